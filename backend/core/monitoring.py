@@ -11,6 +11,10 @@ import logging
 from dataclasses import dataclass, field
 from collections import deque, defaultdict
 import time
+from urllib.parse import urlparse
+
+from .fanout import FanoutHub
+from .histograms import HistogramRegistry
 
 class AlertLevel(Enum):
     INFO = "info"
@@ -46,27 +50,31 @@ class Metric:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 class MetricsCollector:
-    """Collect and aggregate metrics"""
+    """Collect and aggregate metrics
+    
+    Timer and histogram samples are folded into fixed-memory latency
+    sketches instead of being kept as individual Metric objects.
+    """
     
     def __init__(self, max_history: int = 10000):
         self.metrics_history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=max_history))
         self.current_values: Dict[str, float] = {}
         self.counters: Dict[str, float] = defaultdict(float)
-        self.timers: Dict[str, List[float]] = defaultdict(list)
+        self.histograms = HistogramRegistry()
         self.logger = logging.getLogger(__name__)
     
     def record_metric(self, metric: Metric):
         """Record a single metric"""
-        self.metrics_history[metric.name].append(metric)
         self.current_values[metric.name] = metric.value
         
+        if metric.metric_type in (MetricType.TIMER, MetricType.HISTOGRAM):
+            self.histograms.observe(metric.name, metric.value, metric.tags)
+            return
+        
+        self.metrics_history[metric.name].append(metric)
+        
         if metric.metric_type == MetricType.COUNTER:
             self.counters[metric.name] += metric.value
-        elif metric.metric_type == MetricType.TIMER:
-            self.timers[metric.name].append(metric.value)
-            # Keep only last 1000 timer measurements
-            if len(self.timers[metric.name]) > 1000:
-                self.timers[metric.name] = self.timers[metric.name][-1000:]
     
     def increment_counter(self, name: str, value: float = 1.0, tags: Dict[str, str] = None):
         """Increment a counter metric"""
@@ -101,8 +109,17 @@ class MetricsCollector:
         )
         self.record_metric(metric)
     
+    def get_percentiles(self, name: str, tags: Dict[str, str] = None,
+                        time_window: timedelta = None) -> Dict[str, float]:
+        """Get count/mean/p50/p90/p99 for a timer, filtered by a subset of tags"""
+        window = time_window.total_seconds() if time_window else None
+        return self.histograms.percentiles(name, tags, window_seconds=window)
+    
     def get_metric_summary(self, name: str, time_window: timedelta = None) -> Dict[str, Any]:
         """Get summary statistics for a metric"""
+        if name in self.histograms.names():
+            return self._timer_summary(name, time_window)
+        
         if name not in self.metrics_history:
             return {}
         
@@ -128,17 +145,35 @@ class MetricsCollector:
             'latest_timestamp': metrics[-1].timestamp.isoformat()
         }
         
-        # Calculate percentiles for timers
-        if metrics[0].metric_type == MetricType.TIMER and values:
-            sorted_values = sorted(values)
-            n = len(sorted_values)
-            summary.update({
-                'p50': sorted_values[int(n * 0.5)],
-                'p95': sorted_values[int(n * 0.95)],
-                'p99': sorted_values[int(n * 0.99)]
-            })
+        return summary
+    
+    def _timer_summary(self, name: str, time_window: timedelta = None) -> Dict[str, Any]:
+        """Summary for sketch-backed metrics, same keys as get_metric_summary"""
+        window = time_window.total_seconds() if time_window else None
+        snapshot = self.histograms.snapshot(name, window_seconds=window)
+        if not snapshot.count:
+            return {}
         
+        summary = {
+            'count': snapshot.count,
+            'current': self.current_values.get(name),
+            'min': snapshot.min,
+            'max': snapshot.max,
+            'avg': snapshot.mean,
+            'sum': snapshot.sum,
+        }
+        quantiles = snapshot.quantiles((0.5, 0.9, 0.95, 0.99))
+        summary.update({
+            'p50': quantiles[0.5],
+            'p90': quantiles[0.9],
+            'p95': quantiles[0.95],
+            'p99': quantiles[0.99]
+        })
         return summary
+    
+    def export_prometheus(self, prefix: str = "crawler") -> str:
+        """Render timer sketches in Prometheus text format"""
+        return self.histograms.render_prometheus(prefix)
 
 class CrawlMonitor:
     """Monitor crawl jobs and system health"""
@@ -192,6 +227,21 @@ class CrawlMonitor:
         runtime = (datetime.now() - stats['start_time']).total_seconds()
         self.metrics.set_gauge(f'job_runtime_{job_id}', runtime)
     
+    def record_request(self, url: str, duration: float, stage: str = 'fetch'):
+        """Record request latency (seconds) in the per-domain, per-stage sketch"""
+        domain = urlparse(url).netloc or 'unknown'
+        self.metrics.record_time('response_time', duration * 1000, {'domain': domain, 'stage': stage})
+    
+    def get_latency_percentiles(self, domain: str = None, stage: str = None,
+                                time_window: timedelta = None) -> Dict[str, float]:
+        """p50/p90/p99 response time in milliseconds"""
+        tags = {}
+        if domain:
+            tags['domain'] = domain
+        if stage:
+            tags['stage'] = stage
+        return self.metrics.get_percentiles('response_time', tags, time_window)
+    
     def add_job_error(self, job_id: str, error: str):
         """Add error to job monitoring"""
         if job_id in self.job_stats:
@@ -385,7 +435,9 @@ class CrawlMonitor:
             'jobs_started': self.metrics.get_metric_summary('jobs_started', timedelta(hours=1)),
             'jobs_completed': self.metrics.get_metric_summary('jobs_completed', timedelta(hours=1)),
             'pages_crawled': self.metrics.get_metric_summary('job_pages_crawled', timedelta(hours=1)),
-            'avg_response_time': self.metrics.get_metric_summary('response_time', timedelta(hours=1))
+            'avg_response_time': self.metrics.get_metric_summary('response_time', timedelta(hours=1)),
+            'latency_by_domain': self.metrics.histograms.breakdown('response_time', 'domain'),
+            'latency_by_stage': self.metrics.histograms.breakdown('response_time', 'stage')
         }
         
         return {
@@ -397,10 +449,14 @@ class CrawlMonitor:
         }
 
 class RealTimeNotifier:
-    """Real-time notification system"""
+    """Real-time notification system
     
-    def __init__(self):
-        self.websocket_clients: List = []
+    WebSocket delivery goes through a FanoutHub: each client has its own
+    bounded queue, so a slow dashboard never delays the others.
+    """
+    
+    def __init__(self, hub: FanoutHub = None):
+        self.hub = hub or FanoutHub()
         self.notification_channels = {
             'email': [],
             'slack': [],
@@ -408,35 +464,41 @@ class RealTimeNotifier:
         }
         self.logger = logging.getLogger(__name__)
     
+    @property
+    def websocket_clients(self) -> List:
+        return [s.websocket for s in self.hub.subscribers.values()]
+    
     async def subscribe_websocket(self, websocket):
         """Subscribe websocket client for real-time updates"""
-        self.websocket_clients.append(websocket)
-        self.logger.info(f"WebSocket client subscribed, total: {len(self.websocket_clients)}")
+        await self.hub.start()
+        send = getattr(websocket, 'send_text', None) or websocket.send
+        await self.hub.subscribe(websocket, send)
+        self.logger.info(f"WebSocket client subscribed, total: {self.hub.subscriber_count}")
     
     async def unsubscribe_websocket(self, websocket):
         """Unsubscribe websocket client"""
-        if websocket in self.websocket_clients:
-            self.websocket_clients.remove(websocket)
-            self.logger.info(f"WebSocket client unsubscribed, total: {len(self.websocket_clients)}")
-    
-    async def broadcast_update(self, update_type: str, data: Dict[str, Any]):
-        """Broadcast update to all WebSocket clients"""
-        message = {
-            'type': update_type,
-            'data': data,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        # Remove disconnected clients
-        active_clients = []
-        for client in self.websocket_clients:
-            try:
-                await client.send(json.dumps(message))
-                active_clients.append(client)
-            except Exception as e:
-                self.logger.warning(f"Failed to send to WebSocket client: {e}")
+        await self.hub.unsubscribe(websocket)
+        self.logger.info(f"WebSocket client unsubscribed, total: {self.hub.subscriber_count}")
+    
+    async def broadcast_update(self, update_type: str, data: Dict[str, Any], key: str = None):
+        """Broadcast update to all WebSocket clients
         
-        self.websocket_clients = active_clients
+        Queues the update and returns immediately. Updates sharing a ``key``
+        coalesce so lagging clients only receive the latest one.
+        """
+        self.hub.publish(update_type, data, key)
+    
+    def publish_metric(self, name: str, value: float):
+        """Buffer a high-frequency gauge; sent to clients on the next tick"""
+        self.hub.record_metric(name, value)
+    
+    def discard_metric(self, name: str):
+        """Stop publishing a gauge and remove it from clients' metric state"""
+        self.hub.discard_metric(name)
+    
+    def publish_dashboard(self, dashboard: Dict[str, Any]):
+        """Publish dashboard state; clients receive only what changed"""
+        self.hub.publish_state('dashboard', dashboard)
     
     async def send_alert_notification(self, alert: Alert):
         """Send alert through configured notification channels"""
@@ -3,6 +3,7 @@ Main FastAPI server integrating all crawler components
 """
 from fastapi import FastAPI, WebSocket, HTTPException, BackgroundTasks, Depends
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
@@ -312,6 +313,11 @@ async def get_system_health():
     health_data = await crawl_monitor.monitor_system_health()
     return health_data
 
+@app.get("/api/monitoring/metrics", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """Latency percentiles in Prometheus text format"""
+    return crawl_monitor.metrics.export_prometheus()
+
 @app.get("/api/monitoring/alerts")
 async def get_alerts(user: dict = Depends(get_current_user)):
     """Get recent alerts"""
@@ -355,6 +361,7 @@ async def execute_job_background(job_id: str):
         
         # Update progress
         for i, result in enumerate(results):
+            crawl_monitor.record_request(result.url, result.processing_time, stage='crawl')
             crawl_monitor.update_job_progress(
                 job_id,
                 pages_crawled=1 if result.success else 0,
@@ -365,6 +372,7 @@ async def execute_job_background(job_id: str):
             # Update job progress
             progress = (i + 1) / len(job.target_urls)
             job.progress = progress
+            notifier.publish_metric(f'job_progress.{job_id}', progress)
             job.results_count = sum(1 for r in results[:i+1] if r.success)
         
         # Process results
@@ -395,6 +403,10 @@ async def execute_job_background(job_id: str):
         if job:
             job.status = JobStatus.FAILED
             job.error_message = str(e)
+    
+    finally:
+        # Progress is only meaningful while the job runs
+        notifier.discard_metric(f'job_progress.{job_id}')
 
 # Health check endpoint
 @app.get("/health")
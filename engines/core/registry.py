@@ -17,9 +17,19 @@ class ServiceRegistry:
     """
     Unified service registry for managing all services, agents, and engines
     Sammanfogad från core/registry.py, agents/registry.py och tools/registry.py
+    
+    Services are started level by level: every service in a level depends
+    only on services in earlier levels, so the services of a level start
+    concurrently. Each level waits for the whole previous level, so cold
+    start takes the sum of the slowest start in every level rather than
+    the sum of all services. Shutdown runs the levels in reverse, and
+    health checks fan out to all services at once.
     """
     
-    def __init__(self):
+    def __init__(self,
+                 start_timeout: Optional[float] = 60.0,
+                 stop_timeout: Optional[float] = 30.0,
+                 health_check_timeout: Optional[float] = 10.0):
         self._services: Dict[str, BaseService] = {}
         self._agents: Dict[str, BaseAgent] = {}
         self._engines: Dict[str, BaseEngine] = {}
@@ -27,11 +37,21 @@ class ServiceRegistry:
         self._dependencies: Dict[str, Set[str]] = defaultdict(set)
         self._startup_order: List[str] = []
         self._shutdown_order: List[str] = []
+        self._startup_levels: List[List[str]] = []
+        self._timeouts: Dict[str, float] = {}
+        self.start_timeout = start_timeout
+        self.stop_timeout = stop_timeout
+        self.health_check_timeout = health_check_timeout
         self._health_monitoring = True
         self._lock = asyncio.Lock()
         
-    async def register_service(self, service: BaseService, dependencies: List[str] = None) -> bool:
-        """Register a service in the registry"""
+    async def register_service(self, service: BaseService, dependencies: List[str] = None,
+                               start_timeout: Optional[float] = None) -> bool:
+        """Register a service in the registry
+        
+        ``start_timeout`` overrides the registry-wide start timeout for
+        services with slow initialization.
+        """
         async with self._lock:
             service_name = service.name
             
@@ -40,6 +60,8 @@ class ServiceRegistry:
                 
             self._services[service_name] = service
             self._service_types[service_name] = type(service)
+            if start_timeout is not None:
+                self._timeouts[service_name] = start_timeout
             
             # Handle dependencies
             if dependencies:
@@ -76,6 +98,7 @@ class ServiceRegistry:
             del self._services[service_name]
             self._service_types.pop(service_name, None)
             self._dependencies.pop(service_name, None)
+            self._timeouts.pop(service_name, None)
             self._agents.pop(service_name, None)
             self._engines.pop(service_name, None)
             
@@ -112,63 +135,140 @@ class ServiceRegistry:
         return [engine for engine in self._engines.values() 
                 if engine.engine_type == engine_type]
                 
-    async def start_all_services(self) -> Dict[str, bool]:
-        """Start all services in dependency order"""
-        results = {}
+    async def start_all_services(self, fail_fast: bool = False) -> Dict[str, bool]:
+        """Start all services in dependency order, one level at a time
         
-        for service_name in self._startup_order:
-            service = self._services.get(service_name)
-            if service:
-                try:
-                    logger.info(f"Starting service: {service_name}")
-                    result = await service.start()
-                    results[service_name] = result
-                    if not result:
-                        logger.error(f"Failed to start service: {service_name}")
-                        # Continue with other services
-                except Exception as e:
-                    logger.error(f"Exception starting service {service_name}: {e}")
+        Services whose dependencies failed to start are skipped. With
+        ``fail_fast`` the first failure also cancels the rest of its level
+        and skips all later levels. Services that time out or are cancelled
+        are stopped again, ending in ERROR and STOPPED respectively.
+        """
+        results: Dict[str, bool] = {}
+        failed: Set[str] = set()
+        
+        for level in self._startup_levels:
+            startable = []
+            for service_name in level:
+                if service_name not in self._services:
+                    continue
+                blocked = self._dependencies.get(service_name, set()) & failed
+                if blocked:
+                    logger.error(f"Skipping service {service_name}: dependencies failed: {sorted(blocked)}")
                     results[service_name] = False
+                    failed.add(service_name)
+                else:
+                    startable.append(service_name)
                     
-        return results
+            tasks = {
+                asyncio.ensure_future(self._start_service(name)): name
+                for name in startable
+            }
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    service_name = tasks[task]
+                    results[service_name] = task.result()
+                    if not results[service_name]:
+                        failed.add(service_name)
+                if failed and fail_fast and pending:
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+                    for task in pending:
+                        logger.error(f"Cancelled startup of service {tasks[task]}")
+                        results[tasks[task]] = False
+                        failed.add(tasks[task])
+                    pending = set()
+                    
+            if failed and fail_fast:
+                remaining = [name for later in self._startup_levels for name in later
+                             if name in self._services and name not in results]
+                for service_name in remaining:
+                    results[service_name] = False
+                if remaining:
+                    logger.error(f"Startup aborted, not starting: {remaining}")
+                break
+                
+        return {name: results[name] for name in self._startup_order if name in results}
+        
+    async def _start_service(self, service_name: str) -> bool:
+        service = self._services[service_name]
+        timeout = self._timeouts.get(service_name, self.start_timeout)
+        try:
+            logger.info(f"Starting service: {service_name}")
+            result = await asyncio.wait_for(service.start(), timeout)
+            if not result:
+                logger.error(f"Failed to start service: {service_name}")
+            return bool(result)
+        except asyncio.CancelledError:
+            await self._abort_start(service_name, ServiceStatus.STOPPED)
+            raise
+        except asyncio.TimeoutError:
+            logger.error(f"Service {service_name} did not start within {timeout}s")
+            await self._abort_start(service_name, ServiceStatus.ERROR)
+            return False
+        except Exception as e:
+            logger.error(f"Exception starting service {service_name}: {e}")
+            await self._abort_start(service_name, ServiceStatus.ERROR)
+            return False
+            
+    async def _abort_start(self, service_name: str, status: ServiceStatus):
+        """Release whatever an interrupted start acquired and record the final state"""
+        await self._stop_service(service_name)
+        self._services[service_name].status = status
         
     async def stop_all_services(self) -> Dict[str, bool]:
-        """Stop all services in reverse dependency order"""
+        """Stop all services in reverse dependency order, one level at a time"""
         results = {}
         
-        for service_name in reversed(self._shutdown_order):
-            service = self._services.get(service_name)
-            if service and service.status == ServiceStatus.RUNNING:
-                try:
-                    logger.info(f"Stopping service: {service_name}")
-                    result = await service.stop()
-                    results[service_name] = result
-                except Exception as e:
-                    logger.error(f"Exception stopping service {service_name}: {e}")
-                    results[service_name] = False
+        for level in reversed(self._startup_levels):
+            running = [name for name in level
+                       if name in self._services and self._services[name].status == ServiceStatus.RUNNING]
+            stopped = await asyncio.gather(*(self._stop_service(name) for name in running))
+            results.update(zip(running, stopped))
                     
         return results
         
+    async def _stop_service(self, service_name: str) -> bool:
+        try:
+            logger.info(f"Stopping service: {service_name}")
+            return await asyncio.wait_for(self._services[service_name].stop(), self.stop_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Service {service_name} did not stop within {self.stop_timeout}s")
+            return False
+        except Exception as e:
+            logger.error(f"Exception stopping service {service_name}: {e}")
+            return False
+        
     async def health_check_all(self) -> Dict[str, Dict[str, Any]]:
-        """Perform health check on all services"""
-        health_results = {}
+        """Perform health check on all services concurrently"""
+        names = list(self._services)
+        checks = await asyncio.gather(*(self._health_check_service(name) for name in names))
+        return dict(zip(names, checks))
         
-        for service_name, service in self._services.items():
-            try:
-                health = await service.health_check()
-                health_results[service_name] = {
-                    'status': 'healthy',
-                    'details': health,
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-            except Exception as e:
-                health_results[service_name] = {
-                    'status': 'unhealthy',
-                    'error': str(e),
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-                
-        return health_results
+    async def _health_check_service(self, service_name: str) -> Dict[str, Any]:
+        try:
+            health = await asyncio.wait_for(
+                self._services[service_name].health_check(), self.health_check_timeout
+            )
+            return {
+                'status': 'healthy',
+                'details': health,
+                'timestamp': datetime.utcnow().isoformat()
+            }
+        except asyncio.TimeoutError:
+            return {
+                'status': 'unhealthy',
+                'error': f"health check timed out after {self.health_check_timeout}s",
+                'timestamp': datetime.utcnow().isoformat()
+            }
+        except Exception as e:
+            return {
+                'status': 'unhealthy',
+                'error': str(e),
+                'timestamp': datetime.utcnow().isoformat()
+            }
         
     async def get_service_info(self, service_name: str) -> Optional[ServiceInfo]:
         """Get detailed service information"""
@@ -199,45 +299,45 @@ class ServiceRegistry:
             'total_engines': len(self._engines),
             'running_services': running_services,
             'startup_order': self._startup_order.copy(),
+            'startup_levels': [level.copy() for level in self._startup_levels],
             'dependencies': dict(self._dependencies),
             'health_monitoring': self._health_monitoring
         }
         
     async def _update_startup_order(self):
-        """Update the startup order based on dependencies"""
-        # Topological sort for dependency resolution
-        def topological_sort(services, dependencies):
-            in_degree = {service: 0 for service in services}
-            
-            # Calculate in-degrees
-            for service in services:
-                for dep in dependencies.get(service, set()):
-                    if dep in in_degree:
-                        in_degree[service] += 1
-                        
-            # Process services with no dependencies first
-            queue = [service for service, degree in in_degree.items() if degree == 0]
-            result = []
-            
-            while queue:
-                service = queue.pop(0)
-                result.append(service)
-                
-                # Update in-degrees for dependent services
-                for dependent in services:
-                    if service in dependencies.get(dependent, set()):
-                        in_degree[dependent] -= 1
-                        if in_degree[dependent] == 0:
-                            queue.append(dependent)
-                            
-            return result
+        """Update the startup order and levels based on dependencies"""
+        # Topological sort by level: a service's level is one more than
+        # the highest level among its registered dependencies
+        services = list(self._services.keys())
+        dependents: Dict[str, List[str]] = defaultdict(list)
+        in_degree = {service: 0 for service in services}
+        
+        for service in services:
+            for dep in self._dependencies.get(service, set()):
+                if dep in in_degree:
+                    in_degree[service] += 1
+                    dependents[dep].append(service)
+                    
+        levels = []
+        current = [service for service, degree in in_degree.items() if degree == 0]
+        while current:
+            levels.append(current)
+            following = []
+            for service in current:
+                for dependent in dependents[service]:
+                    in_degree[dependent] -= 1
+                    if in_degree[dependent] == 0:
+                        following.append(dependent)
+            current = following
             
-        self._startup_order = topological_sort(
-            list(self._services.keys()), 
-            self._dependencies
-        )
+        self._startup_levels = levels
+        self._startup_order = [service for level in levels for service in level]
         self._shutdown_order = self._startup_order.copy()
         
+        unordered = [service for service in services if in_degree[service] > 0]
+        if unordered:
+            logger.warning(f"Circular dependencies, services will not be started: {unordered}")
+        
     async def find_service_by_capability(self, capability: str) -> Optional[BaseAgent]:
         """Find the first available agent with a specific capability"""
         for agent in self._agents.values():
@@ -9,8 +9,8 @@ import asyncio
 import aiohttp
 import json
 from typing import Dict, List, Any, Optional, Union
-from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+from dataclasses import dataclass, field, fields
+from datetime import datetime
 from enum import Enum
 import re
 from urllib.parse import urljoin, urlencode
@@ -22,6 +22,8 @@ try:
 except ImportError:
     HTTPX_AVAILABLE = False
 
+from .vehicle_cache import COALESCED, HIT, VehicleLookupCache
+
 logger = logging.getLogger(__name__)
 
 class VehicleDataSource(Enum):
@@ -131,10 +133,51 @@ class VehicleSearchResult:
     success: bool
     error_message: Optional[str] = None
 
+def _to_json(obj) -> Dict[str, Any]:
+    """Dataclass fields as JSON-safe values (enums by value, datetimes as ISO strings)"""
+    data = {}
+    for f in fields(obj):
+        value = getattr(obj, f.name)
+        if isinstance(value, Enum):
+            value = value.value
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        data[f.name] = value
+    return data
+
+def _datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+def encode_search_result(result: VehicleSearchResult) -> Dict[str, Any]:
+    """VehicleSearchResult as JSON-safe data for the on-disk lookup cache"""
+    data = _to_json(result)
+    data["results"] = [_to_json(vehicle) for vehicle in result.results]
+    return data
+
+def decode_search_result(data: Dict[str, Any]) -> VehicleSearchResult:
+    """Inverse of encode_search_result"""
+    vehicles = []
+    for vehicle in data["results"]:
+        vehicles.append(VehicleInfo(**{
+            **vehicle,
+            "vehicle_type": VehicleType(vehicle["vehicle_type"]) if vehicle.get("vehicle_type") else None,
+            "source": VehicleDataSource(vehicle["source"]) if vehicle.get("source") else None,
+            "inspection_valid_until": _datetime(vehicle.get("inspection_valid_until")),
+            "first_registration": _datetime(vehicle.get("first_registration")),
+            "last_updated": _datetime(vehicle.get("last_updated")) or datetime.now()
+        }))
+    return VehicleSearchResult(**{
+        **data,
+        "results": vehicles,
+        "source": VehicleDataSource(data["source"]),
+        "search_time": _datetime(data["search_time"])
+    })
+
 class SwedishVehicleDataAdapter:
     """Swedish Vehicle Data integration för vehicle information lookup"""
     
-    def __init__(self, plugin_info):
+    def __init__(self, plugin_info, cache_size: int = 10000, cache_ttl: int = 3600,
+                 cache_path: Optional[str] = None):
         self.plugin_info = plugin_info
         self.initialized = False
         self.session: Optional[aiohttp.ClientSession] = None
@@ -183,15 +226,17 @@ class SwedishVehicleDataAdapter:
             "by_source": {},
             "by_vehicle_type": {},
             "cache_hits": 0,
+            "coalesced_lookups": 0,
             "api_errors": 0,
             "blocket_searches": 0,
             "bytbil_evaluations": 0,
             "market_searches": 0
         }
         
-        # Simple cache
-        self.cache = {}
-        self.cache_ttl = 3600  # 1 hour
+        # Bounded LRU/TTL cache; cache_path keeps it warm across restarts
+        self.cache_ttl = cache_ttl
+        self.cache = VehicleLookupCache(max_entries=cache_size, ttl=cache_ttl, db_path=cache_path,
+                                        encode=encode_search_result, decode=decode_search_result)
         
     async def initialize(self):
         """Initialize Swedish Vehicle Data adapter"""
@@ -219,6 +264,8 @@ class SwedishVehicleDataAdapter:
                 
             for vehicle_type in VehicleType:
                 self.stats["by_vehicle_type"][vehicle_type.value] = 0
+                
+            self.cache.start()
             
             # Test connection to available APIs
             await self._test_api_connectivity()
@@ -265,15 +312,24 @@ class SwedishVehicleDataAdapter:
                 error_message="Invalid Swedish registration number format"
             )
             
-        # Check cache first
-        cache_key = f"vehicle:{reg_number}"
-        if cache_key in self.cache:
-            cached_result = self.cache[cache_key]
-            if datetime.now() - cached_result["timestamp"] < timedelta(seconds=self.cache_ttl):
-                self.stats["cache_hits"] += 1
-                logger.debug(f"💾 Cache hit för vehicle: {reg_number}")
-                return cached_result["data"]
-                
+        # Cached results are returned directly and concurrent lookups of the
+        # same plate share one upstream request
+        result, outcome = await self.cache.get_or_load(
+            f"vehicle:{reg_number}",
+            lambda: self._lookup_uncached(registration_number, reg_number, preferred_sources),
+            should_cache=lambda r: r.success and bool(r.results)
+        )
+        if outcome == HIT:
+            self.stats["cache_hits"] += 1
+            logger.debug(f"💾 Cache hit för vehicle: {reg_number}")
+        elif outcome == COALESCED:
+            self.stats["coalesced_lookups"] += 1
+        return result
+        
+    async def _lookup_uncached(self, registration_number: str, reg_number: str,
+                               preferred_sources: Optional[List[VehicleDataSource]]) -> VehicleSearchResult:
+        """Query the sources in order until one returns the vehicle"""
+        
         # Determine sources to try
         sources_to_try = preferred_sources or [
             VehicleDataSource.TRANSPORTSTYRELSEN,
@@ -290,12 +346,6 @@ class SwedishVehicleDataAdapter:
                 result = await self._lookup_from_source(reg_number, source)
                 
                 if result.success and result.results:
-                    # Cache successful result
-                    self.cache[cache_key] = {
-                        "data": result,
-                        "timestamp": datetime.now()
-                    }
-                    
                     self.stats["successful_lookups"] += 1
                     self.stats["by_source"][source.value]["successes"] += 1
                     
@@ -600,16 +650,32 @@ class SwedishVehicleDataAdapter:
             
     async def batch_lookup(self, registration_numbers: List[str], 
                           max_concurrent: int = 3) -> Dict[str, VehicleSearchResult]:
-        """Look up multiple vehicles concurrently"""
+        """Look up multiple vehicles concurrently
+        
+        Numbers that normalize to the same plate ("ABC123", "abc 123") are
+        looked up once and the result is returned under every input key.
+        """
         
         semaphore = asyncio.Semaphore(max_concurrent)
         
-        async def lookup_with_semaphore(reg_number):
+        # Group input spellings by normalized plate
+        inputs_by_plate: Dict[str, List[str]] = {}
+        for reg_num in registration_numbers:
+            plate = self._normalize_registration_number(reg_num)
+            inputs_by_plate.setdefault(plate, []).append(reg_num)
+            
+        async def lookup_with_semaphore(plate):
+            # Served from cache without taking a concurrency slot
+            # A miss is counted once, by lookup_vehicle
+            cached = self.cache.get(f"vehicle:{plate}", count_miss=False)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                return plate, cached
             async with semaphore:
-                return reg_number, await self.lookup_vehicle(reg_number)
+                return plate, await self.lookup_vehicle(plate)
                 
-        # Create tasks
-        tasks = [lookup_with_semaphore(reg_num) for reg_num in registration_numbers]
+        # One task per unique plate
+        tasks = [lookup_with_semaphore(plate) for plate in inputs_by_plate]
         
         # Execute with concurrency limit
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -618,11 +684,16 @@ class SwedishVehicleDataAdapter:
         batch_results = {}
         for result in results:
             if isinstance(result, tuple):
-                reg_number, search_result = result
-                batch_results[reg_number] = search_result
+                plate, search_result = result
+                for reg_number in inputs_by_plate[plate]:
+                    batch_results[reg_number] = search_result
             else:
                 logger.error(f"❌ Batch lookup error: {str(result)}")
                 
+        duplicates = len(registration_numbers) - len(inputs_by_plate)
+        if duplicates:
+            logger.debug(f"🔁 Batch lookup skipped {duplicates} duplicate registration numbers")
+            
         return batch_results
         
     def get_vehicle_statistics(self) -> Dict[str, Any]:
@@ -635,19 +706,22 @@ class SwedishVehicleDataAdapter:
                 self.stats["successful_lookups"] / max(1, self.stats["total_lookups"])
             ) * 100,
             "cache_hits": self.stats["cache_hits"],
+            "coalesced_lookups": self.stats["coalesced_lookups"],
+            # Share of all requests answered from cache, including batch lookups
             "cache_hit_rate": (
-                self.stats["cache_hits"] / max(1, self.stats["total_lookups"])
+                self.stats["cache_hits"] / max(1, self.stats["cache_hits"] + self.stats["coalesced_lookups"]
+                                              + self.stats["total_lookups"])
             ) * 100,
             "by_source": self.stats["by_source"],
             "by_vehicle_type": self.stats["by_vehicle_type"],
-            "cache_size": len(self.cache)
+            "cache_size": len(self.cache),
+            "cache": self.cache.get_stats()
         }
         
     def get_cached_vehicles(self) -> List[VehicleInfo]:
         """Get all cached vehicles"""
         cached_vehicles = []
-        for cache_entry in self.cache.values():
-            search_result = cache_entry["data"]
+        for search_result in self.cache.values():
             cached_vehicles.extend(search_result.results)
         return cached_vehicles
         
@@ -655,18 +729,10 @@ class SwedishVehicleDataAdapter:
         """Clear vehicle cache"""
         if older_than_hours == 0:
             # Clear all cache
-            cleared = len(self.cache)
-            self.cache.clear()
+            cleared = self.cache.clear()
         else:
             # Clear old entries
-            cutoff_time = datetime.now() - timedelta(hours=older_than_hours)
-            old_keys = [
-                key for key, value in self.cache.items()
-                if value["timestamp"] < cutoff_time
-            ]
-            for key in old_keys:
-                del self.cache[key]
-            cleared = len(old_keys)
+            cleared = self.cache.clear(older_than=older_than_hours * 3600)
             
         logger.info(f"🧹 Cleared {cleared} vehicle cache entries")
         
@@ -1122,7 +1188,8 @@ class SwedishVehicleDataAdapter:
         if hasattr(self, 'blocket_public_session') and self.blocket_public_session:
             await self.blocket_public_session.aclose()
             
-        self.cache.clear()
+        # Persisted cache entries are kept for the next start
+        await self.cache.close()
         self.stats.clear()
         self.blocket_token = None
         self.initialized = False
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Vehicle Lookup Cache för Sparkling-Owl-Spin
+Bounded LRU/TTL cache med single-flight och valfri SQLite-persistens
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How get_or_load answered a lookup
+HIT = "hit"              # fresh value already cached
+COALESCED = "coalesced"  # joined a load another caller had in flight
+LOADED = "loaded"        # this caller ran the loader
+
+
+class _LoadAbandoned(Exception):
+    """Set on a shared load whose leading caller was cancelled"""
+
+
+class VehicleLookupCache:
+    """
+    Size-bounded LRU cache with per-entry TTL for vehicle lookups.
+
+    - least recently used entries are evicted once ``max_entries`` is reached
+    - expired entries are dropped on read and by a background sweep
+    - concurrent ``get_or_load`` calls for the same key share one upstream
+      request (single-flight), so repeated plates cost one API call
+    - with ``db_path`` entries are written through to SQLite and loaded
+      on startup, so a warm cache survives restarts
+
+    The on-disk store holds JSON: ``encode`` turns a value into JSON-safe
+    data and ``decode`` rebuilds it, so reading the file never executes
+    code. Rows that fail to decode are dropped.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600,
+                 db_path: Optional[str] = None, sweep_interval: float = 60.0,
+                 encode: Callable[[Any], Any] = lambda value: value,
+                 decode: Callable[[Any], Any] = lambda data: data):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.sweep_interval = sweep_interval
+        self._encode = encode
+        self._decode = decode
+
+        # key -> (value, stored_at wall clock)
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS vehicle_lookup_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            """)
+            self._load()
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+    def _load(self):
+        """Warm the in-memory cache from disk, newest entries last"""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            self._conn.execute("DELETE FROM vehicle_lookup_cache WHERE stored_at < ?", (cutoff,))
+            rows = self._conn.execute(
+                "SELECT cache_key, value, stored_at FROM vehicle_lookup_cache "
+                "ORDER BY stored_at DESC LIMIT ?", (self.max_entries,)
+            ).fetchall()
+        unreadable = []
+        for key, payload, stored_at in reversed(rows):
+            try:
+                self._entries[key] = (self._decode(json.loads(payload)), stored_at)
+            except Exception as e:
+                logger.debug(f"Dropping unreadable cache entry {key}: {str(e)}")
+                unreadable.append((key,))
+        if unreadable:
+            with self._lock:
+                self._conn.executemany("DELETE FROM vehicle_lookup_cache WHERE cache_key = ?", unreadable)
+        if rows:
+            logger.info(f"💾 Loaded {len(self._entries)} cached vehicle lookups från disk")
+
+    def _expired(self, stored_at: float, now: Optional[float] = None) -> bool:
+        return (now or time.time()) - stored_at >= self.ttl
+
+    def get(self, key: str, count_miss: bool = True) -> Optional[Any]:
+        """Return a fresh cached value or None
+
+        Pass ``count_miss=False`` when a miss is followed by ``get_or_load``
+        for the same key, which counts it.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            if count_miss:
+                self.stats["misses"] += 1
+            return None
+        value, stored_at = entry
+        if self._expired(stored_at):
+            self._remove(key)
+            self.stats["expirations"] += 1
+            if count_miss:
+                self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        """Store a value, evicting the least recently used entries if full"""
+        stored_at = time.time()
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            evicted.append(old_key)
+        self.stats["evictions"] += len(evicted)
+
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO vehicle_lookup_cache (cache_key, value, stored_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, json.dumps(self._encode(value), ensure_ascii=False, default=str), stored_at)
+                )
+                if evicted:
+                    self._conn.executemany(
+                        "DELETE FROM vehicle_lookup_cache WHERE cache_key = ?",
+                        [(k,) for k in evicted]
+                    )
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]],
+                          should_cache: Callable[[Any], bool] = lambda value: True) -> Tuple[Any, str]:
+        """
+        Return the cached value for ``key`` or load it once
+
+        Callers arriving while a load for the same key is in progress wait
+        for that load instead of starting their own. Returns the value and
+        how it was obtained: ``HIT``, ``COALESCED`` or ``LOADED``.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, HIT
+        return await self._load_once(key, loader, should_cache)
+
+    async def _load_once(self, key: str, loader: Callable[[], Awaitable[Any]],
+                         should_cache: Callable[[Any], bool]) -> Tuple[Any, str]:
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(pending), COALESCED
+            except _LoadAbandoned:
+                # The leading caller was cancelled; take over the load
+                return await self._load_once(key, loader, should_cache)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.stats["loads"] += 1
+        try:
+            value = await loader()
+        except BaseException as e:
+            future.set_exception(e if isinstance(e, Exception) else _LoadAbandoned())
+            # Retrieved here so a load nobody waited for is not logged as unhandled
+            future.exception()
+            raise
+        else:
+            if should_cache(value):
+                self.set(key, value)
+            future.set_result(value)
+            return value, LOADED
+        finally:
+            self._inflight.pop(key, None)
+
+    def _remove(self, key: str):
+        self._entries.pop(key, None)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM vehicle_lookup_cache WHERE cache_key = ?", (key,))
+
+    def expire(self) -> int:
+        """Drop every expired entry; returns the number removed"""
+        now = time.time()
+        expired = [key for key, (_, stored_at) in self._entries.items() if self._expired(stored_at, now)]
+        for key in expired:
+            self._entries.pop(key, None)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM vehicle_lookup_cache WHERE stored_at <= ?", (now - self.ttl,))
+        self.stats["expirations"] += len(expired)
+        return len(expired)
+
+    def start(self):
+        """Start the background expiry sweep on the running event loop"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep())
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                removed = self.expire()
+                if removed:
+                    logger.debug(f"🧹 Expired {removed} vehicle cache entries")
+            except Exception as e:
+                logger.warning(f"⚠️ Vehicle cache sweep failed: {str(e)}")
+
+    def clear(self, older_than: Optional[float] = None) -> int:
+        """Remove all entries, or only those stored more than ``older_than`` seconds ago"""
+        if older_than is None:
+            cleared = len(self._entries)
+            self._entries.clear()
+            if self._conn is not None:
+                with self._lock:
+                    self._conn.execute("DELETE FROM vehicle_lookup_cache")
+            return cleared
+
+        cutoff = time.time() - older_than
+        old_keys = [key for key, (_, stored_at) in self._entries.items() if stored_at < cutoff]
+        for key in old_keys:
+            self._entries.pop(key, None)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM vehicle_lookup_cache WHERE stored_at < ?", (cutoff,))
+        return len(old_keys)
+
+    def values(self) -> Iterator[Any]:
+        """Iterate over fresh cached values"""
+        now = time.time()
+        return iter([value for value, stored_at in list(self._entries.values())
+                     if not self._expired(stored_at, now)])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and not self._expired(entry[1])
+
+    async def close(self):
+        """Stop the sweep and close the on-disk store; persisted entries are kept"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            "persistent": self._conn is not None
+        }
@@ -34,12 +34,18 @@ __version__ = "1.0.0"
 __author__ = "ECaDP Development Team"
 __email__ = "dev@ecadp.com"
 
-# Core imports for easy access
-from .crawler import BaseCrawler
-from .scraper import BaseScraper
-from .proxy_pool import ProxyManager
-from .database import DatabaseManager
-from .observability import MetricsCollector
+import importlib
+from typing import Any
+
+# Core components, imported on first attribute access so that importing an
+# entry point (``src.cli``, ``src.scheduler``) does not load every subsystem
+_LAZY_IMPORTS = {
+    "BaseCrawler": ".crawler",
+    "BaseScraper": ".scraper",
+    "ProxyManager": ".proxy_pool",
+    "DatabaseManager": ".database",
+    "MetricsCollector": ".observability",
+}
 
 __all__ = [
     "BaseCrawler",
@@ -50,4 +56,17 @@ __all__ = [
     "__version__",
     "__author__",
     "__email__"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -6,30 +6,52 @@ Large Language Models för intelligent strukturerad dataextraktion.
 """
 
 import asyncio
+import copy
+import hashlib
 import json
 import logging
-from typing import Dict, List, Any, Optional, Union, Tuple
-from dataclasses import dataclass, asdict
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Union, Tuple
+from dataclasses import dataclass, asdict, replace
 from enum import Enum
 import re
 from datetime import datetime
 
 # AI/ML imports
-import openai
-import anthropic
-from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
-import torch
-
-# Web scraping imports  
-from bs4 import BeautifulSoup
-import lxml.html
-from playwright.async_api import Page
+try:
+    import openai
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+try:
+    import anthropic
+    ANTHROPIC_AVAILABLE = True
+except ImportError:
+    ANTHROPIC_AVAILABLE = False
+
+try:
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+    import torch
+    TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    TRANSFORMERS_AVAILABLE = False
+
+# Web scraping imports
+if TYPE_CHECKING:
+    from playwright.async_api import Page
 
 # Internal imports
+from src.ai.html_pruning import HTMLPruner, PruningProfile
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Output limit of the hosted models; micro-batches scale up to it
+MAX_OUTPUT_TOKENS = 4096
+
 
 class ExtractionModel(Enum):
     """Supported AI models for extraction"""
@@ -71,6 +93,8 @@ class ExtractionSchema:
     fields: List[ExtractionField]
     context_instructions: str = None
     examples: List[Dict[str, Any]] = None
+    # XPath or CSS selectors of the template regions holding the fields
+    region_selectors: List[str] = None
 
 
 @dataclass
@@ -84,6 +108,76 @@ class ExtractionResult:
     tokens_used: int = 0
     errors: List[str] = None
     raw_response: str = None
+    cached: bool = False
+
+
+@dataclass(frozen=True)
+class ExtractionPrompt:
+    """Prompt split into the schema prefix shared by all pages and the page body"""
+    prefix: str
+    body: str
+    pages: int = 1
+    
+    @property
+    def text(self) -> str:
+        return self.prefix + self.body
+
+
+class ExtractionCache:
+    """
+    Bounded LRU cache of extraction results keyed by content hash.
+    
+    Entries older than ``ttl`` seconds are treated as missing.
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, ExtractionResult]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: str) -> Optional[ExtractionResult]:
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def put(self, key: str, result: ExtractionResult):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic(), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+    
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
 
 
 class AIExtractionEngine:
@@ -92,13 +186,23 @@ class AIExtractionEngine:
     
     Använder state-of-the-art AI models för att extrahera strukturerad data
     från webbsidor med naturlig språkförståelse.
+    
+    Pages are pruned to their schema-relevant text before prompting. Results
+    are cached by a hash of that text, and the schema part of the prompt is
+    built once and sent as a stable prefix. ``batch_extract`` also packs small
+    pages into shared model calls.
     """
     
     def __init__(self, 
                  openai_api_key: str = None,
                  anthropic_api_key: str = None,
                  default_model: ExtractionModel = ExtractionModel.GPT_4_TURBO,
-                 local_model_path: str = None):
+                 local_model_path: str = None,
+                 cache_size: int = 1024,
+                 cache_ttl: Optional[float] = None,
+                 max_content_chars: int = 8000,
+                 micro_batch_size: int = 4,
+                 micro_batch_max_chars: int = 1500):
         
         self.openai_client = None
         self.anthropic_client = None
@@ -107,9 +211,13 @@ class AIExtractionEngine:
         
         # Initialize API clients
         if openai_api_key:
+            if not OPENAI_AVAILABLE:
+                raise ImportError("OpenAI models require the openai package")
             self.openai_client = openai.AsyncOpenAI(api_key=openai_api_key)
             
         if anthropic_api_key:
+            if not ANTHROPIC_AVAILABLE:
+                raise ImportError("Claude models require the anthropic package")
             self.anthropic_client = anthropic.AsyncAnthropic(api_key=anthropic_api_key)
             
         # Initialize local model if specified
@@ -117,12 +225,35 @@ class AIExtractionEngine:
             self._load_local_model(local_model_path)
             
         self.default_model = default_model
-        self.extraction_cache = {}
+        self.extraction_cache = ExtractionCache(max_entries=cache_size, ttl=cache_ttl)
+        self.pruner = HTMLPruner(max_chars=max_content_chars)
+        # Pages up to micro_batch_max_chars are packed micro_batch_size to a call
+        self.micro_batch_size = micro_batch_size
+        self.micro_batch_max_chars = micro_batch_max_chars
+        
+        # Per-schema state, keyed by schema fingerprint
+        self._pruning_profiles: Dict[str, PruningProfile] = {}
+        self._prompt_prefixes: Dict[Tuple[str, str], str] = {}
+        # Identical extractions already running, shared by concurrent callers
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        # Encoded prompt prefixes (token ids, KV cache) for the local model
+        self._local_prefixes: Dict[str, Tuple[Any, Any]] = {}
+        self._local_prefix_lock = threading.Lock()
+        self._reuse_local_kv_cache = True
+        
+        self.stats = {
+            'model_calls': 0,
+            'micro_batches': 0,
+            'batched_pages': 0
+        }
         
         logger.info(f"AI Extraction Engine initialized with model: {default_model.value}")
     
     def _load_local_model(self, model_path: str):
         """Load local Hugging Face model"""
+        if not TRANSFORMERS_AVAILABLE:
+            logger.error("Local models require the transformers and torch packages")
+            return
         try:
             self.local_tokenizer = AutoTokenizer.from_pretrained(model_path)
             self.local_model = AutoModelForCausalLM.from_pretrained(
@@ -142,23 +273,64 @@ class AIExtractionEngine:
                               max_retries: int = 3) -> ExtractionResult:
         """
         Extract structured data from HTML using AI
+        
+        Pages whose pruned content was extracted before, with the same schema,
+        model and strategy, are answered from the cache; concurrent requests
+        for the same content share a single model call.
         """
         start_time = datetime.now()
         model = model or self.default_model
         
         try:
-            # Clean and preprocess HTML
-            cleaned_html = self._preprocess_html(html_content)
+            # Prune to schema-relevant text
+            content = self._preprocess_html(html_content, schema)
+            if not content.strip():
+                # Never prompt or cache under empty content; every such page would share one key
+                return self._failure(model, start_time, "Page has no extractable text")
+            key = self._cache_key(content, schema, model, strategy)
             
-            # Build extraction prompt
-            prompt = self._build_extraction_prompt(cleaned_html, schema, strategy)
+            cached = self.extraction_cache.get(key)
+            if cached is not None:
+                return self._from_cache(cached, start_time)
             
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                return self._from_cache(await asyncio.shield(in_flight), start_time)
+            
+            future = asyncio.get_running_loop().create_future()
+            self._in_flight[key] = future
+            try:
+                result = await self._extract_content(content, key, schema, model, strategy, max_retries, start_time)
+                future.set_result(result)
+                return result
+            finally:
+                del self._in_flight[key]
+                if not future.done():
+                    future.cancel()
+            
+        except Exception as e:
+            logger.error(f"AI extraction failed: {e}")
+            return self._failure(model, start_time, str(e))
+    
+    async def _extract_content(self,
+                             content: str,
+                             key: str,
+                             schema: ExtractionSchema,
+                             model: ExtractionModel,
+                             strategy: ExtractionStrategy,
+                             max_retries: int,
+                             start_time: datetime) -> ExtractionResult:
+        """Extract one pruned page with retries and cache the successful result"""
+        prompt = self._build_prompt(content, schema, strategy)
+        
+        try:
             # Execute extraction with retries
             for attempt in range(max_retries):
                 try:
                     result = await self._execute_extraction(prompt, model, schema)
                     if result.success:
                         result.extraction_time = (datetime.now() - start_time).total_seconds()
+                        self._store(key, result)
                         return result
                         
                 except Exception as e:
@@ -166,53 +338,109 @@ class AIExtractionEngine:
                     if attempt == max_retries - 1:
                         raise
             
-            return ExtractionResult(
-                success=False,
-                extracted_data={},
-                confidence_score=0.0,
-                model_used=model.value,
-                extraction_time=(datetime.now() - start_time).total_seconds(),
-                errors=[f"All {max_retries} extraction attempts failed"]
-            )
+            return self._failure(model, start_time, f"All {max_retries} extraction attempts failed")
             
         except Exception as e:
             logger.error(f"AI extraction failed: {e}")
-            return ExtractionResult(
-                success=False,
-                extracted_data={},
-                confidence_score=0.0,
-                model_used=model.value,
-                extraction_time=(datetime.now() - start_time).total_seconds(),
-                errors=[str(e)]
-            )
+            return self._failure(model, start_time, str(e))
+    
+    def _failure(self, model: ExtractionModel, start_time: datetime, error: str) -> ExtractionResult:
+        return ExtractionResult(
+            success=False,
+            extracted_data={},
+            confidence_score=0.0,
+            model_used=model.value,
+            extraction_time=(datetime.now() - start_time).total_seconds(),
+            errors=[error]
+        )
+    
+    def _store(self, key: str, result: ExtractionResult):
+        self.extraction_cache.put(key, replace(result, extracted_data=copy.deepcopy(result.extracted_data)))
     
-    def _preprocess_html(self, html_content: str) -> str:
+    def _from_cache(self, result: ExtractionResult, start_time: datetime) -> ExtractionResult:
+        """Copy of a cached or shared result, so callers cannot change the original"""
+        if not result.success:
+            return replace(result, errors=list(result.errors or []))
+        return replace(
+            result,
+            extracted_data=copy.deepcopy(result.extracted_data),
+            extraction_time=(datetime.now() - start_time).total_seconds(),
+            tokens_used=0,
+            cached=True
+        )
+    
+    def _schema_fingerprint(self, schema: ExtractionSchema) -> str:
+        payload = json.dumps(asdict(schema), sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _cache_key(self,
+                   content: str,
+                   schema: ExtractionSchema,
+                   model: ExtractionModel,
+                   strategy: ExtractionStrategy) -> str:
+        digest = hashlib.sha256()
+        for part in (model.value, strategy.value, self._schema_fingerprint(schema), content):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+    
+    def _preprocess_html(self, html_content: str, schema: ExtractionSchema = None) -> str:
         """Clean and prepare HTML for AI processing"""
-        soup = BeautifulSoup(html_content, 'lxml')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "noscript"]):
-            script.decompose()
-        
-        # Remove comments
-        for comment in soup.find_all(string=lambda text: isinstance(text, str) and text.strip().startswith('<!--')):
-            comment.extract()
-        
-        # Get text content with structure preservation
-        text_content = soup.get_text(separator=' ', strip=True)
-        
-        # Limit content length to avoid token limits
-        max_length = 8000  # Adjust based on model limits
-        if len(text_content) > max_length:
-            text_content = text_content[:max_length] + "..."
+        profile = None
+        if schema is not None:
+            fingerprint = self._schema_fingerprint(schema)
+            profile = self._pruning_profiles.get(fingerprint)
+            if profile is None:
+                profile = self._pruning_profiles[fingerprint] = PruningProfile.from_schema(schema)
         
-        return text_content
+        # Limit content length to avoid token limits, keeping the relevant blocks
+        return self.pruner.prune(html_content, profile)
     
     def _build_extraction_prompt(self, 
                                content: str, 
                                schema: ExtractionSchema,
                                strategy: ExtractionStrategy) -> str:
         """Build AI prompt for data extraction"""
+        return self._build_prompt(content, schema, strategy).text
+    
+    def _build_prompt(self,
+                      content: str,
+                      schema: ExtractionSchema,
+                      strategy: ExtractionStrategy) -> ExtractionPrompt:
+        body = f"""
+WEB CONTENT TO ANALYZE:
+{content}
+
+JSON OUTPUT:
+"""
+        return ExtractionPrompt(prefix=self._prompt_prefix(schema, strategy), body=body)
+    
+    def _build_batch_prompt(self,
+                            contents: List[str],
+                            schema: ExtractionSchema,
+                            strategy: ExtractionStrategy) -> ExtractionPrompt:
+        pages = "\n\n".join(f"=== PAGE {i} ===\n{content}" for i, content in enumerate(contents, 1))
+        body = f"""
+The web content below holds {len(contents)} separate pages. Extract the fields from each page on its own and return a JSON object {{"results": [...]}} with exactly {len(contents)} objects, one per page, in page order.
+
+WEB CONTENT TO ANALYZE:
+{pages}
+
+JSON OUTPUT:
+"""
+        return ExtractionPrompt(prefix=self._prompt_prefix(schema, strategy), body=body, pages=len(contents))
+    
+    def _prompt_prefix(self, schema: ExtractionSchema, strategy: ExtractionStrategy) -> str:
+        """
+        Schema part of the prompt, built once per schema and strategy.
+        
+        It holds everything but the page content, so every prompt for a schema
+        starts with the same text and the providers' prompt caches can reuse it.
+        """
+        key = (self._schema_fingerprint(schema), strategy.value)
+        prefix = self._prompt_prefixes.get(key)
+        if prefix is not None:
+            return prefix
         
         # Build field descriptions
         field_descriptions = []
@@ -240,8 +468,8 @@ class AIExtractionEngine:
             ExtractionStrategy.MULTI_STEP: "Break down the extraction into logical steps."
         }
         
-        prompt = f"""
-You are an expert data extraction assistant. Extract structured data from the following web content according to the specified schema.
+        prefix = f"""
+You are an expert data extraction assistant. Extract structured data from the web content at the end of this prompt according to the specified schema.
 
 EXTRACTION SCHEMA: {schema.name}
 Description: {schema.description}
@@ -257,26 +485,27 @@ CONTEXT INSTRUCTIONS:
 
 {examples_section}
 
-WEB CONTENT TO ANALYZE:
-{content}
-
 INSTRUCTIONS:
 1. Analyze the content carefully
 2. Extract data for each field according to its type and description
 3. Return ONLY valid JSON with the extracted data
 4. Use null for missing optional fields
 5. Ensure data types match the schema (string, number, date, etc.)
-
-JSON OUTPUT:
 """
         
-        return prompt
+        if len(self._prompt_prefixes) >= 128:
+            self._prompt_prefixes.clear()
+        self._prompt_prefixes[key] = prefix
+        return prefix
     
     async def _execute_extraction(self, 
-                                prompt: str, 
+                                prompt: Union[str, ExtractionPrompt], 
                                 model: ExtractionModel,
                                 schema: ExtractionSchema) -> ExtractionResult:
         """Execute the actual AI extraction"""
+        if isinstance(prompt, str):
+            prompt = ExtractionPrompt(prefix="", body=prompt)
+        self.stats['model_calls'] += 1
         
         if model.value.startswith("gpt"):
             return await self._extract_with_openai(prompt, model, schema)
@@ -287,8 +516,11 @@ JSON OUTPUT:
         else:
             raise ValueError(f"Unsupported model: {model.value}")
     
+    def _max_output_tokens(self, prompt: ExtractionPrompt) -> int:
+        return min(MAX_OUTPUT_TOKENS, 2000 * prompt.pages)
+    
     async def _extract_with_openai(self, 
-                                 prompt: str, 
+                                 prompt: ExtractionPrompt, 
                                  model: ExtractionModel,
                                  schema: ExtractionSchema) -> ExtractionResult:
         """Extract using OpenAI GPT models"""
@@ -296,14 +528,15 @@ JSON OUTPUT:
             raise ValueError("OpenAI client not initialized")
         
         try:
+            # OpenAI caches long prompt prefixes automatically when they are identical
             response = await self.openai_client.chat.completions.create(
                 model=model.value,
                 messages=[
                     {"role": "system", "content": "You are a data extraction expert. Always return valid JSON."},
-                    {"role": "user", "content": prompt}
+                    {"role": "user", "content": prompt.text}
                 ],
                 temperature=0.1,
-                max_tokens=2000,
+                max_tokens=self._max_output_tokens(prompt),
                 response_format={"type": "json_object"}
             )
             
@@ -328,7 +561,7 @@ JSON OUTPUT:
             raise
     
     async def _extract_with_anthropic(self, 
-                                    prompt: str, 
+                                    prompt: ExtractionPrompt, 
                                     model: ExtractionModel,
                                     schema: ExtractionSchema) -> ExtractionResult:
         """Extract using Anthropic Claude models"""
@@ -336,12 +569,20 @@ JSON OUTPUT:
             raise ValueError("Anthropic client not initialized")
         
         try:
+            content: Union[str, List[Dict[str, Any]]] = prompt.text
+            if prompt.prefix:
+                # Mark the schema prefix for prompt caching; only the page body changes between calls
+                content = [
+                    {"type": "text", "text": prompt.prefix, "cache_control": {"type": "ephemeral"}},
+                    {"type": "text", "text": prompt.body}
+                ]
+            
             response = await self.anthropic_client.messages.create(
                 model=model.value,
-                max_tokens=2000,
+                max_tokens=self._max_output_tokens(prompt),
                 temperature=0.1,
                 messages=[
-                    {"role": "user", "content": prompt}
+                    {"role": "user", "content": content}
                 ]
             )
             
@@ -361,7 +602,9 @@ JSON OUTPUT:
                 confidence_score=confidence_score,
                 model_used=model.value,
                 extraction_time=0,
-                tokens_used=response.usage.input_tokens + response.usage.output_tokens,
+                tokens_used=(response.usage.input_tokens + response.usage.output_tokens
+                             + (getattr(response.usage, 'cache_creation_input_tokens', 0) or 0)
+                             + (getattr(response.usage, 'cache_read_input_tokens', 0) or 0)),
                 raw_response=raw_response
             )
             
@@ -370,26 +613,15 @@ JSON OUTPUT:
             raise
     
     async def _extract_with_local_model(self, 
-                                      prompt: str,
+                                      prompt: ExtractionPrompt,
                                       schema: ExtractionSchema) -> ExtractionResult:
         """Extract using local Hugging Face model"""
         if not self.local_model:
             raise ValueError("Local model not loaded")
         
         try:
-            inputs = self.local_tokenizer.encode(prompt, return_tensors="pt", truncation=True)
-            
-            with torch.no_grad():
-                outputs = self.local_model.generate(
-                    inputs,
-                    max_length=inputs.shape[1] + 500,
-                    temperature=0.1,
-                    do_sample=True,
-                    pad_token_id=self.local_tokenizer.eos_token_id
-                )
-            
-            response = self.local_tokenizer.decode(outputs[0], skip_special_tokens=True)
-            raw_response = response[len(prompt):].strip()
+            # Generation is blocking; keep it off the event loop
+            raw_response, tokens_used = await asyncio.to_thread(self._generate_local, prompt)
             
             # Extract JSON from response
             json_match = re.search(r'\{.*\}', raw_response, re.DOTALL)
@@ -405,7 +637,7 @@ JSON OUTPUT:
                 confidence_score=confidence_score,
                 model_used="local",
                 extraction_time=0,
-                tokens_used=len(inputs[0]) + len(outputs[0]) - len(inputs[0]),
+                tokens_used=tokens_used,
                 raw_response=raw_response
             )
             
@@ -413,6 +645,75 @@ JSON OUTPUT:
             logger.error(f"Local model extraction failed: {e}")
             raise
     
+    def _generate_local(self, prompt: ExtractionPrompt) -> Tuple[str, int]:
+        """Generate with the local model, reusing the encoded prefix and its KV cache"""
+        prefix_ids, prefix_cache = self._local_prefix(prompt.prefix)
+        body_ids = self.local_tokenizer.encode(
+            prompt.body, add_special_tokens=prefix_ids is None, return_tensors="pt"
+        )
+        
+        # Truncate the page body, never the schema prefix
+        prefix_length = prefix_ids.shape[1] if prefix_ids is not None else 0
+        max_length = getattr(self.local_tokenizer, 'model_max_length', None)
+        if max_length and max_length < 1_000_000:
+            body_ids = body_ids[:, :max(1, max_length - prefix_length)]
+        
+        inputs = torch.cat([prefix_ids, body_ids], dim=1) if prefix_ids is not None else body_ids
+        inputs = inputs.to(self.local_model.device)
+        
+        def generate(past_key_values=None):
+            kwargs = {}
+            if past_key_values is not None:
+                # Generation extends the cache in place; keep the shared one intact
+                kwargs['past_key_values'] = copy.deepcopy(past_key_values)
+            with torch.no_grad():
+                return self.local_model.generate(
+                    inputs,
+                    attention_mask=torch.ones_like(inputs),
+                    max_new_tokens=500 * prompt.pages,
+                    temperature=0.1,
+                    do_sample=True,
+                    pad_token_id=self.local_tokenizer.eos_token_id,
+                    **kwargs
+                )
+        
+        if prefix_cache is not None and self._reuse_local_kv_cache:
+            try:
+                outputs = generate(prefix_cache)
+            except (TypeError, ValueError, AttributeError) as e:
+                logger.warning(f"Local model cannot reuse the prompt KV cache, disabling: {e}")
+                self._reuse_local_kv_cache = False
+                outputs = generate()
+        else:
+            outputs = generate()
+        
+        new_tokens = outputs[0][inputs.shape[1]:]
+        raw_response = self.local_tokenizer.decode(new_tokens, skip_special_tokens=True).strip()
+        return raw_response, int(outputs.shape[1])
+    
+    def _local_prefix(self, prefix: str) -> Tuple[Any, Any]:
+        """Token ids and KV cache of a prompt prefix, computed once per prefix"""
+        if not prefix:
+            return None, None
+        
+        with self._local_prefix_lock:
+            cached = self._local_prefixes.get(prefix)
+            if cached is not None:
+                return cached
+            
+            prefix_ids = self.local_tokenizer.encode(prefix, return_tensors="pt")
+            prefix_cache = None
+            if self._reuse_local_kv_cache:
+                with torch.no_grad():
+                    prefix_cache = self.local_model(
+                        prefix_ids.to(self.local_model.device), use_cache=True
+                    ).past_key_values
+            
+            if len(self._local_prefixes) >= 8:
+                self._local_prefixes.clear()
+            self._local_prefixes[prefix] = (prefix_ids, prefix_cache)
+            return prefix_ids, prefix_cache
+    
     def _calculate_confidence(self, 
                             extracted_data: Dict[str, Any], 
                             schema: ExtractionSchema) -> float:
@@ -448,7 +749,7 @@ JSON OUTPUT:
         return round(confidence, 3)
     
     async def extract_from_page(self, 
-                              page: Page,
+                              page: "Page",
                               schema: ExtractionSchema,
                               model: ExtractionModel = None) -> ExtractionResult:
         """Extract data directly from Playwright page"""
@@ -470,34 +771,136 @@ JSON OUTPUT:
                           html_contents: List[str],
                           schema: ExtractionSchema,
                           model: ExtractionModel = None,
-                          max_concurrent: int = 5) -> List[ExtractionResult]:
-        """Extract data from multiple HTML contents concurrently"""
+                          max_concurrent: int = 5,
+                          strategy: ExtractionStrategy = ExtractionStrategy.STRUCTURED_OUTPUT,
+                          max_retries: int = 3) -> List[ExtractionResult]:
+        """
+        Extract data from multiple HTML contents concurrently
+        
+        Every page is pruned and looked up in the cache first. Pages with the
+        same pruned content share one extraction. Small pages are packed up to
+        ``micro_batch_size`` at a time into one model call; if the model does
+        not return one result per page, those pages are extracted one by one.
+        """
+        start_time = datetime.now()
+        model = model or self.default_model
+        results: List[Optional[ExtractionResult]] = [None] * len(html_contents)
+        contents: Dict[str, str] = {}
+        pending: Dict[str, List[int]] = {}
+        
+        for i, html_content in enumerate(html_contents):
+            try:
+                content = self._preprocess_html(html_content, schema)
+                if not content.strip():
+                    raise ValueError("Page has no extractable text")
+                key = self._cache_key(content, schema, model, strategy)
+            except Exception as e:
+                logger.error(f"AI extraction failed: {e}")
+                results[i] = self._failure(model, start_time, str(e))
+                continue
+            
+            cached = self.extraction_cache.get(key)
+            if cached is not None:
+                results[i] = self._from_cache(cached, start_time)
+                continue
+            contents[key] = content
+            pending.setdefault(key, []).append(i)
         
         semaphore = asyncio.Semaphore(max_concurrent)
         
-        async def extract_single(html_content: str) -> ExtractionResult:
+        async def extract_batch(keys: List[str]):
             async with semaphore:
-                return await self.extract_from_html(html_content, schema, model)
+                if len(keys) == 1:
+                    extracted = [await self._extract_content(contents[keys[0]], keys[0], schema, model, strategy,
+                                                             max_retries, start_time)]
+                else:
+                    extracted = await self._extract_micro_batch(keys, contents, schema, model, strategy,
+                                                                max_retries, start_time)
+            for key, result in zip(keys, extracted):
+                first, *duplicates = pending[key]
+                results[first] = result
+                for i in duplicates:
+                    results[i] = self._from_cache(result, start_time)
         
-        tasks = [extract_single(html) for html in html_contents]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        outcomes = await asyncio.gather(*(extract_batch(keys) for keys in self._plan_micro_batches(contents)),
+                                        return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                logger.error(f"Batch extraction failed: {outcome}")
         
         # Handle exceptions
-        processed_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                processed_results.append(ExtractionResult(
-                    success=False,
-                    extracted_data={},
-                    confidence_score=0.0,
-                    model_used=model.value if model else self.default_model.value,
-                    extraction_time=0,
-                    errors=[str(result)]
-                ))
-            else:
-                processed_results.append(result)
-        
-        return processed_results
+        return [
+            result if result is not None else self._failure(model, start_time, "Extraction did not complete")
+            for result in results
+        ]
+    
+    def _plan_micro_batches(self, contents: Dict[str, str]) -> List[List[str]]:
+        """Group small pages into micro-batches within the content budget"""
+        batches = []
+        current: List[str] = []
+        current_chars = 0
+        
+        for key, content in contents.items():
+            if self.micro_batch_size <= 1 or len(content) > self.micro_batch_max_chars:
+                batches.append([key])
+                continue
+            if current and (len(current) >= self.micro_batch_size
+                            or current_chars + len(content) > self.pruner.max_chars):
+                batches.append(current)
+                current, current_chars = [], 0
+            current.append(key)
+            current_chars += len(content)
+        
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def _extract_micro_batch(self,
+                                   keys: List[str],
+                                   contents: Dict[str, str],
+                                   schema: ExtractionSchema,
+                                   model: ExtractionModel,
+                                   strategy: ExtractionStrategy,
+                                   max_retries: int,
+                                   start_time: datetime) -> List[ExtractionResult]:
+        """Extract several small pages with one model call"""
+        prompt = self._build_batch_prompt([contents[key] for key in keys], schema, strategy)
+        
+        try:
+            combined = await self._execute_extraction(prompt, model, schema)
+            items = combined.extracted_data.get("results") if isinstance(combined.extracted_data, dict) else None
+            if (not isinstance(items, list) or len(items) != len(keys)
+                    or not all(isinstance(item, dict) for item in items)):
+                raise ValueError(f"Expected {len(keys)} page results in the response")
+        except Exception as e:
+            logger.warning(f"Micro-batch of {len(keys)} pages failed, extracting pages one by one: {e}")
+            return [
+                await self._extract_content(contents[key], key, schema, model, strategy, max_retries, start_time)
+                for key in keys
+            ]
+        
+        self.stats['micro_batches'] += 1
+        self.stats['batched_pages'] += len(keys)
+        extraction_time = (datetime.now() - start_time).total_seconds()
+        
+        results = []
+        for key, item in zip(keys, items):
+            result = ExtractionResult(
+                success=True,
+                extracted_data=item,
+                confidence_score=self._calculate_confidence(item, schema),
+                model_used=combined.model_used,
+                extraction_time=extraction_time,
+                tokens_used=combined.tokens_used // len(keys),
+                raw_response=json.dumps(item, ensure_ascii=False)
+            )
+            self._store(key, result)
+            results.append(result)
+        return results
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Model call, micro-batch and cache statistics"""
+        return {**self.stats, 'cache': self.extraction_cache.get_stats()}
 
 
 # Factory function
@@ -0,0 +1,333 @@
+"""
+Structure-aware HTML pruning for AI extraction prompts.
+
+Pages are reduced to the regions that can hold schema fields before any
+token budget is applied:
+
+- Non-content elements (scripts, styles, embeds, form controls) and
+  comments are dropped. JSON-LD blocks are kept, since they often carry
+  the cleanest product or listing data on the page.
+- Boilerplate regions are removed by tag, ARIA role and class/id:
+  navigation, page headers and footers, sidebars, cookie banners and ads.
+  A region is never removed if it holds the page heading or microdata.
+  ``<html>``, ``<body>`` and wrappers holding most of the page text are
+  never boilerplate, whatever their classes (``has-sidebar``,
+  ``modal-open``). If pruning still leaves nothing, the page text is used
+  unpruned.
+- The remaining text is split into blocks, and each block is scored
+  against the schema: field names, descriptions, examples, hints and
+  data-type patterns.
+
+If the page is still over budget, the best-scoring blocks and their
+neighbours (labels next to values) are kept in document order. Text is no
+longer cut off at a fixed length.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Pattern, Sequence, Set
+
+import lxml.html
+from lxml import etree
+
+# Elements whose content is never useful to the model
+REMOVED_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "object", "embed",
+    "link", "meta", "button", "select", "option", "input", "textarea"
+}
+
+BOILERPLATE_TAGS = {"nav", "aside"}
+# Only page-level headers and footers; inside <article>/<main> they hold titles and bylines
+PAGE_CHROME_TAGS = {"header", "footer"}
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search", "dialog", "alertdialog"}
+BOILERPLATE_PATTERN = re.compile(
+    r"(?:^|[\s_-])(?:nav|navbar|menu|breadcrumbs?|footer|masthead|sidebar|cookies?|consent|gdpr|"
+    r"advert|ads|adv|sponsored|promo|newsletter|subscribe|social|share|sharing|related|"
+    r"recommended|comments?|popup|modal|skip)(?:[\s_-]|$)",
+    re.IGNORECASE
+)
+CONTENT_TAGS = {"main", "article"}
+# Page-wide elements whose classes describe the layout, not their content
+NEVER_BOILERPLATE_TAGS = {"html", "head", "body"}
+# An element holding more than this share of the page text is the page, not boilerplate
+MAX_BOILERPLATE_SHARE = 0.5
+
+BLOCK_TAGS = {
+    "html", "body", "title", "p", "div", "section", "article", "main", "header", "footer", "aside", "form",
+    "fieldset", "ul", "ol", "li", "dl", "dt", "dd", "table", "thead", "tbody", "tfoot", "tr", "td", "th",
+    "caption", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "figure", "figcaption", "address",
+    "label", "br", "hr"
+}
+HEADING_TAGS = {"title", "h1", "h2", "h3"}
+
+DATA_TYPE_PATTERNS = {
+    "number": re.compile(r"\d"),
+    "price": re.compile(r"[$€£¥]\s*\d|\d[\d\s.,]*\s*(?:kr|sek|nok|dkk|eur|usd|gbp|:-)", re.IGNORECASE),
+    "date": re.compile(r"\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[/.]\d{1,2}[/.]\d{2,4}"),
+    "email": re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+"),
+    "phone": re.compile(r"\+?\d[\d\s()-]{6,}\d"),
+    "url": re.compile(r"https?://|www\.", re.IGNORECASE),
+}
+# Words that say nothing about where a field lives on the page
+STOP_WORDS = {
+    "the", "and", "for", "with", "from", "that", "this", "product", "page", "item", "value", "field",
+    "current", "main", "data", "information", "details", "number", "string", "text"
+}
+
+
+@dataclass
+class PruningProfile:
+    """What makes a block relevant to an extraction schema."""
+    keywords: Set[str] = field(default_factory=set)
+    patterns: List[Pattern] = field(default_factory=list)
+    region_selectors: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_schema(cls, schema: Any) -> "PruningProfile":
+        """Build a profile from an ``ExtractionSchema``-like object."""
+        keywords = set()
+        patterns = []
+        for schema_field in getattr(schema, "fields", None) or []:
+            words = [schema_field.name.replace("_", " "), schema_field.description or ""]
+            words += list(schema_field.examples or []) + list(schema_field.extraction_hints or [])
+            for word in re.findall(r"\w+", " ".join(words).lower()):
+                if len(word) > 2 and word not in STOP_WORDS and not word.isdigit():
+                    keywords.add(word)
+            pattern = DATA_TYPE_PATTERNS.get(schema_field.data_type)
+            if pattern is not None and pattern not in patterns:
+                patterns.append(pattern)
+        return cls(
+            keywords=keywords,
+            patterns=patterns,
+            region_selectors=list(getattr(schema, "region_selectors", None) or [])
+        )
+
+
+@dataclass
+class TextBlock:
+    """Text of one block-level element, without its nested blocks."""
+    text: str
+    tag: str
+    link_density: float
+    position: int
+    score: float = 0.0
+
+
+class HTMLPruner:
+    """Reduces HTML pages to schema-relevant text within a character budget."""
+
+    def __init__(self,
+                 max_chars: int = 8000,
+                 context_blocks: int = 1,
+                 max_link_density: float = 0.5,
+                 keep_json_ld: bool = True):
+        self.max_chars = max_chars
+        self.context_blocks = context_blocks
+        self.max_link_density = max_link_density
+        self.keep_json_ld = keep_json_ld
+
+    def prune(self, html_content: str, profile: Optional[PruningProfile] = None) -> str:
+        """Return the relevant text of ``html_content``, one block per line."""
+        profile = profile or PruningProfile()
+        try:
+            root = lxml.html.document_fromstring(html_content)
+        except (etree.ParserError, ValueError):
+            return ""
+
+        blocks = []
+        if self.keep_json_ld:
+            blocks.extend(self._json_ld_blocks(root))
+        self._strip_non_content(root)
+        self._strip_boilerplate(root)
+
+        regions = self._select_regions(root, profile.region_selectors) or [root]
+        content = list(blocks)
+        for region in regions:
+            content.extend(self._text_blocks(region, len(content)))
+
+        content = [block for block in content if block.link_density <= self.max_link_density]
+        if not any(block.tag != "json-ld" for block in content):
+            # Pruning misjudged the page; fall back to all of its text
+            root = lxml.html.document_fromstring(html_content)
+            self._strip_non_content(root)
+            content = blocks + self._text_blocks(root, len(blocks))
+        return self._fit(content, profile)
+
+    # -- cleaning --------------------------------------------------------------
+
+    def _json_ld_blocks(self, root) -> List[TextBlock]:
+        blocks = []
+        for script in root.xpath('//script[@type="application/ld+json"]'):
+            try:
+                data = json.loads(script.text or "")
+            except ValueError:
+                continue
+            text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+            blocks.append(TextBlock(text=text, tag="json-ld", link_density=0.0, position=len(blocks)))
+        return blocks
+
+    def _strip_non_content(self, root):
+        """Drop non-content elements and comments in place."""
+        for elem in list(root.iter(etree.Comment, etree.ProcessingInstruction)):
+            elem.drop_tree()
+        for elem in list(root.iter(*REMOVED_TAGS)):
+            elem.drop_tree()
+
+    def _strip_boilerplate(self, root):
+        """Drop boilerplate regions in place."""
+        page_chars = self._text_length(root)
+        boilerplate = []
+        for elem in root.iter():
+            if elem.tag in CONTENT_TAGS or elem.tag in NEVER_BOILERPLATE_TAGS or not isinstance(elem.tag, str):
+                continue
+            if not self._is_boilerplate(elem) or self._holds_content(elem):
+                continue
+            # Layout wrappers (<div class="layout-with-sidebar">) hold the page itself
+            if self._text_length(elem) > MAX_BOILERPLATE_SHARE * page_chars:
+                continue
+            boilerplate.append(elem)
+        for elem in boilerplate:
+            # Nested boilerplate may already be gone with its ancestor
+            if elem.getparent() is not None:
+                elem.drop_tree()
+
+    @staticmethod
+    def _text_length(elem) -> int:
+        return sum(len(text.strip()) for text in elem.itertext())
+
+    def _is_boilerplate(self, elem) -> bool:
+        if elem.tag in BOILERPLATE_TAGS or elem.get("role") in BOILERPLATE_ROLES:
+            return True
+        inside_content = any(ancestor.tag in CONTENT_TAGS for ancestor in elem.iterancestors())
+        if elem.tag in PAGE_CHROME_TAGS and not inside_content:
+            return True
+        if inside_content:
+            return False
+        markers = f"{elem.get('class', '')} {elem.get('id', '')}"
+        return bool(markers.strip()) and bool(BOILERPLATE_PATTERN.search(markers))
+
+    def _holds_content(self, elem) -> bool:
+        return (elem.tag != "nav" and elem.get("role") != "navigation"
+                and bool(elem.xpath(".//h1 | .//main | .//article | .//*[@itemprop]")))
+
+    def _select_regions(self, root, selectors: Sequence[str]) -> List[Any]:
+        regions = []
+        for selector in selectors:
+            try:
+                if selector.startswith(("/", "(")):
+                    found = root.xpath(selector)
+                else:
+                    found = root.cssselect(selector)
+            except Exception:
+                continue
+            regions.extend(elem for elem in found if isinstance(elem, etree.ElementBase) and elem not in regions)
+        # Keep the page title for context when only part of the page is used
+        if regions:
+            regions[:0] = root.xpath("//head/title")
+        return regions
+
+    # -- blocks ----------------------------------------------------------------
+
+    def _text_blocks(self, root, offset: int = 0) -> List[TextBlock]:
+        """Split text into blocks without recursion, in document order."""
+        blocks = []
+        parts: List[str] = []
+        link_chars = 0
+        link_depth = 0
+        block_tags = [root.tag if root.tag in BLOCK_TAGS else "div"]
+
+        def flush():
+            nonlocal parts, link_chars
+            text = " ".join(" ".join(parts).split())
+            if text:
+                total = max(len(text), 1)
+                blocks.append(TextBlock(text=text, tag=block_tags[-1], link_density=min(1.0, link_chars / total),
+                                        position=offset + len(blocks)))
+            parts, link_chars = [], 0
+
+        def add(text: Optional[str]):
+            nonlocal link_chars
+            if text and text.strip():
+                parts.append(text)
+                if link_depth:
+                    link_chars += len(text.strip())
+
+        for event, elem in etree.iterwalk(root, events=("start", "end")):
+            if event == "start":
+                if elem.tag in BLOCK_TAGS and elem is not root:
+                    flush()
+                    block_tags.append(elem.tag)
+                if elem.tag == "a":
+                    link_depth += 1
+                add(elem.text)
+            else:
+                if elem.tag == "a":
+                    link_depth -= 1
+                if elem.tag in BLOCK_TAGS and elem is not root:
+                    flush()
+                    block_tags.pop()
+                if elem is not root:
+                    add(elem.tail)
+        flush()
+        return blocks
+
+    def _score(self, block: TextBlock, profile: PruningProfile) -> float:
+        if block.tag == "json-ld":
+            return 10.0
+        text = block.text.lower()
+        words = set(re.findall(r"\w+", text))
+        score = 2.0 * len(profile.keywords & words)
+        score += sum(1.0 for pattern in profile.patterns if pattern.search(block.text))
+        if block.tag in HEADING_TAGS:
+            score += 2.0
+        return score * (1.0 - block.link_density)
+
+    def _fit(self, blocks: List[TextBlock], profile: PruningProfile) -> str:
+        """Keep every block if they fit, else the best blocks and their neighbours."""
+        total = sum(len(block.text) + 1 for block in blocks)
+        if total <= self.max_chars:
+            return "\n".join(block.text for block in blocks)
+
+        for block in blocks:
+            block.score = self._score(block, profile)
+        ranked = sorted(range(len(blocks)), key=lambda i: (-blocks[i].score, i))
+
+        selected: Set[int] = set()
+        used = 0
+
+        def take(i: int) -> bool:
+            nonlocal used
+            if i in selected:
+                return True
+            size = len(blocks[i].text) + 1
+            if used + size > self.max_chars:
+                return False
+            selected.add(i)
+            used += size
+            return True
+
+        for i in ranked:
+            if blocks[i].score <= 0:
+                break
+            if not take(i):
+                continue
+            for offset in range(1, self.context_blocks + 1):
+                for neighbour in (i - offset, i + offset):
+                    if 0 <= neighbour < len(blocks):
+                        take(neighbour)
+
+        # Fill what is left of the budget in document order
+        for i in range(len(blocks)):
+            if used >= self.max_chars:
+                break
+            take(i)
+
+        lines = []
+        previous = None
+        for i in sorted(selected):
+            if previous is not None and i != previous + 1:
+                lines.append("...")
+            lines.append(blocks[i].text)
+            previous = i
+        return "\n".join(lines)
@@ -25,20 +25,35 @@ Browser Stealth:
 
 Diagnostics:
 - DiagnoseURL: Website protection analysis
-"""
 
-from .policy_manager import PolicyManager, DomainPolicy, RiskLevel, PolicyAction, DetectionSignal
-from .header_generator import HeaderGenerator
-from .session_manager import SessionManager
-from .delay_strategy import DelayStrategy
-from .fallback_strategy import FallbackStrategy
-from .credential_manager import CredentialManager
+Components are imported on first attribute access, so importing one
+submodule (e.g. ``anti_bot.policy_manager``) does not load Selenium or
+Playwright through the browser stealth package.
+"""
 
-# Browser stealth components
-from .browser_stealth import StealthBrowser, HumanBehavior, CaptchaSolver, CloudflareDetector
+import importlib
+from typing import Any
 
-# Diagnostic tools
-from .diagnostics import DiagnoseURL
+# Public name -> submodule that defines it
+_LAZY_IMPORTS = {
+    "PolicyManager": ".policy_manager",
+    "DomainPolicy": ".policy_manager",
+    "RiskLevel": ".policy_manager",
+    "PolicyAction": ".policy_manager",
+    "DetectionSignal": ".policy_manager",
+    "HeaderGenerator": ".header_generator",
+    "SessionManager": ".session_manager",
+    "DelayStrategy": ".delay_strategy",
+    "FallbackStrategy": ".fallback_strategy",
+    "CredentialManager": ".credential_manager",
+    # Browser stealth components
+    "StealthBrowser": ".browser_stealth.stealth_browser",
+    "HumanBehavior": ".browser_stealth.human_behavior",
+    "CaptchaSolver": ".browser_stealth.captcha_solver",
+    "CloudflareDetector": ".browser_stealth.cloudflare_bypass",
+    # Diagnostic tools
+    "DiagnoseURL": ".diagnostics",
+}
 
 __all__ = [
     "PolicyManager",
@@ -53,4 +68,17 @@ __all__ = [
     "CaptchaSolver",
     "CloudflareDetector",
     "DiagnoseURL"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
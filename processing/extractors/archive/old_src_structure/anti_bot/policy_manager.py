@@ -46,6 +46,10 @@ class DomainPolicy(BaseModel):
     proxy_type: Literal["datacenter", "residential"] = "datacenter"
     session_policy: Literal["rotating", "sticky"] = "rotating"
     header_family: Literal["chrome", "firefox"] = "chrome"
+    # Re-fetch with the browser when HTTP fails or misses required content
+    fallback_to_browser: bool = True
+    # Playwright resource types aborted in browser transport
+    block_resources: List[str] = ["image", "font", "media"]
     
     current_delay_seconds: float = 2.0
     backoff_until: float = 0.0
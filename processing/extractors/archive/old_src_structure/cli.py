@@ -17,8 +17,6 @@ sys.path.append(str(Path(__file__).parent))
 
 from settings import get_settings
 from database import create_tables, drop_tables
-from services import UserService
-from models import UserCreate
 
 
 @click.group()
@@ -113,6 +111,8 @@ def user():
 def create(username: str, email: str, password: str, full_name: Optional[str], admin: bool):
     """Create a new user."""
     from database import SessionLocal
+    from webapp.schemas.models import UserCreate
+    from webapp.services.auth_service import UserService
     
     click.echo(f"👤 Creating user '{username}'...")
     
@@ -147,6 +147,7 @@ def create(username: str, email: str, password: str, full_name: Optional[str], a
 def info(identifier: str):
     """Get user information."""
     from database import SessionLocal
+    from webapp.services.auth_service import UserService
     
     db = SessionLocal()
     try:
@@ -17,21 +17,37 @@ Main Components:
 - TemplateDetector: Page template classification
 - KeywordSearchCrawler: Keyword-based crawling
 - URLFrontier: URL queue management
+
+Components are imported on first attribute access, so importing a single
+submodule (e.g. ``crawler.url_queue``) does not pull in the scraper
+transport, Playwright or the anti-bot stack.
 """
 
-from .sitemap_generator import SitemapGenerator
-from .link_extractor import LinkExtractor
-from .robots_parser import RobotsParser
-from .template_detector import TemplateDetector
-from .keywords_search import KeywordSearchCrawler
-from .url_frontier import URLFrontier
-from .url_queue import URLQueue
+import importlib
+from typing import Any
+
+# Public name -> submodule that defines it
+_LAZY_IMPORTS = {
+    "SitemapGenerator": ".sitemap_generator",
+    "LinkExtractor": ".link_extractor",
+    "RobotsParser": ".robots_parser",
+    "TemplateDetector": ".template_detector",
+    "KeywordSearchCrawler": ".keywords_search",
+    "URLFrontier": ".url_frontier",
+    "URLQueue": ".url_queue",
+}
 
 # Define a base crawler interface
 class BaseCrawler:
     """Base crawler interface for consistent API."""
     
     def __init__(self, **kwargs):
+        from .sitemap_generator import SitemapGenerator
+        from .link_extractor import LinkExtractor
+        from .robots_parser import RobotsParser
+        from .template_detector import TemplateDetector
+        from .url_frontier import URLFrontier
+        
         self.sitemap_generator = SitemapGenerator(**kwargs)
         self.link_extractor = LinkExtractor(**kwargs)
         self.robots_parser = RobotsParser(**kwargs)
@@ -55,4 +71,17 @@ __all__ = [
     "KeywordSearchCrawler",
     "URLFrontier",
     "URLQueue"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
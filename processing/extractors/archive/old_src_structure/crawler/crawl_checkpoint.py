@@ -0,0 +1,341 @@
+"""
+Crawl Checkpoint - Durable progress log for CrawlCoordinator.
+
+Coordinator progress is recorded as an append-only JSON-lines log of small
+events (URLs enqueued, claimed, finished; host politeness times; stats).
+The log is periodically compacted into a gzipped snapshot so that resuming
+a crawl reads one snapshot plus a short log tail instead of replaying the
+whole crawl.
+
+Layout of ``<checkpoint_dir>/<crawl_id>/``::
+
+    snapshot.json.gz    state up to and including record ``seq``
+    log.000007.jsonl    records written since, one segment per compaction
+    completed           marker written when the crawl finished
+
+Compaction switches to a new log segment first, so records written while
+the snapshot is being serialized land in the new segment and are replayed
+on top of it. A torn final line from a crash is ignored.
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_FILE = "snapshot.json.gz"
+COMPLETED_MARKER = "completed"
+
+
+@dataclass
+class CheckpointState:
+    """Coordinator state rebuilt from a checkpoint"""
+    crawl_id: str
+    strategy: Optional[str] = None
+    # url_hash -> serialized QueuedURL, for URLs queued or in flight
+    frontier: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    in_flight: Set[str] = field(default_factory=set)
+    # url_hashes of URLs already crawled or given up on
+    visited: Set[str] = field(default_factory=set)
+    # url_hash -> serialized QueuedURL, for failed URLs to retry on resume
+    failed: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # url_hash -> number of failed attempts, for URLs not crawled yet
+    failures: Dict[str, int] = field(default_factory=dict)
+    # host -> unix time of the last request, for politeness delays
+    host_last: Dict[str, float] = field(default_factory=dict)
+    stats: Dict[str, Any] = field(default_factory=dict)
+    seq: int = 0
+
+    def apply(self, record: Dict[str, Any]):
+        """Apply one log record"""
+        op = record["op"]
+        if op == "enqueue":
+            for data in record["urls"]:
+                url_hash = data["url_hash"]
+                if url_hash not in self.visited:
+                    self.frontier.setdefault(url_hash, data["url"])
+                    self.failed.pop(url_hash, None)
+        elif op == "claim":
+            self.in_flight.update(record["hashes"])
+            self.host_last.update(record.get("hosts", {}))
+        elif op == "done":
+            retry = record.get("status") == "failed"
+            for url_hash in record["hashes"]:
+                url = self.frontier.pop(url_hash, None)
+                self.in_flight.discard(url_hash)
+                if retry and url is not None:
+                    self.failed[url_hash] = url
+                    self.failures[url_hash] = self.failures.get(url_hash, 0) + 1
+                else:
+                    self.failed.pop(url_hash, None)
+                    self.failures.pop(url_hash, None)
+                    self.visited.add(url_hash)
+        elif op == "stats":
+            self.stats = record["stats"]
+        elif op == "meta":
+            self.strategy = record.get("strategy", self.strategy)
+        self.seq = record["seq"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "crawl_id": self.crawl_id,
+            "strategy": self.strategy,
+            "frontier": self.frontier,
+            "in_flight": list(self.in_flight),
+            "visited": list(self.visited),
+            "failed": self.failed,
+            "failures": self.failures,
+            "host_last": self.host_last,
+            "stats": self.stats,
+            "seq": self.seq
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CheckpointState":
+        return cls(
+            crawl_id=data["crawl_id"],
+            strategy=data.get("strategy"),
+            frontier=data.get("frontier", {}),
+            in_flight=set(data.get("in_flight", [])),
+            visited=set(data.get("visited", [])),
+            failed=data.get("failed", {}),
+            failures=data.get("failures", {}),
+            host_last=data.get("host_last", {}),
+            stats=data.get("stats", {}),
+            seq=data.get("seq", 0)
+        )
+
+    def copy(self) -> "CheckpointState":
+        """Shallow copy whose containers are safe to serialize off-loop"""
+        return CheckpointState(
+            crawl_id=self.crawl_id,
+            strategy=self.strategy,
+            frontier=dict(self.frontier),
+            in_flight=set(self.in_flight),
+            visited=set(self.visited),
+            failed=dict(self.failed),
+            failures=dict(self.failures),
+            host_last=dict(self.host_last),
+            stats=dict(self.stats),
+            seq=self.seq
+        )
+
+
+class CrawlCheckpoint:
+    """
+    Append-only checkpoint log with periodic compaction.
+
+    Records are buffered in memory and written by ``flush()``, which the
+    coordinator calls after every batch; ``maybe_flush()`` only writes once
+    ``flush_interval`` seconds have passed. Once ``compact_every`` records
+    have been written since the last snapshot, ``maybe_flush()`` starts a
+    compaction in a worker thread.
+    """
+
+    def __init__(self,
+                 directory: Union[str, Path],
+                 crawl_id: str,
+                 flush_interval: float = 5.0,
+                 compact_every: int = 50000,
+                 fsync: bool = True,
+                 _state: Optional[CheckpointState] = None):
+        self.directory = Path(directory) / crawl_id
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.crawl_id = crawl_id
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self.fsync = fsync
+
+        self.state = _state or CheckpointState(crawl_id)
+        self._seq = self.state.seq
+        self._buffer: List[str] = []
+        self._segment = max(self._segments(), default=0) + 1
+        self._log = None
+        self._records_since_compaction = 0
+        self._last_flush = time.monotonic()
+        self._compaction: Optional[asyncio.Task] = None
+
+        self.stats = {
+            'records_written': 0,
+            'flushes': 0,
+            'compactions': 0,
+            'last_compaction_seconds': 0.0
+        }
+
+    # -- loading -----------------------------------------------------------
+
+    def _segments(self) -> List[int]:
+        return sorted(int(p.name[4:-6]) for p in self.directory.glob("log.*.jsonl"))
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.directory / f"log.{segment:06d}.jsonl"
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], crawl_id: str, **kwargs) -> "CrawlCheckpoint":
+        """Rebuild the state of ``crawl_id`` from its snapshot and log tail"""
+        path = Path(directory) / crawl_id
+        if not path.is_dir():
+            raise FileNotFoundError(f"No checkpoint for crawl {crawl_id} in {directory}")
+
+        started = time.monotonic()
+        snapshot = path / SNAPSHOT_FILE
+        if snapshot.exists():
+            with gzip.open(snapshot, "rt", encoding="utf-8") as f:
+                state = CheckpointState.from_dict(json.load(f))
+        else:
+            state = CheckpointState(crawl_id)
+
+        replayed = 0
+        for log_path in sorted(path.glob("log.*.jsonl")):
+            with open(log_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        logger.warning(f"Ignoring torn checkpoint record in {log_path.name}")
+                        break
+                    if record["seq"] > state.seq:
+                        state.apply(record)
+                        replayed += 1
+
+        logger.info(f"Loaded checkpoint {crawl_id}: {len(state.frontier)} queued, "
+                    f"{len(state.visited)} visited, {replayed} log records replayed "
+                    f"in {time.monotonic() - started:.2f}s")
+        return cls(directory, crawl_id, _state=state, **kwargs)
+
+    @staticmethod
+    def latest(directory: Union[str, Path]) -> Optional[str]:
+        """ID of the most recently updated crawl that did not complete"""
+        root = Path(directory)
+        if not root.is_dir():
+            return None
+        candidates = [p for p in root.iterdir()
+                      if p.is_dir() and not (p / COMPLETED_MARKER).exists()]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda p: p.stat().st_mtime).name
+
+    # -- recording ---------------------------------------------------------
+
+    def _record(self, op: str, **data: Any):
+        self._seq += 1
+        record = {"op": op, "seq": self._seq, **data}
+        self.state.apply(record)
+        self._buffer.append(json.dumps(record, separators=(",", ":"), default=str))
+
+    def record_meta(self, strategy: str):
+        self._record("meta", strategy=strategy)
+
+    def record_enqueued(self, urls: Iterable[Dict[str, Any]]):
+        """``urls`` are ``{"url_hash": ..., "url": <serialized QueuedURL>}``"""
+        urls = list(urls)
+        if urls:
+            self._record("enqueue", urls=urls)
+
+    def record_claimed(self, hashes: Iterable[str], hosts: Optional[Dict[str, float]] = None):
+        hashes = list(hashes)
+        if hashes:
+            self._record("claim", hashes=hashes, hosts=hosts or {})
+
+    def record_done(self, hashes: Iterable[str], status: str = "completed"):
+        """Finish URLs; ``failed`` ones are kept for a retry on resume, any other status is final"""
+        hashes = list(hashes)
+        if hashes:
+            self._record("done", hashes=hashes, status=status)
+
+    def record_stats(self, stats: Dict[str, Any]):
+        self._record("stats", stats=stats)
+
+    # -- persistence -------------------------------------------------------
+
+    def flush(self):
+        """Write buffered records to the current log segment"""
+        if not self._buffer:
+            return
+        if self._log is None:
+            self._log = open(self._segment_path(self._segment), "a", encoding="utf-8")
+        self._log.write("\n".join(self._buffer) + "\n")
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self.stats['records_written'] += len(self._buffer)
+        self.stats['flushes'] += 1
+        self._records_since_compaction += len(self._buffer)
+        self._buffer.clear()
+        self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        """Flush when the interval has passed; compact when the log has grown"""
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        if (self._records_since_compaction >= self.compact_every
+                and (self._compaction is None or self._compaction.done())):
+            self._compaction = asyncio.get_running_loop().create_task(self.compact())
+
+    async def compact(self):
+        """Write a snapshot of the current state and drop the log it covers"""
+        self.flush()
+        started = time.monotonic()
+
+        # New records go to the next segment from here on
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        covered = [s for s in self._segments() if s <= self._segment]
+        self._segment += 1
+        self._records_since_compaction = 0
+        state = self.state.copy()
+
+        try:
+            await asyncio.to_thread(self._write_snapshot, state)
+        except Exception as e:
+            logger.error(f"Checkpoint compaction failed for {self.crawl_id}: {e}")
+            return
+
+        for segment in covered:
+            self._segment_path(segment).unlink(missing_ok=True)
+        self.stats['compactions'] += 1
+        self.stats['last_compaction_seconds'] = time.monotonic() - started
+        logger.debug(f"Compacted checkpoint {self.crawl_id} at seq {state.seq} "
+                     f"in {self.stats['last_compaction_seconds']:.2f}s")
+
+    def _write_snapshot(self, state: CheckpointState):
+        tmp = self.directory / (SNAPSHOT_FILE + ".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=3) as f:
+            json.dump(state.to_dict(), f, separators=(",", ":"), default=str)
+        if self.fsync:
+            with open(tmp, "rb") as f:
+                os.fsync(f.fileno())
+        os.replace(tmp, self.directory / SNAPSHOT_FILE)
+
+    async def close(self, completed: bool = False):
+        """Flush, wait for a running compaction and close the log"""
+        self.flush()
+        if self._compaction is not None:
+            await self._compaction
+            self._compaction = None
+        if completed:
+            await self.compact()
+            (self.directory / COMPLETED_MARKER).touch()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'seq': self._seq,
+            'buffered': len(self._buffer),
+            'frontier': len(self.state.frontier),
+            'in_flight': len(self.state.in_flight),
+            'visited': len(self.state.visited),
+            'failed': len(self.state.failed)
+        }
@@ -20,6 +20,7 @@ from .url_queue import URLQueue, QueuedURL
 from .sitemap_generator import SitemapGenerator
 from .link_extractor import LinkExtractor
 from .robots_parser import RobotsParser
+from .crawl_checkpoint import CrawlCheckpoint, CheckpointState
 from revolutionary_scraper.core.revolutionary_crawler import RevolutionaryCrawler
 # Import advanced components (available when needed)
 try:
@@ -79,6 +80,12 @@ class CrawlConfiguration:
     export_format: str = "json"  # json, csv, xml
     save_to_database: bool = True
     
+    # Checkpointing (disabled when checkpoint_dir is None)
+    checkpoint_dir: Optional[str] = None
+    checkpoint_interval: float = 5.0  # seconds between log flushes
+    checkpoint_compact_every: int = 50000  # log records between snapshots
+    checkpoint_max_failures: int = 3  # failed attempts before resume stops retrying a URL
+    
 @dataclass
 class CrawlResult:
     """Complete crawl result with all extracted data"""
@@ -115,6 +122,7 @@ class CrawlCoordinator:
     - AI-powered data extraction
     - Real-time monitoring and metrics
     - Production-ready error handling and recovery
+    - Checkpoint/resume of crawl progress (``checkpoint_dir``)
     """
     
     def __init__(self, 
@@ -166,6 +174,7 @@ class CrawlCoordinator:
         self.crawl_id = f"crawl_{int(time.time())}"
         self.is_running = False
         self.stop_requested = False
+        self.checkpoint: Optional[CrawlCheckpoint] = None
         
         logger.info(f"Crawl coordinator initialized with strategy: {config.strategy}")
     
@@ -184,14 +193,101 @@ class CrawlCoordinator:
             
         logger.info(f"Starting crawl operation {self.crawl_id} with {len(start_urls)} seed URLs")
         
-        self.is_running = True
-        self.stop_requested = False
         self.stats = CrawlStats()
         self.stats.start_time = datetime.utcnow()
         
+        if self.config.checkpoint_dir:
+            self.checkpoint = self._open_checkpoint(CrawlCheckpoint, self.crawl_id)
+            self.checkpoint.record_meta(self.config.strategy)
+        
+        return await self._run(start_urls)
+    
+    async def resume_crawl(self, crawl_id: Optional[str] = None) -> str:
+        """
+        Resume a crawl from its checkpoint.
+        
+        Restores the visited set, the queued and in-flight URLs, per-domain
+        politeness times and statistics, then continues with the configured
+        strategy without re-running seed discovery. URLs that failed are
+        queued again until they have failed ``checkpoint_max_failures`` times.
+        
+        Args:
+            crawl_id: Crawl to resume; defaults to the most recently updated
+                unfinished crawl in ``checkpoint_dir``
+            
+        Returns:
+            Crawl ID of the resumed operation
+        """
+        if self.is_running:
+            raise ValueError("Crawler is already running")
+        if not self.config.checkpoint_dir:
+            raise ValueError("Resuming requires checkpoint_dir in the crawl configuration")
+        
+        crawl_id = crawl_id or CrawlCheckpoint.latest(self.config.checkpoint_dir)
+        if crawl_id is None:
+            raise ValueError(f"No unfinished crawl checkpoint in {self.config.checkpoint_dir}")
+        
+        self.checkpoint = self._open_checkpoint(CrawlCheckpoint.load, crawl_id)
+        self.crawl_id = crawl_id
+        await self._restore_from_checkpoint(self.checkpoint.state)
+        
+        return await self._run(None)
+    
+    def _open_checkpoint(self, factory: Callable[..., CrawlCheckpoint], crawl_id: str) -> CrawlCheckpoint:
+        return factory(
+            self.config.checkpoint_dir,
+            crawl_id,
+            flush_interval=self.config.checkpoint_interval,
+            compact_every=self.config.checkpoint_compact_every
+        )
+    
+    async def _restore_from_checkpoint(self, state: CheckpointState):
+        """Load checkpointed progress back into the URL queue and stats"""
+        if state.strategy and state.strategy != self.config.strategy:
+            logger.warning(f"Checkpoint was written by strategy {state.strategy}, "
+                           f"resuming with {self.config.strategy}")
+        
+        retry_urls, abandoned = [], []
+        for url_hash, data in list(state.failed.items()):
+            if state.failures.get(url_hash, 0) < self.config.checkpoint_max_failures:
+                retry_urls.append(QueuedURL.from_dict(data))
+            else:
+                abandoned.append(url_hash)
+        self.checkpoint.record_done(abandoned, "abandoned")
+        
+        # Visited URLs first so rediscovered links are deduplicated
+        await self.url_queue.mark_seen_batch(list(state.visited))
+        
+        # Queued and in-flight URLs go back on the queue; in-flight ones were
+        # already popped from it and never finished
+        queued_urls = [QueuedURL.from_dict(data) for data in state.frontier.values()]
+        await self.url_queue.add_urls_batch(queued_urls + retry_urls, force=True)
+        self._checkpoint_enqueued(retry_urls)
+        await self.url_queue.restore_domain_last_crawl(state.host_last)
+        
+        stats = state.stats
+        self.stats = CrawlStats(
+            total_discovered=stats.get('total_discovered', len(state.frontier) + len(state.visited)),
+            total_crawled=stats.get('total_crawled', 0),
+            total_failed=stats.get('total_failed', 0),
+            domains_active=set(stats.get('domains_active', []))
+        )
+        if stats.get('start_time'):
+            self.stats.start_time = datetime.fromisoformat(stats['start_time'])
+        
+        logger.info(f"♻️ Resumed crawl {state.crawl_id}: {len(queued_urls)} URLs requeued "
+                    f"({len(state.in_flight)} were in flight), {len(retry_urls)} failed URLs retried "
+                    f"({len(abandoned)} given up), {len(state.visited)} already visited")
+    
+    async def _run(self, start_urls: Optional[List[str]]) -> str:
+        self.is_running = True
+        self.stop_requested = False
+        completed = False
+        
         try:
-            # Phase 1: Initialize and populate queue
-            await self._initialize_crawl(start_urls)
+            # Phase 1: Initialize and populate queue (skipped when resuming)
+            if start_urls is not None:
+                await self._initialize_crawl(start_urls)
             
             # Phase 2: Execute chosen crawling strategy
             if self.config.strategy == "bfs":
@@ -207,12 +303,16 @@ class CrawlCoordinator:
             
             # Phase 3: Finalization
             await self._finalize_crawl()
+            completed = not self.stop_requested
             
         except Exception as e:
             logger.error(f"Crawl operation failed: {e}")
             raise
         finally:
             self.is_running = False
+            if self.checkpoint:
+                self._checkpoint_stats()
+                await self.checkpoint.close(completed=completed)
             
         logger.info(f"Crawl operation {self.crawl_id} completed successfully")
         return self.crawl_id
@@ -261,6 +361,7 @@ class CrawlCoordinator:
         
         added_count = await self.url_queue.add_urls_batch(queued_urls)
         self.stats.total_discovered = added_count
+        self._checkpoint_enqueued(queued_urls)
         
         logger.info(f"✅ Initialized with {added_count} URLs in queue")
     
@@ -272,7 +373,7 @@ class CrawlCoordinator:
             # Get batch of URLs from queue
             batch_urls = []
             for _ in range(min(self.config.max_concurrent, 50)):
-                queued_url = await self.url_queue.get_next_url(self.config.domain_delay)
+                queued_url = await self._next_url()
                 if not queued_url:
                     break
                 batch_urls.append(queued_url.url)
@@ -287,10 +388,11 @@ class CrawlCoordinator:
                 session_manager = self.session
                 results = await self.crawler.crawl_bfs(batch_urls, session_manager)
                 
-                await self._process_crawl_results(results)
+                await self._process_crawl_results(results, claimed=batch_urls)
                 
             except Exception as e:
                 logger.error(f"BFS batch processing failed: {e}")
+                self._checkpoint_done(batch_urls, "failed")
                 continue
             
             # Update statistics
@@ -305,7 +407,7 @@ class CrawlCoordinator:
         
         # DFS works differently - we take URLs one by one and go deep
         while not self.stop_requested and self.stats.total_crawled < self.config.max_pages:
-            queued_url = await self.url_queue.get_next_url(self.config.domain_delay)
+            queued_url = await self._next_url()
             if not queued_url:
                 logger.info("No more URLs in queue, DFS crawl complete")
                 break
@@ -315,10 +417,11 @@ class CrawlCoordinator:
                 session_manager = self.session
                 results = await self.crawler.crawl_dfs([queued_url.url], session_manager)
                 
-                await self._process_crawl_results(results)
+                await self._process_crawl_results(results, claimed=[queued_url.url])
                 
             except Exception as e:
                 logger.error(f"DFS crawl failed for {queued_url.url}: {e}")
+                self._checkpoint_done([queued_url.url], "failed")
                 continue
             
             await self._update_stats()
@@ -331,7 +434,7 @@ class CrawlCoordinator:
         # Get a good sample of URLs for intelligent analysis
         sample_urls = []
         for _ in range(min(100, self.config.max_pages // 10)):
-            queued_url = await self.url_queue.get_next_url(self.config.domain_delay)
+            queued_url = await self._next_url()
             if not queued_url:
                 break
             sample_urls.append(queued_url.url)
@@ -344,10 +447,11 @@ class CrawlCoordinator:
             # Use hybrid crawler with intelligent strategy selection
             session_manager = self.session
             results = await self.crawler.crawl_bfs(sample_urls, session_manager)
-            await self._process_crawl_results(results)
+            await self._process_crawl_results(results, claimed=sample_urls)
             
         except Exception as e:
             logger.error(f"Intelligent crawl failed: {e}")
+            self._checkpoint_done(sample_urls, "failed")
             
         await self._update_stats()
     
@@ -359,7 +463,7 @@ class CrawlCoordinator:
         while not self.stop_requested and self.stats.total_crawled < self.config.max_pages:
             batch_urls = []
             for _ in range(min(self.config.max_concurrent, 20)):
-                queued_url = await self.url_queue.get_next_url(self.config.domain_delay)
+                queued_url = await self._next_url()
                 if not queued_url:
                     break
                 batch_urls.append(queued_url.url)
@@ -371,17 +475,23 @@ class CrawlCoordinator:
                 # Use hybrid crawler with priority strategy
                 session_manager = self.session
                 results = await self.crawler.crawl_bfs(batch_urls, session_manager)
-                await self._process_crawl_results(results)
+                await self._process_crawl_results(results, claimed=batch_urls)
                 
             except Exception as e:
                 logger.error(f"Priority crawl batch failed: {e}")
+                self._checkpoint_done(batch_urls, "failed")
                 continue
             
             await self._update_stats()
             await asyncio.sleep(0.1)
     
-    async def _process_crawl_results(self, results):
-        """Process results from crawling operations"""
+    async def _process_crawl_results(self, results, claimed: Optional[List[str]] = None):
+        """Process results from crawling operations
+        
+        ``claimed`` are the URLs taken from the queue for this batch; any of
+        them without a result is checkpointed as failed.
+        """
+        processed = []
         for result in results:
             try:
                 # Convert to our CrawlResult format
@@ -420,15 +530,48 @@ class CrawlCoordinator:
                     if new_queued_urls:
                         await self.url_queue.add_urls_batch(new_queued_urls)
                         self.stats.total_discovered += len(new_queued_urls)
+                        self._checkpoint_enqueued(new_queued_urls)
                 
                 # Save result
                 await self._save_crawl_result(crawl_result)
                 
                 self.stats.total_crawled += 1
+                self._checkpoint_done([result.url])
                 
             except Exception as e:
                 logger.error(f"Failed to process crawl result for {result.url}: {e}")
                 self.stats.total_failed += 1
+                self._checkpoint_done([result.url], "failed")
+            processed.append(result.url)
+        
+        if claimed:
+            self._checkpoint_done(set(claimed).difference(processed), "failed")
+    
+    async def _next_url(self) -> Optional[QueuedURL]:
+        """Take the next URL from the queue, checkpointing the claim"""
+        queued_url = await self.url_queue.get_next_url(self.config.domain_delay)
+        if queued_url and self.checkpoint:
+            self.checkpoint.record_claimed([queued_url.url_hash], {queued_url.domain: time.time()})
+        return queued_url
+    
+    def _checkpoint_enqueued(self, queued_urls: List[QueuedURL]):
+        if self.checkpoint:
+            self.checkpoint.record_enqueued(
+                {"url_hash": q.url_hash, "url": q.to_dict()} for q in queued_urls
+            )
+    
+    def _checkpoint_done(self, urls, status: str = "completed"):
+        if self.checkpoint:
+            self.checkpoint.record_done((QueuedURL(url=url).url_hash for url in urls), status)
+    
+    def _checkpoint_stats(self):
+        self.checkpoint.record_stats({
+            'total_discovered': self.stats.total_discovered,
+            'total_crawled': self.stats.total_crawled,
+            'total_failed': self.stats.total_failed,
+            'start_time': self.stats.start_time.isoformat(),
+            'domains_active': sorted(self.stats.domains_active)
+        })
     
     def _should_follow_link(self, url: str) -> bool:
         """Determine if a link should be followed based on configuration"""
@@ -492,6 +635,10 @@ class CrawlCoordinator:
         queue_stats = await self.url_queue.get_queue_stats()
         self.stats.queue_size = queue_stats['total_queued']
         
+        if self.checkpoint:
+            self._checkpoint_stats()
+            self.checkpoint.maybe_flush()
+        
         # Log progress periodically
         if self.stats.total_crawled % 100 == 0:
             logger.info(f"Progress: {self.stats.total_crawled} pages crawled, "
@@ -543,6 +690,7 @@ class CrawlCoordinator:
                 'pages_per_second': self.stats.pages_per_second,
                 'elapsed_seconds': (datetime.utcnow() - self.stats.start_time).total_seconds(),
             },
+            'checkpoint': self.checkpoint.get_stats() if self.checkpoint else None,
             'config': {
                 'strategy': self.config.strategy,
                 'max_pages': self.config.max_pages,
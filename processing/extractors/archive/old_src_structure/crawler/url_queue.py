@@ -43,6 +43,20 @@ class QueuedURL:
         """Generate a hash for URL deduplication"""
         return hashlib.sha256(self.url.encode()).hexdigest()[:16]
 
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form, as stored in Redis"""
+        url_data = asdict(self)
+        url_data['discovered_at'] = self.discovered_at.isoformat() if self.discovered_at else None
+        url_data['scheduled_for'] = self.scheduled_for.isoformat() if self.scheduled_for else None
+        return url_data
+
+    @classmethod
+    def from_dict(cls, url_data: Dict[str, Any]) -> "QueuedURL":
+        url_data = dict(url_data)
+        url_data['discovered_at'] = datetime.fromisoformat(url_data['discovered_at']) if url_data.get('discovered_at') else None
+        url_data['scheduled_for'] = datetime.fromisoformat(url_data['scheduled_for']) if url_data.get('scheduled_for') else None
+        return cls(**url_data)
+
 class URLQueue:
     """
     Redis-based URL queue with deduplication, priority, and domain-aware scheduling.
@@ -86,9 +100,7 @@ class URLQueue:
         await self.redis.sadd(self.seen_urls_key, url_hash)
         
         # Store URL data
-        url_data = asdict(queued_url)
-        url_data['discovered_at'] = queued_url.discovered_at.isoformat() if queued_url.discovered_at else None
-        url_data['scheduled_for'] = queued_url.scheduled_for.isoformat() if queued_url.scheduled_for else None
+        url_data = queued_url.to_dict()
         
         await self.redis.hset(
             self.url_data_key,
@@ -130,9 +142,7 @@ class URLQueue:
                         continue
                     
                     # Prepare data
-                    url_data = asdict(queued_url)
-                    url_data['discovered_at'] = queued_url.discovered_at.isoformat() if queued_url.discovered_at else None
-                    url_data['scheduled_for'] = queued_url.scheduled_for.isoformat() if queued_url.scheduled_for else None
+                    url_data = queued_url.to_dict()
                     
                     # Add to pipeline
                     pipe.sadd(self.seen_urls_key, url_hash)
@@ -198,13 +208,35 @@ class URLQueue:
                 )
             
             # Reconstruct QueuedURL object
-            url_data['discovered_at'] = datetime.fromisoformat(url_data['discovered_at']) if url_data.get('discovered_at') else None
-            url_data['scheduled_for'] = datetime.fromisoformat(url_data['scheduled_for']) if url_data.get('scheduled_for') else None
-            
-            return QueuedURL(**url_data)
+            return QueuedURL.from_dict(url_data)
             
         return None  # All domains are delayed
         
+    async def mark_seen_batch(self, url_hashes: List[str]) -> int:
+        """
+        Mark URL hashes as seen without queueing them.
+        
+        Used when resuming a crawl so already visited URLs are not
+        queued again when they are rediscovered.
+        """
+        batch_size = 10000
+        for i in range(0, len(url_hashes), batch_size):
+            await self.redis.sadd(self.seen_urls_key, *url_hashes[i:i + batch_size])
+        return len(url_hashes)
+        
+    async def restore_domain_last_crawl(self, domain_times: Dict[str, float]):
+        """Restore per-domain last crawl times (unix timestamps) after a restart"""
+        if not domain_times:
+            return
+        async with self.redis.pipeline() as pipe:
+            for domain, timestamp in domain_times.items():
+                pipe.set(
+                    f"{self.domain_last_crawl_key}:{domain}",
+                    datetime.utcfromtimestamp(timestamp).isoformat(),
+                    ex=3600
+                )
+            await pipe.execute()
+        
     async def get_queue_stats(self) -> Dict[str, Any]:
         """Get queue statistics"""
         total_queued = await self.redis.zcard(self.priority_queue_key)
@@ -16,7 +16,10 @@ Main Components:
 - MigrationManager: Schema evolution
 """
 
-from .manager import DatabaseManager, get_db, get_database_manager
+from .manager import (
+    DatabaseManager, get_db, get_database_manager,
+    create_tables, drop_tables, SessionLocal
+)
 from .connection import DatabaseConnection, DatabaseMigrator
 try:
     from .models import (
@@ -34,6 +37,9 @@ __all__ = [
     "DatabaseMigrator",
     "get_db",
     "get_database_manager",
+    "create_tables",
+    "drop_tables",
+    "SessionLocal",
     "PersonModel",
     "CompanyModel", 
     "VehicleModel",
@@ -6,20 +6,23 @@ Complete database layer with SQLAlchemy models, repository pattern, and advanced
 import asyncio
 import json
 import hashlib
-from typing import List, Dict, Any, Optional, Union, Tuple, AsyncGenerator
+from typing import List, Dict, Any, Optional, Union, Tuple, AsyncGenerator, Callable
 from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
 
 import asyncpg
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Boolean, Float, ForeignKey, Index
-from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Boolean, Float, ForeignKey, Index, Computed
+from sqlalchemy.orm import relationship, defer
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 from sqlalchemy.sql import func
-from sqlalchemy import select, update, delete, and_, or_
+from sqlalchemy import select, update, delete, and_, tuple_
 
 from ..utils.logger import get_logger
+from .search_index import (
+    TEXT_SEARCH_CONFIG, PageSearchIndex, PostgresSearchIndex, SearchDocument, SearchResults
+)
 
 logger = get_logger(__name__)
 
@@ -133,6 +136,33 @@ class CrawledPage(Base):
         Index('idx_crawled_pages_crawled_at', 'crawled_at'),
         Index('idx_crawled_pages_status_code', 'status_code'),
         Index('idx_crawled_pages_depth', 'depth'),
+        # Keyset pagination: WHERE job_id = ? AND (crawled_at, id) < (?, ?)
+        Index('idx_crawled_pages_job_crawled_at_id', 'job_id', 'crawled_at', 'id'),
+    )
+
+class PageSearchDocument(Base):
+    """Extracted text of a crawled page, indexed for full-text search"""
+    __tablename__ = 'page_search_documents'
+    
+    page_id = Column(UUID(as_uuid=True), ForeignKey('crawled_pages.id', ondelete='CASCADE'), primary_key=True)
+    job_id = Column(UUID(as_uuid=True), nullable=False)
+    url = Column(String(2048), nullable=False)
+    title = Column(String(500))
+    meta_description = Column(Text)
+    body_text = Column(Text)
+    indexed_at = Column(DateTime, server_default=func.now())
+    
+    # Maintained by Postgres from the text columns above
+    search_vector = Column(TSVECTOR, Computed(
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(meta_description, '')), 'B') || "
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(body_text, '')), 'C')",
+        persisted=True
+    ))
+    
+    __table_args__ = (
+        Index('idx_page_search_job_id', 'job_id'),
+        Index('idx_page_search_vector', 'search_vector', postgresql_using='gin'),
     )
 
 class DiscoveredLink(Base):
@@ -321,13 +351,56 @@ class CrawlJobRepository(BaseRepository):
 class CrawledPageRepository(BaseRepository):
     """Repository for crawled page operations"""
     
-    async def save_page(self, **kwargs) -> CrawledPage:
-        """Save a crawled page"""
+    def __init__(self, session: AsyncSession, search_index: Optional[PageSearchIndex] = None):
+        super().__init__(session)
+        self.search_index = search_index or PostgresSearchIndex(session)
+    
+    async def save_page(self, index: bool = True, **kwargs) -> CrawledPage:
+        """Save a crawled page and add its text to the search index"""
         page = CrawledPage(**kwargs)
         self.session.add(page)
         await self.session.flush()
+        if index:
+            await self.index_page(page)
         return page
     
+    async def index_page(self, page: CrawledPage) -> bool:
+        """Index a page's extracted text; failures never lose the page itself"""
+        try:
+            # Savepoint so a failed index write does not abort the transaction
+            async with self.session.begin_nested():
+                await self.search_index.index(SearchDocument.from_page(page))
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to index page {page.url} for search: {e}")
+            return False
+    
+    async def reindex_job(self, job_id: str, batch_size: int = 200) -> int:
+        """Rebuild search documents for all pages of a job (backfill)"""
+        indexed = 0
+        last_id = None
+        while True:
+            stmt = (
+                select(CrawledPage)
+                .where(CrawledPage.job_id == job_id)
+                .order_by(CrawledPage.id)
+                .limit(batch_size)
+            )
+            if last_id is not None:
+                stmt = stmt.where(CrawledPage.id > last_id)
+            pages = list((await self.session.execute(stmt)).scalars().all())
+            if not pages:
+                break
+            
+            indexed += await self.search_index.index_many(
+                SearchDocument.from_page(page) for page in pages
+            )
+            last_id = pages[-1].id
+            # Drop processed HTML from the identity map between batches
+            for page in pages:
+                self.session.expunge(page)
+        return indexed
+    
     async def get_page_by_url(self, job_id: str, url: str) -> Optional[CrawledPage]:
         """Get page by URL"""
         url_hash = hashlib.sha256(url.encode()).hexdigest()
@@ -341,17 +414,50 @@ class CrawledPageRepository(BaseRepository):
         )
         return result.scalar_one_or_none()
     
-    async def get_pages_by_job(self, job_id: str, limit: int = 100, offset: int = 0) -> List[CrawledPage]:
-        """Get pages by job ID with pagination"""
-        result = await self.session.execute(
+    async def get_pages_by_job(self, job_id: str, limit: int = 100, offset: int = 0,
+                               after: Optional[Tuple[datetime, Any]] = None) -> List[CrawledPage]:
+        """Get pages by job ID, newest first
+        
+        Pass the ``(crawled_at, id)`` of the last page seen as ``after`` to
+        seek directly to the next page via the composite index; ``offset``
+        is kept for existing callers but scans every skipped row.
+        """
+        stmt = (
             select(CrawledPage)
             .where(CrawledPage.job_id == job_id)
-            .order_by(CrawledPage.crawled_at.desc())
+            .order_by(CrawledPage.crawled_at.desc(), CrawledPage.id.desc())
             .limit(limit)
-            .offset(offset)
         )
+        if after is not None:
+            stmt = stmt.where(tuple_(CrawledPage.crawled_at, CrawledPage.id) < tuple_(*after))
+        elif offset:
+            stmt = stmt.offset(offset)
+        
+        result = await self.session.execute(stmt)
         return list(result.scalars().all())
     
+    async def stream_pages_by_job(self, job_id: str, batch_size: int = 500,
+                                  include_html: bool = False) -> AsyncGenerator[CrawledPage, None]:
+        """Yield every page of a job through a server-side cursor
+        
+        Rows are fetched ``batch_size`` at a time, so memory stays constant
+        regardless of job size. HTML is deferred unless requested.
+        """
+        stmt = (
+            select(CrawledPage)
+            .where(CrawledPage.job_id == job_id)
+            .order_by(CrawledPage.crawled_at, CrawledPage.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if not include_html:
+            stmt = stmt.options(defer(CrawledPage.html_content))
+        
+        result = await self.session.stream(stmt)
+        async for page in result.scalars():
+            yield page
+            # Detach so the identity map does not grow with the stream
+            self.session.expunge(page)
+    
     async def get_pages_by_status_code(self, job_id: str, status_code: int) -> List[CrawledPage]:
         """Get pages by HTTP status code"""
         result = await self.session.execute(
@@ -364,21 +470,24 @@ class CrawledPageRepository(BaseRepository):
         )
         return list(result.scalars().all())
     
-    async def search_pages_by_content(self, job_id: str, query: str) -> List[CrawledPage]:
-        """Search pages by content"""
+    async def search_pages(self, query: str, job_id: Optional[str] = None,
+                           limit: int = 20, offset: int = 0) -> SearchResults:
+        """Ranked full-text search with snippets"""
+        return await self.search_index.search(query, job_id=job_id, limit=limit, offset=offset)
+    
+    async def search_pages_by_content(self, job_id: str, query: str,
+                                      limit: int = 100, offset: int = 0) -> List[CrawledPage]:
+        """Search pages by content, best matches first"""
+        results = await self.search_pages(query, job_id=job_id, limit=limit, offset=offset)
+        if not results.hits:
+            return []
+        
+        page_ids = [hit.page_id for hit in results.hits]
         result = await self.session.execute(
-            select(CrawledPage)
-            .where(and_(
-                CrawledPage.job_id == job_id,
-                or_(
-                    CrawledPage.title.ilike(f'%{query}%'),
-                    CrawledPage.html_content.ilike(f'%{query}%'),
-                    CrawledPage.meta_description.ilike(f'%{query}%')
-                )
-            ))
-            .order_by(CrawledPage.crawled_at.desc())
+            select(CrawledPage).where(CrawledPage.id.in_(page_ids))
         )
-        return list(result.scalars().all())
+        pages = {str(page.id): page for page in result.scalars().all()}
+        return [pages[page_id] for page_id in page_ids if page_id in pages]
     
     async def get_page_count_by_job(self, job_id: str) -> int:
         """Get total page count for a job"""
@@ -431,8 +540,10 @@ class DiscoveredLinkRepository(BaseRepository):
 class DatabaseManager:
     """Central database manager with connection pooling and migrations"""
     
-    def __init__(self, database_url: str, echo: bool = False):
+    def __init__(self, database_url: str, echo: bool = False,
+                 search_index_factory: Optional[Callable[[AsyncSession], PageSearchIndex]] = None):
         self.database_url = database_url
+        self.search_index_factory = search_index_factory
         self.engine = create_async_engine(
             database_url,
             echo=echo,
@@ -481,7 +592,8 @@ class DatabaseManager:
         return CrawlJobRepository(session)
     
     def get_crawled_page_repository(self, session: AsyncSession) -> CrawledPageRepository:
-        return CrawledPageRepository(session)
+        search_index = self.search_index_factory(session) if self.search_index_factory else None
+        return CrawledPageRepository(session, search_index=search_index)
     
     def get_discovered_link_repository(self, session: AsyncSession) -> DiscoveredLinkRepository:
         return DiscoveredLinkRepository(session)
@@ -588,6 +700,58 @@ class CrawlDatabaseService:
             await session.commit()
             return str(page.id)
     
+    async def search_pages(self,
+                           query: str,
+                           job_id: Optional[str] = None,
+                           limit: int = 20,
+                           offset: int = 0) -> Dict[str, Any]:
+        """Full-text search over crawled pages, paginated"""
+        
+        async with self.db_manager.get_session() as session:
+            repo = self.db_manager.get_crawled_page_repository(session)
+            results = await repo.search_pages(query, job_id=job_id, limit=limit, offset=offset)
+            return results.to_dict()
+    
+    async def list_pages(self,
+                         job_id: str,
+                         limit: int = 100,
+                         after: Optional[Tuple[datetime, Any]] = None) -> List[Dict[str, Any]]:
+        """List a job's pages (without HTML) using keyset pagination"""
+        
+        async with self.db_manager.get_session() as session:
+            repo = self.db_manager.get_crawled_page_repository(session)
+            pages = await repo.get_pages_by_job(job_id, limit=limit, after=after)
+            return [self.page_to_dict(page) for page in pages]
+    
+    async def stream_pages(self,
+                           job_id: str,
+                           batch_size: int = 500,
+                           include_html: bool = False) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream all pages of a job as dicts in constant memory"""
+        
+        async with self.db_manager.get_session() as session:
+            repo = self.db_manager.get_crawled_page_repository(session)
+            async for page in repo.stream_pages_by_job(job_id, batch_size, include_html):
+                yield self.page_to_dict(page, include_html=include_html)
+    
+    @staticmethod
+    def page_to_dict(page: CrawledPage, include_html: bool = False) -> Dict[str, Any]:
+        """Serializable view of a crawled page"""
+        data = {
+            'id': str(page.id),
+            'job_id': str(page.job_id),
+            'url': page.url,
+            'status_code': page.status_code,
+            'content_type': page.content_type,
+            'title': page.title,
+            'meta_description': page.meta_description,
+            'extracted_data': page.extracted_data,
+            'crawled_at': page.crawled_at.isoformat() if page.crawled_at else None
+        }
+        if include_html:
+            data['html_content'] = page.html_content
+        return data
+    
     async def get_job_statistics(self, job_id: str) -> Dict[str, Any]:
         """Get comprehensive statistics for a crawl job"""
         
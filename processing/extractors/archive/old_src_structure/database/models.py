@@ -243,6 +243,8 @@ class ExtractedItem(Base):
         Index('ix_extracted_items_item_template', 'item_key', 'template_id', unique=True),
         Index('ix_extracted_items_dq_status', 'dq_status'),
         Index('ix_extracted_items_created', 'created_at'),
+        # Keyset pagination and streaming of a job's items
+        Index('ix_extracted_items_job_id_id', 'job_id', 'id'),
     )
 
 
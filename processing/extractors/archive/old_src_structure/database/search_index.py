@@ -0,0 +1,429 @@
+"""
+Full-text Search Index for Crawled Pages
+
+Keeps the visible text of each crawled page apart from its raw HTML and
+indexes it for ranked search:
+
+- Postgres: weighted ``tsvector`` column on ``page_search_documents`` with
+  a GIN index, ranked with ``ts_rank_cd`` and snippets from ``ts_headline``
+- SQLite: FTS5 virtual table ranked with ``bm25`` for local and test setups
+
+Both backends expose the same async ``index`` / ``remove`` / ``search``
+interface, so repositories can index incrementally as pages are saved.
+"""
+
+import html
+import re
+import sqlite3
+import threading
+from dataclasses import asdict, dataclass, field
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..utils.logger import get_logger
+
+try:
+    from sqlalchemy import text
+    SQLALCHEMY_AVAILABLE = True
+except ImportError:
+    SQLALCHEMY_AVAILABLE = False
+
+logger = get_logger(__name__)
+
+# Text search configuration used by the generated tsvector column. 'simple'
+# does no stemming, which keeps Swedish and English content searchable alike.
+TEXT_SEARCH_CONFIG = "simple"
+
+# Upper bound on indexed body text per page; tsvector values max out at 1 MB
+MAX_INDEXED_CHARS = 200_000
+
+SNIPPET_START = "<mark>"
+SNIPPET_STOP = "</mark>"
+
+# The database wraps matches in these private-use characters; the snippet is
+# HTML-escaped before they become the tags above, so page text is never markup
+_MATCH_START = "\ue000"
+_MATCH_STOP = "\ue001"
+
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+_BLOCK_TAGS = {
+    "p", "div", "br", "li", "ul", "ol", "tr", "td", "th", "table", "section",
+    "article", "header", "footer", "nav", "aside", "h1", "h2", "h3", "h4",
+    "h5", "h6", "blockquote", "pre", "dd", "dt", "form", "main",
+}
+_WHITESPACE = re.compile(r"\s+")
+_QUERY_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+class _TextExtractor(HTMLParser):
+    """Collects visible text, skipping scripts, styles and the document head"""
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.size = 0
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_data(self, data):
+        if self.skip_depth or self.size >= self.max_chars:
+            return
+        self.parts.append(data)
+        self.size += len(data)
+
+
+def extract_search_text(html_content: Optional[str], max_chars: int = MAX_INDEXED_CHARS) -> str:
+    """Extract whitespace-normalized visible text from an HTML document"""
+    if not html_content:
+        return ""
+
+    parser = _TextExtractor(max_chars)
+    try:
+        parser.feed(html_content)
+        parser.close()
+    except Exception as e:
+        logger.debug(f"HTML text extraction stopped early: {e}")
+
+    text = "".join(parser.parts).replace(_MATCH_START, "").replace(_MATCH_STOP, "")
+    return _WHITESPACE.sub(" ", text).strip()[:max_chars]
+
+
+def render_snippet(raw: Optional[str]) -> str:
+    """HTML-escape a database snippet and wrap its matches in ``<mark>``"""
+    if not raw:
+        return ""
+    return html.escape(raw).replace(_MATCH_START, SNIPPET_START).replace(_MATCH_STOP, SNIPPET_STOP)
+
+
+@dataclass
+class SearchDocument:
+    """Extracted, indexable text for a single crawled page"""
+    page_id: str
+    job_id: str
+    url: str
+    title: str = ""
+    meta_description: str = ""
+    body_text: str = ""
+
+    @classmethod
+    def from_page(cls, page: Any) -> "SearchDocument":
+        """Build a document from a ``CrawledPage``-like object"""
+        return cls(
+            page_id=str(page.id),
+            job_id=str(page.job_id),
+            url=page.url,
+            title=page.title or "",
+            meta_description=page.meta_description or "",
+            body_text=extract_search_text(page.html_content)
+        )
+
+
+@dataclass
+class SearchHit:
+    """One ranked search result"""
+    page_id: str
+    url: str
+    title: str
+    snippet: str  # HTML-escaped page text with matches in <mark> tags
+    rank: float
+
+
+@dataclass
+class SearchResults:
+    """A page of ranked search results"""
+    query: str
+    total: int
+    limit: int
+    offset: int
+    hits: List[SearchHit] = field(default_factory=list)
+
+    @property
+    def has_more(self) -> bool:
+        return self.offset + len(self.hits) < self.total
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "query": self.query,
+            "total": self.total,
+            "limit": self.limit,
+            "offset": self.offset,
+            "has_more": self.has_more,
+            "hits": [asdict(hit) for hit in self.hits]
+        }
+
+
+def query_terms(query: str) -> List[str]:
+    """Split a free-text query into plain search terms"""
+    return _QUERY_TOKEN.findall(query or "")
+
+
+class PageSearchIndex:
+    """Interface shared by the search index backends"""
+
+    async def index(self, document: SearchDocument):
+        raise NotImplementedError
+
+    async def index_many(self, documents: Iterable[SearchDocument]) -> int:
+        count = 0
+        for document in documents:
+            await self.index(document)
+            count += 1
+        return count
+
+    async def remove(self, page_id: str):
+        raise NotImplementedError
+
+    async def search(self, query: str, job_id: Optional[str] = None,
+                     limit: int = 20, offset: int = 0) -> SearchResults:
+        raise NotImplementedError
+
+
+class PostgresSearchIndex(PageSearchIndex):
+    """tsvector/GIN search over ``page_search_documents``
+
+    Runs on the caller's ``AsyncSession`` so indexing shares the
+    transaction that saved the page. The ``search_vector`` column is
+    generated by Postgres from title (A), meta description (B) and body
+    text (C) weights.
+    """
+
+    def __init__(self, session, config: str = TEXT_SEARCH_CONFIG,
+                 headline_options: str = "MaxFragments=2, MaxWords=30, MinWords=10"):
+        if not SQLALCHEMY_AVAILABLE:
+            raise ImportError("SQLAlchemy is required for PostgresSearchIndex")
+        self.session = session
+        self.config = config
+        self.headline_options = (
+            f"{headline_options}, StartSel={_MATCH_START}, StopSel={_MATCH_STOP}"
+        )
+
+    async def index(self, document: SearchDocument):
+        """Insert or refresh the document for a page"""
+        await self.session.execute(
+            text("""
+                INSERT INTO page_search_documents
+                    (page_id, job_id, url, title, meta_description, body_text, indexed_at)
+                VALUES
+                    (CAST(:page_id AS uuid), CAST(:job_id AS uuid), :url, :title,
+                     :meta_description, :body_text, now())
+                ON CONFLICT (page_id) DO UPDATE SET
+                    url = EXCLUDED.url,
+                    title = EXCLUDED.title,
+                    meta_description = EXCLUDED.meta_description,
+                    body_text = EXCLUDED.body_text,
+                    indexed_at = EXCLUDED.indexed_at
+            """),
+            asdict(document)
+        )
+
+    async def remove(self, page_id: str):
+        await self.session.execute(
+            text("DELETE FROM page_search_documents WHERE page_id = CAST(:page_id AS uuid)"),
+            {"page_id": str(page_id)}
+        )
+
+    async def search(self, query: str, job_id: Optional[str] = None,
+                     limit: int = 20, offset: int = 0) -> SearchResults:
+        """Ranked search; snippets are only built for the returned page"""
+        if not query_terms(query):
+            return SearchResults(query=query, total=0, limit=limit, offset=offset)
+
+        job_filter = "AND d.job_id = CAST(:job_id AS uuid)" if job_id else ""
+        params = {
+            "config": self.config,
+            "query": query,
+            "job_id": str(job_id) if job_id else None,
+            "limit": limit,
+            "offset": offset,
+            "headline_options": self.headline_options,
+        }
+
+        # ts_headline re-parses the document, so it runs in the outer query
+        # over the already limited rows only
+        result = await self.session.execute(
+            text(f"""
+                WITH q AS (
+                    SELECT websearch_to_tsquery(CAST(:config AS regconfig), :query) AS tsq
+                ),
+                ranked AS (
+                    SELECT d.page_id, d.url, d.title, d.body_text,
+                           ts_rank_cd(d.search_vector, q.tsq) AS rank,
+                           count(*) OVER () AS total
+                    FROM page_search_documents d, q
+                    WHERE d.search_vector @@ q.tsq {job_filter}
+                    ORDER BY rank DESC, d.page_id
+                    LIMIT :limit OFFSET :offset
+                )
+                SELECT r.page_id, r.url, r.title, r.rank, r.total,
+                       ts_headline(CAST(:config AS regconfig), r.body_text, q.tsq,
+                                   :headline_options) AS snippet
+                FROM ranked r, q
+                ORDER BY r.rank DESC, r.page_id
+            """),
+            {k: v for k, v in params.items() if v is not None}
+        )
+        rows = result.mappings().all()
+
+        total = rows[0]["total"] if rows else 0
+        if not rows and offset:
+            total = await self._count(query, job_id)
+
+        return SearchResults(
+            query=query,
+            total=total,
+            limit=limit,
+            offset=offset,
+            hits=[
+                SearchHit(
+                    page_id=str(row["page_id"]),
+                    url=row["url"],
+                    title=row["title"] or "",
+                    snippet=render_snippet(row["snippet"]),
+                    rank=float(row["rank"])
+                )
+                for row in rows
+            ]
+        )
+
+    async def _count(self, query: str, job_id: Optional[str]) -> int:
+        job_filter = "AND job_id = CAST(:job_id AS uuid)" if job_id else ""
+        params = {"config": self.config, "query": query}
+        if job_id:
+            params["job_id"] = str(job_id)
+        result = await self.session.execute(
+            text(f"""
+                SELECT count(*) FROM page_search_documents
+                WHERE search_vector @@ websearch_to_tsquery(CAST(:config AS regconfig), :query)
+                {job_filter}
+            """),
+            params
+        )
+        return result.scalar() or 0
+
+
+class SQLiteSearchIndex(PageSearchIndex):
+    """FTS5 search index for local development and tests
+
+    Column weights mirror the Postgres setup: title ranks above the meta
+    description, which ranks above body text.
+    """
+
+    def __init__(self, db_path: str = ":memory:",
+                 weights: tuple = (10.0, 4.0, 1.0),
+                 snippet_tokens: int = 24):
+        self.db_path = db_path
+        self.weights = weights
+        self.snippet_tokens = snippet_tokens
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            if self.db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS page_search USING fts5(
+                    page_id UNINDEXED,
+                    job_id UNINDEXED,
+                    url UNINDEXED,
+                    title,
+                    meta_description,
+                    body_text,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    async def index(self, document: SearchDocument):
+        self.index_sync([document])
+
+    async def index_many(self, documents: Iterable[SearchDocument]) -> int:
+        return self.index_sync(documents)
+
+    def index_sync(self, documents: Iterable[SearchDocument]) -> int:
+        """Insert or replace documents in a single transaction"""
+        rows = [asdict(document) for document in documents]
+        with self._lock, self._conn:
+            # FTS5 tables have no upsert; replace by deleting first
+            self._conn.executemany(
+                "DELETE FROM page_search WHERE page_id = :page_id", rows
+            )
+            self._conn.executemany("""
+                INSERT INTO page_search
+                    (page_id, job_id, url, title, meta_description, body_text)
+                VALUES (:page_id, :job_id, :url, :title, :meta_description, :body_text)
+            """, rows)
+        return len(rows)
+
+    async def remove(self, page_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM page_search WHERE page_id = ?", (str(page_id),))
+
+    async def search(self, query: str, job_id: Optional[str] = None,
+                     limit: int = 20, offset: int = 0) -> SearchResults:
+        return self.search_sync(query, job_id, limit, offset)
+
+    def search_sync(self, query: str, job_id: Optional[str] = None,
+                    limit: int = 20, offset: int = 0) -> SearchResults:
+        terms = query_terms(query)
+        if not terms:
+            return SearchResults(query=query, total=0, limit=limit, offset=offset)
+
+        # Quote every term so user input can never be parsed as FTS5 syntax
+        match = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        where = "page_search MATCH ?"
+        params: List[Any] = [match]
+        if job_id:
+            where += " AND job_id = ?"
+            params.append(str(job_id))
+
+        title_w, meta_w, body_w = self.weights
+        with self._lock:
+            total = self._conn.execute(
+                f"SELECT count(*) FROM page_search WHERE {where}", params
+            ).fetchone()[0]
+            rows = self._conn.execute(f"""
+                SELECT page_id, url, title,
+                       bm25(page_search, 0, 0, 0, ?, ?, ?) AS score,
+                       snippet(page_search, 5, ?, ?, '…', ?) AS snippet
+                FROM page_search
+                WHERE {where}
+                ORDER BY score, page_id
+                LIMIT ? OFFSET ?
+            """, [title_w, meta_w, body_w, _MATCH_START, _MATCH_STOP,
+                  self.snippet_tokens, *params, limit, offset]).fetchall()
+
+        return SearchResults(
+            query=query,
+            total=total,
+            limit=limit,
+            offset=offset,
+            hits=[
+                # bm25() is lower-is-better; flip it so rank sorts like ts_rank
+                SearchHit(
+                    page_id=row["page_id"],
+                    url=row["url"],
+                    title=row["title"],
+                    snippet=render_snippet(row["snippet"]),
+                    rank=-row["score"]
+                )
+                for row in rows
+            ]
+        )
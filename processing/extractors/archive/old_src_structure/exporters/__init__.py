@@ -1,20 +1,40 @@
 """
 Exporter package initialization.
 Registers all available exporters and provides a unified interface.
+
+The lightweight CSV and JSON exporters are imported eagerly; exporters
+that depend on pandas or cloud SDKs are imported on first access, either
+as a package attribute or through ``ExporterRegistry.get_exporter``.
 """
 
+import importlib
+from typing import Any
+
 from .base import BaseExporter, ExportConfig, ExportResult, ExporterRegistry, ExportManager
 
-# Import all exporters to trigger registration
+# Standard library only - cheap to import and register
 from .csv_exporter import CSVExporter
 from .json_exporter import JSONExporter
-from .excel_exporter import ExcelExporter
-from .sheets_exporter import SheetsExporter
-from .bigquery_exporter import BigQueryExporter
-from .snowflake_exporter import SnowflakeExporter
-from .elastic_exporter import ElasticExporter
-from .google_sheets_exporter import GoogleSheetsExporter
-from .opensearch_exporter import OpenSearchExporter
+
+# Exporter class -> submodule, imported on first attribute access
+_LAZY_EXPORTERS = {
+    'ExcelExporter': '.excel_exporter',
+    'SheetsExporter': '.sheets_exporter',
+    'BigQueryExporter': '.bigquery_exporter',
+    'SnowflakeExporter': '.snowflake_exporter',
+    'ElasticExporter': '.elastic_exporter',
+    'GoogleSheetsExporter': '.google_sheets_exporter',
+    'OpenSearchExporter': '.opensearch_exporter',
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_EXPORTERS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
 
 __all__ = [
     'BaseExporter',
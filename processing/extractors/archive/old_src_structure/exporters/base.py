@@ -4,27 +4,23 @@ Provides common functionality and interface for data export operations.
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Union, Generator
+from typing import TYPE_CHECKING, Any, AsyncIterable, Dict, Iterable, List, Optional, Union, Generator
+import importlib
 import logging
 from dataclasses import dataclass
 from datetime import datetime
 import asyncio
 from pathlib import Path
 import uuid
-from sqlalchemy.orm import Session
 
-# Import database utilities
-from src.utils.export_utils import (
-    get_data_from_db, 
-    generate_csv_stream, 
-    generate_ndjson_stream, 
-    generate_json_stream,
-    get_fieldnames_for_export_type,
-    upload_to_supabase_storage
-)
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+# Input accepted by streaming exporters
+Records = Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+
 @dataclass
 class ExportConfig:
     """Configuration for export operations."""
@@ -71,19 +67,18 @@ class BaseExporter(ABC):
     
     def prepare_data(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Prepare data for export (common preprocessing)."""
-        prepared_data = []
+        return [self.prepare_record(record) for record in data]
+    
+    def prepare_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Prepare a single record; used by streaming exporters."""
+        prepared_record = record.copy()
         
-        for record in data:
-            prepared_record = record.copy()
-            
-            # Add metadata if requested
-            if self.config.include_metadata:
-                prepared_record["_export_timestamp"] = datetime.utcnow().isoformat()
-                prepared_record["_exporter"] = self.__class__.__name__
-            
-            prepared_data.append(prepared_record)
+        # Add metadata if requested
+        if self.config.include_metadata:
+            prepared_record["_export_timestamp"] = datetime.utcnow().isoformat()
+            prepared_record["_exporter"] = self.__class__.__name__
         
-        return prepared_data
+        return prepared_record
     
     def create_metadata(self, record_count: int) -> Dict[str, Any]:
         """Create export metadata."""
@@ -144,24 +139,61 @@ class BaseExporter(ABC):
             )
 
 class ExporterRegistry:
-    """Registry for managing available exporters."""
+    """Registry for managing available exporters.
+    
+    Exporters backed by heavy optional libraries (pandas, BigQuery,
+    Snowflake, Elasticsearch, ...) are registered lazily by module name
+    and imported on first lookup. The module registers its class on import
+    if its dependencies are installed.
+    """
     
     _exporters: Dict[str, type] = {}
     
+    # name -> module (relative to this package) that registers it on import
+    _lazy: Dict[str, str] = {
+        'csv': '.csv_exporter',
+        'json': '.json_exporter',
+        'jsonl': '.json_exporter',
+        'excel': '.excel_exporter',
+        'bigquery': '.bigquery_exporter',
+        'snowflake': '.snowflake_exporter',
+        'elasticsearch': '.elastic_exporter',
+        'elastic': '.elastic_exporter',
+        'opensearch': '.opensearch_exporter',
+        'google_sheets': '.google_sheets_exporter',
+        'gsheets': '.google_sheets_exporter',
+        'sheets': '.sheets_exporter',
+    }
+    
     @classmethod
     def register(cls, name: str, exporter_class: type):
         """Register an exporter."""
         cls._exporters[name] = exporter_class
+        cls._lazy.pop(name, None)
+    
+    @classmethod
+    def register_lazy(cls, name: str, module: str):
+        """Register an exporter by the module that defines it, imported on first use."""
+        if name not in cls._exporters:
+            cls._lazy[name] = module
     
     @classmethod
     def get_exporter(cls, name: str) -> Optional[type]:
-        """Get an exporter by name."""
-        return cls._exporters.get(name)
+        """Get an exporter by name, importing its module on first use."""
+        exporter_class = cls._exporters.get(name)
+        if exporter_class is None and name in cls._lazy:
+            module = cls._lazy.pop(name)
+            try:
+                importlib.import_module(module, __package__)
+            except ImportError as e:
+                logger.warning(f"Exporter {name} unavailable: {e}")
+            exporter_class = cls._exporters.get(name)
+        return exporter_class
     
     @classmethod
     def list_exporters(cls) -> List[str]:
-        """List all registered exporters."""
-        return list(cls._exporters.keys())
+        """List all registered exporters, including ones not imported yet."""
+        return list(cls._exporters.keys()) + [name for name in cls._lazy if name not in cls._exporters]
     
     @classmethod
     def create_exporter(cls, name: str, config: ExportConfig) -> Optional[BaseExporter]:
@@ -209,7 +241,7 @@ class ExportManager:
     
     def export_from_database(
         self,
-        db: Session,
+        db: "Session",
         export_type: str,
         format: str,
         tenant_id: uuid.UUID,
@@ -234,15 +266,27 @@ class ExportManager:
             fields: Specific fields to include
             mask_pii: Whether to mask PII data
             limit: Maximum number of records
-            offset: Records to skip
-            **kwargs: Additional format-specific options
+            offset: Records to skip (deprecated; forces a single streamed query)
+            **kwargs: Additional format-specific options; ``chunk_size`` sets
+                the number of rows fetched per database round trip
             
         Returns:
             Generator yielding data chunks as bytes
         """
+        from src.utils.export_utils import (
+            ExportPlan,
+            get_data_from_db,
+            generate_csv_stream,
+            generate_ndjson_stream,
+            generate_json_stream
+        )
+        
         filters = filters or {}
         
-        # Get data generator from database
+        # Column list and masking are resolved once for the whole export
+        plan = ExportPlan(export_type, fields, mask_pii)
+        
+        # Rows are read lazily from the database as the stream is consumed
         data_generator = get_data_from_db(
             db=db,
             export_type=export_type,
@@ -252,16 +296,18 @@ class ExportManager:
             fields=fields,
             mask_pii=mask_pii,
             limit=limit,
-            offset=offset
+            offset=offset,
+            chunk_size=kwargs.pop('chunk_size', 1000),
+            plan=plan
         )
         
         # Generate appropriate stream based on format
         if format.lower() == 'csv':
-            return generate_csv_stream(data_generator, get_fieldnames_for_export_type(export_type))
+            yield from generate_csv_stream(data_generator, plan.fieldnames)
         elif format.lower() == 'json':
-            return generate_json_stream(data_generator)
+            yield from generate_json_stream(data_generator)
         elif format.lower() == 'ndjson':
-            return generate_ndjson_stream(data_generator)
+            yield from generate_ndjson_stream(data_generator)
         else:
             # Fall back to standard export for other formats
             data_list = list(data_generator)
@@ -287,6 +333,8 @@ class ExportManager:
         Returns:
             Public URL of uploaded file
         """
+        from src.utils.export_utils import upload_to_supabase_storage
+        
         return await upload_to_supabase_storage(
             bucket_name=bucket_name,
             file_path=file_path,
@@ -297,4 +345,4 @@ class ExportManager:
     
     def get_available_formats(self) -> List[str]:
         """Get list of available export formats"""
-        return list(self.registry.exporters.keys())
+        return self.registry.list_exporters()
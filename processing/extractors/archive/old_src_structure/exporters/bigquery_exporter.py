@@ -1,20 +1,26 @@
 """
 BigQuery Exporter for exporting data to Google BigQuery.
-Supports batch inserts, schema validation, and partitioning.
+Supports chunked, file-staged load jobs that run concurrently and can be resumed.
 """
 
 import asyncio
+import os
+import tempfile
+import uuid
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 try:
     from google.cloud import bigquery
     from google.oauth2 import service_account
+    from google.api_core.exceptions import GoogleAPICallError, NotFound
     BIGQUERY_AVAILABLE = True
 except ImportError:
     BIGQUERY_AVAILABLE = False
 
-from .base import BaseExporter, ExportConfig, ExportResult, ExporterRegistry
+from .base import BaseExporter, ExportConfig, ExportResult, ExporterRegistry, Records
+from .staged_load import PYARROW_AVAILABLE, StagedChunk, StagedLoader, StagedLoadManifest
 
 class BigQueryExporter(BaseExporter):
     """Exporter for Google BigQuery."""
@@ -28,6 +34,15 @@ class BigQueryExporter(BaseExporter):
         self.write_disposition = config.format_options.get('write_disposition', 'WRITE_APPEND')
         self.create_disposition = config.format_options.get('create_disposition', 'CREATE_IF_NEEDED')
         self.auto_detect_schema = config.format_options.get('auto_detect_schema', True)
+        # Staged load options
+        self.staging_dir = config.format_options.get(
+            'staging_dir', os.path.join(config.output_path or tempfile.gettempdir(), 'bigquery_staging')
+        )
+        self.chunk_format = config.format_options.get('chunk_format', 'ndjson')
+        self.chunk_target_bytes = config.format_options.get('chunk_target_bytes', 64 * 1024 * 1024)
+        self.max_concurrent_loads = config.format_options.get('max_concurrent_loads', 4)
+        self.max_load_attempts = config.format_options.get('max_load_attempts', 3)
+        self.keep_chunk_files = config.format_options.get('keep_chunk_files', False)
     
     def validate_config(self) -> bool:
         """Validate BigQuery exporter configuration."""
@@ -48,6 +63,10 @@ class BigQueryExporter(BaseExporter):
                 self.logger.error("Table ID is required for BigQuery export")
                 return False
             
+            if self.chunk_format == 'parquet' and not PYARROW_AVAILABLE:
+                self.logger.error("Parquet chunks require the pyarrow package")
+                return False
+            
             return True
         except Exception as e:
             self.logger.error(f"Configuration validation failed: {str(e)}")
@@ -55,44 +74,46 @@ class BigQueryExporter(BaseExporter):
     
     async def export(self, data: List[Dict[str, Any]], **kwargs) -> ExportResult:
         """Export data to BigQuery."""
+        return await self.export_stream(data, **kwargs)
+    
+    async def export_stream(self, records: Records, load_id: Optional[str] = None, **kwargs) -> ExportResult:
+        """
+        Export a list, iterator or async iterator of records to BigQuery.
+        
+        Records are staged into compressed chunk files of about
+        ``chunk_target_bytes``; each closed chunk is loaded with its own load
+        job while later chunks are still being written. If some chunks fail,
+        the result carries the ``load_id`` to pass to ``resume_load``.
+        """
         if not self.validate_config():
+            return self._invalid_config()
+        
+        try:
+            load_id = load_id or f"{self.table_id}-{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+            loader = await asyncio.to_thread(self._create_loader, self._create_client(), load_id)
+            await loader.run(records, prepare=self.prepare_record)
+            return self._result(loader)
+        except Exception as e:
+            self.logger.error(f"BigQuery export failed: {str(e)}")
             return ExportResult(
                 success=False,
                 records_exported=0,
                 output_location="",
                 export_time=datetime.utcnow(),
-                error_message="Invalid configuration or missing dependencies"
+                error_message=str(e)
             )
+    
+    async def resume_load(self, load_id: str) -> ExportResult:
+        """Load the staged chunks of an earlier export that were not loaded."""
+        if not self.validate_config():
+            return self._invalid_config()
         
         try:
-            # Prepare data
-            prepared_data = self.prepare_data(data)
-            
-            if not prepared_data:
-                return ExportResult(
-                    success=True,
-                    records_exported=0,
-                    output_location=f"{self.project_id}.{self.dataset_id}.{self.table_id}",
-                    export_time=datetime.utcnow(),
-                    metadata=self.create_metadata(0)
-                )
-            
-            # Write to BigQuery
-            rows_inserted = await self._write_bigquery(prepared_data)
-            
-            location = f"{self.project_id}.{self.dataset_id}.{self.table_id}"
-            self.logger.info(f"Exported {rows_inserted} records to BigQuery: {location}")
-            
-            return ExportResult(
-                success=True,
-                records_exported=rows_inserted,
-                output_location=location,
-                export_time=datetime.utcnow(),
-                metadata=self.create_metadata(rows_inserted)
-            )
-            
+            loader = await asyncio.to_thread(self._create_loader, self._create_client(), load_id)
+            await loader.resume()
+            return self._result(loader)
         except Exception as e:
-            self.logger.error(f"BigQuery export failed: {str(e)}")
+            self.logger.error(f"Resuming BigQuery load {load_id} failed: {str(e)}")
             return ExportResult(
                 success=False,
                 records_exported=0,
@@ -101,34 +122,102 @@ class BigQueryExporter(BaseExporter):
                 error_message=str(e)
             )
     
-    async def _write_bigquery(self, data: List[Dict[str, Any]]) -> int:
-        """Write data to BigQuery."""
-        def write_sync():
-            # Initialize client
-            if self.credentials_path:
-                credentials = service_account.Credentials.from_service_account_file(self.credentials_path)
-                client = bigquery.Client(credentials=credentials, project=self.project_id)
-            else:
-                client = bigquery.Client(project=self.project_id)
-            
-            # Get table reference
-            table_ref = client.dataset(self.dataset_id).table(self.table_id)
-            
-            # Configure job
-            job_config = bigquery.LoadJobConfig(
-                write_disposition=self.write_disposition,
-                create_disposition=self.create_disposition,
-                autodetect=self.auto_detect_schema,
-                source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
-            )
-            
-            # Insert rows
-            job = client.load_table_from_json(data, table_ref, job_config=job_config)
-            job.result()  # Wait for job to complete
-            
-            return len(data)
+    def _invalid_config(self) -> ExportResult:
+        return ExportResult(
+            success=False,
+            records_exported=0,
+            output_location="",
+            export_time=datetime.utcnow(),
+            error_message="Invalid configuration or missing dependencies"
+        )
+    
+    def _result(self, loader: StagedLoader) -> ExportResult:
+        summary = loader.summary()
+        location = f"{self.project_id}.{self.dataset_id}.{self.table_id}"
+        self.logger.info(f"Exported {summary['rows_loaded']} records to BigQuery: {location} "
+                         f"({summary['chunks_loaded']}/{summary['chunks']} chunks)")
+        
+        metadata = self.create_metadata(summary['rows_loaded'])
+        metadata['staged_load'] = summary
+        return ExportResult(
+            success=loader.complete,
+            records_exported=summary['rows_loaded'],
+            output_location=location,
+            export_time=datetime.utcnow(),
+            metadata=metadata,
+            error_message=None if loader.complete else
+                f"{summary['chunks_failed']} chunks not loaded; resume with load_id={summary['load_id']}"
+        )
+    
+    def _create_client(self) -> "bigquery.Client":
+        """Connect to BigQuery."""
+        if self.credentials_path:
+            credentials = service_account.Credentials.from_service_account_file(self.credentials_path)
+            return bigquery.Client(credentials=credentials, project=self.project_id)
+        return bigquery.Client(project=self.project_id)
+    
+    def _create_loader(self, client: "bigquery.Client", load_id: str) -> StagedLoader:
+        table_ref = client.dataset(self.dataset_id).table(self.table_id)
+        try:
+            client.get_table(table_ref)
+            table_exists = True
+        except NotFound:
+            table_exists = False
+        
+        def load_chunk(path: Path, chunk: StagedChunk, manifest: StagedLoadManifest) -> str:
+            return self._load_chunk(client, table_ref, path, chunk, manifest)
+        
+        return StagedLoader(
+            self.staging_dir,
+            load_id,
+            f"{self.project_id}.{self.dataset_id}.{self.table_id}",
+            load_chunk,
+            file_format=self.chunk_format,
+            target_bytes=self.chunk_target_bytes,
+            max_concurrent_loads=self.max_concurrent_loads,
+            max_attempts=self.max_load_attempts,
+            keep_files=self.keep_chunk_files,
+            # Truncation and table creation (with schema detection) happen on the
+            # first chunk; the rest append once it has finished
+            exclusive_first_chunk=self.write_disposition != 'WRITE_APPEND' or not table_exists,
+            batch_size=self.config.batch_size
+        )
+    
+    def _load_chunk(self, client: "bigquery.Client", table_ref, path: Path, chunk: StagedChunk,
+                    manifest: StagedLoadManifest) -> str:
+        """Run one load job for a staged chunk; returns the job id."""
+        job_prefix = f"{manifest.load_id}_{chunk.index:06d}"
+        
+        # An earlier attempt may have completed without the manifest recording it
+        for attempt in range(1, chunk.attempts):
+            try:
+                previous = client.get_job(f"{job_prefix}_{attempt}")
+                previous.result()
+            except GoogleAPICallError:
+                continue
+            self.logger.info(f"Chunk {chunk.name} was already loaded by job {previous.job_id}")
+            return previous.job_id
+        
+        first = chunk.index == 0
+        job_config = bigquery.LoadJobConfig(
+            write_disposition=self.write_disposition if first else 'WRITE_APPEND',
+            create_disposition=self.create_disposition,
+            autodetect=self.auto_detect_schema,
+            source_format=bigquery.SourceFormat.PARQUET if manifest.file_format == 'parquet'
+            else bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
+        )
+        if not first and self.auto_detect_schema:
+            # Later chunks may carry fields the first chunk did not have
+            job_config.schema_update_options = [bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION]
+        
+        with open(path, 'rb') as source:
+            job = client.load_table_from_file(source, table_ref, job_id=f"{job_prefix}_{chunk.attempts}",
+                                              job_config=job_config)
+        job.result()  # Wait for job to complete
         
-        return await asyncio.get_event_loop().run_in_executor(None, write_sync)
+        if job.output_rows is not None and job.output_rows != chunk.rows:
+            self.logger.warning(f"Load job {job.job_id} wrote {job.output_rows} rows for {chunk.rows} staged")
+        return job.job_id
 
 # Register the exporter only if dependencies are available
 if BIGQUERY_AVAILABLE:
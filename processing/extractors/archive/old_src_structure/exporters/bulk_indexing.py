@@ -0,0 +1,240 @@
+"""
+Streaming bulk indexing shared by the Elasticsearch and OpenSearch exporters.
+
+Documents are consumed from a sync or async iterable and grouped into bulk
+requests bounded by both document count and serialized size. Up to
+``max_in_flight`` requests are sent concurrently; the producer waits for a
+free slot before building the next batch, so memory stays bounded by
+``max_in_flight * max_chunk_bytes`` regardless of the input size.
+
+Items rejected with 429 (queue full) are retried with exponential backoff;
+a whole request rejected with 429 is retried the same way. Any other item
+error counts as a failure. For large loads the index refresh interval and
+replica count can be switched off for the duration of the load and
+restored afterwards.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+Documents = Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+
+
+@dataclass
+class BulkIndexStats:
+    """Outcome of a streaming bulk load"""
+    indexed: int = 0
+    failed: int = 0
+    retried: int = 0
+    requests: int = 0
+    bytes_sent: int = 0
+    seconds: float = 0.0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "indexed": self.indexed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "requests": self.requests,
+            "bytes_sent": self.bytes_sent,
+            "seconds": round(self.seconds, 3),
+            "docs_per_second": round(self.indexed / self.seconds, 1) if self.seconds else 0.0,
+            "errors": self.errors
+        }
+
+
+async def _aiter(documents: Documents) -> AsyncIterator[Dict[str, Any]]:
+    if hasattr(documents, "__aiter__"):
+        async for document in documents:
+            yield document
+    else:
+        for document in documents:
+            yield document
+
+
+def _status_of(error: Exception) -> Optional[int]:
+    """HTTP status of a client exception (elasticsearch-py 7/8, opensearch-py)"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        meta = getattr(error, "meta", None)
+        status = getattr(meta, "status", None)
+    return status if isinstance(status, int) else None
+
+
+class StreamingBulkIndexer:
+    """
+    Concurrent, size-bounded bulk indexing against a sync ES/OpenSearch client.
+
+    The client's ``bulk`` call runs in a worker thread so that several
+    requests can be in flight while the event loop keeps producing batches.
+    """
+
+    MAX_RECORDED_ERRORS = 10
+
+    def __init__(self,
+                 client,
+                 index: str,
+                 chunk_size: int = 1000,
+                 max_chunk_bytes: int = 10 * 1024 * 1024,
+                 max_in_flight: int = 4,
+                 max_retries: int = 5,
+                 initial_backoff: float = 0.5,
+                 max_backoff: float = 30.0,
+                 action_meta: Optional[Dict[str, Any]] = None,
+                 serializer: Optional[Callable[[Any], str]] = None):
+        self.client = client
+        self.index = index
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.action_line = json.dumps({"index": {"_index": index, **(action_meta or {})}}).encode()
+        self.serializer = serializer or (lambda doc: json.dumps(doc, ensure_ascii=False, default=str))
+
+    def _encode(self, document: Dict[str, Any]) -> bytes:
+        return self.action_line + b"\n" + self.serializer(document).encode("utf-8") + b"\n"
+
+    async def index_documents(self, documents: Documents) -> BulkIndexStats:
+        """Index all ``documents``; returns counts rather than raising on item errors"""
+        stats = BulkIndexStats()
+        started = time.monotonic()
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks: set = set()
+
+        async def send(batch: List[bytes]):
+            try:
+                await self._send_with_retries(batch, stats)
+            finally:
+                slots.release()
+
+        batch: List[bytes] = []
+        batch_bytes = 0
+        try:
+            async for document in _aiter(documents):
+                entry = self._encode(document)
+                if batch and (len(batch) >= self.chunk_size or batch_bytes + len(entry) > self.max_chunk_bytes):
+                    await slots.acquire()
+                    task = asyncio.create_task(send(batch))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    batch, batch_bytes = [], 0
+                batch.append(entry)
+                batch_bytes += len(entry)
+            if batch:
+                await slots.acquire()
+                task = asyncio.create_task(send(batch))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        stats.seconds = time.monotonic() - started
+        return stats
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.initial_backoff * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _send_with_retries(self, entries: List[bytes], stats: BulkIndexStats):
+        for attempt in range(self.max_retries + 1):
+            body = b"".join(entries)
+            try:
+                response = await asyncio.to_thread(self.client.bulk, body=body)
+            except Exception as e:
+                if _status_of(e) == 429 and attempt < self.max_retries:
+                    stats.retried += len(entries)
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                stats.failed += len(entries)
+                self._record_error(stats, {"error": str(e), "documents": len(entries)})
+                logger.error(f"Bulk request to {self.index} failed: {e}")
+                return
+            stats.requests += 1
+            stats.bytes_sent += len(body)
+
+            rejected = []
+            if response.get("errors"):
+                for entry, item in zip(entries, response["items"]):
+                    result = next(iter(item.values()))
+                    status = result.get("status", 500)
+                    if status == 429:
+                        rejected.append(entry)
+                    elif status >= 300:
+                        stats.failed += 1
+                        self._record_error(stats, {"status": status, "error": result.get("error")})
+                    else:
+                        stats.indexed += 1
+            else:
+                stats.indexed += len(entries)
+
+            if not rejected:
+                return
+            if attempt == self.max_retries:
+                stats.failed += len(rejected)
+                self._record_error(stats, {"status": 429, "error": "rejected after retries",
+                                           "documents": len(rejected)})
+                return
+            stats.retried += len(rejected)
+            entries = rejected
+            await asyncio.sleep(self._backoff(attempt))
+
+    def _record_error(self, stats: BulkIndexStats, error: Dict[str, Any]):
+        if len(stats.errors) < self.MAX_RECORDED_ERRORS:
+            stats.errors.append(error)
+
+    # -- index settings --------------------------------------------------------
+
+    def prepare_bulk_load(self) -> Optional[Dict[str, Any]]:
+        """Disable refresh and replicas; returns the settings to restore, or None"""
+        if not self.client.indices.exists(index=self.index):
+            logger.debug(f"Index {self.index} does not exist yet; bulk load settings not changed")
+            return None
+        current = self.client.indices.get_settings(index=self.index)
+        settings = next(iter(current.values()), {}).get("settings", {}).get("index", {})
+        previous = {
+            "refresh_interval": settings.get("refresh_interval"),
+            "number_of_replicas": settings.get("number_of_replicas")
+        }
+        self.client.indices.put_settings(
+            index=self.index, body={"index": {"refresh_interval": "-1", "number_of_replicas": 0}}
+        )
+        logger.info(f"Disabled refresh and replicas on {self.index} for bulk load")
+        return previous
+
+    def finish_bulk_load(self, previous: Optional[Dict[str, Any]], refresh: bool = True):
+        """Restore settings from ``prepare_bulk_load`` and optionally refresh"""
+        if previous is not None:
+            # None resets a setting to the cluster default
+            self.client.indices.put_settings(index=self.index, body={"index": previous})
+            logger.info(f"Restored index settings on {self.index}")
+        if refresh:
+            self.client.indices.refresh(index=self.index)
+
+
+async def bulk_index(client, index: str, documents: Documents, bulk_load_settings: bool = False,
+                     refresh: bool = True, **options) -> BulkIndexStats:
+    """Stream ``documents`` into ``index``, optionally with bulk-load index settings"""
+    indexer = StreamingBulkIndexer(client, index, **options)
+    previous = await asyncio.to_thread(indexer.prepare_bulk_load) if bulk_load_settings else None
+    stats = None
+    try:
+        stats = await indexer.index_documents(documents)
+        return stats
+    finally:
+        # Nothing to refresh (and possibly no index) when nothing was sent
+        sent = stats is not None and stats.requests > 0
+        await asyncio.to_thread(indexer.finish_bulk_load, previous, refresh and sent)
@@ -1,20 +1,19 @@
 """
 Elasticsearch Exporter for exporting data to Elasticsearch.
-Supports bulk indexing and various authentication methods.
+Supports streaming, concurrent bulk indexing and various authentication methods.
 """
 
-import asyncio
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 try:
     from elasticsearch import Elasticsearch
-    from elasticsearch.helpers import bulk
     ELASTIC_AVAILABLE = True
 except ImportError:
     ELASTIC_AVAILABLE = False
 
 from .base import BaseExporter, ExportConfig, ExportResult, ExporterRegistry
+from .bulk_indexing import Documents, bulk_index
 
 class ElasticExporter(BaseExporter):
     """Exporter for Elasticsearch."""
@@ -30,7 +29,16 @@ class ElasticExporter(BaseExporter):
         self.use_ssl = config.format_options.get('use_ssl', False)
         self.verify_certs = config.format_options.get('verify_certs', True)
         self.timeout = config.format_options.get('timeout', 30)
+        # Documents are visible to search when the export returns
         self.refresh = config.format_options.get('refresh', 'wait_for')
+        # Streaming bulk options
+        self.max_chunk_bytes = config.format_options.get('max_chunk_bytes', 10 * 1024 * 1024)
+        self.max_in_flight = config.format_options.get('max_in_flight', 4)
+        self.max_retries = config.format_options.get('max_retries', 5)
+        self.initial_backoff = config.format_options.get('initial_backoff', 0.5)
+        self.max_backoff = config.format_options.get('max_backoff', 30.0)
+        # Disable refresh and replicas while loading, restore afterwards
+        self.bulk_load_settings = config.format_options.get('bulk_load_settings', False)
     
     def validate_config(self) -> bool:
         """Validate Elasticsearch exporter configuration."""
@@ -50,6 +58,16 @@ class ElasticExporter(BaseExporter):
     
     async def export(self, data: List[Dict[str, Any]], **kwargs) -> ExportResult:
         """Export data to Elasticsearch."""
+        return await self.export_stream(data, **kwargs)
+    
+    async def export_stream(self, documents: Documents, **kwargs) -> ExportResult:
+        """
+        Export a list, iterator or async iterator of records to Elasticsearch.
+        
+        Records are indexed as they arrive, in bulk requests bounded by
+        ``batch_size`` documents and ``max_chunk_bytes``, with up to
+        ``max_in_flight`` requests running concurrently.
+        """
         if not self.validate_config():
             return ExportResult(
                 success=False,
@@ -60,30 +78,33 @@ class ElasticExporter(BaseExporter):
             )
         
         try:
-            # Prepare data
-            prepared_data = self.prepare_data(data)
-            
-            if not prepared_data:
-                return ExportResult(
-                    success=True,
-                    records_exported=0,
-                    output_location=self.index,
-                    export_time=datetime.utcnow(),
-                    metadata=self.create_metadata(0)
-                )
-            
-            # Write to Elasticsearch
-            success_count, failed_count = await self._write_elasticsearch(prepared_data)
+            stats = await bulk_index(
+                self._create_client(),
+                self.index,
+                self._prepared(documents),
+                bulk_load_settings=kwargs.get('bulk_load_settings', self.bulk_load_settings),
+                refresh=bool(self.refresh) and self.refresh != 'false',
+                chunk_size=self.config.batch_size,
+                max_chunk_bytes=self.max_chunk_bytes,
+                max_in_flight=self.max_in_flight,
+                max_retries=self.max_retries,
+                initial_backoff=self.initial_backoff,
+                max_backoff=self.max_backoff,
+                action_meta={'_type': self.doc_type} if self.doc_type and self.doc_type != '_doc' else None
+            )
             
-            self.logger.info(f"Exported {success_count} records to Elasticsearch index: {self.index}")
+            self.logger.info(f"Exported {stats.indexed} records to Elasticsearch index: {self.index} "
+                             f"({stats.requests} bulk requests, {stats.retried} retried, {stats.seconds:.1f}s)")
             
+            metadata = self.create_metadata(stats.indexed)
+            metadata['bulk'] = stats.to_dict()
             return ExportResult(
-                success=failed_count == 0,
-                records_exported=success_count,
+                success=stats.failed == 0,
+                records_exported=stats.indexed,
                 output_location=self.index,
                 export_time=datetime.utcnow(),
-                metadata=self.create_metadata(success_count),
-                error_message=f"{failed_count} records failed" if failed_count > 0 else None
+                metadata=metadata,
+                error_message=f"{stats.failed} records failed" if stats.failed > 0 else None
             )
             
         except Exception as e:
@@ -96,47 +117,31 @@ class ElasticExporter(BaseExporter):
                 error_message=str(e)
             )
     
-    async def _write_elasticsearch(self, data: List[Dict[str, Any]]) -> tuple:
-        """Write data to Elasticsearch."""
-        def write_sync():
-            # Connect to Elasticsearch
-            es_config = {
-                'hosts': self.hosts,
-                'timeout': self.timeout,
-                'use_ssl': self.use_ssl,
-                'verify_certs': self.verify_certs
-            }
-            
-            if self.username and self.password:
-                es_config['http_auth'] = (self.username, self.password)
-            elif self.api_key:
-                es_config['api_key'] = self.api_key
-            
-            es = Elasticsearch(**es_config)
-            
-            # Prepare documents for bulk indexing
-            docs = []
-            for doc in data:
-                doc_dict = {
-                    '_index': self.index,
-                    '_type': self.doc_type,
-                    '_source': doc
-                }
-                docs.append(doc_dict)
-            
-            # Perform bulk indexing
-            success_count, failed_items = bulk(
-                es,
-                docs,
-                refresh=self.refresh,
-                chunk_size=self.config.batch_size
-            )
-            
-            failed_count = len(failed_items) if failed_items else 0
-            
-            return success_count, failed_count
+    async def _prepared(self, documents: Documents):
+        if hasattr(documents, '__aiter__'):
+            async for record in documents:
+                yield self.prepare_record(record)
+        else:
+            for record in documents:
+                yield self.prepare_record(record)
+    
+    def _create_client(self) -> "Elasticsearch":
+        """Connect to Elasticsearch."""
+        es_config = {
+            'hosts': self.hosts,
+            'timeout': self.timeout,
+            'use_ssl': self.use_ssl,
+            'verify_certs': self.verify_certs,
+            # Connections for concurrent bulk requests
+            'maxsize': self.max_in_flight
+        }
+        
+        if self.username and self.password:
+            es_config['http_auth'] = (self.username, self.password)
+        elif self.api_key:
+            es_config['api_key'] = self.api_key
         
-        return await asyncio.get_event_loop().run_in_executor(None, write_sync)
+        return Elasticsearch(**es_config)
 
 # Register the exporter only if dependencies are available
 if ELASTIC_AVAILABLE:
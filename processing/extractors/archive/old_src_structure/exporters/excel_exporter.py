@@ -1,21 +1,187 @@
 """
 Excel Exporter for exporting data to Excel format.
 Supports multiple sheets, formatting, and compression.
+
+Workbooks are written in openpyxl's write-only mode: rows are streamed to
+disk as they arrive, so memory stays flat regardless of row count. Column
+widths are computed once from a sample of the first rows, per-column
+number formats are resolved once to cell positions, and a new sheet is
+started when a sheet reaches Excel's row limit.
+
+Columns come from ``format_options['columns']`` when given; otherwise a
+list is scanned in full and a stream takes them from the sample, and a
+stream that then meets keys outside the sample is a failed export.
 """
 
 import asyncio
-from typing import Any, Dict, List, Optional
+import json
+from typing import Any, Dict, Iterable, List, Optional
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime, time
+from decimal import Decimal
 
 try:
-    import pandas as pd
     import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
     EXCEL_AVAILABLE = True
 except ImportError:
     EXCEL_AVAILABLE = False
 
-from .base import BaseExporter, ExportConfig, ExportResult, ExporterRegistry
+from .base import BaseExporter, ExportConfig, ExportResult, ExporterRegistry, Records
+
+# Rows per worksheet, including the header row
+EXCEL_MAX_ROWS = 1_048_576
+# Excel limits sheet names to 31 characters
+MAX_SHEET_NAME = 31
+
+_NATIVE_TYPES = (str, int, float, bool, Decimal, datetime, date, time)
+
+
+def _cell_value(value: Any) -> Any:
+    """Convert a record value to something openpyxl can store."""
+    if value is None or isinstance(value, _NATIVE_TYPES):
+        # openpyxl rejects timezone-aware datetimes
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            return value.replace(tzinfo=None)
+        return value
+    if isinstance(value, (dict, list, tuple, set)):
+        return json.dumps(value if not isinstance(value, set) else sorted(value, key=str),
+                          ensure_ascii=False, default=str)
+    return str(value)
+
+
+class StreamingExcelWriter:
+    """
+    Write-only workbook fed with batches of records.
+    
+    The first ``sample_size`` records are buffered to decide the widths,
+    and the columns unless ``columns`` is given; after that rows go
+    straight to the sheet. Keys outside the columns are not exported;
+    ``close()`` reports them as ``dropped_columns`` with the number of
+    affected rows. Dates and datetimes get
+    openpyxl's default formats; ``number_formats`` maps column names to
+    explicit Excel formats.
+    """
+    
+    def __init__(self, output_path: str, sheet_name: str = 'Sheet1', include_index: bool = False,
+                 freeze_header: bool = True, auto_adjust_columns: bool = True,
+                 sample_size: int = 1000, max_rows: int = EXCEL_MAX_ROWS,
+                 number_formats: Optional[Dict[str, str]] = None,
+                 columns: Optional[List[str]] = None):
+        self.output_path = output_path
+        self.sheet_name = sheet_name
+        self.include_index = include_index
+        self.freeze_header = freeze_header
+        self.auto_adjust_columns = auto_adjust_columns
+        self.sample_size = sample_size
+        self.max_rows = max_rows
+        self.number_formats = number_formats or {}
+        self.fixed_columns = list(columns) if columns is not None else None
+        
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.columns: Optional[List[str]] = None
+        self._column_set = frozenset()
+        self.sheets: List[str] = []
+        self.rows_written = 0
+        self._sample: List[Dict[str, Any]] = []
+        self._sheet = None
+        self._sheet_rows = 0
+        self._widths: Dict[str, float] = {}
+        self._formats: Dict[int, str] = {}
+        self._dropped_keys: Dict[str, int] = {}
+    
+    @property
+    def empty(self) -> bool:
+        return self.rows_written == 0 and not self._sample
+    
+    def write_rows(self, records: Iterable[Dict[str, Any]]):
+        for record in records:
+            if self.columns is None:
+                self._sample.append(record)
+                if len(self._sample) >= self.sample_size:
+                    self._flush_sample()
+            else:
+                self._append(record)
+    
+    def _flush_sample(self):
+        sample, self._sample = self._sample, []
+        self._plan_columns(sample)
+        for record in sample:
+            self._append(record)
+    
+    def _plan_columns(self, sample: List[Dict[str, Any]]):
+        if self.fixed_columns is not None:
+            columns = dict.fromkeys(self.fixed_columns)
+        else:
+            columns = {}
+            for record in sample:
+                columns.update(dict.fromkeys(record))
+        self.columns = list(columns)
+        self._column_set = frozenset(columns)
+        
+        offset = 1 if self.include_index else 0
+        for position, column in enumerate(self.columns, start=offset):
+            values = [_cell_value(record.get(column)) for record in sample]
+            if self.auto_adjust_columns:
+                longest = max([len(str(column))] + [len(str(v)) for v in values if v is not None])
+                self._widths[get_column_letter(position + 1)] = min(longest + 2, 50)
+            if column in self.number_formats:
+                self._formats[position] = self.number_formats[column]
+    
+    def _new_sheet(self):
+        number = len(self.sheets) + 1
+        name = self.sheet_name if number == 1 else f"{self.sheet_name[:MAX_SHEET_NAME - 1 - len(str(number))]}_{number}"
+        sheet = self.workbook.create_sheet(name)
+        if self.freeze_header:
+            sheet.freeze_panes = 'A2'
+        for letter, width in self._widths.items():
+            sheet.column_dimensions[letter].width = width
+        
+        header_font = Font(bold=True)
+        header = ([''] if self.include_index else []) + self.columns
+        cells = []
+        for title in header:
+            cell = WriteOnlyCell(sheet, value=title)
+            cell.font = header_font
+            cells.append(cell)
+        sheet.append(cells)
+        
+        self._sheet = sheet
+        self._sheet_rows = 1
+        self.sheets.append(name)
+    
+    def _append(self, record: Dict[str, Any]):
+        if self._sheet is None or self._sheet_rows >= self.max_rows:
+            self._new_sheet()
+        
+        row = [self.rows_written] if self.include_index else []
+        row.extend(_cell_value(record.get(column)) for column in self.columns)
+        for position, number_format in self._formats.items():
+            if row[position] is not None:
+                cell = WriteOnlyCell(self._sheet, value=row[position])
+                cell.number_format = number_format
+                row[position] = cell
+        self._sheet.append(row)
+        
+        if not record.keys() <= self._column_set:
+            for key in record.keys() - self._column_set:
+                self._dropped_keys[key] = self._dropped_keys.get(key, 0) + 1
+        self._sheet_rows += 1
+        self.rows_written += 1
+    
+    def close(self) -> Dict[str, Any]:
+        """Write any buffered sample and save the workbook."""
+        if self.columns is None and self._sample:
+            self._flush_sample()
+        self.workbook.save(self.output_path)
+        return {
+            'rows': self.rows_written,
+            'sheets': self.sheets,
+            'dropped_columns': dict(sorted(self._dropped_keys.items()))
+        }
+
 
 class ExcelExporter(BaseExporter):
     """Exporter for Excel format files."""
@@ -26,12 +192,19 @@ class ExcelExporter(BaseExporter):
         self.include_index = config.format_options.get('include_index', False)
         self.freeze_header = config.format_options.get('freeze_header', True)
         self.auto_adjust_columns = config.format_options.get('auto_adjust_columns', True)
+        # Rows used to size columns and pick number formats
+        self.sample_size = config.format_options.get('sample_size', 1000)
+        self.max_rows_per_sheet = config.format_options.get('max_rows_per_sheet', EXCEL_MAX_ROWS)
+        # Column name -> Excel number format, e.g. {'price': '#,##0.00'}
+        self.number_formats = config.format_options.get('number_formats', {})
+        # Explicit column order; required for streams whose keys vary beyond the sample
+        self.columns = config.format_options.get('columns')
     
     def validate_config(self) -> bool:
         """Validate Excel exporter configuration."""
         try:
             if not EXCEL_AVAILABLE:
-                self.logger.error("Excel export requires pandas and openpyxl packages")
+                self.logger.error("Excel export requires the openpyxl package")
                 return False
                 
             if not self.config.output_path:
@@ -44,7 +217,21 @@ class ExcelExporter(BaseExporter):
             return False
     
     async def export(self, data: List[Dict[str, Any]], **kwargs) -> ExportResult:
-        """Export data to Excel format."""
+        """Export data to Excel format, with columns taken from every record."""
+        if self.columns is None and 'columns' not in kwargs:
+            kwargs['columns'] = self._columns_of(data)
+        return await self.export_stream(data, **kwargs)
+    
+    def _columns_of(self, data: List[Dict[str, Any]]) -> List[str]:
+        """Keys of all records in first-seen order, followed by any added by ``prepare_record``."""
+        columns: Dict[str, None] = {}
+        for record in data:
+            columns.update(dict.fromkeys(record))
+        columns.update(dict.fromkeys(self.prepare_record({})))
+        return list(columns)
+    
+    async def export_stream(self, records: Records, **kwargs) -> ExportResult:
+        """Export a list, iterator or async iterator of records to Excel format."""
         if not self.validate_config():
             return ExportResult(
                 success=False,
@@ -55,18 +242,6 @@ class ExcelExporter(BaseExporter):
             )
         
         try:
-            # Prepare data
-            prepared_data = self.prepare_data(data)
-            
-            if not prepared_data:
-                return ExportResult(
-                    success=True,
-                    records_exported=0,
-                    output_location="",
-                    export_time=datetime.utcnow(),
-                    metadata=self.create_metadata(0)
-                )
-            
             # Generate output filename
             output_path = kwargs.get('output_path', self.config.output_path)
             if not output_path.endswith('.xlsx'):
@@ -76,16 +251,47 @@ class ExcelExporter(BaseExporter):
             Path(output_path).parent.mkdir(parents=True, exist_ok=True)
             
             # Write Excel file
-            await self._write_excel(output_path, prepared_data)
+            columns = kwargs.get('columns', self.columns)
+            stats = await self._write_excel(output_path, records, columns)
+            
+            if stats['rows'] == 0:
+                return ExportResult(
+                    success=True,
+                    records_exported=0,
+                    output_location="",
+                    export_time=datetime.utcnow(),
+                    metadata=self.create_metadata(0)
+                )
+            
+            metadata = self.create_metadata(stats['rows'])
+            metadata['sheets'] = stats['sheets']
+            # Column name -> number of rows whose value for it was not exported
+            metadata['dropped_columns'] = stats['dropped_columns']
             
-            self.logger.info(f"Exported {len(prepared_data)} records to {output_path}")
+            if stats['dropped_columns'] and columns is None:
+                message = (f"Keys not in the first {self.sample_size} records were not exported "
+                           f"(column: rows): {stats['dropped_columns']}; "
+                           f"pass format_options['columns'] to export them")
+                self.logger.error(f"Excel export incomplete: {message}")
+                return ExportResult(
+                    success=False,
+                    records_exported=stats['rows'],
+                    output_location=output_path,
+                    export_time=datetime.utcnow(),
+                    error_message=message,
+                    metadata=metadata
+                )
+            if stats['dropped_columns']:
+                self.logger.info(f"Keys outside the requested columns were not exported "
+                                 f"(column: rows): {stats['dropped_columns']}")
+            self.logger.info(f"Exported {stats['rows']} records to {output_path} ({len(stats['sheets'])} sheets)")
             
             return ExportResult(
                 success=True,
-                records_exported=len(prepared_data),
+                records_exported=stats['rows'],
                 output_location=output_path,
                 export_time=datetime.utcnow(),
-                metadata=self.create_metadata(len(prepared_data))
+                metadata=metadata
             )
             
         except Exception as e:
@@ -98,44 +304,40 @@ class ExcelExporter(BaseExporter):
                 error_message=str(e)
             )
     
-    async def _write_excel(self, output_path: str, data: List[Dict[str, Any]]):
-        """Write data to Excel file."""
-        def write_sync():
-            # Create DataFrame
-            df = pd.DataFrame(data)
-            
-            # Write to Excel with formatting
-            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                df.to_excel(
-                    writer,
-                    sheet_name=self.sheet_name,
-                    index=self.include_index
-                )
-                
-                # Get the workbook and worksheet
-                workbook = writer.book
-                worksheet = writer.sheets[self.sheet_name]
-                
-                # Apply formatting
-                if self.freeze_header:
-                    worksheet.freeze_panes = worksheet['A2']
-                
-                if self.auto_adjust_columns:
-                    for column in worksheet.columns:
-                        max_length = 0
-                        column_letter = column[0].column_letter
-                        
-                        for cell in column:
-                            try:
-                                if len(str(cell.value)) > max_length:
-                                    max_length = len(str(cell.value))
-                            except:
-                                pass
-                        
-                        adjusted_width = min(max_length + 2, 50)
-                        worksheet.column_dimensions[column_letter].width = adjusted_width
+    async def _write_excel(self, output_path: str, records: Records,
+                           columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Stream records into a write-only workbook, one batch per worker-thread call."""
+        writer = StreamingExcelWriter(
+            output_path,
+            sheet_name=self.sheet_name,
+            include_index=self.include_index,
+            freeze_header=self.freeze_header,
+            auto_adjust_columns=self.auto_adjust_columns,
+            sample_size=self.sample_size,
+            max_rows=self.max_rows_per_sheet,
+            number_formats=self.number_formats,
+            columns=columns
+        )
+        
+        batch = []
+        if hasattr(records, '__aiter__'):
+            async for record in records:
+                batch.append(self.prepare_record(record))
+                if len(batch) >= self.config.batch_size:
+                    await asyncio.to_thread(writer.write_rows, batch)
+                    batch = []
+        else:
+            for record in records:
+                batch.append(self.prepare_record(record))
+                if len(batch) >= self.config.batch_size:
+                    await asyncio.to_thread(writer.write_rows, batch)
+                    batch = []
+        if batch:
+            await asyncio.to_thread(writer.write_rows, batch)
         
-        await asyncio.get_event_loop().run_in_executor(None, write_sync)
+        if writer.empty:
+            return {'rows': 0, 'sheets': [], 'dropped_columns': {}}
+        return await asyncio.to_thread(writer.close)
 
 # Register the exporter only if dependencies are available
 if EXCEL_AVAILABLE:
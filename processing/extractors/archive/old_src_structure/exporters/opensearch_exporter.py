@@ -1,20 +1,19 @@
 """
 OpenSearch Exporter for exporting data to OpenSearch.
-Supports bulk indexing and various authentication methods.
+Supports streaming, concurrent bulk indexing and various authentication methods.
 """
 
-import asyncio
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 try:
     from opensearchpy import OpenSearch
-    from opensearchpy.helpers import bulk
     OPENSEARCH_AVAILABLE = True
 except ImportError:
     OPENSEARCH_AVAILABLE = False
 
 from .base import BaseExporter, ExportConfig, ExportResult, ExporterRegistry
+from .bulk_indexing import Documents, bulk_index
 
 class OpenSearchExporter(BaseExporter):
     """Exporter for OpenSearch."""
@@ -28,7 +27,16 @@ class OpenSearchExporter(BaseExporter):
         self.use_ssl = config.format_options.get('use_ssl', False)
         self.verify_certs = config.format_options.get('verify_certs', True)
         self.timeout = config.format_options.get('timeout', 30)
+        # Documents are visible to search when the export returns
         self.refresh = config.format_options.get('refresh', 'wait_for')
+        # Streaming bulk options
+        self.max_chunk_bytes = config.format_options.get('max_chunk_bytes', 10 * 1024 * 1024)
+        self.max_in_flight = config.format_options.get('max_in_flight', 4)
+        self.max_retries = config.format_options.get('max_retries', 5)
+        self.initial_backoff = config.format_options.get('initial_backoff', 0.5)
+        self.max_backoff = config.format_options.get('max_backoff', 30.0)
+        # Disable refresh and replicas while loading, restore afterwards
+        self.bulk_load_settings = config.format_options.get('bulk_load_settings', False)
     
     def validate_config(self) -> bool:
         """Validate OpenSearch exporter configuration."""
@@ -48,6 +56,16 @@ class OpenSearchExporter(BaseExporter):
     
     async def export(self, data: List[Dict[str, Any]], **kwargs) -> ExportResult:
         """Export data to OpenSearch."""
+        return await self.export_stream(data, **kwargs)
+    
+    async def export_stream(self, documents: Documents, **kwargs) -> ExportResult:
+        """
+        Export a list, iterator or async iterator of records to OpenSearch.
+        
+        Records are indexed as they arrive, in bulk requests bounded by
+        ``batch_size`` documents and ``max_chunk_bytes``, with up to
+        ``max_in_flight`` requests running concurrently.
+        """
         if not self.validate_config():
             return ExportResult(
                 success=False,
@@ -58,30 +76,32 @@ class OpenSearchExporter(BaseExporter):
             )
         
         try:
-            # Prepare data
-            prepared_data = self.prepare_data(data)
-            
-            if not prepared_data:
-                return ExportResult(
-                    success=True,
-                    records_exported=0,
-                    output_location=self.index,
-                    export_time=datetime.utcnow(),
-                    metadata=self.create_metadata(0)
-                )
-            
-            # Write to OpenSearch
-            success_count, failed_count = await self._write_opensearch(prepared_data)
+            stats = await bulk_index(
+                self._create_client(),
+                self.index,
+                self._prepared(documents),
+                bulk_load_settings=kwargs.get('bulk_load_settings', self.bulk_load_settings),
+                refresh=bool(self.refresh) and self.refresh != 'false',
+                chunk_size=self.config.batch_size,
+                max_chunk_bytes=self.max_chunk_bytes,
+                max_in_flight=self.max_in_flight,
+                max_retries=self.max_retries,
+                initial_backoff=self.initial_backoff,
+                max_backoff=self.max_backoff
+            )
             
-            self.logger.info(f"Exported {success_count} records to OpenSearch index: {self.index}")
+            self.logger.info(f"Exported {stats.indexed} records to OpenSearch index: {self.index} "
+                             f"({stats.requests} bulk requests, {stats.retried} retried, {stats.seconds:.1f}s)")
             
+            metadata = self.create_metadata(stats.indexed)
+            metadata['bulk'] = stats.to_dict()
             return ExportResult(
-                success=failed_count == 0,
-                records_exported=success_count,
+                success=stats.failed == 0,
+                records_exported=stats.indexed,
                 output_location=self.index,
                 export_time=datetime.utcnow(),
-                metadata=self.create_metadata(success_count),
-                error_message=f"{failed_count} records failed" if failed_count > 0 else None
+                metadata=metadata,
+                error_message=f"{stats.failed} records failed" if stats.failed > 0 else None
             )
             
         except Exception as e:
@@ -94,44 +114,29 @@ class OpenSearchExporter(BaseExporter):
                 error_message=str(e)
             )
     
-    async def _write_opensearch(self, data: List[Dict[str, Any]]) -> tuple:
-        """Write data to OpenSearch."""
-        def write_sync():
-            # Connect to OpenSearch
-            client_config = {
-                'hosts': self.hosts,
-                'timeout': self.timeout,
-                'use_ssl': self.use_ssl,
-                'verify_certs': self.verify_certs
-            }
-            
-            if self.username and self.password:
-                client_config['http_auth'] = (self.username, self.password)
-            
-            client = OpenSearch(**client_config)
-            
-            # Prepare documents for bulk indexing
-            docs = []
-            for doc in data:
-                doc_dict = {
-                    '_index': self.index,
-                    '_source': doc
-                }
-                docs.append(doc_dict)
-            
-            # Perform bulk indexing
-            success_count, failed_items = bulk(
-                client,
-                docs,
-                refresh=self.refresh,
-                chunk_size=self.config.batch_size
-            )
-            
-            failed_count = len(failed_items) if failed_items else 0
-            
-            return success_count, failed_count
+    async def _prepared(self, documents: Documents):
+        if hasattr(documents, '__aiter__'):
+            async for record in documents:
+                yield self.prepare_record(record)
+        else:
+            for record in documents:
+                yield self.prepare_record(record)
+    
+    def _create_client(self) -> "OpenSearch":
+        """Connect to OpenSearch."""
+        client_config = {
+            'hosts': self.hosts,
+            'timeout': self.timeout,
+            'use_ssl': self.use_ssl,
+            'verify_certs': self.verify_certs,
+            # Connections for concurrent bulk requests
+            'maxsize': self.max_in_flight
+        }
+        
+        if self.username and self.password:
+            client_config['http_auth'] = (self.username, self.password)
         
-        return await asyncio.get_event_loop().run_in_executor(None, write_sync)
+        return OpenSearch(**client_config)
 
 # Register the exporter only if dependencies are available
 if OPENSEARCH_AVAILABLE:
@@ -1,21 +1,24 @@
 """
 Snowflake Exporter for exporting data to Snowflake.
-Supports bulk inserts and various authentication methods.
+Supports chunked PUT/COPY loads that run concurrently and can be resumed.
 """
 
 import asyncio
+import os
+import tempfile
+import uuid
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 try:
     import snowflake.connector
-    from snowflake.connector.pandas_tools import write_pandas
-    import pandas as pd
     SNOWFLAKE_AVAILABLE = True
 except ImportError:
     SNOWFLAKE_AVAILABLE = False
 
-from .base import BaseExporter, ExportConfig, ExportResult, ExporterRegistry
+from .base import BaseExporter, ExportConfig, ExportResult, ExporterRegistry, Records
+from .staged_load import PYARROW_AVAILABLE, StagedChunk, StagedLoader, StagedLoadManifest
 
 class SnowflakeExporter(BaseExporter):
     """Exporter for Snowflake."""
@@ -31,6 +34,16 @@ class SnowflakeExporter(BaseExporter):
         self.warehouse = config.format_options.get('warehouse')
         self.role = config.format_options.get('role')
         self.if_exists = config.format_options.get('if_exists', 'append')
+        self.auto_create_table = config.format_options.get('auto_create_table', True)
+        # Staged load options
+        self.staging_dir = config.format_options.get(
+            'staging_dir', os.path.join(config.output_path or tempfile.gettempdir(), 'snowflake_staging')
+        )
+        self.chunk_format = config.format_options.get('chunk_format', 'ndjson')
+        self.chunk_target_bytes = config.format_options.get('chunk_target_bytes', 64 * 1024 * 1024)
+        self.max_concurrent_loads = config.format_options.get('max_concurrent_loads', 4)
+        self.max_load_attempts = config.format_options.get('max_load_attempts', 3)
+        self.keep_chunk_files = config.format_options.get('keep_chunk_files', False)
     
     def validate_config(self) -> bool:
         """Validate Snowflake exporter configuration."""
@@ -45,6 +58,10 @@ class SnowflakeExporter(BaseExporter):
                     self.logger.error(f"{field} is required for Snowflake export")
                     return False
             
+            if self.chunk_format == 'parquet' and not PYARROW_AVAILABLE:
+                self.logger.error("Parquet chunks require the pyarrow package")
+                return False
+            
             return True
         except Exception as e:
             self.logger.error(f"Configuration validation failed: {str(e)}")
@@ -52,44 +69,54 @@ class SnowflakeExporter(BaseExporter):
     
     async def export(self, data: List[Dict[str, Any]], **kwargs) -> ExportResult:
         """Export data to Snowflake."""
+        return await self.export_stream(data, **kwargs)
+    
+    async def export_stream(self, records: Records, load_id: Optional[str] = None, **kwargs) -> ExportResult:
+        """
+        Export a list, iterator or async iterator of records to Snowflake.
+        
+        Records are staged into compressed chunk files of about
+        ``chunk_target_bytes``; each closed chunk is PUT to the user stage and
+        loaded with its own COPY INTO while later chunks are still being
+        written. If some chunks fail, the result carries the ``load_id`` to
+        pass to ``resume_load``.
+        """
         if not self.validate_config():
+            return self._invalid_config()
+        
+        load_id = load_id or f"{self.table}-{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        conn = None
+        try:
+            conn = await asyncio.to_thread(self._connect)
+            loader = await asyncio.to_thread(self._create_loader, conn, load_id)
+            await loader.run(records, prepare=self.prepare_record)
+            return self._result(loader)
+        except Exception as e:
+            self.logger.error(f"Snowflake export failed: {str(e)}")
             return ExportResult(
                 success=False,
                 records_exported=0,
                 output_location="",
                 export_time=datetime.utcnow(),
-                error_message="Invalid configuration or missing dependencies"
+                error_message=str(e)
             )
+        finally:
+            if conn is not None:
+                conn.close()
+    
+    async def resume_load(self, load_id: str) -> ExportResult:
+        """Load the staged chunks of an earlier export that were not loaded."""
+        if not self.validate_config():
+            return self._invalid_config()
         
+        conn = None
         try:
-            # Prepare data
-            prepared_data = self.prepare_data(data)
-            
-            if not prepared_data:
-                return ExportResult(
-                    success=True,
-                    records_exported=0,
-                    output_location=f"{self.database}.{self.schema}.{self.table}",
-                    export_time=datetime.utcnow(),
-                    metadata=self.create_metadata(0)
-                )
-            
-            # Write to Snowflake
-            rows_inserted = await self._write_snowflake(prepared_data)
-            
-            location = f"{self.database}.{self.schema}.{self.table}"
-            self.logger.info(f"Exported {rows_inserted} records to Snowflake: {location}")
-            
-            return ExportResult(
-                success=True,
-                records_exported=rows_inserted,
-                output_location=location,
-                export_time=datetime.utcnow(),
-                metadata=self.create_metadata(rows_inserted)
-            )
-            
+            conn = await asyncio.to_thread(self._connect)
+            loader = await asyncio.to_thread(self._create_loader, conn, load_id)
+            await loader.resume()
+            return self._result(loader)
         except Exception as e:
-            self.logger.error(f"Snowflake export failed: {str(e)}")
+            self.logger.error(f"Resuming Snowflake load {load_id} failed: {str(e)}")
             return ExportResult(
                 success=False,
                 records_exported=0,
@@ -97,39 +124,110 @@ class SnowflakeExporter(BaseExporter):
                 export_time=datetime.utcnow(),
                 error_message=str(e)
             )
-    
-    async def _write_snowflake(self, data: List[Dict[str, Any]]) -> int:
-        """Write data to Snowflake."""
-        def write_sync():
-            # Connect to Snowflake
-            conn = snowflake.connector.connect(
-                user=self.user,
-                password=self.password,
-                account=self.account,
-                warehouse=self.warehouse,
-                database=self.database,
-                schema=self.schema,
-                role=self.role
-            )
-            
-            try:
-                # Convert to DataFrame
-                df = pd.DataFrame(data)
-                
-                # Write to Snowflake
-                success, nchunks, nrows, _ = write_pandas(
-                    conn,
-                    df,
-                    self.table,
-                    auto_create_table=True,
-                    overwrite=(self.if_exists == 'replace')
-                )
-                
-                return nrows
-            finally:
+        finally:
+            if conn is not None:
                 conn.close()
+    
+    def _invalid_config(self) -> ExportResult:
+        return ExportResult(
+            success=False,
+            records_exported=0,
+            output_location="",
+            export_time=datetime.utcnow(),
+            error_message="Invalid configuration or missing dependencies"
+        )
+    
+    def _result(self, loader: StagedLoader) -> ExportResult:
+        summary = loader.summary()
+        location = f"{self.database}.{self.schema}.{self.table}"
+        self.logger.info(f"Exported {summary['rows_loaded']} records to Snowflake: {location} "
+                         f"({summary['chunks_loaded']}/{summary['chunks']} chunks)")
+        
+        metadata = self.create_metadata(summary['rows_loaded'])
+        metadata['staged_load'] = summary
+        return ExportResult(
+            success=loader.complete,
+            records_exported=summary['rows_loaded'],
+            output_location=location,
+            export_time=datetime.utcnow(),
+            metadata=metadata,
+            error_message=None if loader.complete else
+                f"{summary['chunks_failed']} chunks not loaded; resume with load_id={summary['load_id']}"
+        )
+    
+    def _connect(self):
+        """Connect to Snowflake."""
+        return snowflake.connector.connect(
+            user=self.user,
+            password=self.password,
+            account=self.account,
+            warehouse=self.warehouse,
+            database=self.database,
+            schema=self.schema,
+            role=self.role
+        )
+    
+    def _create_loader(self, conn, load_id: str) -> StagedLoader:
+        file_format = f"STAGED_LOAD_{self.chunk_format.upper()}"
+        cursor = conn.cursor()
+        try:
+            # Shared by COPY and by INFER_SCHEMA when the table is created
+            cursor.execute(f"CREATE TEMPORARY FILE FORMAT IF NOT EXISTS {file_format} "
+                           f"TYPE = {'PARQUET' if self.chunk_format == 'parquet' else 'JSON'}")
+        finally:
+            cursor.close()
         
-        return await asyncio.get_event_loop().run_in_executor(None, write_sync)
+        def load_chunk(path: Path, chunk: StagedChunk, manifest: StagedLoadManifest) -> str:
+            return self._load_chunk(conn, file_format, path, chunk, manifest)
+        
+        return StagedLoader(
+            self.staging_dir,
+            load_id,
+            f"{self.database}.{self.schema}.{self.table}",
+            load_chunk,
+            file_format=self.chunk_format,
+            target_bytes=self.chunk_target_bytes,
+            max_concurrent_loads=self.max_concurrent_loads,
+            max_attempts=self.max_load_attempts,
+            keep_files=self.keep_chunk_files,
+            # Table creation and truncation happen on the first chunk
+            exclusive_first_chunk=self.auto_create_table or self.if_exists == 'replace',
+            batch_size=self.config.batch_size
+        )
+    
+    def _load_chunk(self, conn, file_format: str, path: Path, chunk: StagedChunk,
+                    manifest: StagedLoadManifest) -> str:
+        """PUT one staged chunk and COPY it into the table; returns the COPY query id."""
+        stage = f"@~/staged_load/{manifest.load_id}/"
+        table = f'"{self.table}"'
+        cursor = conn.cursor()
+        try:
+            # Chunks are already compressed; re-PUTting the same file on retry is harmless
+            cursor.execute(f"PUT 'file://{path.as_posix()}' '{stage}' AUTO_COMPRESS = FALSE")
+            
+            if chunk.index == 0:
+                if self.auto_create_table:
+                    cursor.execute(
+                        f"CREATE TABLE IF NOT EXISTS {table} USING TEMPLATE ("
+                        f"SELECT ARRAY_AGG(OBJECT_CONSTRUCT(*)) FROM TABLE(INFER_SCHEMA("
+                        f"LOCATION => '{stage}', FILES => '{chunk.name}', FILE_FORMAT => '{file_format}')))"
+                    )
+                if self.if_exists == 'replace':
+                    # Also clears COPY load history, so a retried first chunk loads again
+                    cursor.execute(f"TRUNCATE TABLE IF EXISTS {table}")
+            
+            # COPY skips files it has already loaded, which makes resumed loads idempotent
+            cursor.execute(
+                f"COPY INTO {table} FROM '{stage}' FILES = ('{chunk.name}') "
+                f"FILE_FORMAT = (FORMAT_NAME = '{file_format}') "
+                f"MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE PURGE = TRUE"
+            )
+            for row in cursor.fetchall():
+                if len(row) > 3 and row[3] != chunk.rows:
+                    self.logger.warning(f"COPY of {row[0]} loaded {row[3]} rows for {chunk.rows} staged")
+            return cursor.sfqid
+        finally:
+            cursor.close()
 
 # Register the exporter only if dependencies are available
 if SNOWFLAKE_AVAILABLE:
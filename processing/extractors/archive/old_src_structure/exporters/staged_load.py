@@ -0,0 +1,388 @@
+"""
+File-staged warehouse loads shared by the BigQuery and Snowflake exporters.
+
+Records are streamed into rotating local chunk files (gzipped NDJSON, or
+Parquet when pyarrow is installed) of roughly ``target_bytes`` each. As
+soon as a chunk is closed it is handed to a warehouse-specific load
+function, with up to ``max_concurrent_loads`` loads running while later
+chunks are still being written.
+
+Per-chunk state is kept in ``<staging_dir>/<load_id>/manifest.json`` and
+rewritten atomically on every transition (written -> loading -> loaded or
+failed). ``StagedLoader.resume()`` loads every complete chunk that has not
+been loaded yet; a chunk that was still being written when the process
+died is left as ``*.partial`` and ignored, and ``rows_written`` tells the
+caller how many source rows made it into complete chunks.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from .base import Records
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+FILE_SUFFIXES = {"ndjson": ".ndjson.gz", "parquet": ".parquet"}
+
+
+@dataclass
+class StagedChunk:
+    """One staged chunk file and its load state"""
+    index: int
+    name: str
+    rows: int
+    bytes: int
+    sha256: str
+    state: str = "written"
+    attempts: int = 0
+    job_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class StagedLoadManifest:
+    """Progress of one staged load"""
+    load_id: str
+    destination: str
+    file_format: str
+    chunks: List[StagedChunk] = field(default_factory=list)
+    rows_written: int = 0
+    writes_complete: bool = False
+
+    def save(self, directory: Path):
+        tmp = directory / (MANIFEST_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, indent=1)
+        os.replace(tmp, directory / MANIFEST_FILE)
+
+    @classmethod
+    def load(cls, directory: Path) -> "StagedLoadManifest":
+        with open(directory / MANIFEST_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        data["chunks"] = [StagedChunk(**chunk) for chunk in data.get("chunks", [])]
+        return cls(**data)
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class ChunkFileWriter:
+    """
+    Writes records into rotating chunk files of about ``target_bytes``.
+
+    ``write_rows`` returns the chunks it closed, so the caller can start
+    loading them while writing continues.
+
+    A Parquet file has a single schema, so a row group that brings new keys
+    closes the current chunk and starts the next one with the widened
+    schema. Keys whose type conflicts with earlier rows raise.
+    """
+
+    def __init__(self, directory: Path, prefix: str = "chunk", file_format: str = "ndjson",
+                 target_bytes: int = 64 * 1024 * 1024, row_group_size: int = 10000,
+                 compression_level: int = 6):
+        if file_format not in FILE_SUFFIXES:
+            raise ValueError(f"Unsupported chunk format: {file_format}")
+        if file_format == "parquet" and not PYARROW_AVAILABLE:
+            raise ValueError("Parquet chunks require the pyarrow package")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.file_format = file_format
+        self.target_bytes = target_bytes
+        self.row_group_size = row_group_size
+        self.compression_level = compression_level
+        self.next_index = 0
+        self.rows_written = 0
+
+        self._raw = None
+        self._gzip = None
+        self._parquet = None
+        self._schema = None
+        self._buffer: List[Dict[str, Any]] = []
+        self._rows = 0
+        self._path: Optional[Path] = None
+
+    def _open(self):
+        name = f"{self.prefix}-{self.next_index:06d}{FILE_SUFFIXES[self.file_format]}"
+        self._path = self.directory / name
+        self._raw = open(self._partial_path(), "wb")
+        if self.file_format == "ndjson":
+            self._gzip = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=self.compression_level)
+        self._rows = 0
+
+    def _partial_path(self) -> Path:
+        return self._path.with_name(self._path.name + ".partial")
+
+    def _size(self) -> int:
+        return self._raw.tell()
+
+    def write_rows(self, records: Iterable[Dict[str, Any]]) -> List[StagedChunk]:
+        closed = []
+        for record in records:
+            if self._raw is None:
+                self._open()
+            self._rows += 1
+            if self.file_format == "ndjson":
+                self._gzip.write(json.dumps(record, ensure_ascii=False, default=_json_default).encode("utf-8") + b"\n")
+            else:
+                self._buffer.append(record)
+                if len(self._buffer) >= self.row_group_size:
+                    closed.extend(self._write_row_group())
+            if self._size() >= self.target_bytes:
+                closed.extend(self._close_chunk())
+        return closed
+
+    def _write_row_group(self) -> List[StagedChunk]:
+        """Write the buffered rows; returns the chunk closed to widen the schema, if any"""
+        closed = []
+        schema = pa.Table.from_pylist(self._buffer).schema
+        if self._schema is not None:
+            schema = pa.unify_schemas([self._schema, schema])
+        if self._parquet is not None and not schema.equals(self._schema):
+            buffer, self._buffer = self._buffer, []
+            self._rows -= len(buffer)
+            closed.extend(self._close_chunk())
+            self._open()
+            self._buffer, self._rows = buffer, len(buffer)
+        self._schema = schema
+        table = pa.Table.from_pylist(self._buffer, schema=schema)
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self._raw, schema, compression="zstd")
+        self._parquet.write_table(table)
+        self._buffer = []
+        return closed
+
+    def _close_chunk(self) -> List[StagedChunk]:
+        closed = []
+        if self.file_format == "ndjson":
+            self._gzip.close()
+        else:
+            if self._buffer:
+                closed.extend(self._write_row_group())
+            self._parquet.close()
+            self._parquet = None
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        self._raw = self._gzip = None
+
+        partial = self._partial_path()
+        digest = hashlib.sha256()
+        with open(partial, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        os.replace(partial, self._path)
+
+        chunk = StagedChunk(index=self.next_index, name=self._path.name, rows=self._rows,
+                            bytes=self._path.stat().st_size, sha256=digest.hexdigest())
+        self.next_index += 1
+        self.rows_written += self._rows
+        return closed + [chunk]
+
+    def close(self) -> List[StagedChunk]:
+        """Close the current chunk, if it has any rows"""
+        if self._raw is None:
+            return []
+        return self._close_chunk()
+
+
+# load_fn(path, chunk, manifest) -> job id or None; runs in a worker thread
+ChunkLoadFn = Callable[[Path, StagedChunk, StagedLoadManifest], Optional[str]]
+
+
+class StagedLoader:
+    """Writes chunk files and loads them concurrently, tracking per-chunk state"""
+
+    def __init__(self,
+                 staging_dir: Union[str, Path],
+                 load_id: str,
+                 destination: str,
+                 load_fn: ChunkLoadFn,
+                 file_format: str = "ndjson",
+                 target_bytes: int = 64 * 1024 * 1024,
+                 max_concurrent_loads: int = 4,
+                 max_attempts: int = 3,
+                 retry_delay: float = 2.0,
+                 keep_files: bool = False,
+                 exclusive_first_chunk: bool = False,
+                 batch_size: int = 1000):
+        self.directory = Path(staging_dir) / load_id
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.load_fn = load_fn
+        self.target_bytes = target_bytes
+        self.max_concurrent_loads = max_concurrent_loads
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.keep_files = keep_files
+        # Loads that replace the table (truncate) must finish before others append
+        self.exclusive_first_chunk = exclusive_first_chunk
+        self.batch_size = batch_size
+
+        if (self.directory / MANIFEST_FILE).exists():
+            self.manifest = StagedLoadManifest.load(self.directory)
+        else:
+            self.manifest = StagedLoadManifest(load_id=load_id, destination=destination, file_format=file_format)
+            self.manifest.save(self.directory)
+
+        self._slots = asyncio.Semaphore(max_concurrent_loads)
+        self._tasks: set = set()
+        self._first_loaded: Optional[asyncio.Event] = None
+
+    # -- loading ---------------------------------------------------------------
+
+    async def _load(self, chunk: StagedChunk):
+        path = self.directory / chunk.name
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                # ``attempts`` is cumulative across resumes so load functions can
+                # derive unique, checkable job ids from it
+                chunk.state = "loading"
+                chunk.attempts += 1
+                self._save()
+                try:
+                    chunk.job_id = await asyncio.to_thread(self.load_fn, path, chunk, self.manifest)
+                except Exception as e:
+                    chunk.state, chunk.error = "failed", str(e)
+                    self._save()
+                    logger.warning(f"Loading {chunk.name} failed (attempt {chunk.attempts}): {e}")
+                    if attempt < self.max_attempts:
+                        await asyncio.sleep(min(self.retry_delay * 2 ** (attempt - 1), 30))
+                    continue
+                chunk.state, chunk.error = "loaded", None
+                self._save()
+                if not self.keep_files:
+                    path.unlink(missing_ok=True)
+                logger.debug(f"Loaded {chunk.name} ({chunk.rows} rows) into {self.manifest.destination}")
+                return
+        finally:
+            self._slots.release()
+            if chunk.index == 0 and self._first_loaded is not None:
+                self._first_loaded.set()
+
+    async def _schedule(self, chunk: StagedChunk):
+        if self.exclusive_first_chunk and chunk.index > 0 and self._first_loaded is not None:
+            await self._first_loaded.wait()
+            if self.manifest.chunks[0].state != "loaded":
+                # Appending behind a failed replace would mix old and new rows
+                logger.warning(f"Not loading {chunk.name}: first chunk of {self.manifest.load_id} is not loaded")
+                return
+        await self._slots.acquire()
+        task = asyncio.create_task(self._load(chunk))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if self.exclusive_first_chunk and chunk.index == 0:
+            await task
+
+    def _save(self):
+        self.manifest.save(self.directory)
+
+    # -- entry points ------------------------------------------------------------
+
+    async def run(self, records: Records, prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+                  ) -> StagedLoadManifest:
+        """Stage ``records`` into chunk files and load them as they are closed"""
+        if self.manifest.chunks:
+            raise RuntimeError(f"Load {self.manifest.load_id} already has chunks; use resume()")
+        writer = ChunkFileWriter(self.directory, file_format=self.manifest.file_format,
+                                 target_bytes=self.target_bytes)
+        self._first_loaded = asyncio.Event()
+
+        async def write(batch):
+            for chunk in await asyncio.to_thread(writer.write_rows, batch):
+                self.manifest.chunks.append(chunk)
+                self.manifest.rows_written = writer.rows_written
+                self._save()
+                await self._schedule(chunk)
+
+        try:
+            batch = []
+            if hasattr(records, "__aiter__"):
+                async for record in records:
+                    batch.append(prepare(record) if prepare else record)
+                    if len(batch) >= self.batch_size:
+                        await write(batch)
+                        batch = []
+            else:
+                for record in records:
+                    batch.append(prepare(record) if prepare else record)
+                    if len(batch) >= self.batch_size:
+                        await write(batch)
+                        batch = []
+            if batch:
+                await write(batch)
+            for chunk in await asyncio.to_thread(writer.close):
+                self.manifest.chunks.append(chunk)
+                self.manifest.rows_written = writer.rows_written
+                await self._schedule(chunk)
+            self.manifest.writes_complete = True
+            self._save()
+        finally:
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._cleanup()
+        return self.manifest
+
+    async def resume(self) -> StagedLoadManifest:
+        """Load every complete chunk that has not been loaded yet"""
+        pending = [chunk for chunk in self.manifest.chunks if chunk.state != "loaded"]
+        self._first_loaded = asyncio.Event()
+        if not any(chunk.index == 0 for chunk in pending):
+            self._first_loaded.set()
+        try:
+            for chunk in pending:
+                if not (self.directory / chunk.name).exists():
+                    chunk.state, chunk.error = "failed", "chunk file missing"
+                    self._save()
+                    continue
+                await self._schedule(chunk)
+        finally:
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._cleanup()
+        return self.manifest
+
+    def _cleanup(self):
+        # The manifest is only needed to resume an incomplete load
+        if self.complete and not self.keep_files:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    # -- reporting -------------------------------------------------------------
+
+    def summary(self) -> Dict[str, Any]:
+        chunks = self.manifest.chunks
+        loaded = [chunk for chunk in chunks if chunk.state == "loaded"]
+        return {
+            "load_id": self.manifest.load_id,
+            "chunks": len(chunks),
+            "chunks_loaded": len(loaded),
+            "chunks_failed": len(chunks) - len(loaded),
+            "rows_written": self.manifest.rows_written,
+            "rows_loaded": sum(chunk.rows for chunk in loaded),
+            "bytes_staged": sum(chunk.bytes for chunk in chunks),
+            "writes_complete": self.manifest.writes_complete,
+            "staging_dir": str(self.directory)
+        }
+
+    @property
+    def complete(self) -> bool:
+        return self.manifest.writes_complete and all(chunk.state == "loaded" for chunk in self.manifest.chunks)
@@ -0,0 +1,341 @@
+"""
+WebSocket Fan-out Hub
+
+Broadcasts monitoring updates to many dashboard clients without letting a
+slow client stall the others. Every subscriber gets its own bounded queue
+and sender task; updates are serialized once and shared by all queues.
+
+- ``publish``: one-off events (alerts, job notifications)
+- ``publish_state``: dict state sent as deltas against the last version
+- ``record_metric``: high-frequency gauges, batched into fixed ticks
+"""
+
+import asyncio
+import json
+from collections import OrderedDict, deque
+from datetime import datetime
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SendFunc = Callable[[str], Awaitable[Any]]
+
+
+class OverflowPolicy(Enum):
+    """What to do when a subscriber's event queue is full"""
+    DROP_OLDEST = "drop_oldest"    # Keep the newest events
+    DROP_NEWEST = "drop_newest"    # Keep what is already queued
+    DISCONNECT = "disconnect"      # Treat the client as dead
+
+
+class _Resync:
+    """Placeholder for a coalesced delta; resolved to a full snapshot on send"""
+
+    __slots__ = ("topic",)
+
+    def __init__(self, topic: str):
+        self.topic = topic
+
+
+class Subscriber:
+    """A single client connection with its own bounded outbound queue"""
+
+    def __init__(self, hub: "FanoutHub", websocket: Any, send: SendFunc):
+        self.hub = hub
+        self.websocket = websocket
+        self.send = send
+
+        self.events: deque = deque()
+        self.keyed: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        self.sent = 0
+        self.dropped = 0
+
+    def enqueue(self, payload: str, key: Optional[Hashable] = None) -> bool:
+        """Queue a serialized message; returns False if the client must go"""
+        if key is not None:
+            # Latest value wins; re-insert so the key moves to the back
+            self.keyed.pop(key, None)
+            self.keyed[key] = payload
+        elif len(self.events) >= self.hub.max_queue:
+            self.dropped += 1
+            policy = self.hub.overflow_policy
+            if policy == OverflowPolicy.DISCONNECT:
+                return False
+            if policy == OverflowPolicy.DROP_NEWEST:
+                return True
+            self.events.popleft()
+            self.events.append(payload)
+        else:
+            self.events.append(payload)
+
+        self.ready.set()
+        return True
+
+    def enqueue_delta(self, topic: str, payload: str):
+        """Queue a state delta, collapsing to a resync if one is pending"""
+        key = ("state", topic)
+        if key in self.keyed:
+            # Two deltas cannot be merged without re-serializing, so the
+            # client gets the current full snapshot instead
+            self.keyed.pop(key)
+            self.keyed[key] = _Resync(topic)
+            self.dropped += 1
+        else:
+            self.keyed[key] = payload
+        self.ready.set()
+
+    async def run(self):
+        """Drain the queue until closed"""
+        try:
+            while not self.closed:
+                await self.ready.wait()
+                self.ready.clear()
+
+                while not self.closed and (self.events or self.keyed):
+                    if self.events:
+                        payload = self.events.popleft()
+                    else:
+                        _, payload = self.keyed.popitem(last=False)
+
+                    if isinstance(payload, _Resync):
+                        payload = self.hub.snapshot_message(payload.topic)
+                        if payload is None:
+                            continue
+
+                    await asyncio.wait_for(self.send(payload), timeout=self.hub.send_timeout)
+                    self.sent += 1
+        except Exception as e:
+            logger.debug(f"Dropping WebSocket subscriber: {e}")
+        finally:
+            self.closed = True
+            self.hub._forget(self)
+
+
+class FanoutHub:
+    """Coalescing, backpressured fan-out to WebSocket subscribers"""
+
+    def __init__(self,
+                 max_queue: int = 100,
+                 overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+                 tick_interval: float = 0.5,
+                 send_timeout: float = 5.0):
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.tick_interval = tick_interval
+        self.send_timeout = send_timeout
+
+        self.subscribers: Dict[int, Subscriber] = {}
+
+        # Delta state per topic
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        self._snapshot_cache: Dict[str, str] = {}
+
+        # Metric events buffered until the next tick
+        self._metric_buffer: Dict[str, Any] = {}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tick_task: Optional[asyncio.Task] = None
+
+        self.published = 0
+        self.disconnected = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self.subscribers)
+
+    async def start(self):
+        """Start the metric tick loop"""
+        self._loop = asyncio.get_running_loop()
+        if self._tick_task is None:
+            self._tick_task = asyncio.create_task(self._tick_loop())
+
+    async def stop(self):
+        """Stop ticking and close every subscriber task"""
+        if self._tick_task:
+            self._tick_task.cancel()
+            await asyncio.gather(self._tick_task, return_exceptions=True)
+            self._tick_task = None
+
+        tasks = [s.task for s in self.subscribers.values() if s.task]
+        for subscriber in list(self.subscribers.values()):
+            subscriber.closed = True
+            subscriber.ready.set()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.subscribers.clear()
+
+    async def subscribe(self, websocket: Any, send: Optional[SendFunc] = None) -> Subscriber:
+        """Register a client; it immediately receives every state snapshot"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+
+        subscriber = Subscriber(self, websocket, send or websocket.send)
+        for topic in self._states:
+            subscriber.keyed[("state", topic)] = _Resync(topic)
+        subscriber.ready.set()
+
+        self.subscribers[id(websocket)] = subscriber
+        subscriber.task = asyncio.create_task(subscriber.run())
+        return subscriber
+
+    async def unsubscribe(self, websocket: Any):
+        """Remove a client and stop its sender task"""
+        subscriber = self.subscribers.pop(id(websocket), None)
+        if subscriber and subscriber.task:
+            subscriber.closed = True
+            subscriber.ready.set()
+            subscriber.task.cancel()
+            await asyncio.gather(subscriber.task, return_exceptions=True)
+
+    def _forget(self, subscriber: Subscriber):
+        if self.subscribers.get(id(subscriber.websocket)) is subscriber:
+            del self.subscribers[id(subscriber.websocket)]
+            self.disconnected += 1
+
+    def _call_in_loop(self, func: Callable, *args) -> bool:
+        """Hop to the hub's loop when called from another thread"""
+        if self._loop is None:
+            return False
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            return False
+        self._loop.call_soon_threadsafe(func, *args)
+        return True
+
+    @staticmethod
+    def _serialize(message: Dict[str, Any]) -> str:
+        return json.dumps(message, default=str, separators=(",", ":"))
+
+    def publish(self, message_type: str, data: Dict[str, Any], key: Optional[Hashable] = None):
+        """Serialize once and queue for every subscriber
+
+        Messages with a ``key`` coalesce per subscriber: only the latest
+        value for that key is sent if the client has fallen behind.
+        """
+        if self._call_in_loop(self.publish, message_type, data, key):
+            return
+
+        payload = self._serialize({
+            "type": message_type,
+            "data": data,
+            "timestamp": datetime.now().isoformat()
+        })
+        self._fan_out(payload, key)
+
+    def _fan_out(self, payload: str, key: Optional[Hashable] = None):
+        self.published += 1
+        overflowed: List[Subscriber] = []
+        for subscriber in self.subscribers.values():
+            if not subscriber.enqueue(payload, key):
+                overflowed.append(subscriber)
+
+        for subscriber in overflowed:
+            subscriber.closed = True
+            subscriber.ready.set()
+            if subscriber.task:
+                subscriber.task.cancel()
+            self._forget(subscriber)
+
+    def publish_state(self, topic: str, state: Dict[str, Any]):
+        """Publish a dict state; clients receive only the changed keys"""
+        if self._call_in_loop(self.publish_state, topic, state):
+            return
+
+        previous = self._states.get(topic, {})
+        changed = {k: v for k, v in state.items() if k not in previous or previous[k] != v}
+        removed = [k for k in previous if k not in state]
+        if not changed and not removed and topic in self._states:
+            return
+
+        version = self._versions.get(topic, 0) + 1
+        self._states[topic] = dict(state)
+        self._versions[topic] = version
+        self._snapshot_cache.pop(topic, None)
+
+        payload = self._serialize({
+            "type": "delta",
+            "topic": topic,
+            "version": version,
+            "changed": changed,
+            "removed": removed,
+            "timestamp": datetime.now().isoformat()
+        })
+
+        self.published += 1
+        for subscriber in self.subscribers.values():
+            subscriber.enqueue_delta(topic, payload)
+
+    def snapshot_message(self, topic: str) -> Optional[str]:
+        """Full snapshot for ``topic``, serialized once per version"""
+        if topic not in self._states:
+            return None
+
+        cached = self._snapshot_cache.get(topic)
+        if cached is None:
+            cached = self._serialize({
+                "type": "snapshot",
+                "topic": topic,
+                "version": self._versions[topic],
+                "state": self._states[topic],
+                "timestamp": datetime.now().isoformat()
+            })
+            self._snapshot_cache[topic] = cached
+        return cached
+
+    def record_metric(self, name: str, value: Any):
+        """Buffer a gauge value; flushed to clients on the next tick"""
+        if self._call_in_loop(self.record_metric, name, value):
+            return
+        self._metric_buffer[name] = value
+
+    def discard_metric(self, name: str):
+        """Drop a gauge that will not be updated again, e.g. a finished job's progress"""
+        if self._call_in_loop(self.discard_metric, name):
+            return
+        self._metric_buffer.pop(name, None)
+        state = self._states.get("metrics", {})
+        if name in state:
+            self.publish_state("metrics", {k: v for k, v in state.items() if k != name})
+
+    def flush_metrics(self):
+        """Merge buffered metric values into the ``metrics`` state topic"""
+        if not self._metric_buffer:
+            return
+
+        state = dict(self._states.get("metrics", {}))
+        state.update(self._metric_buffer)
+        self._metric_buffer = {}
+        self.publish_state("metrics", state)
+
+    async def _tick_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(self.tick_interval)
+                self.flush_metrics()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error flushing metric tick: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Fan-out statistics for the status endpoint"""
+        subscribers = list(self.subscribers.values())
+        return {
+            "subscribers": len(subscribers),
+            "published": self.published,
+            "disconnected": self.disconnected,
+            "dropped": sum(s.dropped for s in subscribers),
+            "max_backlog": max((len(s.events) + len(s.keyed) for s in subscribers), default=0)
+        }
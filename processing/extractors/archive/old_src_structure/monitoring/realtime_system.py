@@ -22,9 +22,12 @@ from concurrent.futures import ThreadPoolExecutor
 import aiohttp
 import websockets
 import sqlite3
+from urllib.parse import urlparse
 
 # Internal imports
 from src.utils.logger import get_logger
+from src.observability.histograms import HistogramRegistry, get_histogram_registry
+from src.monitoring.fanout import FanoutHub
 
 logger = get_logger(__name__)
 
@@ -127,17 +130,26 @@ class PerformanceSnapshot:
     error_rate: float
     response_time_avg: float
     queue_sizes: Dict[str, int] = field(default_factory=dict)
+    response_time_percentiles: Dict[str, float] = field(default_factory=dict)
 
 
 class MetricsCollector:
-    """Collect system and application metrics"""
+    """Collect system and application metrics
     
-    def __init__(self):
+    Histogram metrics are not stored sample by sample; they are folded into
+    fixed-memory sketches so percentiles stay cheap on the request hot path.
+    """
+    
+    def __init__(self, histograms: Optional[HistogramRegistry] = None):
         self.metrics = {}
         self.collection_interval = 1.0  # seconds
         self.running = False
         self.collection_thread = None
         
+        # Latency sketches (shared with the Prometheus exporter by default)
+        self.histograms = histograms or get_histogram_registry()
+        self.histogram_window = timedelta(minutes=5)
+        
         # System metrics
         self._init_system_metrics()
         
@@ -179,13 +191,18 @@ class MetricsCollector:
             description=description,
             unit=unit
         )
+        
+        if metric_type == MetricType.HISTOGRAM:
+            self.histograms.describe(name, f"{description} ({unit})" if unit else description)
     
     def record_metric(self, name: str, value: float, labels: Dict[str, str] = None, metadata: Dict[str, Any] = None):
         """Record a metric value"""
-        if name in self.metrics:
-            self.metrics[name].add_value(value, labels, metadata)
-        else:
+        if name not in self.metrics:
             logger.warning(f"Metric not registered: {name}")
+        elif self.metrics[name].type == MetricType.HISTOGRAM:
+            self.histograms.observe(name, value, labels)
+        else:
+            self.metrics[name].add_value(value, labels, metadata)
     
     def increment_counter(self, name: str, amount: float = 1.0, labels: Dict[str, str] = None):
         """Increment a counter metric"""
@@ -199,11 +216,30 @@ class MetricsCollector:
             self.record_metric(name, value, labels)
     
     def get_latest_value(self, name: str) -> Optional[float]:
-        """Get latest value for a metric"""
+        """Get latest value for a metric
+        
+        For histogram metrics this is the mean over ``histogram_window``.
+        """
+        if name in self.metrics and self.metrics[name].type == MetricType.HISTOGRAM:
+            snapshot = self.histograms.snapshot(
+                name, window_seconds=self.histogram_window.total_seconds()
+            )
+            return snapshot.mean if snapshot.count else None
+        
         if name in self.metrics and self.metrics[name].values:
             return self.metrics[name].values[-1].value
         return None
     
+    def get_histogram_summary(self, name: str, labels: Dict[str, str] = None,
+                              duration: timedelta = None) -> Dict[str, float]:
+        """Get count, mean and p50/p90/p99 for a histogram metric
+        
+        ``labels`` filters by subset, e.g. ``{"domain": "example.com"}``
+        merges every stage recorded for that domain.
+        """
+        window = (duration or self.histogram_window).total_seconds()
+        return self.histograms.percentiles(name, labels, window_seconds=window)
+    
     def get_metric_history(self, name: str, duration: timedelta = None) -> List[MetricValue]:
         """Get metric history within duration"""
         if name not in self.metrics:
@@ -514,7 +550,8 @@ class PerformanceAnalyzer:
             active_connections=int(self.metrics_collector.get_latest_value("active_connections") or 0),
             request_rate=self.metrics_collector.get_latest_value("processing_rate") or 0,
             error_rate=self._calculate_error_rate(),
-            response_time_avg=self._calculate_avg_response_time()
+            response_time_avg=self._calculate_avg_response_time(),
+            response_time_percentiles=self.metrics_collector.get_histogram_summary("response_time")
         )
     
     def _calculate_error_rate(self) -> float:
@@ -529,15 +566,12 @@ class PerformanceAnalyzer:
     
     def _calculate_avg_response_time(self) -> float:
         """Calculate average response time"""
-        history = self.metrics_collector.get_metric_history(
-            "response_time", 
-            timedelta(minutes=5)
+        summary = self.metrics_collector.get_histogram_summary(
+            "response_time",
+            duration=timedelta(minutes=5)
         )
         
-        if not history:
-            return 0.0
-        
-        return statistics.mean([v.value for v in history])
+        return summary["mean"]
     
     def analyze_performance_trends(self, duration: timedelta = timedelta(hours=1)) -> Dict[str, Any]:
         """Analyze performance trends over time"""
@@ -552,6 +586,15 @@ class PerformanceAnalyzer:
         analysis = {}
         
         for metric_name in key_metrics:
+            metric = self.metrics_collector.metrics.get(metric_name)
+            if metric and metric.type == MetricType.HISTOGRAM:
+                summary = self.metrics_collector.get_histogram_summary(
+                    metric_name, duration=duration
+                )
+                if summary["count"]:
+                    analysis[metric_name] = summary
+                continue
+            
             history = self.metrics_collector.get_metric_history(metric_name, duration)
             if not history:
                 continue
@@ -636,7 +679,7 @@ class RealTimeMonitoringSystem:
         # WebSocket server for real-time updates
         self.websocket_server = None
         self.websocket_port = 8765
-        self.connected_clients = set()
+        self.fanout = FanoutHub()
         
         # Data persistence
         self.db_path = "monitoring.db"
@@ -753,6 +796,7 @@ class RealTimeMonitoringSystem:
         self.alert_manager.add_callback(AlertSeverity.WARNING, self._handle_warning_alert)
         
         # Start WebSocket server
+        await self.fanout.start()
         await self._start_websocket_server()
         
         logger.info("Real-time Monitoring System started")
@@ -762,6 +806,8 @@ class RealTimeMonitoringSystem:
         self.metrics_collector.stop_collection()
         self.alert_manager.stop_monitoring()
         
+        await self.fanout.stop()
+        
         if self.websocket_server:
             self.websocket_server.close()
             await self.websocket_server.wait_closed()
@@ -780,14 +826,19 @@ class RealTimeMonitoringSystem:
         except Exception as e:
             logger.error(f"Failed to start WebSocket server: {e}")
     
+    @property
+    def connected_clients(self) -> set:
+        """Currently subscribed WebSocket clients"""
+        return {s.websocket for s in self.fanout.subscribers.values()}
+    
     async def _handle_websocket_connection(self, websocket, path):
         """Handle WebSocket client connections"""
-        self.connected_clients.add(websocket)
         logger.info(f"Client connected: {websocket.remote_address}")
         
         try:
-            # Send initial data
+            # Send initial data before broadcasts can interleave with it
             await self._send_initial_data(websocket)
+            await self.fanout.subscribe(websocket)
             
             # Keep connection alive and handle messages
             async for message in websocket:
@@ -798,7 +849,7 @@ class RealTimeMonitoringSystem:
         except Exception as e:
             logger.error(f"WebSocket error: {e}")
         finally:
-            self.connected_clients.discard(websocket)
+            await self.fanout.unsubscribe(websocket)
             logger.info(f"Client disconnected: {websocket.remote_address}")
     
     async def _send_initial_data(self, websocket):
@@ -922,25 +973,25 @@ class RealTimeMonitoringSystem:
         # Could integrate with external alerting systems (email, Slack, PagerDuty, etc.)
         
         # Broadcast to WebSocket clients
-        asyncio.create_task(self._broadcast_alert(event))
+        self._broadcast_alert(event)
     
     def _handle_error_alert(self, event: AlertEvent):
         """Handle error alert events"""
         logger.error(f"ERROR ALERT: {event.message}")
-        asyncio.create_task(self._broadcast_alert(event))
+        self._broadcast_alert(event)
     
     def _handle_warning_alert(self, event: AlertEvent):
         """Handle warning alert events"""
         logger.warning(f"WARNING ALERT: {event.message}")
-        asyncio.create_task(self._broadcast_alert(event))
+        self._broadcast_alert(event)
     
-    async def _broadcast_alert(self, event: AlertEvent):
-        """Broadcast alert to all connected clients"""
-        if not self.connected_clients:
-            return
+    def _broadcast_alert(self, event: AlertEvent):
+        """Broadcast alert to all connected clients
         
+        Safe to call from the alert evaluation thread; the hub hops to the
+        event loop and never waits on individual clients.
+        """
         alert_data = {
-            "type": "alert_event",
             "event_id": event.event_id,
             "alert_name": event.alert.name,
             "severity": event.alert.severity.value,
@@ -949,21 +1000,7 @@ class RealTimeMonitoringSystem:
             "triggered_at": event.triggered_at.isoformat()
         }
         
-        message = json.dumps(alert_data)
-        
-        # Send to all connected clients
-        disconnected_clients = set()
-        for client in self.connected_clients:
-            try:
-                await client.send(message)
-            except websockets.exceptions.ConnectionClosed:
-                disconnected_clients.add(client)
-            except Exception as e:
-                logger.error(f"Error broadcasting to client: {e}")
-                disconnected_clients.add(client)
-        
-        # Remove disconnected clients
-        self.connected_clients -= disconnected_clients
+        self.fanout.publish("alert_event", alert_data)
     
     def get_system_status(self) -> Dict[str, Any]:
         """Get comprehensive system status"""
@@ -989,12 +1026,18 @@ class RealTimeMonitoringSystem:
             "key_metrics": key_metrics,
             "active_alerts": active_alerts,
             "total_metrics": len(self.metrics_collector.metrics),
-            "connected_clients": len(self.connected_clients)
+            "connected_clients": self.fanout.subscriber_count,
+            "fanout": self.fanout.get_stats()
         }
     
     # Public API methods for external integration
-    def record_request(self, url: str, response_time: float, status_code: int, success: bool):
-        """Record HTTP request metrics"""
+    def record_request(self, url: str, response_time: float, status_code: int, success: bool,
+                       stage: str = "fetch"):
+        """Record HTTP request metrics
+        
+        Response times go into the per-domain, per-stage latency sketch.
+        The full URL is deliberately not a label to keep cardinality bounded.
+        """
         self.metrics_collector.increment_counter("requests_total")
         
         if success:
@@ -1005,7 +1048,30 @@ class RealTimeMonitoringSystem:
         self.metrics_collector.record_metric(
             "response_time", 
             response_time,
-            labels={"url": url, "status": str(status_code)}
+            labels={"domain": urlparse(url).netloc or "unknown", "stage": stage}
+        )
+        
+        # Live dashboards get these as batched ticks, not one message per request
+        for name in ("requests_total", "requests_successful", "requests_failed"):
+            self.fanout.record_metric(name, self.metrics_collector.get_latest_value(name) or 0)
+        self.fanout.record_metric("last_response_time", response_time)
+    
+    def get_latency_percentiles(self, domain: Optional[str] = None, stage: Optional[str] = None,
+                                duration: timedelta = None) -> Dict[str, float]:
+        """Get p50/p90/p99 response time, optionally per domain and/or stage"""
+        labels = {}
+        if domain:
+            labels["domain"] = domain
+        if stage:
+            labels["stage"] = stage
+        
+        return self.metrics_collector.get_histogram_summary("response_time", labels, duration)
+    
+    def get_latency_breakdown(self, by: str = "domain", duration: timedelta = None) -> Dict[str, Dict[str, float]]:
+        """Get p50/p90/p99 response time grouped by ``domain`` or ``stage``"""
+        window = (duration or self.metrics_collector.histogram_window).total_seconds()
+        return self.metrics_collector.histograms.breakdown(
+            "response_time", by, window_seconds=window
         )
     
     def record_scraping_success(self, url: str, items_extracted: int):
@@ -8,6 +8,7 @@ This module provides:
 - Metrics collection and export
 - System instrumentation
 - Performance monitoring
+- Fixed-memory latency histograms
 - Health checks
 """
 
@@ -20,6 +21,13 @@ from .metrics import (
     time_operation,
     get_metrics_collector
 )
+from .histograms import (
+    LatencyHistogram,
+    ShardedHistogram,
+    HistogramRegistry,
+    histogram_registry,
+    get_histogram_registry
+)
 
 try:
     from .instrumentation import (
@@ -40,6 +48,12 @@ __all__ = [
     "metrics_collector",
     "time_operation",
     "get_metrics_collector",
+    # Latency histograms
+    "LatencyHistogram",
+    "ShardedHistogram",
+    "HistogramRegistry",
+    "histogram_registry",
+    "get_histogram_registry",
 ]
 
 # Add instrumentation if available
@@ -0,0 +1,419 @@
+"""
+Latency Histograms
+==================
+
+Fixed-memory, mergeable latency sketches for hot-path metrics.
+
+Samples are folded into logarithmic buckets with a bounded relative error
+(HDR-style), so memory depends on the value range rather than on the number
+of requests. Each recording thread writes to its own shard without taking a
+lock; shards are merged when percentiles are read or metrics are scraped.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_QUANTILES: Tuple[float, ...] = (0.5, 0.9, 0.99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed histogram with bounded relative error.
+
+    A value ``v`` lands in bucket ``ceil(log(v) / log(gamma))`` where
+    ``gamma = (1 + a) / (1 - a)`` for relative accuracy ``a``. Two histograms
+    with the same accuracy merge by adding bucket counts. When more than
+    ``max_buckets`` buckets are in use the lowest ones are collapsed, which
+    keeps memory fixed and only degrades accuracy for the fastest samples.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048,
+                 min_value: float = 1e-6):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _bucket_value(self, index: int) -> float:
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+    def record(self, value: float, count: int = 1):
+        """Record ``count`` occurrences of ``value``"""
+        if value < 0:
+            raise ValueError("Histogram values must be non-negative")
+
+        if value <= self.min_value:
+            self.zero_count += count
+        else:
+            index = self._index(value)
+            buckets = self.buckets
+            if index in buckets:
+                buckets[index] += count
+            else:
+                buckets[index] = count
+                if len(buckets) > self.max_buckets:
+                    self._collapse()
+
+        self.count += count
+        self.sum += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def _collapse(self):
+        """Fold the lowest buckets together until within max_buckets"""
+        keys = sorted(self.buckets)
+        excess = len(keys) - self.max_buckets
+        if excess <= 0:
+            return
+
+        target = keys[excess]
+        for key in keys[:excess]:
+            self.buckets[target] += self.buckets.pop(key)
+
+    def merge(self, other: "LatencyHistogram"):
+        """Add the contents of ``other`` into this histogram"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge histograms with different accuracy")
+
+        # dict() copies atomically, so merging a shard that another thread
+        # is still writing to never sees a dict changing size mid-iteration
+        for index, bucket_count in dict(other.buckets).items():
+            self.buckets[index] = self.buckets.get(index, 0) + bucket_count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantiles(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> Dict[float, float]:
+        """Estimate several quantiles in a single pass over the buckets"""
+        wanted = sorted(quantiles)
+        result: Dict[float, float] = {}
+        if self.count == 0:
+            return {q: 0.0 for q in wanted}
+
+        ranks = [(q, q * (self.count - 1)) for q in wanted]
+        position = 0
+
+        cumulative = self.zero_count
+        while position < len(ranks) and ranks[position][1] < cumulative:
+            result[ranks[position][0]] = 0.0
+            position += 1
+
+        for index in sorted(self.buckets):
+            if position >= len(ranks):
+                break
+            cumulative += self.buckets[index]
+            estimate = min(max(self._bucket_value(index), self.min), self.max)
+            while position < len(ranks) and ranks[position][1] < cumulative:
+                result[ranks[position][0]] = estimate
+                position += 1
+
+        for q, _ in ranks[position:]:
+            result[q] = self.max
+
+        return result
+
+    def quantile(self, q: float) -> float:
+        """Estimate a single quantile (0.0 - 1.0)"""
+        return self.quantiles((q,))[q]
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def summary(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> Dict[str, float]:
+        """Return count/sum/min/max/mean plus pNN entries"""
+        summary = {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else 0.0,
+            "max": self.max if self.count else 0.0,
+            "mean": self.mean,
+        }
+        for q, value in self.quantiles(quantiles).items():
+            summary[quantile_label(q)] = value
+        return summary
+
+    def empty_copy(self) -> "LatencyHistogram":
+        return LatencyHistogram(self.relative_accuracy, self.max_buckets, self.min_value)
+
+
+class _Shard:
+    """Per-thread histogram slices plus cumulative totals"""
+
+    __slots__ = ("slices", "current_slice", "current", "total_count", "total_sum")
+
+    def __init__(self, max_slices: int):
+        self.slices: deque = deque(maxlen=max_slices)
+        self.current_slice: Optional[int] = None
+        self.current: Optional[LatencyHistogram] = None
+        self.total_count = 0
+        self.total_sum = 0.0
+
+
+class ShardedHistogram:
+    """
+    Thread-sharded, time-sliced latency histogram.
+
+    ``record`` only touches the calling thread's shard, so the hot path takes
+    no lock. Each shard keeps ``window_slices`` slices of ``slice_seconds``;
+    reading merges the slices inside the requested window across all shards.
+    Cumulative count and sum are kept separately for Prometheus, which needs
+    them to be monotonic.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048,
+                 slice_seconds: float = 60.0, window_slices: int = 10):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.slice_seconds = slice_seconds
+        self.window_slices = window_slices
+
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+
+    def _new_histogram(self) -> LatencyHistogram:
+        return LatencyHistogram(self.relative_accuracy, self.max_buckets)
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard(self.window_slices)
+            self._local.shard = shard
+            # Registration happens once per thread; recording never locks
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _slice_id(self, now: Optional[float] = None) -> int:
+        return int((now if now is not None else time.monotonic()) // self.slice_seconds)
+
+    def record(self, value: float, count: int = 1):
+        """Record a sample from the calling thread"""
+        shard = self._shard()
+        slice_id = self._slice_id()
+
+        if shard.current_slice != slice_id:
+            shard.current = self._new_histogram()
+            shard.current_slice = slice_id
+            shard.slices.append((slice_id, shard.current))
+
+        shard.current.record(value, count)
+        shard.total_count += count
+        shard.total_sum += value * count
+
+    def snapshot(self, window_seconds: Optional[float] = None) -> LatencyHistogram:
+        """Merge all shards into a single histogram covering the window"""
+        merged = self._new_histogram()
+        current = self._slice_id()
+
+        if window_seconds is None:
+            oldest = current - self.window_slices + 1
+        else:
+            oldest = current - max(1, math.ceil(window_seconds / self.slice_seconds)) + 1
+
+        with self._shards_lock:
+            shards = list(self._shards)
+
+        for shard in shards:
+            for slice_id, histogram in list(shard.slices):
+                if slice_id >= oldest:
+                    merged.merge(histogram)
+
+        return merged
+
+    def totals(self) -> Tuple[int, float]:
+        """Cumulative (count, sum) since creation"""
+        with self._shards_lock:
+            shards = list(self._shards)
+        return (
+            sum(shard.total_count for shard in shards),
+            sum(shard.total_sum for shard in shards),
+        )
+
+    def percentiles(self, quantiles: Iterable[float] = DEFAULT_QUANTILES,
+                    window_seconds: Optional[float] = None) -> Dict[str, float]:
+        return self.snapshot(window_seconds).summary(quantiles)
+
+
+class HistogramRegistry:
+    """
+    Named, labelled latency histograms.
+
+    Histograms are keyed by metric name and a label set such as
+    ``domain`` and ``stage``. Label sets are created on first use.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048,
+                 slice_seconds: float = 60.0, window_slices: int = 10):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.slice_seconds = slice_seconds
+        self.window_slices = window_slices
+
+        self._histograms: Dict[str, Dict[LabelKey, ShardedHistogram]] = {}
+        self._descriptions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, description: str):
+        """Attach a help text used by the Prometheus exposition"""
+        self._descriptions[name] = description
+
+    def get(self, name: str, labels: Optional[Dict[str, str]] = None) -> ShardedHistogram:
+        key = _label_key(labels)
+        series = self._histograms.get(name)
+        if series is not None:
+            histogram = series.get(key)
+            if histogram is not None:
+                return histogram
+
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = ShardedHistogram(
+                    relative_accuracy=self.relative_accuracy,
+                    max_buckets=self.max_buckets,
+                    slice_seconds=self.slice_seconds,
+                    window_slices=self.window_slices,
+                )
+                series[key] = histogram
+            return histogram
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """Record a sample for ``name`` under ``labels``"""
+        self.get(name, labels).record(value)
+
+    def names(self) -> List[str]:
+        return list(self._histograms)
+
+    def series(self, name: str) -> Dict[LabelKey, ShardedHistogram]:
+        with self._lock:
+            return dict(self._histograms.get(name, {}))
+
+    def snapshot(self, name: str, labels: Optional[Dict[str, str]] = None,
+                 window_seconds: Optional[float] = None) -> LatencyHistogram:
+        """
+        Merge every series of ``name`` whose labels include ``labels``.
+
+        Passing ``{"domain": "example.com"}`` aggregates all stages for that
+        domain; passing ``None`` aggregates the whole metric.
+        """
+        wanted = set(_label_key(labels))
+        merged = LatencyHistogram(self.relative_accuracy, self.max_buckets)
+
+        for key, histogram in self.series(name).items():
+            if wanted.issubset(key):
+                merged.merge(histogram.snapshot(window_seconds))
+
+        return merged
+
+    def percentiles(self, name: str, labels: Optional[Dict[str, str]] = None,
+                    quantiles: Iterable[float] = DEFAULT_QUANTILES,
+                    window_seconds: Optional[float] = None) -> Dict[str, float]:
+        """Summary (count, mean, pNN...) for ``name`` filtered by ``labels``"""
+        return self.snapshot(name, labels, window_seconds).summary(quantiles)
+
+    def breakdown(self, name: str, by: str,
+                  quantiles: Iterable[float] = DEFAULT_QUANTILES,
+                  window_seconds: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """Percentile summaries grouped by a single label, e.g. ``domain``"""
+        grouped: Dict[str, LatencyHistogram] = {}
+
+        for key, histogram in self.series(name).items():
+            value = dict(key).get(by)
+            if value is None:
+                continue
+            merged = grouped.get(value)
+            if merged is None:
+                merged = grouped[value] = LatencyHistogram(
+                    self.relative_accuracy, self.max_buckets
+                )
+            merged.merge(histogram.snapshot(window_seconds))
+
+        return {value: merged.summary(quantiles) for value, merged in grouped.items()}
+
+    def render_prometheus(self, prefix: str = "ecadp",
+                          quantiles: Iterable[float] = DEFAULT_QUANTILES) -> str:
+        """Render all histograms as Prometheus summaries (text format 0.0.4)"""
+        quantiles = tuple(quantiles)
+        lines: List[str] = []
+
+        for name in sorted(self.names()):
+            metric = f"{prefix}_{name}" if prefix else name
+            lines.append(f"# HELP {metric} {self._descriptions.get(name, name)}")
+            lines.append(f"# TYPE {metric} summary")
+
+            for key, histogram in sorted(self.series(name).items()):
+                estimates = histogram.snapshot().quantiles(quantiles)
+                for q in quantiles:
+                    labels = _format_labels(key + (("quantile", repr(q)),))
+                    lines.append(f"{metric}{labels} {_format_value(estimates[q])}")
+
+                count, total = histogram.totals()
+                labels = _format_labels(key)
+                lines.append(f"{metric}_sum{labels} {_format_value(total)}")
+                lines.append(f"{metric}_count{labels} {count}")
+
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def quantile_label(q: float) -> str:
+    """0.5 -> 'p50', 0.99 -> 'p99', 0.999 -> 'p99.9'"""
+    return "p" + f"{q * 100:.10g}"
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    if not labels:
+        return ()
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in key) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
+
+
+# Global histogram registry shared by collectors and the Prometheus exporter
+histogram_registry = HistogramRegistry()
+
+
+def get_histogram_registry() -> HistogramRegistry:
+    """Get the global latency histogram registry"""
+    return histogram_registry
@@ -16,6 +16,8 @@ from collections import defaultdict, deque
 import asyncio
 import os
 
+from .histograms import HistogramRegistry, get_histogram_registry
+
 try:
     import psutil
     PSUTIL_AVAILABLE = True
@@ -74,7 +76,8 @@ class MetricsCollector:
     def __init__(self, 
                  enable_prometheus: bool = True,
                  enable_system_metrics: bool = True,
-                 collection_interval: int = 30):
+                 collection_interval: int = 30,
+                 histograms: Optional[HistogramRegistry] = None):
         
         self.enable_prometheus = enable_prometheus and PROMETHEUS_AVAILABLE
         self.enable_system_metrics = enable_system_metrics and PSUTIL_AVAILABLE
@@ -84,6 +87,12 @@ class MetricsCollector:
         self.metrics: Dict[str, MetricSeries] = {}
         self.lock = threading.RLock()
         
+        # Fixed-memory latency sketches, merged on scrape
+        self.histograms = histograms or get_histogram_registry()
+        self.histograms.describe(
+            'crawl_stage_latency_ms', 'Crawl latency in milliseconds by domain and stage'
+        )
+        
         # Prometheus registry and metrics
         if self.enable_prometheus:
             self.registry = CollectorRegistry()
@@ -373,15 +382,38 @@ class MetricsCollector:
             self.job_counter.labels(job_type=job_type, status=status).inc()
             self.job_duration.labels(job_type=job_type, status=status).observe(duration)
     
-    def record_crawler_request(self, domain: str, status: str):
+    def record_crawler_request(self, domain: str, status: str,
+                               duration: Optional[float] = None, stage: str = "fetch"):
         """Record crawler request metrics"""
         labels = {'domain': domain, 'status': status}
         
         self.record_counter('crawler_requests_count', labels=labels)
         
+        if duration is not None:
+            self.record_latency(domain, stage, duration * 1000)
+        
         if self.enable_prometheus:
             self.crawler_requests.labels(domain=domain, status=status).inc()
     
+    def record_latency(self, domain: str, stage: str, duration_ms: float):
+        """Record a per-domain, per-stage latency sample in milliseconds"""
+        self.histograms.observe(
+            'crawl_stage_latency_ms', duration_ms, {'domain': domain, 'stage': stage}
+        )
+    
+    def get_latency_percentiles(self, domain: Optional[str] = None,
+                                stage: Optional[str] = None,
+                                window_minutes: Optional[int] = None) -> Dict[str, float]:
+        """p50/p90/p99 latency, optionally filtered by domain and/or stage"""
+        labels = {}
+        if domain:
+            labels['domain'] = domain
+        if stage:
+            labels['stage'] = stage
+        
+        window = window_minutes * 60 if window_minutes else None
+        return self.histograms.percentiles('crawl_stage_latency_ms', labels, window_seconds=window)
+    
     def record_scraper_extraction(self, template: str, status: str, records_count: int = 1):
         """Record scraper extraction metrics"""
         labels = {'template': template, 'status': status}
@@ -470,10 +502,12 @@ class MetricsCollector:
     
     def export_prometheus(self) -> str:
         """Export metrics in Prometheus format"""
+        sketches = self.histograms.render_prometheus()
+        
         if not self.enable_prometheus:
-            return "# Prometheus not available\n"
+            return "# Prometheus not available\n" + sketches
         
-        return generate_latest(self.registry).decode('utf-8')
+        return generate_latest(self.registry).decode('utf-8') + sketches
     
     def export_json(self, window_minutes: int = 60) -> Dict[str, Any]:
         """Export metrics as JSON"""
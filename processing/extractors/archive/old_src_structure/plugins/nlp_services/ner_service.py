@@ -2,17 +2,48 @@
 """
 NER Service Adapter för Sparkling-Owl-Spin
 Named Entity Recognition med stöd för spaCy, NLTK, och Hugging Face
+
+Model inference runs batched in a worker pool, off the event loop. spaCy
+uses nlp.pipe with only the NER components enabled, and Hugging Face
+pipelines tokenize and run whole batches.
 """
 
 import logging
 import asyncio
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Dict, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import re
 
+try:
+    import spacy
+    SPACY_AVAILABLE = True
+except ImportError:
+    SPACY_AVAILABLE = False
+
+try:
+    from transformers import pipeline as hf_pipeline
+    TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    TRANSFORMERS_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# spaCy packages per model and language
+SPACY_PACKAGES = {
+    "spacy_sm": {"en": "en_core_web_sm", "sv": "sv_core_news_sm"},
+    "spacy_lg": {"en": "en_core_web_lg", "sv": "sv_core_news_lg"},
+}
+# Everything else in the spaCy pipeline is disabled; NER only needs these
+SPACY_NER_COMPONENTS = {"tok2vec", "transformer", "ner"}
+HUGGINGFACE_NER_MODEL = "Davlan/bert-base-multilingual-cased-ner-hrl"
+
 class EntityType(Enum):
     """Entity types för NER"""
     PERSON = "PERSON"
@@ -30,6 +61,20 @@ class EntityType(Enum):
     EVENT = "EVENT"
     LANGUAGE = "LANGUAGE"
 
+# Model labels (spaCy English and Swedish, Hugging Face CoNLL-style) to entity types
+MODEL_LABELS = {
+    "PERSON": EntityType.PERSON, "PER": EntityType.PERSON, "PRS": EntityType.PERSON,
+    "ORG": EntityType.ORGANIZATION,
+    "GPE": EntityType.LOCATION, "LOC": EntityType.LOCATION,
+    "DATE": EntityType.DATE, "TME": EntityType.DATE,
+    "TIME": EntityType.TIME,
+    "MONEY": EntityType.MONEY,
+    "PERCENT": EntityType.PERCENT,
+    "PRODUCT": EntityType.PRODUCT, "OBJ": EntityType.PRODUCT,
+    "EVENT": EntityType.EVENT, "EVN": EntityType.EVENT,
+    "LANGUAGE": EntityType.LANGUAGE,
+}
+
 @dataclass
 class Entity:
     """Extracted entity"""
@@ -52,12 +97,22 @@ class NERResult:
 class NERServiceAdapter:
     """NER Service integration för entity extraction"""
     
-    def __init__(self, plugin_info):
+    def __init__(self, plugin_info, batch_size: int = 64, n_process: int = 1, max_workers: Optional[int] = None):
         self.plugin_info = plugin_info
         self.models = {}
         self.initialized = False
         self.available_models = ["spacy_sm", "spacy_lg", "nltk", "huggingface", "regex"]
         self.regex_patterns = {}
+        # Batched inference settings; n_process > 1 starts spaCy worker processes for large batches
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Loaded pipelines per (model, language); None when loading failed
+        self._pipelines: Dict[Tuple[str, str], Any] = {}
+        self._pipeline_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._pipelines_lock = threading.Lock()
+        self._compiled_patterns: List[Tuple[EntityType, re.Pattern]] = []
         
     async def initialize(self):
         """Initiera NER Service"""
@@ -78,14 +133,15 @@ class NERServiceAdapter:
     async def _initialize_models(self):
         """Initialize NER models"""
         
-        # Try spaCy
-        try:
-            # import spacy  # Uncomment when available
-            logger.info("📚 spaCy model initialization (mock)")
+        # Try spaCy; pipelines are loaded per language on first use
+        if SPACY_AVAILABLE:
+            logger.info("📚 spaCy available, pipelines load on first use")
+            for model_name, packages in SPACY_PACKAGES.items():
+                self.models[model_name] = {"model": "spacy", "packages": packages, "languages": list(packages)}
+        else:
+            logger.warning("⚠️ spaCy not available, using mock spaCy models")
             self.models["spacy_sm"] = {"model": "mock_spacy_sm", "languages": ["en", "sv"]}
             self.models["spacy_lg"] = {"model": "mock_spacy_lg", "languages": ["en", "sv"]}
-        except ImportError:
-            logger.warning("⚠️ spaCy not available")
             
         # Try NLTK
         try:
@@ -96,16 +152,20 @@ class NERServiceAdapter:
             logger.warning("⚠️ NLTK not available")
             
         # Try Hugging Face Transformers
-        try:
-            # from transformers import AutoTokenizer, AutoModelForTokenClassification  # Uncomment when available
-            logger.info("🤗 Hugging Face model initialization (mock)")
+        if TRANSFORMERS_AVAILABLE:
+            logger.info("🤗 Hugging Face available, pipeline loads on first use")
+            self.models["huggingface"] = {
+                "model": HUGGINGFACE_NER_MODEL,
+                "tokenizer": HUGGINGFACE_NER_MODEL,
+                "languages": ["en", "sv", "de", "fr"]
+            }
+        else:
+            logger.warning("⚠️ Hugging Face Transformers not available, using mock model")
             self.models["huggingface"] = {
                 "model": "mock_bert_ner",
                 "tokenizer": "mock_tokenizer",
                 "languages": ["en", "sv", "de", "fr"]
             }
-        except ImportError:
-            logger.warning("⚠️ Hugging Face Transformers not available")
             
         # Regex patterns always available
         self.models["regex"] = {"model": "regex_patterns", "languages": ["all"]}
@@ -154,9 +214,15 @@ class NERServiceAdapter:
         
         logger.info(f"🔍 Setup regex patterns för {len(self.regex_patterns)} entity types")
         
+        # Compiled once; batches run them from worker threads
+        self._compiled_patterns = [
+            (entity_type, re.compile(pattern, re.IGNORECASE))
+            for entity_type, patterns in self.regex_patterns.items()
+            for pattern in patterns
+        ]
+        
     async def extract_entities(self, text: str, model_name: str = "regex", language: str = "en") -> NERResult:
         """Extract entities från text"""
-        import time
         start_time = time.time()
         
         if not self.initialized:
@@ -167,16 +233,7 @@ class NERServiceAdapter:
             
         logger.info(f"🔍 Extracting entities using {model_name} model")
         
-        if model_name == "regex":
-            entities = await self._extract_with_regex(text)
-        elif model_name.startswith("spacy"):
-            entities = await self._extract_with_spacy(text, model_name, language)
-        elif model_name == "nltk":
-            entities = await self._extract_with_nltk(text)
-        elif model_name == "huggingface":
-            entities = await self._extract_with_huggingface(text, language)
-        else:
-            entities = []
+        entities = (await self._run_batch([text], model_name, language))[0]
             
         processing_time = time.time() - start_time
         
@@ -188,30 +245,159 @@ class NERServiceAdapter:
             language=language
         )
         
-    async def _extract_with_regex(self, text: str) -> List[Entity]:
+    async def batch_extract(self, texts: List[str], model_name: str = "regex", language: str = "en") -> List[NERResult]:
+        """
+        Batch entity extraction
+        
+        All texts go through the model as one batch in the worker pool. Each
+        result's processing_time is its share of the batch time.
+        """
+        start_time = time.time()
+        
+        if not self.initialized:
+            await self.initialize()
+            
+        if model_name not in self.models:
+            model_name = "regex"  # Fallback
+            
+        if not texts:
+            return []
+            
+        logger.info(f"🔍 Extracting entities from {len(texts)} texts using {model_name} model")
+        
+        batch_entities = await self._run_batch(texts, model_name, language)
+        processing_time = (time.time() - start_time) / len(texts)
+        
+        return [
+            NERResult(
+                text=text,
+                entities=entities,
+                processing_time=processing_time,
+                model_used=model_name,
+                language=language
+            )
+            for text, entities in zip(texts, batch_entities)
+        ]
+        
+    async def _run_batch(self, texts: List[str], model_name: str, language: str) -> List[List[Entity]]:
+        """Run a batch in the worker pool so inference never blocks the event loop"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ner")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(self._extract_batch, list(texts), model_name, language)
+        )
+        
+    def _extract_batch(self, texts: List[str], model_name: str, language: str) -> List[List[Entity]]:
+        """Extract entities för a batch of texts (runs in a worker thread)"""
+        if model_name == "regex":
+            return [self._extract_with_regex(text) for text in texts]
+        elif model_name.startswith("spacy"):
+            return self._extract_with_spacy(texts, model_name, language)
+        elif model_name == "nltk":
+            return [self._extract_with_nltk(text) for text in texts]
+        elif model_name == "huggingface":
+            return self._extract_with_huggingface(texts, language)
+        else:
+            return [[] for _ in texts]
+        
+    def _get_pipeline(self, model_name: str, language: str) -> Tuple[Any, Optional[threading.Lock]]:
+        """Load a model pipeline once per model and language; (None, None) if unavailable"""
+        key = (model_name, language)
+        with self._pipelines_lock:
+            if key not in self._pipelines:
+                if model_name.startswith("spacy"):
+                    self._pipelines[key] = self._load_spacy_pipeline(model_name, language)
+                else:
+                    self._pipelines[key] = self._load_huggingface_pipeline()
+                self._pipeline_locks[key] = threading.Lock()
+            return self._pipelines[key], self._pipeline_locks[key]
+        
+    def _load_spacy_pipeline(self, model_name: str, language: str) -> Any:
+        """Load a spaCy pipeline with everything but NER disabled"""
+        if not SPACY_AVAILABLE:
+            return None
+        packages = SPACY_PACKAGES.get(model_name, {})
+        package = packages.get(language) or packages.get("en")
+        try:
+            nlp = spacy.load(package)
+            unused = [name for name in nlp.pipe_names if name not in SPACY_NER_COMPONENTS]
+            nlp.select_pipes(disable=unused)
+            logger.info(f"📚 Loaded spaCy pipeline {package} ({', '.join(nlp.pipe_names)})")
+            return nlp
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ spaCy pipeline {package} not available, using mock model: {e}")
+            return None
+        
+    def _load_huggingface_pipeline(self) -> Any:
+        """Load the Hugging Face token classification pipeline"""
+        if not TRANSFORMERS_AVAILABLE:
+            return None
+        try:
+            ner = hf_pipeline("ner", model=HUGGINGFACE_NER_MODEL, aggregation_strategy="simple")
+            logger.info(f"🤗 Loaded Hugging Face pipeline {HUGGINGFACE_NER_MODEL}")
+            return ner
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Hugging Face pipeline not available, using mock model: {e}")
+            return None
+        
+    def _spacy_pipe_settings(self, count: int) -> Tuple[int, int]:
+        """batch_size and n_process för nlp.pipe, sized to the batch"""
+        # Worker processes only pay off once each gets at least a full batch
+        n_process = max(1, min(self.n_process, count // self.batch_size))
+        batch_size = max(1, min(self.batch_size, math.ceil(count / n_process)))
+        return batch_size, n_process
+        
+    def _extract_with_regex(self, text: str) -> List[Entity]:
         """Extract entities med regex patterns"""
         entities = []
         
-        for entity_type, patterns in self.regex_patterns.items():
-            for pattern in patterns:
-                for match in re.finditer(pattern, text, re.IGNORECASE):
-                    entity = Entity(
-                        text=match.group(),
-                        label=entity_type,
-                        start=match.start(),
-                        end=match.end(),
-                        confidence=0.8,  # Regex has good precision but lower recall
-                        context=text[max(0, match.start()-20):min(len(text), match.end()+20)]
-                    )
-                    entities.append(entity)
+        for entity_type, pattern in self._compiled_patterns:
+            for match in pattern.finditer(text):
+                entity = Entity(
+                    text=match.group(),
+                    label=entity_type,
+                    start=match.start(),
+                    end=match.end(),
+                    confidence=0.8,  # Regex has good precision but lower recall
+                    context=text[max(0, match.start()-20):min(len(text), match.end()+20)]
+                )
+                entities.append(entity)
                     
         return entities
         
-    async def _extract_with_spacy(self, text: str, model_name: str, language: str) -> List[Entity]:
-        """Extract entities med spaCy (mock implementation)"""
-        await asyncio.sleep(0.1)  # Simulate processing
+    def _extract_with_spacy(self, texts: List[str], model_name: str, language: str) -> List[List[Entity]]:
+        """Extract entities med spaCy, one nlp.pipe call per batch"""
+        nlp, lock = self._get_pipeline(model_name, language)
+        if nlp is None:
+            model_entities = [self._mock_spacy_entities(text) for text in texts]
+        else:
+            batch_size, n_process = self._spacy_pipe_settings(len(texts))
+            with lock:
+                docs = list(nlp.pipe(texts, batch_size=batch_size, n_process=n_process))
+            model_entities = [
+                [
+                    self._model_entity(text, ent.label_, ent.start_char, ent.end_char, 0.9)
+                    for ent in doc.ents if ent.label_ in MODEL_LABELS
+                ]
+                for text, doc in zip(texts, docs)
+            ]
+            
+        # Add regex entities as backup
+        return [entities + self._extract_with_regex(text) for text, entities in zip(texts, model_entities)]
+        
+    def _model_entity(self, text: str, label: str, start: int, end: int, confidence: float) -> Entity:
+        return Entity(
+            text=text[start:end],
+            label=MODEL_LABELS[label],
+            start=start,
+            end=end,
+            confidence=confidence,
+            context=text[max(0, start-30):min(len(text), end+30)]
+        )
         
-        # Mock spaCy extraction
+    def _mock_spacy_entities(self, text: str) -> List[Entity]:
+        """Mock spaCy extraction when no spaCy pipeline is available"""
         entities = []
         
         # Mock some common entities
@@ -222,16 +408,10 @@ class NERServiceAdapter:
         if "Google" in text:
             entities.append(Entity("Google", EntityType.ORGANIZATION, text.find("Google"), text.find("Google")+6, 0.88))
             
-        # Add regex entities as backup
-        regex_entities = await self._extract_with_regex(text)
-        entities.extend(regex_entities)
-        
         return entities
         
-    async def _extract_with_nltk(self, text: str) -> List[Entity]:
+    def _extract_with_nltk(self, text: str) -> List[Entity]:
         """Extract entities med NLTK (mock implementation)"""
-        await asyncio.sleep(0.15)  # Simulate processing
-        
         entities = []
         
         # Mock NLTK named entities
@@ -251,10 +431,25 @@ class NERServiceAdapter:
                     
         return entities
         
-    async def _extract_with_huggingface(self, text: str, language: str) -> List[Entity]:
-        """Extract entities med Hugging Face (mock implementation)"""
-        await asyncio.sleep(0.3)  # Simulate more complex processing
+    def _extract_with_huggingface(self, texts: List[str], language: str) -> List[List[Entity]]:
+        """Extract entities med Hugging Face; the pipeline tokenizes and runs the texts in batches"""
+        ner, lock = self._get_pipeline("huggingface", "all")
+        if ner is None:
+            return [self._mock_huggingface_entities(text) for text in texts]
+            
+        with lock:
+            outputs = ner(texts, batch_size=self.batch_size)
+            
+        return [
+            [
+                self._model_entity(text, item["entity_group"], item["start"], item["end"], float(item["score"]))
+                for item in items if item.get("entity_group") in MODEL_LABELS
+            ]
+            for text, items in zip(texts, outputs)
+        ]
         
+    def _mock_huggingface_entities(self, text: str) -> List[Entity]:
+        """Mock transformer-based NER when no pipeline is available"""
         entities = []
         
         # Mock transformer-based NER
@@ -282,14 +477,6 @@ class NERServiceAdapter:
                 
         return entities
         
-    async def batch_extract(self, texts: List[str], model_name: str = "regex", language: str = "en") -> List[NERResult]:
-        """Batch entity extraction"""
-        results = []
-        for text in texts:
-            result = await self.extract_entities(text, model_name, language)
-            results.append(result)
-        return results
-        
     def get_supported_models(self) -> List[Dict[str, Any]]:
         """Hämta supported models"""
         return [
@@ -340,6 +527,12 @@ class NERServiceAdapter:
     async def cleanup(self):
         """Cleanup NER Service"""
         logger.info("🧹 Cleaning up NER Service Adapter")
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._pipelines.clear()
+        self._pipeline_locks.clear()
+        self._compiled_patterns = []
         self.models.clear()
         self.regex_patterns.clear()
         self.initialized = False
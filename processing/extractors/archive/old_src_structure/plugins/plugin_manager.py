@@ -2,6 +2,10 @@
 """
 Sparkling-Owl-Spin Plugin Manager
 Hanterar alla plugins enligt registry.yaml
+
+Plugins laddas lazy som standard: ``initialize`` läser bara registret och
+plugin-modulerna (Playwright, spaCy, transformers ...) importeras först när
+pluginet används via ``load_plugin``.
 """
 
 import os
@@ -9,6 +13,7 @@ import yaml
 import logging
 import asyncio
 import importlib
+import importlib.util
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
@@ -23,6 +28,7 @@ class SecurityLevel(Enum):
 
 class PluginStatus(Enum):
     DISABLED = "disabled"
+    PENDING = "pending"  # aktiverad, laddas vid första användning
     LOADING = "loading"
     READY = "ready"
     ERROR = "error"
@@ -44,22 +50,34 @@ class PluginInfo:
 class PluginManager:
     """Central plugin manager för Sparkling-Owl-Spin"""
     
-    def __init__(self, config_path: str = None, environment: str = "development"):
+    def __init__(self, config_path: str = None, environment: str = "development",
+                 lazy: bool = True, preload: Optional[List[str]] = None):
         self.config_path = config_path or "src/plugins/registry.yaml"
         self.environment = environment
+        self.lazy = lazy
+        self.preload = preload or []
         self.plugins: Dict[str, PluginInfo] = {}
         self.loaded_plugins: Dict[str, Any] = {}
         self.registry_config = None
+        self._load_locks: Dict[str, asyncio.Lock] = {}
         
     async def initialize(self):
-        """Ladda plugin registry och initiera alla aktiverade plugins"""
+        """Ladda plugin registry; aktiverade plugins laddas direkt endast om lazy=False"""
         logger.info("🔌 Initializing Plugin Manager")
         
         try:
             await self._load_registry()
             await self._validate_environment()
-            await self._load_enabled_plugins()
-            logger.info(f"✅ Plugin Manager initialized with {len(self.loaded_plugins)} active plugins")
+            for plugin_info in self.plugins.values():
+                if plugin_info.enabled:
+                    plugin_info.status = PluginStatus.PENDING
+            if self.lazy:
+                for name in self.preload:
+                    await self.load_plugin(name)
+            else:
+                await self._load_enabled_plugins()
+            logger.info(f"✅ Plugin Manager initialized with {len(self.loaded_plugins)} active plugins "
+                        f"({len([p for p in self.plugins.values() if p.enabled])} enabled)")
         except Exception as e:
             logger.error(f"❌ Failed to initialize Plugin Manager: {str(e)}")
             raise
@@ -112,8 +130,28 @@ class PluginManager:
     async def _load_enabled_plugins(self):
         """Ladda alla aktiverade plugins"""
         for name, plugin_info in self.plugins.items():
-            if not plugin_info.enabled:
-                continue
+            if plugin_info.enabled:
+                await self.load_plugin(name)
+                
+    async def load_plugin(self, name: str) -> Optional[Any]:
+        """Hämta plugin instance, laddas vid första användning"""
+        if name in self.loaded_plugins:
+            return self.loaded_plugins[name]
+            
+        plugin_info = self.plugins.get(name)
+        if plugin_info is None:
+            logger.warning(f"Unknown plugin: {name}")
+            return None
+        if not plugin_info.enabled:
+            logger.warning(f"🚫 Plugin {name} is disabled")
+            return None
+            
+        lock = self._load_locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            if name in self.loaded_plugins:
+                return self.loaded_plugins[name]
+            if plugin_info.status == PluginStatus.ERROR:
+                return None
                 
             try:
                 plugin_info.status = PluginStatus.LOADING
@@ -139,12 +177,16 @@ class PluginManager:
                 plugin_info.error = str(e)
                 logger.error(f"❌ Failed to load plugin {name}: {str(e)}")
                 
+            return self.loaded_plugins.get(name)
+                
     async def _check_dependencies(self, plugin_info: PluginInfo):
-        """Kontrollera att alla beroenden finns"""
+        """Kontrollera att alla beroenden finns (utan att importera dem)"""
         for dep in plugin_info.dependencies:
             try:
-                importlib.import_module(dep)
-            except ImportError:
+                found = importlib.util.find_spec(dep) is not None
+            except (ImportError, ValueError):
+                found = False
+            if not found:
                 logger.warning(f"⚠️ Missing dependency {dep} for plugin {plugin_info.name}")
                 
     async def _load_plugin_by_category(self, plugin_info: PluginInfo) -> Optional[Any]:
@@ -255,16 +297,26 @@ class PluginManager:
         return None
         
     def get_plugin(self, name: str) -> Optional[Any]:
-        """Hämta plugin instance"""
+        """Hämta redan laddad plugin instance (se ``load_plugin``)"""
         return self.loaded_plugins.get(name)
         
     def get_plugins_by_category(self, category: str) -> List[Any]:
-        """Hämta alla plugins i kategori"""
+        """Hämta alla laddade plugins i kategori"""
         return [
             instance for name, instance in self.loaded_plugins.items()
             if self.plugins[name].category == category
         ]
         
+    async def load_plugins_by_category(self, category: str) -> List[Any]:
+        """Ladda och hämta alla aktiverade plugins i kategori"""
+        instances = []
+        for name, plugin_info in self.plugins.items():
+            if plugin_info.enabled and plugin_info.category == category:
+                instance = await self.load_plugin(name)
+                if instance is not None:
+                    instances.append(instance)
+        return instances
+        
     def get_status(self) -> Dict[str, Any]:
         """Hämta plugin status"""
         return {
@@ -5,9 +5,11 @@ Implements intelligent proxy rotation with health tracking, load balancing,
 and adaptive selection based on success rates and response times.
 """
 
+import heapq
+import itertools
 import random
 import time
-from typing import List, Optional, Dict, Any, Callable
+from typing import List, Optional, Dict, Any, Callable, Set, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
@@ -87,6 +89,102 @@ class ProxyStats:
                 score *= 1.1
         
         return max(0.0, min(1.0, score))
+    
+    @property
+    def next_score_change(self) -> Optional[datetime]:
+        """When health_score next changes without new requests (ban end, recency bonus expiry)"""
+        if self.is_banned:
+            return self.banned_until
+        if self.last_success:
+            bonus_ends = self.last_success + timedelta(hours=1)
+            if bonus_ends > datetime.utcnow():
+                return bonus_ends
+        return None
+
+class FenwickTree:
+    """
+    Binary indexed tree over non-negative weights.
+    
+    Supports point updates, prefix sums and sampling an index with
+    probability proportional to its weight, all in O(log n).
+    """
+    
+    def __init__(self, size: int = 0):
+        self._size = size
+        self._tree = [0.0] * (size + 1)
+        self._weights = [0.0] * size
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def grow(self, size: int):
+        """Extend capacity to ``size`` slots, keeping current weights"""
+        if size <= self._size:
+            return
+        weights = self._weights + [0.0] * (size - self._size)
+        self.rebuild(weights)
+    
+    def rebuild(self, weights: List[float]):
+        """Rebuild from scratch in O(n); also clears accumulated float drift"""
+        self._size = len(weights)
+        self._weights = list(weights)
+        self._tree = [0.0] * (self._size + 1)
+        for i, weight in enumerate(self._weights, start=1):
+            self._tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= self._size:
+                self._tree[parent] += self._tree[i]
+    
+    def get(self, index: int) -> float:
+        return self._weights[index]
+    
+    def set(self, index: int, weight: float):
+        delta = weight - self._weights[index]
+        if delta == 0:
+            return
+        self._weights[index] = weight
+        i = index + 1
+        while i <= self._size:
+            self._tree[i] += delta
+            i += i & -i
+    
+    def total(self) -> float:
+        return self.prefix_sum(self._size)
+    
+    def prefix_sum(self, count: int) -> float:
+        """Sum of the first ``count`` weights"""
+        result = 0.0
+        i = count
+        while i > 0:
+            result += self._tree[i]
+            i -= i & -i
+        return result
+    
+    def find(self, target: float) -> int:
+        """Smallest index whose inclusive prefix sum exceeds ``target``"""
+        position = 0
+        step = 1 << self._size.bit_length()
+        while step:
+            nxt = position + step
+            if nxt <= self._size and self._tree[nxt] <= target:
+                position = nxt
+                target -= self._tree[nxt]
+            step >>= 1
+        return min(position, self._size - 1)
+    
+    def sample(self, rng: random.Random = random) -> Optional[int]:
+        """Index drawn with probability weight / total, or None if all weights are zero"""
+        total = self.total()
+        if total <= 0:
+            return None
+        index = self.find(rng.random() * total)
+        if self._weights[index] <= 0:
+            # Float drift at a boundary; step back to the nearest weighted slot
+            while index > 0 and self._weights[index] <= 0:
+                index -= 1
+            if self._weights[index] <= 0:
+                return None
+        return index
 
 class ProxyRotator:
     """
@@ -119,22 +217,62 @@ class ProxyRotator:
         self.domain_proxy_mapping: Dict[str, str] = {}  # Sticky sessions per domain
         self.load_balancer_weights: Dict[str, float] = {}
         
+        # Selection index, updated incrementally as results are recorded.
+        # Each proxy owns a slot in two Fenwick trees (health weight and
+        # availability) and has entries in two lazily invalidated heaps.
+        self._proxy_by_id: Dict[str, ProxyInfo] = {}
+        self._slot_of: Dict[str, int] = {}
+        self._slot_ids: List[Optional[str]] = []
+        self._free_slots: List[int] = []
+        self._weights = FenwickTree()
+        self._available = FenwickTree()
+        self._health: Dict[str, float] = {}
+        self._least_used_heap: List[Tuple[int, int, str]] = []
+        self._best_heap: List[Tuple[float, int, str]] = []
+        self._refresh_heap: List[Tuple[datetime, str]] = []
+        self._refresh_due: Dict[str, datetime] = {}
+        self._sequence = itertools.count()
+        self._updates_since_rebuild = 0
+        
     def add_proxy(self, proxy: ProxyInfo):
         """Add a proxy to the rotation pool"""
-        if proxy not in self.proxies:
+        proxy_id = f"{proxy.ip}:{proxy.port}"
+        if proxy_id not in self._proxy_by_id:
             self.proxies.append(proxy)
-            proxy_id = f"{proxy.ip}:{proxy.port}"
+            self._proxy_by_id[proxy_id] = proxy
             if proxy_id not in self.proxy_stats:
                 self.proxy_stats[proxy_id] = ProxyStats(proxy_id=proxy_id)
+            
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            else:
+                slot = len(self._slot_ids)
+                self._slot_ids.append(None)
+                if slot >= len(self._weights):
+                    capacity = max(16, 2 * len(self._weights))
+                    self._weights.grow(capacity)
+                    self._available.grow(capacity)
+            self._slot_ids[slot] = proxy_id
+            self._slot_of[proxy_id] = slot
+            self._update_index(proxy_id)
             logger.info(f"Added proxy to rotator: {proxy_id}")
     
     def remove_proxy(self, proxy: ProxyInfo):
         """Remove a proxy from the rotation pool"""
-        if proxy in self.proxies:
-            self.proxies.remove(proxy)
-            proxy_id = f"{proxy.ip}:{proxy.port}"
+        proxy_id = f"{proxy.ip}:{proxy.port}"
+        if proxy_id in self._proxy_by_id:
+            self.proxies.remove(self._proxy_by_id.pop(proxy_id))
             if proxy_id in self.proxy_stats:
                 del self.proxy_stats[proxy_id]
+            
+            # Heap entries for the id become stale and are skipped on pop
+            slot = self._slot_of.pop(proxy_id)
+            self._weights.set(slot, 0.0)
+            self._available.set(slot, 0.0)
+            self._slot_ids[slot] = None
+            self._free_slots.append(slot)
+            self._health.pop(proxy_id, None)
+            self._refresh_due.pop(proxy_id, None)
             logger.info(f"Removed proxy from rotator: {proxy_id}")
     
     def get_next_proxy(self, 
@@ -154,28 +292,30 @@ class ProxyRotator:
         if self._should_run_health_check():
             self._run_health_check()
         
-        # Filter available proxies
-        available_proxies = self._get_available_proxies(exclude_proxies)
+        # Pick up score changes that happen with time alone (ban expiry etc.)
+        self._apply_due_refreshes()
+        
+        exclude = set(exclude_proxies or [])
         
-        if not available_proxies:
+        if not self._has_available(exclude):
             logger.warning("No available proxies for rotation")
             return None
         
         # Select proxy based on strategy
         if self.strategy == RotationStrategy.ROUND_ROBIN:
-            proxy = self._round_robin_selection(available_proxies)
+            proxy = self._round_robin_selection(exclude)
         elif self.strategy == RotationStrategy.RANDOM:
-            proxy = self._random_selection(available_proxies)
+            proxy = self._random_selection(exclude)
         elif self.strategy == RotationStrategy.WEIGHTED_RANDOM:
-            proxy = self._weighted_random_selection(available_proxies)
+            proxy = self._weighted_random_selection(exclude)
         elif self.strategy == RotationStrategy.LEAST_USED:
-            proxy = self._least_used_selection(available_proxies)
+            proxy = self._least_used_selection(exclude)
         elif self.strategy == RotationStrategy.BEST_PERFORMANCE:
-            proxy = self._best_performance_selection(available_proxies)
+            proxy = self._best_performance_selection(exclude)
         elif self.strategy == RotationStrategy.ADAPTIVE:
-            proxy = self._adaptive_selection(available_proxies, domain)
+            proxy = self._adaptive_selection(exclude, domain)
         else:
-            proxy = self._random_selection(available_proxies)
+            proxy = self._random_selection(exclude)
         
         if proxy:
             proxy_id = f"{proxy.ip}:{proxy.port}"
@@ -216,119 +356,186 @@ class ProxyRotator:
                 stats.banned_until = datetime.utcnow() + timedelta(seconds=self.ban_duration)
                 logger.warning(f"Banned proxy {proxy_id} for {self.ban_duration}s after {stats.consecutive_failures} consecutive failures")
         
+        if proxy_id in self._slot_of:
+            self._update_index(proxy_id)
+        
         logger.debug(f"Recorded result for {proxy_id}: success={success}, response_time={response_time}")
     
+    def _update_index(self, proxy_id: str):
+        """Re-score one proxy and update the trees and heaps in O(log n)"""
+        stats = self.proxy_stats.get(proxy_id)
+        if stats is None:
+            stats = self.proxy_stats[proxy_id] = ProxyStats(proxy_id=proxy_id)
+        slot = self._slot_of[proxy_id]
+        
+        health = stats.health_score
+        available = not stats.is_banned
+        self._health[proxy_id] = health
+        self._weights.set(slot, health if available else 0.0)
+        self._available.set(slot, 1.0 if available else 0.0)
+        
+        if available:
+            sequence = next(self._sequence)
+            heapq.heappush(self._least_used_heap, (stats.total_requests, sequence, proxy_id))
+            heapq.heappush(self._best_heap, (-health, sequence, proxy_id))
+        
+        # One pending refresh per proxy is enough: it re-scores and reschedules
+        refresh_at = stats.next_score_change
+        pending = self._refresh_due.get(proxy_id)
+        if refresh_at is not None and (pending is None or refresh_at < pending):
+            self._refresh_due[proxy_id] = refresh_at
+            heapq.heappush(self._refresh_heap, (refresh_at, proxy_id))
+        
+        self._updates_since_rebuild += 1
+        if self._updates_since_rebuild > max(10000, 4 * len(self._slot_of)):
+            self._rebuild_index()
+    
+    def _rebuild_index(self):
+        """Drop stale heap entries and reset float drift in the trees"""
+        self._updates_since_rebuild = 0
+        weights = [0.0] * len(self._weights)
+        available = [0.0] * len(self._available)
+        self._least_used_heap = []
+        self._best_heap = []
+        for proxy_id, slot in self._slot_of.items():
+            stats = self.proxy_stats[proxy_id]
+            health = self._health.get(proxy_id, 0.0)
+            if not stats.is_banned:
+                weights[slot] = health
+                available[slot] = 1.0
+                sequence = next(self._sequence)
+                self._least_used_heap.append((stats.total_requests, sequence, proxy_id))
+                self._best_heap.append((-health, sequence, proxy_id))
+        heapq.heapify(self._least_used_heap)
+        heapq.heapify(self._best_heap)
+        self._weights.rebuild(weights)
+        self._available.rebuild(available)
+    
+    def _apply_due_refreshes(self):
+        now = datetime.utcnow()
+        while self._refresh_heap and self._refresh_heap[0][0] <= now:
+            due, proxy_id = heapq.heappop(self._refresh_heap)
+            if self._refresh_due.get(proxy_id) != due:
+                continue  # superseded by an earlier refresh
+            del self._refresh_due[proxy_id]
+            if proxy_id in self._slot_of:
+                self._update_index(proxy_id)
+    
+    def _is_available(self, proxy_id: str) -> bool:
+        slot = self._slot_of.get(proxy_id)
+        return slot is not None and self._available.get(slot) > 0
+    
+    def _has_available(self, exclude: Set[str]) -> bool:
+        total = self._available.total()
+        if total < 0.5:
+            return False
+        excluded = sum(1 for proxy_id in exclude if self._is_available(proxy_id))
+        return total - excluded >= 0.5
+    
+    def _sample(self, tree: FenwickTree, exclude: Set[str]) -> Optional[ProxyInfo]:
+        """Weighted draw from ``tree`` with excluded proxies masked out.
+        
+        Excluded slots are zeroed for the draw and restored afterwards, so
+        the cost is O(k log n) for k exclusions rather than a list copy.
+        """
+        masked = []
+        for proxy_id in exclude:
+            slot = self._slot_of.get(proxy_id)
+            if slot is not None and tree.get(slot) > 0:
+                masked.append((slot, tree.get(slot)))
+                tree.set(slot, 0.0)
+        try:
+            slot = tree.sample()
+        finally:
+            for slot_index, weight in masked:
+                tree.set(slot_index, weight)
+        if slot is None:
+            return None
+        return self._proxy_by_id[self._slot_ids[slot]]
+    
     def _get_available_proxies(self, exclude_proxies: Optional[List[str]] = None) -> List[ProxyInfo]:
         """Get list of available (non-banned) proxies"""
         exclude_set = set(exclude_proxies or [])
-        available = []
-        
-        for proxy in self.proxies:
-            proxy_id = f"{proxy.ip}:{proxy.port}"
-            
-            if proxy_id in exclude_set:
-                continue
-                
-            if proxy_id in self.proxy_stats:
-                if self.proxy_stats[proxy_id].is_banned:
-                    continue
-            
-            available.append(proxy)
-        
-        return available
+        return [
+            proxy for proxy in self.proxies
+            if f"{proxy.ip}:{proxy.port}" not in exclude_set
+            and self._is_available(f"{proxy.ip}:{proxy.port}")
+        ]
     
-    def _round_robin_selection(self, proxies: List[ProxyInfo]) -> Optional[ProxyInfo]:
+    def _round_robin_selection(self, exclude: Set[str]) -> Optional[ProxyInfo]:
         """Round-robin selection"""
-        if not proxies:
-            return None
-            
-        self.round_robin_index = (self.round_robin_index + 1) % len(proxies)
-        return proxies[self.round_robin_index]
+        for _ in range(len(self.proxies)):
+            self.round_robin_index = (self.round_robin_index + 1) % len(self.proxies)
+            proxy = self.proxies[self.round_robin_index]
+            proxy_id = f"{proxy.ip}:{proxy.port}"
+            if proxy_id not in exclude and self._is_available(proxy_id):
+                return proxy
+        return None
     
-    def _random_selection(self, proxies: List[ProxyInfo]) -> Optional[ProxyInfo]:
+    def _random_selection(self, exclude: Set[str]) -> Optional[ProxyInfo]:
         """Random selection"""
-        return random.choice(proxies) if proxies else None
+        return self._sample(self._available, exclude)
     
-    def _weighted_random_selection(self, proxies: List[ProxyInfo]) -> Optional[ProxyInfo]:
+    def _weighted_random_selection(self, exclude: Set[str]) -> Optional[ProxyInfo]:
         """Weighted random selection based on health scores"""
-        if not proxies:
-            return None
-        
-        weights = []
-        for proxy in proxies:
-            proxy_id = f"{proxy.ip}:{proxy.port}"
-            if proxy_id in self.proxy_stats:
-                weight = self.proxy_stats[proxy_id].health_score
-            else:
-                weight = 1.0  # New proxy gets full weight
-            weights.append(weight)
+        proxy = self._sample(self._weights, exclude)
         
         # If all weights are 0, fall back to random
-        if sum(weights) == 0:
-            return self._random_selection(proxies)
+        if proxy is None:
+            return self._random_selection(exclude)
+        return proxy
+    
+    def _pop_best(self, heap: List[Tuple[Any, int, str]], exclude: Set[str],
+                  is_current: Callable[[Any, str], bool]) -> Optional[ProxyInfo]:
+        """Top of a lazily invalidated heap, skipping excluded proxies.
         
-        return random.choices(proxies, weights=weights)[0]
+        Outdated entries (a newer one was pushed when the proxy was re-scored)
+        are discarded; excluded but valid entries are pushed back.
+        """
+        skipped = []
+        selected = None
+        while heap:
+            key, sequence, proxy_id = heap[0]
+            if (proxy_id not in self._slot_of or not self._is_available(proxy_id)
+                    or not is_current(key, proxy_id)):
+                heapq.heappop(heap)
+                continue
+            if proxy_id in exclude:
+                skipped.append(heapq.heappop(heap))
+                continue
+            selected = self._proxy_by_id[proxy_id]
+            break
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return selected
     
-    def _least_used_selection(self, proxies: List[ProxyInfo]) -> Optional[ProxyInfo]:
+    def _least_used_selection(self, exclude: Set[str]) -> Optional[ProxyInfo]:
         """Select the least used proxy"""
-        if not proxies:
-            return None
-        
-        min_usage = float('inf')
-        best_proxy = None
-        
-        for proxy in proxies:
-            proxy_id = f"{proxy.ip}:{proxy.port}"
-            if proxy_id in self.proxy_stats:
-                usage = self.proxy_stats[proxy_id].total_requests
-            else:
-                usage = 0
-            
-            if usage < min_usage:
-                min_usage = usage
-                best_proxy = proxy
-        
-        return best_proxy or proxies[0]
+        return self._pop_best(
+            self._least_used_heap, exclude,
+            lambda requests, proxy_id: self.proxy_stats[proxy_id].total_requests == requests
+        )
     
-    def _best_performance_selection(self, proxies: List[ProxyInfo]) -> Optional[ProxyInfo]:
+    def _best_performance_selection(self, exclude: Set[str]) -> Optional[ProxyInfo]:
         """Select the best performing proxy"""
-        if not proxies:
-            return None
-        
-        best_score = -1
-        best_proxy = None
-        
-        for proxy in proxies:
-            proxy_id = f"{proxy.ip}:{proxy.port}"
-            if proxy_id in self.proxy_stats:
-                score = self.proxy_stats[proxy_id].health_score
-            else:
-                score = 1.0  # New proxy gets benefit of doubt
-            
-            if score > best_score:
-                best_score = score
-                best_proxy = proxy
-        
-        return best_proxy or proxies[0]
+        return self._pop_best(
+            self._best_heap, exclude,
+            lambda neg_health, proxy_id: self._health.get(proxy_id) == -neg_health
+        )
     
-    def _adaptive_selection(self, proxies: List[ProxyInfo], domain: Optional[str] = None) -> Optional[ProxyInfo]:
+    def _adaptive_selection(self, exclude: Set[str], domain: Optional[str] = None) -> Optional[ProxyInfo]:
         """Adaptive selection combining multiple factors"""
-        if not proxies:
-            return None
         
         # Check for sticky session
         if domain and domain in self.domain_proxy_mapping:
             sticky_proxy_id = self.domain_proxy_mapping[domain]
-            for proxy in proxies:
-                if f"{proxy.ip}:{proxy.port}" == sticky_proxy_id:
-                    # Check if sticky proxy is still healthy
-                    if sticky_proxy_id in self.proxy_stats:
-                        if self.proxy_stats[sticky_proxy_id].health_score > 0.5:
-                            return proxy
-                    break
+            if sticky_proxy_id not in exclude and self._is_available(sticky_proxy_id):
+                # Check if sticky proxy is still healthy
+                if self._health.get(sticky_proxy_id, 0.0) > 0.5:
+                    return self._proxy_by_id[sticky_proxy_id]
         
         # Use weighted random selection for general adaptive behavior
-        selected_proxy = self._weighted_random_selection(proxies)
+        selected_proxy = self._weighted_random_selection(exclude)
         
         # Establish sticky session for domain
         if domain and selected_proxy:
@@ -350,6 +557,8 @@ class ProxyRotator:
             if stats.banned_until and current_time >= stats.banned_until:
                 stats.banned_until = None
                 stats.consecutive_failures = 0
+                if proxy_id in self._slot_of:
+                    self._update_index(proxy_id)
                 logger.info(f"Unbanned proxy: {proxy_id}")
         
         logger.debug("Completed proxy health check")
@@ -383,8 +592,13 @@ class ProxyRotator:
         if proxy_id:
             if proxy_id in self.proxy_stats:
                 self.proxy_stats[proxy_id] = ProxyStats(proxy_id=proxy_id)
+                if proxy_id in self._slot_of:
+                    self._update_index(proxy_id)
                 logger.info(f"Reset stats for proxy: {proxy_id}")
         else:
             for proxy_id in self.proxy_stats:
                 self.proxy_stats[proxy_id] = ProxyStats(proxy_id=proxy_id)
+                if proxy_id in self._slot_of:
+                    self._health[proxy_id] = self.proxy_stats[proxy_id].health_score
+            self._rebuild_index()
             logger.info("Reset stats for all proxies")
\ No newline at end of file
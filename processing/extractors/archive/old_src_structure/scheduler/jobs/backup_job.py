@@ -4,10 +4,17 @@ Backup Job Implementation
 
 Implementation of backup jobs for the ECaDP scheduler.
 Handles database backups, file system backups, and backup verification.
+
+Backups are streamed: dump output is compressed, encrypted, checksummed
+and written in a single pass with bounded memory. "full" backups produce
+one self-contained file per target; "incremental" and "differential"
+backups split the stream into content-defined chunks in a local chunk
+store, so data unchanged since an earlier backup is never written again.
 """
 
 import asyncio
 import logging
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Union
 from dataclasses import dataclass, field
@@ -16,11 +23,17 @@ import json
 import shutil
 import subprocess
 import gzip
+import hashlib
 import os
 
 from src.database.manager import DatabaseManager
 from src.webhooks.client import WebhookClient
 
+from .backup_storage import (
+    CRYPTOGRAPHY_AVAILABLE, MANIFEST_SUFFIX, ChunkedSink, ChunkManifest, ChunkStore,
+    ContentDefinedChunker, StreamingFileSink, derive_key, new_salt
+)
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -39,6 +52,14 @@ class BackupJobConfig:
     webhook_url: Optional[str] = None
     include_patterns: List[str] = field(default_factory=list)
     exclude_patterns: List[str] = field(default_factory=list)
+    # Chunk store for incremental/differential backups (default: <output_path>/chunks)
+    chunk_store_path: Optional[str] = None
+    chunk_min_size: int = 256 * 1024
+    chunk_avg_size: int = 1024 * 1024
+    chunk_max_size: int = 4 * 1024 * 1024
+    read_block_size: int = 1024 * 1024
+    # Re-read every backup and compare checksums instead of checking sizes and chunk presence
+    deep_verify: bool = False
 
 @dataclass
 class BackupJobResult:
@@ -88,6 +109,20 @@ class BackupJob:
         # Backup paths
         self.backup_dir = Path(self.config.output_path) / datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         self.backup_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Streaming state
+        self._key: Optional[bytes] = None
+        self._salt: Optional[bytes] = None
+        self._chunk_store: Optional[ChunkStore] = None
+        self._artifacts: Dict[str, Dict[str, Any]] = {}
+    
+    @property
+    def chunked(self) -> bool:
+        return self.config.backup_type in ("incremental", "differential")
+    
+    @property
+    def chunk_store_path(self) -> Path:
+        return Path(self.config.chunk_store_path or Path(self.config.output_path) / "chunks")
     
     async def initialize(self):
         """Initialize job components"""
@@ -128,6 +163,18 @@ class BackupJob:
             # Validate encryption configuration
             if self.config.encryption and not self.config.encryption_key:
                 raise ValueError("Encryption enabled but no key specified")
+            if self.config.encryption and not CRYPTOGRAPHY_AVAILABLE:
+                raise ValueError("Encryption enabled but the cryptography package is not installed")
+            
+            if self.config.backup_type not in ("full", "incremental", "differential"):
+                raise ValueError(f"Unknown backup type: {self.config.backup_type}")
+            
+            if self.chunked:
+                passphrase = self.config.encryption_key if self.config.encryption else None
+                self._chunk_store = await asyncio.to_thread(ChunkStore, self.chunk_store_path, passphrase)
+            elif self.config.encryption:
+                self._salt = new_salt()
+                self._key = await asyncio.to_thread(derive_key, self.config.encryption_key, self._salt)
             
             logger.info("Backup configuration validated")
             
@@ -147,28 +194,15 @@ class BackupJob:
             # Get database connection info
             db_config = await self.db_manager.get_connection_config()
             
-            # Create database backup filename
+            # Stream the dump straight into the backup sink
             timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-            backup_filename = f"database_backup_{timestamp}.sql"
-            backup_path = self.backup_dir / backup_filename
-            
-            # Perform database dump
-            await self._perform_database_dump(db_config, backup_path)
-            
-            # Compress if requested
-            if self.config.compression:
-                compressed_path = await self._compress_file(backup_path)
-                backup_path.unlink()  # Remove uncompressed file
-                backup_path = compressed_path
-            
-            # Encrypt if requested
-            if self.config.encryption:
-                encrypted_path = await self._encrypt_file(backup_path)
-                backup_path.unlink()  # Remove unencrypted file
-                backup_path = encrypted_path
-            
-            self.result.backup_files.append(str(backup_path))
-            self.result.backup_size += backup_path.stat().st_size
+            sink, backup_path = self._open_sink(f"database_backup_{timestamp}.sql", "database")
+            try:
+                await self._perform_database_dump(db_config, sink)
+            except BaseException:
+                self._abort_sink(sink)
+                raise
+            await self._close_sink(sink, backup_path)
             
             logger.info(f"Database backup completed: {backup_path}")
             
@@ -178,10 +212,10 @@ class BackupJob:
             self.result.errors.append(error_msg)
             raise
     
-    async def _perform_database_dump(self, db_config: Dict[str, Any], output_path: Path):
-        """Perform the actual database dump"""
+    async def _perform_database_dump(self, db_config: Dict[str, Any], sink):
+        """Run pg_dump and stream its output into ``sink``"""
         try:
-            # Build pg_dump command
+            # Build pg_dump command; output goes to stdout
             cmd = [
                 "pg_dump",
                 f"--host={db_config['host']}",
@@ -191,8 +225,7 @@ class BackupJob:
                 "--no-password",
                 "--verbose",
                 "--clean",
-                "--create",
-                f"--file={output_path}"
+                "--create"
             ]
             
             # Set environment for password
@@ -204,13 +237,36 @@ class BackupJob:
                 *cmd,
                 env=env,
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stderr=asyncio.subprocess.PIPE,
+                limit=self.config.read_block_size
             )
             
-            stdout, stderr = await process.communicate()
+            # Drain --verbose output concurrently so pg_dump never blocks on
+            # a full stderr pipe; only the tail is kept for error messages
+            stderr_tail: deque = deque(maxlen=50)
+            
+            async def drain_stderr():
+                async for line in process.stderr:
+                    stderr_tail.append(line.decode(errors='replace').rstrip())
+            
+            stderr_task = asyncio.create_task(drain_stderr())
+            try:
+                while True:
+                    block = await process.stdout.read(self.config.read_block_size)
+                    if not block:
+                        break
+                    # Compression/encryption/chunk writes are CPU and disk bound
+                    await asyncio.to_thread(sink.write, block)
+            except BaseException:
+                if process.returncode is None:
+                    process.kill()
+                raise
+            finally:
+                await process.wait()
+                await stderr_task
             
             if process.returncode != 0:
-                raise RuntimeError(f"pg_dump failed: {stderr.decode()}")
+                raise RuntimeError(f"pg_dump failed: {chr(10).join(stderr_tail)}")
             
             logger.info("Database dump completed successfully")
             
@@ -218,6 +274,71 @@ class BackupJob:
             logger.error(f"Database dump failed: {e}")
             raise
     
+    def _open_sink(self, name: str, target: str):
+        """Create the sink for one backup stream; returns ``(sink, path)``"""
+        if self.chunked:
+            path = self.backup_dir / f"{name}{MANIFEST_SUFFIX}"
+            parent = self._latest_manifest(target)
+            manifest = ChunkManifest(
+                name=name,
+                backup_type=self.config.backup_type,
+                created_at=datetime.utcnow().isoformat(),
+                parent=str(parent) if parent else None
+            )
+            chunker = ContentDefinedChunker(
+                min_size=self.config.chunk_min_size,
+                avg_size=self.config.chunk_avg_size,
+                max_size=self.config.chunk_max_size
+            )
+            return ChunkedSink(self._chunk_store, manifest, chunker), path
+        
+        path = self.backup_dir / name
+        if self.config.compression:
+            path = path.with_name(path.name + '.gz')
+        if self.config.encryption:
+            path = path.with_name(path.name + '.enc')
+        return StreamingFileSink(path, compress=self.config.compression, key=self._key, salt=self._salt), path
+    
+    async def _close_sink(self, sink, path: Path):
+        """Finish a sink and record the artifact"""
+        if isinstance(sink, ChunkedSink):
+            # Saved and registered before the sink releases its store lock
+            manifest = await asyncio.to_thread(sink.close, path)
+            artifact = {
+                'size': manifest.size,
+                'sha256': manifest.sha256,
+                'chunks': len(manifest.chunks),
+                'new_chunks': manifest.new_chunks,
+                'reused_chunks': manifest.reused_chunks,
+                'bytes_written': manifest.new_bytes
+            }
+            logger.info(f"Chunked backup {path.name}: {manifest.new_chunks} new, "
+                        f"{manifest.reused_chunks} reused chunks, {manifest.new_bytes} bytes written")
+        else:
+            stats = await asyncio.to_thread(sink.close)
+            # Checksum of the file as written, so it can be checked without decrypting
+            artifact = {
+                'size': stats['bytes_in'],
+                'sha256': stats['sha256'],
+                'bytes_written': stats['bytes_out']
+            }
+        
+        self._artifacts[str(path)] = artifact
+        self.result.backup_files.append(str(path))
+        self.result.backup_size += artifact['bytes_written']
+        self.result.metadata.setdefault('artifacts', {})[path.name] = artifact
+    
+    def _abort_sink(self, sink):
+        sink.abort()
+    
+    def _latest_manifest(self, target: str) -> Optional[Path]:
+        """Most recent chunk manifest for a target from an earlier backup run"""
+        manifests = [
+            path for path in Path(self.config.output_path).glob(f"*/{target}_backup_*{MANIFEST_SUFFIX}")
+            if path.parent != self.backup_dir
+        ]
+        return max(manifests, key=lambda path: path.name, default=None)
+    
     async def backup_files(self):
         """Perform file system backup"""
         try:
@@ -236,28 +357,15 @@ class BackupJob:
                     "src/**"
                 ]
             
-            # Create file backup archive
+            # Stream a tar archive straight into the backup sink
             timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-            backup_filename = f"files_backup_{timestamp}.tar"
-            backup_path = self.backup_dir / backup_filename
-            
-            # Create tar archive
-            await self._create_file_archive(backup_path)
-            
-            # Compress if requested
-            if self.config.compression:
-                compressed_path = await self._compress_file(backup_path)
-                backup_path.unlink()  # Remove uncompressed file
-                backup_path = compressed_path
-            
-            # Encrypt if requested
-            if self.config.encryption:
-                encrypted_path = await self._encrypt_file(backup_path)
-                backup_path.unlink()  # Remove unencrypted file
-                backup_path = encrypted_path
-            
-            self.result.backup_files.append(str(backup_path))
-            self.result.backup_size += backup_path.stat().st_size
+            sink, backup_path = self._open_sink(f"files_backup_{timestamp}.tar", "files")
+            try:
+                await asyncio.to_thread(self._create_file_archive, sink)
+            except BaseException:
+                self._abort_sink(sink)
+                raise
+            await self._close_sink(sink, backup_path)
             
             logger.info(f"File backup completed: {backup_path}")
             
@@ -267,68 +375,37 @@ class BackupJob:
             self.result.errors.append(error_msg)
             raise
     
-    async def _create_file_archive(self, output_path: Path):
-        """Create tar archive of specified files"""
+    def _create_file_archive(self, fileobj):
+        """Write a tar stream of the specified files to ``fileobj``"""
         try:
             import tarfile
+            import glob
+            import fnmatch
             
-            with tarfile.open(output_path, 'w') as tar:
+            # Stream mode: members are written sequentially, nothing is seeked
+            with tarfile.open(fileobj=fileobj, mode='w|') as tar:
                 for pattern in self.config.include_patterns:
                     # Use glob to find matching files
-                    import glob
                     matching_files = glob.glob(pattern, recursive=True)
                     
                     for file_path in matching_files:
                         # Check exclusion patterns
-                        should_exclude = False
-                        for exclude_pattern in self.config.exclude_patterns:
-                            if glob.fnmatch.fnmatch(file_path, exclude_pattern):
-                                should_exclude = True
-                                break
+                        should_exclude = any(
+                            fnmatch.fnmatch(file_path, exclude_pattern)
+                            for exclude_pattern in self.config.exclude_patterns
+                        )
                         
-                        if not should_exclude and Path(file_path).exists():
-                            tar.add(file_path)
+                        # Directories are recreated from their files' paths
+                        if not should_exclude and Path(file_path).is_file():
+                            tar.add(file_path, recursive=False)
                             logger.debug(f"Added to archive: {file_path}")
             
-            logger.info(f"File archive created: {output_path}")
+            logger.info("File archive streamed")
             
         except Exception as e:
             logger.error(f"Failed to create file archive: {e}")
             raise
     
-    async def _compress_file(self, file_path: Path) -> Path:
-        """Compress a file using gzip"""
-        try:
-            compressed_path = file_path.with_suffix(file_path.suffix + '.gz')
-            
-            with open(file_path, 'rb') as f_in:
-                with gzip.open(compressed_path, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
-            
-            logger.info(f"File compressed: {compressed_path}")
-            return compressed_path
-            
-        except Exception as e:
-            logger.error(f"File compression failed: {e}")
-            raise
-    
-    async def _encrypt_file(self, file_path: Path) -> Path:
-        """Encrypt a file (placeholder implementation)"""
-        try:
-            # This is a placeholder implementation
-            # In production, use proper encryption libraries like cryptography
-            encrypted_path = file_path.with_suffix(file_path.suffix + '.enc')
-            
-            # For now, just copy the file (implement actual encryption)
-            shutil.copy2(file_path, encrypted_path)
-            
-            logger.info(f"File encrypted: {encrypted_path}")
-            return encrypted_path
-            
-        except Exception as e:
-            logger.error(f"File encryption failed: {e}")
-            raise
-    
     async def verify_backup(self):
         """Verify backup integrity"""
         try:
@@ -341,40 +418,8 @@ class BackupJob:
             verification_passed = True
             
             for backup_file in self.result.backup_files:
-                backup_path = Path(backup_file)
-                
-                # Check if file exists and is readable
-                if not backup_path.exists():
-                    logger.error(f"Backup file not found: {backup_file}")
+                if not await asyncio.to_thread(self._verify_artifact, backup_file):
                     verification_passed = False
-                    continue
-                
-                # Check file size
-                if backup_path.stat().st_size == 0:
-                    logger.error(f"Backup file is empty: {backup_file}")
-                    verification_passed = False
-                    continue
-                
-                # Verify compressed files can be opened
-                if backup_file.endswith('.gz'):
-                    try:
-                        with gzip.open(backup_path, 'rb') as f:
-                            f.read(1024)  # Read first 1KB to verify
-                        logger.debug(f"Compressed backup verified: {backup_file}")
-                    except Exception as e:
-                        logger.error(f"Compressed backup verification failed: {backup_file}: {e}")
-                        verification_passed = False
-                
-                # Verify tar archives
-                if '.tar' in backup_file:
-                    try:
-                        import tarfile
-                        with tarfile.open(backup_path, 'r') as tar:
-                            tar.getmembers()  # List members to verify integrity
-                        logger.debug(f"Archive backup verified: {backup_file}")
-                    except Exception as e:
-                        logger.error(f"Archive backup verification failed: {backup_file}: {e}")
-                        verification_passed = False
             
             self.result.verification_passed = verification_passed
             
@@ -390,6 +435,65 @@ class BackupJob:
             self.result.errors.append(error_msg)
             self.result.verification_passed = False
     
+    def _verify_artifact(self, backup_file: str) -> bool:
+        """Check one backup artifact against what was recorded while writing it"""
+        backup_path = Path(backup_file)
+        expected = self._artifacts.get(backup_file, {})
+        
+        # Check if file exists and is readable
+        if not backup_path.exists():
+            logger.error(f"Backup file not found: {backup_file}")
+            return False
+        
+        if backup_file.endswith(MANIFEST_SUFFIX):
+            manifest = ChunkManifest.load(backup_path)
+            missing = self._chunk_store.missing(manifest)
+            if missing:
+                logger.error(f"Backup {backup_file} references {len(missing)} missing chunks")
+                return False
+            if self.config.deep_verify:
+                digest = hashlib.sha256()
+                try:
+                    for data in self._chunk_store.read(manifest):
+                        digest.update(data)
+                except Exception as e:
+                    logger.error(f"Chunked backup verification failed: {backup_file}: {e}")
+                    return False
+                if digest.hexdigest() != manifest.sha256:
+                    logger.error(f"Chunked backup checksum mismatch: {backup_file}")
+                    return False
+            logger.debug(f"Chunked backup verified: {backup_file}")
+            return True
+        
+        # Size and checksum were recorded in the same pass that wrote the file
+        if backup_path.stat().st_size != expected.get('bytes_written', backup_path.stat().st_size):
+            logger.error(f"Backup file size mismatch: {backup_file}")
+            return False
+        if backup_path.stat().st_size == 0:
+            logger.error(f"Backup file is empty: {backup_file}")
+            return False
+        
+        if self.config.deep_verify:
+            digest = hashlib.sha256()
+            with open(backup_path, 'rb') as f:
+                for block in iter(lambda: f.read(self.config.read_block_size), b''):
+                    digest.update(block)
+            if digest.hexdigest() != expected.get('sha256', digest.hexdigest()):
+                logger.error(f"Backup checksum mismatch: {backup_file}")
+                return False
+        
+        # Verify compressed files can be opened
+        if backup_file.endswith('.gz'):
+            try:
+                with gzip.open(backup_path, 'rb') as f:
+                    f.read(1024)  # Read first 1KB to verify
+                logger.debug(f"Compressed backup verified: {backup_file}")
+            except Exception as e:
+                logger.error(f"Compressed backup verification failed: {backup_file}: {e}")
+                return False
+        
+        return True
+    
     async def upload_to_cloud(self):
         """Upload backup to cloud storage (placeholder)"""
         try:
@@ -448,6 +552,21 @@ class BackupJob:
                 logger.info(f"Cleaned up {deleted_count} old backups, freed {deleted_size} bytes")
             else:
                 logger.info("No old backups to clean up")
+            
+            # Drop chunks no remaining manifest refers to
+            if self.chunk_store_path.is_dir():
+                referenced = set()
+                for manifest_path in backup_root.glob(f"*/*{MANIFEST_SUFFIX}"):
+                    referenced.update(ChunkManifest.load(manifest_path).chunks)
+                # Deleting needs no key; manifests of other jobs are found through the store registry
+                store = self._chunk_store or ChunkStore(self.chunk_store_path)
+                gc_stats = await asyncio.to_thread(store.garbage_collect, referenced)
+                self.result.metadata['chunk_gc'] = gc_stats
+                if gc_stats['skipped']:
+                    logger.info("Chunk store in use by another backup, garbage collection skipped")
+                elif gc_stats['chunks_removed']:
+                    logger.info(f"Removed {gc_stats['chunks_removed']} unreferenced chunks, "
+                                f"freed {gc_stats['bytes_freed']} bytes")
                 
         except Exception as e:
             error_msg = f"Backup cleanup failed: {str(e)}"
@@ -467,6 +586,15 @@ class BackupJob:
                 'error_count': len(self.result.errors),
                 'runtime_seconds': (datetime.utcnow() - self.result.start_time).total_seconds()
             }
+            if self.chunked:
+                artifacts = self.result.metadata.get('artifacts', {}).values()
+                logical_size = sum(a['size'] for a in artifacts)
+                self.result.statistics.update({
+                    'logical_size': logical_size,
+                    'new_chunks': sum(a['new_chunks'] for a in artifacts),
+                    'reused_chunks': sum(a['reused_chunks'] for a in artifacts),
+                    'dedup_ratio': round(1 - self.result.backup_size / logical_size, 4) if logical_size else 0.0
+                })
             
             # Generate JSON report
             report_path = self.backup_dir / "backup_report.json"
@@ -0,0 +1,517 @@
+"""
+Backup Storage
+==============
+
+Streaming building blocks for BackupJob:
+
+- ``StreamingFileSink`` - one pass from the data source to a single
+  ``.gz[.enc]`` file: compress, encrypt and checksum as bytes arrive
+- ``ContentDefinedChunker`` - splits a stream at content-defined
+  boundaries, so an insertion early in a dump only changes the chunks
+  around it instead of shifting every later chunk
+- ``ChunkStore`` - local content-addressed store; a chunk is written
+  once and referenced by every backup that contains it
+- ``ChunkedSink`` - writes a stream into a ChunkStore and returns the
+  manifest that reassembles it
+
+Memory use is bounded by the chunk size, not by the size of the backup.
+
+Encryption uses AES-256-GCM from the optional ``cryptography`` package.
+Keys are derived from the configured passphrase with scrypt and a random
+salt: one per encrypted file, stored in its header, and one per chunk
+store, stored in ``store.json``. A store derives separate HKDF subkeys
+for chunk ids and chunk encryption. With encryption enabled, chunk ids
+are HMACs of the content, so identical data still deduplicates but
+plaintext hashes are not exposed in the store.
+
+Writers hold a shared lock on the store until their manifest is saved,
+and garbage collection takes it exclusively. GC also spares recently
+written or reused chunks, and collects references from every manifest
+registered with the store, not only those of the job running it.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Union
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    CRYPTOGRAPHY_AVAILABLE = True
+except ImportError:
+    CRYPTOGRAPHY_AVAILABLE = False
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, the GC grace period still applies
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ENCRYPTED_MAGIC = b"ECADPENC2"
+NONCE_SIZE = 12
+TAG_SIZE = 16
+SALT_SIZE = 16
+
+MANIFEST_SUFFIX = ".manifest.json"
+STORE_CONFIG = "store.json"
+STORE_LOCK = ".lock"
+MANIFEST_REGISTRY = "manifests"
+# Chunks and temporary files younger than this are never garbage collected
+GC_GRACE_PERIOD = 6 * 3600
+
+
+def new_salt() -> bytes:
+    return os.urandom(SALT_SIZE)
+
+
+def derive_key(passphrase: str, salt: bytes) -> bytes:
+    """32-byte key from a passphrase and a random salt"""
+    return hashlib.scrypt(passphrase.encode("utf-8"), salt=salt, n=2 ** 14, r=8, p=1, dklen=32)
+
+
+def hkdf_subkey(key: bytes, info: bytes, length: int = 32) -> bytes:
+    """HKDF-SHA256 (RFC 5869) subkey of ``key`` for one purpose"""
+    prk = hmac.new(b"\0" * hashlib.sha256().digest_size, key, hashlib.sha256).digest()
+    output = b""
+    block = b""
+    counter = 1
+    while len(output) < length:
+        block = hmac.new(prk, block + info + bytes([counter]), hashlib.sha256).digest()
+        output += block
+        counter += 1
+    return output[:length]
+
+
+def _require_cryptography():
+    if not CRYPTOGRAPHY_AVAILABLE:
+        raise RuntimeError("Backup encryption requires the 'cryptography' package")
+
+
+# -- single-file streaming ----------------------------------------------------
+
+class StreamingFileSink:
+    """
+    File-like sink: compress -> encrypt -> checksum -> write, in one pass.
+
+    Compressed output is a regular gzip stream. Encrypted output is
+    ``ENCRYPTED_MAGIC + salt + nonce + ciphertext + tag`` (AES-256-GCM),
+    where ``key`` was derived with ``salt``. The checksum is the SHA-256 of
+    the bytes written to disk.
+    """
+
+    def __init__(self, path: Union[str, Path], compress: bool = True,
+                 key: Optional[bytes] = None, compression_level: int = 6, salt: Optional[bytes] = None):
+        self.path = Path(path)
+        self._tmp_path = self.path.with_name(self.path.name + ".partial")
+        self._file: BinaryIO = open(self._tmp_path, "wb")
+        self._compressor = zlib.compressobj(compression_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+        self._encryptor = None
+        self._sha256 = hashlib.sha256()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+        if key is not None:
+            _require_cryptography()
+            if salt is None or len(salt) != SALT_SIZE:
+                raise ValueError("Encrypted files need the salt their key was derived with")
+            nonce = os.urandom(NONCE_SIZE)
+            self._encryptor = Cipher(algorithms.AES(key), modes.GCM(nonce)).encryptor()
+            self._emit(ENCRYPTED_MAGIC + salt + nonce)
+
+    def _emit(self, data: bytes):
+        if data:
+            self._sha256.update(data)
+            self._file.write(data)
+            self.bytes_out += len(data)
+
+    def _process(self, data: bytes):
+        if self._encryptor is not None:
+            data = self._encryptor.update(data)
+        self._emit(data)
+
+    def write(self, data: bytes) -> int:
+        self.bytes_in += len(data)
+        self._process(self._compressor.compress(data) if self._compressor else bytes(data))
+        return len(data)
+
+    def close(self) -> Dict[str, Any]:
+        """Finish the stream, fsync and move the file into place"""
+        if self._compressor is not None:
+            self._process(self._compressor.flush())
+        if self._encryptor is not None:
+            self._emit(self._encryptor.finalize())
+            self._emit(self._encryptor.tag)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        return {
+            "path": str(self.path),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "sha256": self._sha256.hexdigest()
+        }
+
+    def abort(self):
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+# -- content-defined chunking -------------------------------------------------
+
+class ContentDefinedChunker:
+    """
+    Split a byte stream at content-defined boundaries.
+
+    Boundaries are placed at line ends whose preceding ``window`` bytes
+    hash to zero under ``mask``, which suits SQL dumps and tar streams of
+    text files. Chunks are at least ``min_size`` long, and a chunk with no
+    qualifying line end is cut at ``max_size``. Only the current chunk is
+    buffered.
+    """
+
+    def __init__(self, min_size: int = 256 * 1024, avg_size: int = 1024 * 1024,
+                 max_size: int = 4 * 1024 * 1024, window: int = 64):
+        if not min_size < avg_size < max_size:
+            raise ValueError("Chunk sizes must satisfy min_size < avg_size < max_size")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.window = window
+        # Average line length is unknown; aim for one boundary per
+        # (avg - min) bytes assuming ~100 byte lines
+        self.mask = (1 << max(1, ((avg_size - min_size) // 100).bit_length() - 1)) - 1
+        self._buffer = bytearray()
+        self._scan_from = 0
+
+    def _find_boundary(self) -> int:
+        buffer = self._buffer
+        position = max(self._scan_from, self.min_size)
+        limit = min(len(buffer), self.max_size)
+        while position < limit:
+            newline = buffer.find(b"\n", position, limit)
+            if newline < 0:
+                break
+            end = newline + 1
+            if zlib.crc32(buffer[max(0, end - self.window):end]) & self.mask == 0:
+                return end
+            position = end
+        if len(buffer) >= self.max_size:
+            return self.max_size
+        self._scan_from = max(self.min_size, limit)
+        return -1
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        """Add data and yield every chunk that is now complete"""
+        self._buffer += data
+        while True:
+            boundary = self._find_boundary()
+            if boundary < 0:
+                return
+            chunk = bytes(self._buffer[:boundary])
+            del self._buffer[:boundary]
+            self._scan_from = 0
+            yield chunk
+
+    def flush(self) -> Iterator[bytes]:
+        """Yield the remaining data as the last chunk"""
+        if self._buffer:
+            chunk = bytes(self._buffer)
+            self._buffer.clear()
+            self._scan_from = 0
+            yield chunk
+
+
+# -- chunk store --------------------------------------------------------------
+
+@dataclass
+class ChunkManifest:
+    """Ordered list of chunks that reassemble one backed-up stream"""
+    name: str
+    backup_type: str
+    created_at: str
+    chunks: List[str] = field(default_factory=list)
+    size: int = 0
+    sha256: str = ""
+    encrypted: bool = False
+    new_chunks: int = 0
+    new_bytes: int = 0
+    reused_chunks: int = 0
+    parent: Optional[str] = None
+
+    def save(self, path: Union[str, Path]):
+        tmp = Path(str(path) + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.__dict__, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "ChunkManifest":
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+
+class ChunkStore:
+    """
+    Local content-addressed chunk store.
+
+    Each chunk is stored once under ``<root>/<id[:2]>/<id>``, compressed
+    and, with a passphrase, encrypted with its own random nonce. The
+    store's KDF salt lives in ``<root>/store.json``; saved manifests are
+    registered under ``<root>/manifests`` so that garbage collection sees
+    every backup using the store.
+    """
+
+    def __init__(self, root: Union[str, Path], passphrase: Optional[str] = None, compression_level: int = 6):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.compression_level = compression_level
+        self.key = None
+        self._id_key = None
+        self._aead = None
+        if passphrase is not None:
+            _require_cryptography()
+            self.key = derive_key(passphrase, self._salt())
+            self._id_key = hkdf_subkey(self.key, b"ecadp chunk id")
+            self._aead = AESGCM(hkdf_subkey(self.key, b"ecadp chunk encryption"))
+
+    def _salt(self) -> bytes:
+        """The store's KDF salt, created on first use"""
+        path = self.root / STORE_CONFIG
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "x", encoding="utf-8") as f:
+                json.dump({"version": 2, "kdf": "scrypt", "salt": new_salt().hex()}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            # Linking fails if another writer created the config first
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            tmp.unlink(missing_ok=True)
+        with open(path, encoding="utf-8") as f:
+            return bytes.fromhex(json.load(f)["salt"])
+
+    def chunk_id(self, data: bytes) -> str:
+        if self._id_key is not None:
+            return hmac.new(self._id_key, data, hashlib.sha256).hexdigest()
+        return hashlib.sha256(data).hexdigest()
+
+    @contextmanager
+    def lock(self, exclusive: bool = False, blocking: bool = True) -> Iterator[bool]:
+        """
+        Hold the store lock: shared for writers, exclusive for GC.
+
+        Yields False if ``blocking`` is off and the lock is taken.
+        """
+        handle = self.acquire_lock(exclusive, blocking)
+        try:
+            yield handle is not None
+        finally:
+            self.release_lock(handle)
+
+    def acquire_lock(self, exclusive: bool = False, blocking: bool = True) -> Optional[BinaryIO]:
+        """Open and lock the store lock file; None if not blocking and it is taken"""
+        handle = open(self.root / STORE_LOCK, "a+b")
+        if fcntl is None:
+            return handle
+        flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        try:
+            fcntl.flock(handle.fileno(), flags if blocking else flags | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            return None
+        return handle
+
+    @staticmethod
+    def release_lock(handle: Optional[BinaryIO]):
+        if handle is not None:
+            # Closing the file releases the flock
+            handle.close()
+
+    def _path(self, chunk_id: str) -> Path:
+        return self.root / chunk_id[:2] / chunk_id
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return self._path(chunk_id).exists()
+
+    def put(self, data: bytes) -> tuple:
+        """Store a chunk unless present; returns ``(chunk_id, bytes_written)``"""
+        chunk_id = self.chunk_id(data)
+        path = self._path(chunk_id)
+        if path.exists():
+            # A reused chunk counts as new for the GC grace period
+            os.utime(path)
+            return chunk_id, 0
+
+        payload = zlib.compress(data, self.compression_level)
+        if self._aead is not None:
+            nonce = os.urandom(NONCE_SIZE)
+            payload = nonce + self._aead.encrypt(nonce, payload, chunk_id.encode("ascii"))
+
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        return chunk_id, len(payload)
+
+    def get(self, chunk_id: str) -> bytes:
+        payload = self._path(chunk_id).read_bytes()
+        if self._aead is not None:
+            payload = self._aead.decrypt(payload[:NONCE_SIZE], payload[NONCE_SIZE:], chunk_id.encode("ascii"))
+        data = zlib.decompress(payload)
+        if self.chunk_id(data) != chunk_id:
+            raise ValueError(f"Chunk {chunk_id} is corrupt")
+        return data
+
+    def read(self, manifest: ChunkManifest) -> Iterator[bytes]:
+        """Yield the original stream of a manifest, chunk by chunk"""
+        for chunk_id in manifest.chunks:
+            yield self.get(chunk_id)
+
+    def missing(self, manifest: ChunkManifest) -> List[str]:
+        return [chunk_id for chunk_id in manifest.chunks if chunk_id not in self]
+
+    def register_manifest(self, manifest_path: Union[str, Path]):
+        """Record a saved manifest, so GC keeps its chunks for as long as it exists"""
+        manifest_path = str(Path(manifest_path).resolve())
+        registry = self.root / MANIFEST_REGISTRY
+        registry.mkdir(exist_ok=True)
+        entry = registry / hashlib.sha256(manifest_path.encode("utf-8")).hexdigest()[:32]
+        tmp = entry.with_name(entry.name + ".tmp")
+        tmp.write_text(manifest_path, encoding="utf-8")
+        os.replace(tmp, entry)
+
+    def registered_chunks(self) -> Set[str]:
+        """Chunk ids referenced by the registered manifests that still exist"""
+        referenced: Set[str] = set()
+        registry = self.root / MANIFEST_REGISTRY
+        if not registry.is_dir():
+            return referenced
+        for entry in registry.iterdir():
+            if entry.name.endswith(".tmp"):
+                continue
+            manifest_path = Path(entry.read_text(encoding="utf-8"))
+            if not manifest_path.exists():
+                # The backup was deleted by retention
+                entry.unlink(missing_ok=True)
+                continue
+            # An unreadable manifest aborts the GC rather than orphaning its chunks
+            referenced.update(ChunkManifest.load(manifest_path).chunks)
+        return referenced
+
+    def garbage_collect(self, referenced: Optional[Set[str]] = None,
+                        grace_period: float = GC_GRACE_PERIOD) -> Dict[str, Any]:
+        """
+        Delete chunks no manifest refers to.
+
+        Runs only under the exclusive store lock and is skipped while any
+        writer holds the store. ``referenced`` is added to the chunks of
+        every registered manifest; chunks and ``.tmp`` files modified
+        within ``grace_period`` seconds are kept.
+        """
+        removed = 0
+        freed = 0
+        with self.lock(exclusive=True, blocking=False) as locked:
+            if not locked:
+                logger.info(f"Chunk store {self.root} is in use, skipping garbage collection")
+                return {"chunks_removed": 0, "bytes_freed": 0, "skipped": True}
+
+            referenced = set(referenced or ()) | self.registered_chunks()
+            cutoff = time.time() - grace_period
+            for path in self.root.glob("??/*"):
+                stat = path.stat()
+                if stat.st_mtime > cutoff:
+                    continue
+                if path.name.endswith(".tmp") or path.name not in referenced:
+                    freed += stat.st_size
+                    path.unlink()
+                    removed += 1
+        return {"chunks_removed": removed, "bytes_freed": freed, "skipped": False}
+
+
+class ChunkedSink:
+    """
+    File-like sink that chunks a stream into a ChunkStore.
+
+    Holds a shared store lock from creation until the manifest is saved
+    by ``close`` (or the sink is aborted), so GC cannot remove chunks that
+    no saved manifest refers to yet.
+    """
+
+    def __init__(self, store: ChunkStore, manifest: ChunkManifest,
+                 chunker: Optional[ContentDefinedChunker] = None):
+        self.store = store
+        self.manifest = manifest
+        self.chunker = chunker or ContentDefinedChunker()
+        self._sha256 = hashlib.sha256()
+        self.manifest.encrypted = store.key is not None
+        self._lock = store.acquire_lock(exclusive=False)
+
+    def _store(self, chunk: bytes):
+        chunk_id, written = self.store.put(chunk)
+        self.manifest.chunks.append(chunk_id)
+        if written:
+            self.manifest.new_chunks += 1
+            self.manifest.new_bytes += written
+        else:
+            self.manifest.reused_chunks += 1
+
+    def write(self, data: bytes) -> int:
+        self._sha256.update(data)
+        self.manifest.size += len(data)
+        for chunk in self.chunker.feed(data):
+            self._store(chunk)
+        return len(data)
+
+    def close(self, manifest_path: Optional[Union[str, Path]] = None) -> ChunkManifest:
+        """Store the last chunk; with ``manifest_path``, save and register the manifest"""
+        try:
+            for chunk in self.chunker.flush():
+                self._store(chunk)
+            self.manifest.sha256 = self._sha256.hexdigest()
+            if manifest_path is not None:
+                self.manifest.save(manifest_path)
+                self.store.register_manifest(manifest_path)
+            return self.manifest
+        finally:
+            self.abort()
+
+    def abort(self):
+        """Release the store lock without saving a manifest"""
+        self.store.release_lock(self._lock)
+        self._lock = None
+
+
+def restore_chunked_backup(manifest_path: Union[str, Path], store_root: Union[str, Path],
+                           destination: Union[str, Path], encryption_key: Optional[str] = None) -> Dict[str, Any]:
+    """Reassemble a chunked backup into ``destination`` and verify its checksum"""
+    manifest = ChunkManifest.load(manifest_path)
+    if manifest.encrypted and encryption_key is None:
+        raise ValueError("Backup is encrypted; an encryption key is required")
+    store = ChunkStore(store_root, passphrase=encryption_key if manifest.encrypted else None)
+
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(destination, "wb") as f:
+        for data in store.read(manifest):
+            sha256.update(data)
+            size += len(data)
+            f.write(data)
+    if sha256.hexdigest() != manifest.sha256:
+        raise ValueError(f"Restored data does not match manifest checksum: {manifest_path}")
+    return {"path": str(destination), "size": size, "sha256": manifest.sha256}
@@ -6,29 +6,81 @@ Implements:
 - Proxy pool state snapshots
 - Cache validation and recovery
 - Performance metrics tracking
+
+Snapshots stream each keyspace into a gzipped JSON-lines file: keys are
+scanned in batches, values and TTLs are read with one pipelined round
+trip per batch and written while the next batch is fetched, so memory
+stays bounded by the batch size. In "dump" mode values are DUMP payloads
+restored with pipelined RESTORE (exact, but tied to the Redis version);
+"native" mode stores type-specific reads that restore on any version.
 """
 
 import asyncio
+import base64
+import gzip
 import json
 import logging
+import time
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterator
 import redis.asyncio as redis
-import boto3
 from pathlib import Path
 
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+SNAPSHOT_FORMAT = "redis-snapshot"
+SNAPSHOT_VERSION = 1
+
+
+def _b64(value: bytes) -> str:
+    return base64.b64encode(value).decode("ascii")
+
+
+def _unb64(value: str) -> bytes:
+    return base64.b64decode(value)
+
+
+def _encode_native(data_type: str, value: Any) -> Any:
+    """JSON-safe, lossless form of a type-specific read"""
+    if data_type == "string":
+        return _b64(value)
+    if data_type == "hash":
+        return {_b64(k): _b64(v) for k, v in value.items()}
+    if data_type in ("list", "set"):
+        return [_b64(member) for member in value]
+    if data_type == "zset":
+        return [[_b64(member), score] for member, score in value]
+    raise ValueError(f"Unsupported Redis type: {data_type}")
+
+
 class RedisSnapshotJob:
     """Manages Redis data snapshots and backups."""
     
+    # Snapshot name -> key pattern
+    KEYSPACES = {
+        "proxy_pool": "proxy:*",
+        "cache_data": "cache:*",
+        "session_data": "session:*",
+        "metrics_data": "metrics:*"
+    }
+    
     def __init__(self, redis_url: str = "redis://localhost:6379", 
-                 backup_location: str = "data/redis_backups"):
+                 backup_location: str = "data/redis_backups",
+                 mode: str = "dump",
+                 batch_size: int = 1000,
+                 scan_count: int = 1000,
+                 compression_level: int = 6):
+        if mode not in ("dump", "native"):
+            raise ValueError(f"Unknown snapshot mode: {mode}")
         self.redis_url = redis_url
         self.backup_location = Path(backup_location)
         self.backup_location.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self.batch_size = batch_size
+        self.scan_count = scan_count
+        self.compression_level = compression_level
         self._redis_client = None
     
     async def _get_redis_client(self) -> redis.Redis:
@@ -45,13 +97,9 @@ class RedisSnapshotJob:
             redis_client = await self._get_redis_client()
             timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
             
-            results = {
-                "timestamp": timestamp,
-                "proxy_pool": await self._backup_proxy_pool(redis_client, timestamp),
-                "cache_data": await self._backup_cache_data(redis_client, timestamp),
-                "session_data": await self._backup_session_data(redis_client, timestamp),
-                "metrics": await self._backup_metrics(redis_client, timestamp)
-            }
+            results = {"timestamp": timestamp, "mode": self.mode}
+            for name, pattern in self.KEYSPACES.items():
+                results[name] = await self.snapshot_keyspace(redis_client, name, pattern, timestamp)
             
             # Create summary snapshot
             summary_file = self.backup_location / f"snapshot_summary_{timestamp}.json"
@@ -67,129 +115,132 @@ class RedisSnapshotJob:
         finally:
             if self._redis_client:
                 await self._redis_client.close()
+                self._redis_client = None
     
-    async def _backup_proxy_pool(self, redis_client: redis.Redis, timestamp: str) -> Dict[str, int]:
-        """Backup proxy pool data."""
-        logger.info("Backing up proxy pool data")
-        
-        # Get all proxy-related keys
-        proxy_keys = []
-        async for key in redis_client.scan_iter(match="proxy:*"):
-            proxy_keys.append(key.decode())
-        
-        if not proxy_keys:
-            logger.warning("No proxy data found in Redis")
-            return {"count": 0}
-        
-        # Export proxy data
-        proxy_data = {}
-        for key in proxy_keys:
-            data_type = await redis_client.type(key)
-            
-            if data_type == b'string':
-                proxy_data[key] = await redis_client.get(key)
-            elif data_type == b'hash':
-                proxy_data[key] = await redis_client.hgetall(key)
-            elif data_type == b'list':
-                proxy_data[key] = await redis_client.lrange(key, 0, -1)
-            elif data_type == b'set':
-                proxy_data[key] = list(await redis_client.smembers(key))
-            elif data_type == b'zset':
-                proxy_data[key] = await redis_client.zrange(key, 0, -1, withscores=True)
-        
-        # Save to file
-        backup_file = self.backup_location / f"proxy_pool_{timestamp}.json"
-        with open(backup_file, 'w') as f:
-            json.dump(proxy_data, f, indent=2, default=str)
-        
-        logger.info(f"Backed up {len(proxy_keys)} proxy pool keys")
-        return {"count": len(proxy_keys), "file": str(backup_file)}
+    def _snapshot_file(self, name: str, timestamp: str) -> Path:
+        return self.backup_location / f"{name}_{timestamp}.jsonl.gz"
     
-    async def _backup_cache_data(self, redis_client: redis.Redis, timestamp: str) -> Dict[str, int]:
-        """Backup general cache data."""
-        logger.info("Backing up cache data")
-        
-        cache_keys = []
-        async for key in redis_client.scan_iter(match="cache:*"):
-            cache_keys.append(key.decode())
-        
-        if not cache_keys:
-            return {"count": 0}
-        
-        cache_data = {}
-        for key in cache_keys:
-            try:
-                ttl = await redis_client.ttl(key)
-                value = await redis_client.get(key)
-                cache_data[key] = {
-                    "value": value.decode() if value else None,
-                    "ttl": ttl
-                }
-            except Exception as e:
-                logger.warning(f"Failed to backup cache key {key}: {e}")
-        
-        backup_file = self.backup_location / f"cache_data_{timestamp}.json"
-        with open(backup_file, 'w') as f:
-            json.dump(cache_data, f, indent=2, default=str)
-        
-        logger.info(f"Backed up {len(cache_keys)} cache keys")
-        return {"count": len(cache_keys), "file": str(backup_file)}
+    async def _scan_batches(self, redis_client: redis.Redis, pattern: str):
+        """Yield lists of up to ``batch_size`` keys matching ``pattern``"""
+        batch: List[bytes] = []
+        cursor = 0
+        while True:
+            cursor, keys = await redis_client.scan(cursor=cursor, match=pattern, count=self.scan_count)
+            batch.extend(keys)
+            while len(batch) >= self.batch_size:
+                yield batch[:self.batch_size]
+                batch = batch[self.batch_size:]
+            if cursor == 0:
+                break
+        if batch:
+            yield batch
     
-    async def _backup_session_data(self, redis_client: redis.Redis, timestamp: str) -> Dict[str, int]:
-        """Backup session data."""
-        logger.info("Backing up session data")
-        
-        session_keys = []
-        async for key in redis_client.scan_iter(match="session:*"):
-            session_keys.append(key.decode())
-        
-        if not session_keys:
-            return {"count": 0}
+    async def _read_batch(self, redis_client: redis.Redis, keys: List[bytes]) -> List[Dict[str, Any]]:
+        """Read values and TTLs of ``keys`` in pipelined round trips"""
+        pipe = redis_client.pipeline(transaction=False)
+        if self.mode == "dump":
+            for key in keys:
+                pipe.dump(key)
+                pipe.pttl(key)
+            replies = await pipe.execute(raise_on_error=False)
+            records = []
+            for index, key in enumerate(keys):
+                payload, ttl = replies[2 * index], replies[2 * index + 1]
+                # None: the key expired between SCAN and DUMP
+                if payload is None or isinstance(payload, Exception):
+                    continue
+                records.append({"k": _b64(key), "ttl": ttl, "v": _b64(payload)})
+            return records
         
-        session_data = {}
-        for key in session_keys:
-            try:
-                session_data[key] = await redis_client.hgetall(key)
-            except Exception as e:
-                logger.warning(f"Failed to backup session key {key}: {e}")
+        for key in keys:
+            pipe.type(key)
+        types = [t.decode() if isinstance(t, bytes) else t
+                 for t in await pipe.execute(raise_on_error=False)]
         
-        backup_file = self.backup_location / f"session_data_{timestamp}.json"
-        with open(backup_file, 'w') as f:
-            json.dump(session_data, f, indent=2, default=str)
+        pipe = redis_client.pipeline(transaction=False)
+        readable = []
+        for key, data_type in zip(keys, types):
+            if data_type == "string":
+                pipe.get(key)
+            elif data_type == "hash":
+                pipe.hgetall(key)
+            elif data_type == "list":
+                pipe.lrange(key, 0, -1)
+            elif data_type == "set":
+                pipe.smembers(key)
+            elif data_type == "zset":
+                pipe.zrange(key, 0, -1, withscores=True)
+            else:
+                # "none" (expired) or a type we don't snapshot (stream, module types)
+                if data_type != "none":
+                    logger.warning(f"Skipping key {key!r} of unsupported type {data_type}")
+                continue
+            pipe.pttl(key)
+            readable.append((key, data_type))
+        replies = await pipe.execute(raise_on_error=False)
         
-        logger.info(f"Backed up {len(session_keys)} session keys")
-        return {"count": len(session_keys), "file": str(backup_file)}
+        records = []
+        for index, (key, data_type) in enumerate(readable):
+            value, ttl = replies[2 * index], replies[2 * index + 1]
+            if value is None or isinstance(value, Exception):
+                continue
+            records.append({"k": _b64(key), "t": data_type, "ttl": ttl, "v": _encode_native(data_type, value)})
+        return records
     
-    async def _backup_metrics(self, redis_client: redis.Redis, timestamp: str) -> Dict[str, int]:
-        """Backup metrics data."""
-        logger.info("Backing up metrics data")
+    async def snapshot_keyspace(self, redis_client: redis.Redis, name: str, pattern: str,
+                                timestamp: str) -> Dict[str, Any]:
+        """Stream all keys matching ``pattern`` into a compressed snapshot file"""
+        logger.info(f"Backing up {name} ({pattern})")
+        started = time.monotonic()
+        backup_file = self._snapshot_file(name, timestamp)
+        partial = backup_file.with_name(backup_file.name + ".partial")
         
-        metrics_keys = []
-        async for key in redis_client.scan_iter(match="metrics:*"):
-            metrics_keys.append(key.decode())
+        count = 0
+        batches = 0
+        pending_write: Optional[asyncio.Task] = None
+        out = gzip.open(partial, "wb", compresslevel=self.compression_level)
+        try:
+            out.write(self._encode_lines([{
+                "format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION, "mode": self.mode,
+                "pattern": pattern, "created_at": datetime.utcnow().isoformat()
+            }]))
+            async for keys in self._scan_batches(redis_client, pattern):
+                records = await self._read_batch(redis_client, keys)
+                # Compress and write this batch while the next one is fetched
+                if pending_write is not None:
+                    await pending_write
+                pending_write = asyncio.create_task(asyncio.to_thread(out.write, self._encode_lines(records)))
+                count += len(records)
+                batches += 1
+            if pending_write is not None:
+                await pending_write
+        except BaseException:
+            if pending_write is not None and not pending_write.done():
+                await asyncio.gather(pending_write, return_exceptions=True)
+            out.close()
+            partial.unlink(missing_ok=True)
+            raise
+        out.close()
         
-        if not metrics_keys:
+        if count == 0:
+            partial.unlink(missing_ok=True)
+            logger.warning(f"No {name} keys found in Redis")
             return {"count": 0}
         
-        metrics_data = {}
-        for key in metrics_keys:
-            try:
-                data_type = await redis_client.type(key)
-                if data_type == b'zset':
-                    metrics_data[key] = await redis_client.zrange(key, 0, -1, withscores=True)
-                elif data_type == b'hash':
-                    metrics_data[key] = await redis_client.hgetall(key)
-                elif data_type == b'string':
-                    metrics_data[key] = await redis_client.get(key)
-            except Exception as e:
-                logger.warning(f"Failed to backup metrics key {key}: {e}")
-        
-        backup_file = self.backup_location / f"metrics_data_{timestamp}.json"
-        with open(backup_file, 'w') as f:
-            json.dump(metrics_data, f, indent=2, default=str)
-        
-        logger.info(f"Backed up {len(metrics_keys)} metrics keys")
-        return {"count": len(metrics_keys), "file": str(backup_file)}
+        partial.replace(backup_file)
+        seconds = time.monotonic() - started
+        logger.info(f"Backed up {count} {name} keys in {batches} batches ({seconds:.2f}s)")
+        return {
+            "count": count,
+            "file": str(backup_file),
+            "bytes": backup_file.stat().st_size,
+            "batches": batches,
+            "seconds": round(seconds, 3)
+        }
+    
+    @staticmethod
+    def _encode_lines(records: List[Dict[str, Any]]) -> bytes:
+        return b"".join(json.dumps(record, separators=(",", ":")).encode() + b"\n" for record in records)
     
     async def restore_from_snapshot(self, snapshot_timestamp: str) -> Dict[str, bool]:
         """Restore Redis data from snapshot."""
@@ -199,25 +250,15 @@ class RedisSnapshotJob:
         results = {}
         
         try:
-            # Restore proxy pool
-            proxy_file = self.backup_location / f"proxy_pool_{snapshot_timestamp}.json"
-            if proxy_file.exists():
-                results["proxy_pool"] = await self._restore_data(redis_client, proxy_file)
-            
-            # Restore cache data
-            cache_file = self.backup_location / f"cache_data_{snapshot_timestamp}.json"
-            if cache_file.exists():
-                results["cache_data"] = await self._restore_cache_data(redis_client, cache_file)
-            
-            # Restore session data
-            session_file = self.backup_location / f"session_data_{snapshot_timestamp}.json"
-            if session_file.exists():
-                results["session_data"] = await self._restore_data(redis_client, session_file)
-            
-            # Restore metrics
-            metrics_file = self.backup_location / f"metrics_data_{snapshot_timestamp}.json"
-            if metrics_file.exists():
-                results["metrics_data"] = await self._restore_data(redis_client, metrics_file)
+            for name in self.KEYSPACES:
+                snapshot_file = self._snapshot_file(name, snapshot_timestamp)
+                legacy_file = self.backup_location / f"{name}_{snapshot_timestamp}.json"
+                if snapshot_file.exists():
+                    results[name] = await self.restore_keyspace(redis_client, snapshot_file)
+                elif legacy_file.exists() and name == "cache_data":
+                    results[name] = await self._restore_cache_data(redis_client, legacy_file)
+                elif legacy_file.exists():
+                    results[name] = await self._restore_data(redis_client, legacy_file)
             
             logger.info(f"Restore completed: {results}")
             return results
@@ -227,6 +268,79 @@ class RedisSnapshotJob:
             raise
         finally:
             await redis_client.close()
+            self._redis_client = None
+    
+    @staticmethod
+    def _read_snapshot(snapshot_file: Path, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the header, then batches of records from a snapshot file"""
+        with gzip.open(snapshot_file, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("format") != SNAPSHOT_FORMAT:
+                raise ValueError(f"{snapshot_file} is not a Redis snapshot")
+            yield [header]
+            batch = []
+            for line in f:
+                batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+    
+    def _queue_restore(self, pipe, mode: str, record: Dict[str, Any]):
+        key = _unb64(record["k"])
+        # PTTL: -1 no expiry, -2 key gone, otherwise milliseconds left
+        ttl = record.get("ttl", -1)
+        ttl = ttl if ttl and ttl > 0 else 0
+        if mode == "dump":
+            pipe.restore(key, ttl, _unb64(record["v"]), replace=True)
+            return
+        
+        data_type, value = record["t"], record["v"]
+        pipe.delete(key)
+        if data_type == "string":
+            pipe.set(key, _unb64(value))
+        elif data_type == "hash":
+            pipe.hset(key, mapping={_unb64(k): _unb64(v) for k, v in value.items()})
+        elif data_type == "list":
+            pipe.rpush(key, *(_unb64(member) for member in value))
+        elif data_type == "set":
+            pipe.sadd(key, *(_unb64(member) for member in value))
+        elif data_type == "zset":
+            pipe.zadd(key, {_unb64(member): score for member, score in value})
+        if ttl:
+            pipe.pexpire(key, ttl)
+    
+    async def restore_keyspace(self, redis_client: redis.Redis, snapshot_file: Path) -> bool:
+        """Restore a streamed snapshot with one pipelined round trip per batch"""
+        batches = self._read_snapshot(snapshot_file, self.batch_size)
+        try:
+            header = (await asyncio.to_thread(next, batches))[0]
+            mode = header["mode"]
+            restored = failed = 0
+            
+            while True:
+                # Decompress and parse off the event loop
+                records = await asyncio.to_thread(next, batches, None)
+                if records is None:
+                    break
+                pipe = redis_client.pipeline(transaction=False)
+                for record in records:
+                    self._queue_restore(pipe, mode, record)
+                replies = await pipe.execute(raise_on_error=False)
+                errors = [reply for reply in replies if isinstance(reply, Exception)]
+                failed += len(errors)
+                restored += len(records)
+                if errors:
+                    logger.warning(f"{len(errors)} commands failed restoring {snapshot_file.name}: {errors[0]}")
+            
+            logger.info(f"Restored {restored} keys from {snapshot_file.name}")
+            return failed == 0
+        except Exception as e:
+            logger.error(f"Failed to restore from {snapshot_file}: {e}")
+            return False
+        finally:
+            batches.close()
     
     async def _restore_data(self, redis_client: redis.Redis, backup_file: Path) -> bool:
         """Restore generic data from backup file."""
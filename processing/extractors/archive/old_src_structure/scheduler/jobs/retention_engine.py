@@ -0,0 +1,243 @@
+"""
+Retention engine - bounded, throttled deletion of expired rows.
+
+Rows are deleted in keyset batches over the primary key: each batch first
+looks up the upper ``id`` of the next ``batch_size`` expired rows and then
+deletes that id range, so every statement touches a bounded number of rows,
+holds its locks briefly and commits on its own. Only row counts are
+returned; ids are never collected in Python.
+
+Between batches the engine pauses for ``pause_seconds`` and, if
+``max_rows_per_second`` is set, long enough to stay within that budget.
+Batches slower than ``target_batch_seconds`` halve the batch size.
+
+Tables partitioned by day (``<table>_YYYYMMDD``, ``<table>_pYYYYMMDD`` or
+``<table>_YYYY_MM_DD`` partitions on PostgreSQL, or tables following the
+same naming in SQLite) can have whole expired partitions dropped instead.
+
+The engine works on any connection with ``execute_query(sql, params)`` and
+``execute_command(sql, params)`` returning rows and a rowcount, such as
+``database.connection.DatabaseConnection``.
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+@dataclass
+class RetentionTarget:
+    """One table and the predicate that marks its rows as expired"""
+    table: str
+    timestamp_column: str = "created_at"
+    id_column: str = "id"
+    # Extra SQL condition rows must also match, e.g. "status = 'completed'"
+    condition: Optional[str] = None
+    params: Dict[str, Any] = field(default_factory=dict)
+    # Drop whole day partitions older than the cutoff before batch deleting
+    partitioned_by_day: bool = False
+
+    def __post_init__(self):
+        for name in (self.table, self.timestamp_column, self.id_column):
+            if not _IDENTIFIER.match(name):
+                raise ValueError(f"Invalid SQL identifier: {name!r}")
+
+
+@dataclass
+class ThrottleConfig:
+    """Batch size and pacing for retention deletes"""
+    batch_size: int = 5000
+    min_batch_size: int = 500
+    pause_seconds: float = 0.1
+    max_rows_per_second: Optional[float] = None
+    target_batch_seconds: float = 1.0
+    # Stop after this many seconds; the next run continues where this one stopped
+    max_runtime_seconds: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "ThrottleConfig":
+        data = dict(data or {})
+        if "pause_ms" in data:
+            data["pause_seconds"] = data.pop("pause_ms") / 1000
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+
+@dataclass
+class PurgeResult:
+    """Outcome of purging one table"""
+    table: str
+    rows_deleted: int = 0
+    batches: int = 0
+    partitions_dropped: int = 0
+    seconds: float = 0.0
+    completed: bool = True
+
+
+class RetentionEngine:
+    """Deletes expired rows in throttled keyset batches"""
+
+    def __init__(self, conn, throttle: Optional[ThrottleConfig] = None, dialect: Optional[str] = None):
+        self.conn = conn
+        self.throttle = throttle or ThrottleConfig()
+        self.dialect = dialect or self._detect_dialect(conn)
+
+    @staticmethod
+    def _detect_dialect(conn) -> str:
+        engine = getattr(conn, "engine", None)
+        dialect = getattr(engine, "dialect", None)
+        return getattr(dialect, "name", "postgresql")
+
+    async def purge(self, target: RetentionTarget, cutoff: datetime,
+                    throttle: Optional[ThrottleConfig] = None) -> PurgeResult:
+        """Delete rows of ``target`` older than ``cutoff``"""
+        throttle = throttle or self.throttle
+        started = time.monotonic()
+        result = PurgeResult(table=target.table)
+
+        if target.partitioned_by_day:
+            if target.condition:
+                logger.warning(f"{target.table}: partitions are not dropped when a row "
+                               f"condition is set; falling back to batched deletes")
+            else:
+                dropped, rows = await self.drop_expired_partitions(target.table, cutoff)
+                result.partitions_dropped = dropped
+                result.rows_deleted += rows
+
+        if await self._table_exists(target.table):
+            await self._delete_batches(target, cutoff, throttle, result, started)
+
+        result.seconds = time.monotonic() - started
+        logger.info(f"Purged {result.rows_deleted} rows from {target.table} in {result.batches} batches"
+                    f"{f' and {result.partitions_dropped} partitions' if result.partitions_dropped else ''}"
+                    f" ({result.seconds:.1f}s{'' if result.completed else ', stopped at runtime limit'})")
+        return result
+
+    def _where(self, target: RetentionTarget) -> str:
+        where = f"{target.timestamp_column} < :cutoff"
+        if target.condition:
+            where += f" AND ({target.condition})"
+        return where
+
+    async def _delete_batches(self, target: RetentionTarget, cutoff: datetime,
+                              throttle: ThrottleConfig, result: PurgeResult, started: float):
+        where = self._where(target)
+        batch_size = throttle.batch_size
+        # Keyset pagination: the first batch has no lower bound so that
+        # non-numeric keys (UUIDs) work, later batches continue after the last id seen
+        lower = None
+        while True:
+            if throttle.max_runtime_seconds and time.monotonic() - started >= throttle.max_runtime_seconds:
+                result.completed = False
+                return
+
+            after = "" if lower is None else f"{target.id_column} > :lower AND "
+            params = {**target.params, "cutoff": cutoff}
+            if lower is not None:
+                params["lower"] = lower
+            batch_started = time.monotonic()
+            rows = await self.conn.execute_query(
+                f"SELECT MAX({target.id_column}) AS upper FROM ("
+                f"SELECT {target.id_column} FROM {target.table} "
+                f"WHERE {after}{where} "
+                f"ORDER BY {target.id_column} LIMIT :batch_size) AS batch",
+                {**params, "batch_size": batch_size}
+            )
+            upper = rows[0]["upper"] if rows else None
+            if upper is None:
+                return
+            deleted = await self.conn.execute_command(
+                f"DELETE FROM {target.table} "
+                f"WHERE {after}{target.id_column} <= :upper AND {where}",
+                {**params, "upper": upper}
+            )
+            elapsed = time.monotonic() - batch_started
+
+            result.rows_deleted += max(deleted, 0)
+            result.batches += 1
+            lower = upper
+
+            if elapsed > throttle.target_batch_seconds and batch_size > throttle.min_batch_size:
+                batch_size = max(throttle.min_batch_size, batch_size // 2)
+                logger.debug(f"{target.table}: batch took {elapsed:.2f}s, batch size now {batch_size}")
+
+            await asyncio.sleep(self._pause(throttle, deleted, elapsed))
+
+    @staticmethod
+    def _pause(throttle: ThrottleConfig, deleted: int, elapsed: float) -> float:
+        pause = throttle.pause_seconds
+        if throttle.max_rows_per_second:
+            pause = max(pause, deleted / throttle.max_rows_per_second - elapsed)
+        return max(pause, 0.0)
+
+    # -- partitions ------------------------------------------------------------
+
+    @staticmethod
+    def partition_day(table: str, partition: str) -> Optional[date]:
+        """Day covered by a partition named after ``table``, or None"""
+        match = re.match(rf"^{re.escape(table)}_p?(\d{{4}})_?(\d{{2}})_?(\d{{2}})$", partition)
+        if not match:
+            return None
+        try:
+            return date(*map(int, match.groups()))
+        except ValueError:
+            return None
+
+    async def _partitions(self, table: str) -> List[Tuple[str, int]]:
+        """(partition name, row count or estimate) for partitions of ``table``"""
+        if self.dialect == "sqlite":
+            rows = await self.conn.execute_query(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE :prefix ESCAPE '\\'",
+                {"prefix": table.replace("_", "\\_") + "\\_%"}
+            )
+            names = [row["name"] for row in rows]
+            counts = []
+            for name in names:
+                if self.partition_day(table, name) is None:
+                    continue
+                count = await self.conn.execute_query(f'SELECT COUNT(*) AS n FROM "{name}"', {})
+                counts.append((name, count[0]["n"]))
+            return counts
+
+        # reltuples is the planner estimate; counting would scan every expired partition
+        rows = await self.conn.execute_query(
+            "SELECT c.relname AS name, c.reltuples AS estimate FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table",
+            {"table": table}
+        )
+        return [(row["name"], max(int(row["estimate"]), 0)) for row in rows]
+
+    async def drop_expired_partitions(self, table: str, cutoff: datetime) -> Tuple[int, int]:
+        """Drop day partitions that end before ``cutoff``; returns (partitions, rows)"""
+        dropped = rows = 0
+        for name, count in await self._partitions(table):
+            day = self.partition_day(table, name)
+            if day is None or datetime.combine(day, dt_time()) + timedelta(days=1) > cutoff:
+                continue
+            if not _IDENTIFIER.match(name):
+                continue
+            await self.conn.execute_command(f'DROP TABLE IF EXISTS "{name}"', {})
+            dropped += 1
+            rows += count
+            logger.info(f"Dropped expired partition {name} (~{count} rows)")
+        return dropped, rows
+
+    async def _table_exists(self, table: str) -> bool:
+        if self.dialect == "sqlite":
+            rows = await self.conn.execute_query(
+                "SELECT 1 AS found FROM sqlite_master WHERE type = 'table' AND name = :table", {"table": table}
+            )
+        else:
+            rows = await self.conn.execute_query("SELECT to_regclass(:table) IS NOT NULL AS found", {"table": table})
+            return bool(rows and rows[0]["found"])
+        return bool(rows)
@@ -6,6 +6,9 @@ Implements automated cleanup of:
 - Processed exports
 - Historical proxy data
 - Log files and debug information
+
+Rows are deleted in bounded, throttled batches by RetentionEngine; see
+``retention_engine`` for the batching and partition-drop behaviour.
 """
 
 import asyncio
@@ -19,6 +22,8 @@ from observability.metrics import MetricsCollector
 from utils.logger import get_logger
 from utils.config_loader import ConfigLoader
 
+from .retention_engine import PurgeResult, RetentionEngine, RetentionTarget, ThrottleConfig
+
 logger = get_logger(__name__)
 
 class RetentionJob:
@@ -29,6 +34,7 @@ class RetentionJob:
         self.metrics = MetricsCollector()
         self.config_loader = ConfigLoader()
         self.retention_policies = self._load_retention_config()
+        self.last_run: Dict[str, PurgeResult] = {}
     
     def _load_retention_config(self) -> Dict:
         """Load retention policies using ConfigLoader."""
@@ -46,7 +52,8 @@ class RetentionJob:
             "exports": {"days": 30},
             "proxy_data": {"days": 7},
             "logs": {"days": 14},
-            "failed_requests": {"days": 3}
+            "failed_requests": {"days": 3},
+            "batching": {"batch_size": 5000, "pause_ms": 100}
         }
     
     async def run_retention_cleanup(self) -> Dict[str, int]:
@@ -82,85 +89,67 @@ class RetentionJob:
             self.metrics.record_counter("retention_errors", 1)
             raise
     
+    def _throttle(self, policy_name: str) -> ThrottleConfig:
+        """Batching settings: global ``batching`` defaults overridden per policy"""
+        settings = dict(self.retention_policies.get("batching", {}))
+        settings.update(self.retention_policies[policy_name].get("batching", {}))
+        return ThrottleConfig.from_dict(settings)
+    
+    async def _purge(self, policy_name: str, target: RetentionTarget) -> int:
+        """Delete expired rows of one table in throttled batches."""
+        policy = self.retention_policies[policy_name]
+        cutoff_date = datetime.utcnow() - timedelta(days=policy["days"])
+        target.partitioned_by_day = policy.get("partitioned_by_day", target.partitioned_by_day)
+        
+        conn = await get_db_connection()
+        engine = RetentionEngine(conn, self._throttle(policy_name))
+        result = await engine.purge(target, cutoff_date)
+        
+        self.last_run[policy_name] = result
+        labels = {"table": target.table}
+        self.metrics.record_counter("retention_rows_deleted", result.rows_deleted, labels)
+        self.metrics.record_counter("retention_batches", result.batches, labels)
+        self.metrics.record_histogram("retention_purge_seconds", result.seconds, labels)
+        if result.partitions_dropped:
+            self.metrics.record_counter("retention_partitions_dropped", result.partitions_dropped, labels)
+        return result.rows_deleted
+    
     async def _cleanup_crawl_data(self) -> int:
         """Clean up old crawl data."""
-        retention_days = self.retention_policies["crawl_data"]["days"]
-        cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
-        
-        async with get_db_connection() as conn:
-            result = await conn.execute("""
-                DELETE FROM crawl_results 
-                WHERE created_at < $1
-                RETURNING id
-            """, cutoff_date)
-            
-            cleaned_count = len(result)
-            logger.info(f"Cleaned {cleaned_count} old crawl records older than {retention_days} days")
-            return cleaned_count
+        cleaned_count = await self._purge("crawl_data", RetentionTarget("crawl_results"))
+        logger.info(f"Cleaned {cleaned_count} old crawl records older than "
+                    f"{self.retention_policies['crawl_data']['days']} days")
+        return cleaned_count
     
     async def _cleanup_exports(self) -> int:
         """Clean up old export files."""
-        retention_days = self.retention_policies["exports"]["days"]
-        cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
-        
-        async with get_db_connection() as conn:
-            result = await conn.execute("""
-                DELETE FROM export_jobs 
-                WHERE created_at < $1 AND status = 'completed'
-                RETURNING id
-            """, cutoff_date)
-            
-            cleaned_count = len(result)
-            logger.info(f"Cleaned {cleaned_count} old export records")
-            return cleaned_count
+        cleaned_count = await self._purge("exports", RetentionTarget(
+            "export_jobs", condition="status = 'completed'"
+        ))
+        logger.info(f"Cleaned {cleaned_count} old export records")
+        return cleaned_count
     
     async def _cleanup_proxy_data(self) -> int:
         """Clean up old proxy performance data."""
-        retention_days = self.retention_policies["proxy_data"]["days"]
-        cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
-        
-        async with get_db_connection() as conn:
-            result = await conn.execute("""
-                DELETE FROM proxy_metrics 
-                WHERE recorded_at < $1
-                RETURNING id
-            """, cutoff_date)
-            
-            cleaned_count = len(result)
-            logger.info(f"Cleaned {cleaned_count} old proxy metrics")
-            return cleaned_count
+        cleaned_count = await self._purge("proxy_data", RetentionTarget(
+            "proxy_metrics", timestamp_column="recorded_at"
+        ))
+        logger.info(f"Cleaned {cleaned_count} old proxy metrics")
+        return cleaned_count
     
     async def _cleanup_logs(self) -> int:
         """Clean up old log entries."""
-        retention_days = self.retention_policies["logs"]["days"]
-        cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
-        
-        async with get_db_connection() as conn:
-            result = await conn.execute("""
-                DELETE FROM application_logs 
-                WHERE created_at < $1 AND level NOT IN ('ERROR', 'CRITICAL')
-                RETURNING id
-            """, cutoff_date)
-            
-            cleaned_count = len(result)
-            logger.info(f"Cleaned {cleaned_count} old log entries")
-            return cleaned_count
+        cleaned_count = await self._purge("logs", RetentionTarget(
+            "application_logs", condition="level NOT IN ('ERROR', 'CRITICAL')"
+        ))
+        logger.info(f"Cleaned {cleaned_count} old log entries")
+        return cleaned_count
     
     async def _cleanup_failed_requests(self) -> int:
         """Clean up old failed request data."""
-        retention_days = self.retention_policies["failed_requests"]["days"]
-        cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
-        
-        async with get_db_connection() as conn:
-            result = await conn.execute("""
-                DELETE FROM failed_requests 
-                WHERE created_at < $1
-                RETURNING id
-            """, cutoff_date)
-            
-            cleaned_count = len(result)
-            logger.info(f"Cleaned {cleaned_count} failed request records")
-            return cleaned_count
+        cleaned_count = await self._purge("failed_requests", RetentionTarget("failed_requests"))
+        logger.info(f"Cleaned {cleaned_count} failed request records")
+        return cleaned_count
 
 async def run_retention_job():
     """Entry point for retention job execution."""
@@ -18,20 +18,34 @@ Main Components:
 - XPathSuggester: XPath generation and optimization
 - LoginHandler: Authentication management
 - ImageDownloader: File download capabilities
+
+Components are imported on first attribute access, so importing a single
+submodule (e.g. ``scraper.dsl.schema``) does not pull in Playwright or
+Selenium.
 """
 
-from .base_scraper import BaseScraper
-from .http_scraper import HTTPScraper
-from .selenium_scraper import SeleniumScraper
-from .template_extractor import TemplateExtractor
-from .template_runtime import TemplateRuntime
-from .xpath_suggester import XPathSuggester
-from .login_handler import LoginHandler
-from .image_downloader import ImageDownloader
-from .transport import ScrapingTransport
+import importlib
+from typing import Any
 
-# DSL components
-from .dsl import TemplateDSL, FieldTransformer, ValidationRule
+# Public name -> submodule that defines it
+_LAZY_IMPORTS = {
+    "BaseScraper": ".base_scraper",
+    "HTTPScraper": ".http_scraper",
+    "SeleniumScraper": ".selenium_scraper",
+    "TemplateExtractor": ".template_extractor",
+    "TemplateRuntime": ".template_runtime",
+    "XPathSuggester": ".xpath_suggester",
+    "LoginHandler": ".login_handler",
+    "ImageDownloader": ".image_downloader",
+    "ScrapingTransport": ".transport",
+    "BrowserPool": ".browser_pool",
+    "BrowserPoolConfig": ".browser_pool",
+    "RenderRoutingCache": ".render_router",
+    # DSL components
+    "TemplateDSL": ".dsl",
+    "FieldTransformer": ".dsl",
+    "ValidationRule": ".dsl",
+}
 
 __all__ = [
     "BaseScraper",
@@ -43,7 +57,23 @@ __all__ = [
     "LoginHandler",
     "ImageDownloader",
     "ScrapingTransport",
+    "BrowserPool",
+    "BrowserPoolConfig",
+    "RenderRoutingCache",
     "TemplateDSL",
     "FieldTransformer", 
     "ValidationRule"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
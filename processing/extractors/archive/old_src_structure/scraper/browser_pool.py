@@ -0,0 +1,373 @@
+"""
+Browser Pool - Warm, bounded Playwright contexts for render-mode fetching.
+
+Keeps a fixed number of pre-warmed browser contexts, each serving a
+bounded number of concurrent pages:
+- asyncio-safe checkout/checkin with a global capacity limit
+- page reuse within a context, reset to about:blank between requests
+- context recycling after a page-use, age or JS heap budget
+- route-level resource blocking (images, fonts, media) chosen per checkout
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, FrozenSet, Iterable, List, Optional
+
+from utils.logger import get_logger
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+logger = get_logger(__name__)
+
+# Playwright request.resource_type values that are safe to drop for scraping
+DEFAULT_BLOCKED_RESOURCES = frozenset({"image", "font", "media"})
+
+DEFAULT_LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-extensions',
+    '--disable-plugins',
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-features=TranslateUI',
+    '--disable-ipc-flooding-protection'
+]
+
+TRACKING_HOSTS = (
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net',
+    'facebook.net', 'connect.facebook.com', 'hotjar.com'
+)
+
+_HEAP_USAGE_JS = "performance.memory ? performance.memory.usedJSHeapSize : 0"
+
+
+@dataclass
+class BrowserPoolConfig:
+    """Browser pool sizing and recycling configuration."""
+    contexts: int = 2
+    pages_per_context: int = 4
+    warm_pages_per_context: int = 1
+    max_uses_per_context: int = 200
+    max_context_age: float = 1800.0
+    max_heap_mb: Optional[float] = 512.0
+    heap_check_interval: int = 20
+    checkout_timeout: float = 60.0
+    headless: bool = True
+    launch_args: List[str] = field(default_factory=lambda: list(DEFAULT_LAUNCH_ARGS))
+    viewport: Dict[str, int] = field(default_factory=lambda: {'width': 1920, 'height': 1080})
+    user_agent: Optional[str] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    init_scripts: List[str] = field(default_factory=list)
+    block_tracking: bool = True
+
+    @property
+    def capacity(self) -> int:
+        return self.contexts * self.pages_per_context
+
+
+class PooledContext:
+    """A browser context together with its idle pages and usage counters."""
+
+    def __init__(self, context: Any, generation: int):
+        self.context = context
+        self.generation = generation
+        self.created_at = time.monotonic()
+        self.idle_pages: List[Any] = []
+        self.in_use = 0
+        self.uses = 0
+        self.retiring = False
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class BrowserPool:
+    """
+    Bounded pool of warm Playwright browser contexts.
+
+    ``page()`` checks out a page from the least loaded context and returns
+    it afterwards. Blocking rules are installed once per page as a single
+    route handler whose blocked resource types change per checkout, so
+    routes never accumulate on reused pages.
+    """
+
+    def __init__(self, config: Optional[BrowserPoolConfig] = None, browser: Any = None):
+        self.config = config or BrowserPoolConfig()
+
+        self._browser = browser
+        self._owns_browser = browser is None
+        self._playwright = None
+
+        self._contexts: List[PooledContext] = []
+        self._page_context: Dict[int, PooledContext] = {}
+        self._page_blocking: Dict[int, FrozenSet[str]] = {}
+        self._generation = 0
+
+        self._slots = asyncio.Semaphore(self.config.capacity)
+        self._lock = asyncio.Lock()
+        self._started = False
+
+        self.stats = {
+            'checkouts': 0,
+            'pages_created': 0,
+            'pages_reused': 0,
+            'contexts_created': 0,
+            'contexts_recycled': 0,
+            'requests_blocked': 0,
+            'wait_time_total': 0.0
+        }
+
+    @property
+    def capacity(self) -> int:
+        return self.config.capacity
+
+    async def start(self):
+        """Launch the browser and pre-warm all contexts."""
+        async with self._lock:
+            if self._started:
+                return
+
+            if self._browser is None:
+                if not PLAYWRIGHT_AVAILABLE:
+                    raise ImportError("playwright is required for browser transport")
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(
+                    headless=self.config.headless,
+                    args=self.config.launch_args
+                )
+
+            for _ in range(self.config.contexts):
+                pooled = await self._new_context()
+                for _ in range(min(self.config.warm_pages_per_context, self.config.pages_per_context)):
+                    pooled.idle_pages.append(await self._new_page(pooled))
+
+            self._started = True
+            logger.info(
+                f"Browser pool warmed: {self.config.contexts} contexts x "
+                f"{self.config.pages_per_context} pages"
+            )
+
+    async def stop(self):
+        """Close every context and, if owned, the browser itself."""
+        async with self._lock:
+            for pooled in list(self._contexts):
+                await self._close_context(pooled)
+            self._contexts.clear()
+            self._page_context.clear()
+            self._page_blocking.clear()
+
+            if self._owns_browser and self._browser is not None:
+                try:
+                    await self._browser.close()
+                except Exception as e:
+                    logger.debug(f"Error closing browser: {e}")
+                self._browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+            self._started = False
+
+    @asynccontextmanager
+    async def page(self, block_resources: Optional[Iterable[str]] = None) -> AsyncIterator[Any]:
+        """Check out a page for the duration of the ``async with`` block.
+
+        Args:
+            block_resources: Resource types to abort for this request;
+                defaults to images, fonts and media.
+        """
+        page = await self.acquire(block_resources)
+        healthy = True
+        try:
+            yield page
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            await self.release(page, healthy=healthy)
+
+    async def acquire(self, block_resources: Optional[Iterable[str]] = None) -> Any:
+        """Wait for a free slot and return a page from the least loaded context."""
+        if not self._started:
+            await self.start()
+
+        waited = time.monotonic()
+        await asyncio.wait_for(self._slots.acquire(), timeout=self.config.checkout_timeout)
+        self.stats['wait_time_total'] += time.monotonic() - waited
+
+        try:
+            async with self._lock:
+                pooled = self._pick_context()
+                if pooled is None:
+                    pooled = await self._new_context()
+                pooled.in_use += 1
+
+            if pooled.idle_pages:
+                page = pooled.idle_pages.pop()
+                self.stats['pages_reused'] += 1
+            else:
+                try:
+                    page = await self._new_page(pooled)
+                except BaseException:
+                    # The page never existed, so no release() will give the context slot back
+                    pooled.in_use -= 1
+                    if pooled.retiring and pooled.in_use == 0:
+                        async with self._lock:
+                            await self._close_context(pooled)
+                    raise
+        except BaseException:
+            self._slots.release()
+            raise
+
+        blocked = DEFAULT_BLOCKED_RESOURCES if block_resources is None else block_resources
+        self._page_blocking[id(page)] = frozenset(blocked)
+        self.stats['checkouts'] += 1
+        return page
+
+    async def release(self, page: Any, healthy: bool = True):
+        """Return a page to its context, recycling the context when due."""
+        pooled = self._page_context.get(id(page))
+        try:
+            if pooled is None:
+                await self._close_page(page)
+                return
+
+            pooled.in_use -= 1
+            pooled.uses += 1
+
+            if healthy and not pooled.retiring:
+                healthy = await self._reset_page(page)
+
+            if not pooled.retiring and await self._over_budget(pooled, page if healthy else None):
+                await self._retire(pooled)
+
+            if healthy and not pooled.retiring and len(pooled.idle_pages) < self.config.pages_per_context:
+                pooled.idle_pages.append(page)
+            else:
+                await self._close_page(page)
+
+            if pooled.retiring and pooled.in_use == 0:
+                async with self._lock:
+                    await self._close_context(pooled)
+        finally:
+            self._slots.release()
+
+    def _pick_context(self) -> Optional[PooledContext]:
+        candidates = [
+            c for c in self._contexts
+            if not c.retiring and c.in_use < self.config.pages_per_context
+        ]
+        if not candidates:
+            return None
+        # Prefer contexts with idle pages, then the least loaded
+        return min(candidates, key=lambda c: (not c.idle_pages, c.in_use))
+
+    async def _new_context(self) -> PooledContext:
+        options: Dict[str, Any] = {'viewport': self.config.viewport}
+        if self.config.user_agent:
+            options['user_agent'] = self.config.user_agent
+
+        context = await self._browser.new_context(**options)
+        for script in self.config.init_scripts:
+            await context.add_init_script(script)
+
+        self._generation += 1
+        pooled = PooledContext(context, self._generation)
+        self._contexts.append(pooled)
+        self.stats['contexts_created'] += 1
+        return pooled
+
+    async def _new_page(self, pooled: PooledContext) -> Any:
+        page = await pooled.context.new_page()
+        self._page_context[id(page)] = pooled
+        self._page_blocking[id(page)] = DEFAULT_BLOCKED_RESOURCES
+
+        async def handle_route(route):
+            request = route.request
+            blocked = self._page_blocking.get(id(page), DEFAULT_BLOCKED_RESOURCES)
+            if request.resource_type in blocked or (
+                self.config.block_tracking and any(host in request.url for host in TRACKING_HOSTS)
+            ):
+                self.stats['requests_blocked'] += 1
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await page.route("**/*", handle_route)
+        self.stats['pages_created'] += 1
+        return page
+
+    async def _reset_page(self, page: Any) -> bool:
+        """Drop the previous document so idle pages hold no DOM."""
+        try:
+            await page.goto('about:blank')
+            return True
+        except Exception as e:
+            logger.debug(f"Discarding browser page after failed reset: {e}")
+            return False
+
+    async def _over_budget(self, pooled: PooledContext, page: Any) -> bool:
+        if pooled.uses >= self.config.max_uses_per_context:
+            return True
+        if pooled.age >= self.config.max_context_age:
+            return True
+        if (page is not None and self.config.max_heap_mb
+                and pooled.uses % self.config.heap_check_interval == 0):
+            try:
+                heap_bytes = await page.evaluate(_HEAP_USAGE_JS) or 0
+            except Exception:
+                return False
+            return heap_bytes / (1024 * 1024) > self.config.max_heap_mb
+        return False
+
+    async def _retire(self, pooled: PooledContext):
+        """Stop handing out ``pooled`` and start a fresh replacement."""
+        async with self._lock:
+            if pooled.retiring:
+                return
+            pooled.retiring = True
+            self.stats['contexts_recycled'] += 1
+            logger.debug(
+                f"Recycling browser context {pooled.generation} after "
+                f"{pooled.uses} uses / {pooled.age:.0f}s"
+            )
+            replacement = await self._new_context()
+            if self.config.warm_pages_per_context:
+                replacement.idle_pages.append(await self._new_page(replacement))
+
+    async def _close_page(self, page: Any):
+        self._page_context.pop(id(page), None)
+        self._page_blocking.pop(id(page), None)
+        try:
+            await page.close()
+        except Exception as e:
+            logger.debug(f"Error closing browser page: {e}")
+
+    async def _close_context(self, pooled: PooledContext):
+        if pooled in self._contexts:
+            self._contexts.remove(pooled)
+        for page in pooled.idle_pages:
+            self._page_context.pop(id(page), None)
+            self._page_blocking.pop(id(page), None)
+        pooled.idle_pages.clear()
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            logger.debug(f"Error closing browser context: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool occupancy and lifetime counters."""
+        return {
+            **self.stats,
+            'capacity': self.capacity,
+            'contexts': len([c for c in self._contexts if not c.retiring]),
+            'contexts_retiring': len([c for c in self._contexts if c.retiring]),
+            'pages_in_use': sum(c.in_use for c in self._contexts),
+            'pages_idle': sum(len(c.idle_pages) for c in self._contexts)
+        }
@@ -0,0 +1,289 @@
+"""
+Render Router - Learned static-vs-render routing for ScrapingTransport.
+
+A browser render costs an order of magnitude more than a plain GET, yet
+many pages on "browser" domains already carry every field a template
+needs in the static HTML. The router remembers, per domain and per URL
+pattern, whether the cheap HTTP path produced usable content:
+
+- unknown or known-static keys go over HTTP, falling back to the browser
+  only when the HTTP result misses fields (extraction failure)
+- known-dynamic keys go to the browser, with a sampled share probed over
+  HTTP again so sites that become static are noticed
+- outcomes are stored in SQLite so decisions survive restarts
+"""
+
+import random
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# content -> True if the page carries what the caller needs
+ContentValidator = Callable[[str], bool]
+
+_NUMERIC_SEGMENT = re.compile(r"^\d+$")
+_ID_SEGMENT = re.compile(r"^(?=.*\d)[0-9a-fA-F-]{8,}$|^(?=.*\d)(?=.*[a-zA-Z])[\w-]{12,}$")
+_TAG_STRIP = re.compile(r"<script\b.*?</script>|<style\b.*?</style>|<[^>]+>", re.S | re.I)
+_JS_SHELL_MARKERS = (
+    "enable javascript", "javascript is required", "you need to enable javascript",
+    "aktivera javascript", 'id="__next"></div>', 'id="root"></div>', 'id="app"></div>'
+)
+
+
+def url_pattern(url: str, depth: int = 3) -> Tuple[str, str]:
+    """Reduce a URL to ``(domain, path pattern)``.
+
+    Numeric and id-like path segments become placeholders, so
+    ``/bil/12345/volvo-v70`` and ``/bil/67890/saab-95`` share a pattern.
+    """
+    parsed = urlparse(url)
+    segments = []
+    for segment in [s for s in parsed.path.split("/") if s][:depth]:
+        if _NUMERIC_SEGMENT.match(segment):
+            segments.append("{n}")
+        elif _ID_SEGMENT.match(segment):
+            segments.append("{id}")
+        else:
+            segments.append(segment.lower())
+    return parsed.netloc.lower(), "/" + "/".join(segments)
+
+
+def static_content_validator(min_text_chars: int = 200) -> ContentValidator:
+    """Heuristic for callers without field selectors.
+
+    Rejects near-empty documents and client-side rendered app shells.
+    """
+    def validate(content: str) -> bool:
+        if not content:
+            return False
+        lowered = content.lower()
+        if any(marker in lowered for marker in _JS_SHELL_MARKERS):
+            return False
+        text = _TAG_STRIP.sub(" ", content)
+        return len(" ".join(text.split())) >= min_text_chars
+
+    return validate
+
+
+def fields_validator(extract: Callable[[str], Dict[str, Any]],
+                     required_fields: Iterable[str]) -> ContentValidator:
+    """Validator that passes when ``extract(content)`` yields every required field."""
+    required = list(required_fields)
+
+    def validate(content: str) -> bool:
+        try:
+            record = extract(content) or {}
+        except Exception:
+            return False
+        return all(record.get(name) not in (None, "", [], {}) for name in required)
+
+    return validate
+
+
+@dataclass
+class RouteStats:
+    """Outcome counters for one routing key."""
+    http_ok: float = 0.0
+    http_miss: float = 0.0
+    render_ok: float = 0.0
+    render_miss: float = 0.0
+    updated_at: float = 0.0
+
+    @property
+    def http_samples(self) -> float:
+        return self.http_ok + self.http_miss
+
+    @property
+    def http_success_rate(self) -> float:
+        return self.http_ok / self.http_samples if self.http_samples else 0.0
+
+
+@dataclass
+class RouteDecision:
+    """Where to send a request and why."""
+    transport: str  # 'http' or 'browser'
+    reason: str
+    key: Tuple[str, str]
+    probe: bool = False
+
+
+class RenderRoutingCache:
+    """
+    Persistent per-domain and per-URL-pattern transport decisions.
+
+    Counters are halved once a key passes ``window`` samples, so old
+    evidence fades and decisions follow site changes.
+    """
+
+    def __init__(self,
+                 db_path: str = ":memory:",
+                 min_samples: int = 3,
+                 static_threshold: float = 0.9,
+                 probe_rate: float = 0.05,
+                 window: int = 50,
+                 rng: Optional[random.Random] = None):
+        self.db_path = db_path
+        self.min_samples = min_samples
+        self.static_threshold = static_threshold
+        self.probe_rate = probe_rate
+        self.window = window
+        self._rng = rng or random.Random()
+
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], RouteStats] = {}
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS render_routes (
+                domain TEXT NOT NULL,
+                pattern TEXT NOT NULL,
+                http_ok REAL NOT NULL DEFAULT 0,
+                http_miss REAL NOT NULL DEFAULT 0,
+                render_ok REAL NOT NULL DEFAULT 0,
+                render_miss REAL NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (domain, pattern)
+            )
+        """)
+        self._load()
+
+        self.stats = {
+            'decisions_http': 0,
+            'decisions_browser': 0,
+            'http_probes': 0,
+            'browser_fallbacks': 0
+        }
+
+    def _load(self):
+        rows = self._conn.execute(
+            "SELECT domain, pattern, http_ok, http_miss, render_ok, render_miss, updated_at "
+            "FROM render_routes"
+        ).fetchall()
+        for domain, pattern, *counters in rows:
+            self._routes[(domain, pattern)] = RouteStats(*counters)
+        if rows:
+            logger.debug(f"Loaded {len(rows)} learned transport routes")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _lookup(self, url: str) -> Tuple[Tuple[str, str], Optional[RouteStats]]:
+        """Pattern-level stats when mature, else the domain-wide stats."""
+        domain, pattern = url_pattern(url)
+        key = (domain, pattern)
+        stats = self._routes.get(key)
+        if stats is not None and stats.http_samples >= self.min_samples:
+            return key, stats
+        domain_stats = self._routes.get((domain, "*"))
+        if domain_stats is not None and domain_stats.http_samples >= self.min_samples:
+            return key, domain_stats
+        return key, None
+
+    def choose(self, url: str, default_transport: str = "http") -> RouteDecision:
+        """Pick a transport for ``url`` from what has been learned so far."""
+        with self._lock:
+            key, stats = self._lookup(url)
+
+            if stats is None:
+                # Nothing learned yet: the cheap path is also the probe
+                decision = RouteDecision("http", "unknown", key, probe=default_transport == "browser")
+            elif stats.http_success_rate >= self.static_threshold:
+                decision = RouteDecision("http", "learned_static", key)
+            elif self._rng.random() < self.probe_rate:
+                decision = RouteDecision("http", "sampled_probe", key, probe=True)
+            else:
+                decision = RouteDecision("browser", "learned_dynamic", key)
+
+            if decision.transport == "http":
+                self.stats['decisions_http'] += 1
+            else:
+                self.stats['decisions_browser'] += 1
+            if decision.probe:
+                self.stats['http_probes'] += 1
+            return decision
+
+    def record(self, url: str, transport: str, success: bool):
+        """Record whether ``transport`` produced usable content for ``url``."""
+        domain, pattern = url_pattern(url)
+        now = time.time()
+        with self._lock:
+            for key in ((domain, pattern), (domain, "*")):
+                stats = self._routes.setdefault(key, RouteStats())
+                if transport == "http":
+                    if success:
+                        stats.http_ok += 1
+                    else:
+                        stats.http_miss += 1
+                elif success:
+                    stats.render_ok += 1
+                else:
+                    stats.render_miss += 1
+
+                if stats.http_samples > self.window:
+                    stats.http_ok /= 2
+                    stats.http_miss /= 2
+                    stats.render_ok /= 2
+                    stats.render_miss /= 2
+                stats.updated_at = now
+                self._save(key, stats)
+
+    def record_fallback(self):
+        with self._lock:
+            self.stats['browser_fallbacks'] += 1
+
+    def _save(self, key: Tuple[str, str], stats: RouteStats):
+        self._conn.execute("""
+            INSERT INTO render_routes
+                (domain, pattern, http_ok, http_miss, render_ok, render_miss, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (domain, pattern) DO UPDATE SET
+                http_ok = excluded.http_ok,
+                http_miss = excluded.http_miss,
+                render_ok = excluded.render_ok,
+                render_miss = excluded.render_miss,
+                updated_at = excluded.updated_at
+        """, (*key, stats.http_ok, stats.http_miss, stats.render_ok,
+              stats.render_miss, stats.updated_at))
+
+    def forget(self, domain: str):
+        """Drop everything learned about a domain (e.g. after a redesign)."""
+        domain = domain.lower()
+        with self._lock:
+            for key in [k for k in self._routes if k[0] == domain]:
+                del self._routes[key]
+            self._conn.execute("DELETE FROM render_routes WHERE domain = ?", (domain,))
+
+    def get_routes(self, domain: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Learned routes, optionally for a single domain."""
+        with self._lock:
+            return {
+                f"{d}{p}": {
+                    'http_success_rate': round(s.http_success_rate, 3),
+                    'http_samples': s.http_samples,
+                    'render_ok': s.render_ok,
+                    'render_miss': s.render_miss,
+                    'routed_to': 'http' if s.http_samples >= self.min_samples
+                                 and s.http_success_rate >= self.static_threshold else 'browser'
+                }
+                for (d, p), s in self._routes.items()
+                if domain is None or d == domain.lower()
+            }
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            decided = self.stats['decisions_http'] + self.stats['decisions_browser']
+            return {
+                **self.stats,
+                'routes': len(self._routes),
+                'http_share': self.stats['decisions_http'] / decided if decided else 0.0
+            }
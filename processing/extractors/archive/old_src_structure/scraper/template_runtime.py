@@ -26,6 +26,7 @@ except ImportError:
     Engine = None  # type: ignore
 
 from scraper.dsl.schema import ScrapingTemplate as TemplateDefinition, FieldDef, Transform, Validator
+from scraper.warc import WARCArchive
 
 
 # ----------------------------- Feltyper ---------------------------------------
@@ -86,6 +87,16 @@ class InlineFetcher(Fetcher):
             raise TemplateRuntimeError(f"inline url missing: {url}")
         return self.mapping[url]
 
+class WarcFetcher(Fetcher):
+    """Läser arkiverade svar ur en WARC-katalog – inget nätverk."""
+    def __init__(self, archive: Union[WARCArchive, str, Path]):
+        self.archive = archive if isinstance(archive, WARCArchive) else WARCArchive(archive)
+    def fetch(self, url: str) -> str:
+        resp = self.archive.get(url)
+        if resp is None:
+            raise TemplateRuntimeError(f"url not in archive: {url}")
+        return resp.text
+
 
 # ----------------------------- Writers ---------------------------------------
 
@@ -394,6 +405,19 @@ def run_template_over_urls(
     return stats
 
 
+def replay_template_from_warc(
+    archive: Union[WARCArchive, str, Path],
+    template: TemplateDefinition,
+    writer: Writer,
+    url_pattern: Optional[str] = None,
+    config: Optional[RunConfig] = None
+) -> Dict[str, Any]:
+    """Kör en template mot arkiverade svar (status 200) utan att hämta något igen."""
+    fetcher = WarcFetcher(archive)
+    urls = fetcher.archive.urls(pattern=url_pattern, status=200)
+    return run_template_over_urls(urls, template, fetcher, writer, config)
+
+
 class TemplateRuntime:
     """Runtime executor for template processing operations."""
     
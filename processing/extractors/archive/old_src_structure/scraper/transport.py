@@ -16,7 +16,7 @@ from dataclasses import dataclass
 from urllib.parse import urlparse
 
 import httpx
-from playwright.async_api import async_playwright, Page, Browser
+from playwright.async_api import Page
 
 from anti_bot.policy_manager import DomainPolicy  
 from anti_bot.header_generator import HeaderGenerator
@@ -24,8 +24,31 @@ from anti_bot.session_manager import SessionManager
 from utils.logger import get_logger
 from observability.metrics import MetricsCollector
 
+from .browser_pool import BrowserPool, BrowserPoolConfig, DEFAULT_BLOCKED_RESOURCES
+from .render_router import ContentValidator, RenderRoutingCache, RouteDecision, static_content_validator
+from .warc import WARCWriter
+
 logger = get_logger(__name__)
 
+# Navigator overrides installed once per browser context
+STEALTH_INIT_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined,
+    });
+    
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [1, 2, 3, 4, 5],
+    });
+    
+    Object.defineProperty(navigator, 'languages', {
+        get: () => ['en-US', 'en'],
+    });
+    
+    window.chrome = {
+        runtime: {},
+    };
+"""
+
 
 @dataclass
 class TransportResult:
@@ -64,7 +87,12 @@ class ScrapingTransport:
         session_manager: SessionManager,
         metrics_collector: MetricsCollector,
         http_timeout: float = 30.0,
-        browser_timeout: float = 60.0
+        browser_timeout: float = 60.0,
+        browser_pool: Optional[BrowserPool] = None,
+        browser_pool_config: Optional[BrowserPoolConfig] = None,
+        routing_cache: Optional[RenderRoutingCache] = None,
+        content_validator: Optional[ContentValidator] = None,
+        warc_writer: Optional[WARCWriter] = None
     ):
         self.header_generator = header_generator
         self.session_manager = session_manager
@@ -72,16 +100,28 @@ class ScrapingTransport:
         self.http_timeout = http_timeout
         self.browser_timeout = browser_timeout
         
-        # Browser context management
-        self._browser_context = None
-        self._page_pool = []
-        self._max_pages = 5
+        # Warm, bounded browser contexts shared by all render-mode fetches
+        self.browser_pool = browser_pool or BrowserPool(
+            browser_pool_config or BrowserPoolConfig(init_scripts=[STEALTH_INIT_SCRIPT])
+        )
+        
+        # Learned static-vs-render routing; None keeps the static policy flags
+        self.routing_cache = routing_cache
+        self.content_validator = content_validator or static_content_validator()
+        
+        # Raw responses for offline replay; browser fetches store the rendered DOM
+        self.warc_writer = warc_writer
+        
+    async def start(self):
+        """Pre-warm browser contexts so the first render avoids a cold start."""
+        await self.browser_pool.start()
         
     async def fetch(
         self, 
         url: str, 
         policy: DomainPolicy,
-        force_transport: Optional[str] = None
+        force_transport: Optional[str] = None,
+        validator: Optional[ContentValidator] = None
     ) -> TransportResult:
         """
         Fetch URL content based on transport policy.
@@ -90,6 +130,8 @@ class ScrapingTransport:
             url: Target URL to fetch
             policy: Domain-specific policy configuration
             force_transport: Override transport selection ('http' or 'browser')
+            validator: Checks that content carries the fields the caller
+                needs; drives learned routing (defaults to a text heuristic)
             
         Returns:
             TransportResult with content and metadata
@@ -99,30 +141,35 @@ class ScrapingTransport:
         # Determine transport method
         transport_type = force_transport or policy.transport
         
-        logger.debug(f"Fetching {url} using {transport_type} transport")
-        
         try:
-            if transport_type == "browser":
-                result = await self._fetch_with_browser(url, policy)
+            if force_transport is None and self.routing_cache is not None:
+                decision = self.routing_cache.choose(url, policy.transport)
+                transport_type = decision.transport
+                logger.debug(f"Fetching {url} using {transport_type} transport ({decision.reason})")
+                result = await self._fetch_routed(url, policy, decision, validator or self.content_validator)
             else:
-                result = await self._fetch_with_http(url, policy)
-                
-            # If HTTP fails and policy allows fallback, try browser
-            if (result.status_code >= 400 and 
-                transport_type == "http" and 
-                policy.fallback_to_browser):
-                
-                logger.info(f"HTTP fetch failed for {url}, falling back to browser")
-                result = await self._fetch_with_browser(url, policy)
+                logger.debug(f"Fetching {url} using {transport_type} transport")
+                if transport_type == "browser":
+                    result = await self._fetch_with_browser(url, policy)
+                else:
+                    result = await self._fetch_with_http(url, policy)
+                    
+                # If HTTP fails and policy allows fallback, try browser
+                if (result.status_code >= 400 and 
+                    transport_type == "http" and 
+                    getattr(policy, 'fallback_to_browser', True)):
+                    
+                    logger.info(f"HTTP fetch failed for {url}, falling back to browser")
+                    result = await self._fetch_with_browser(url, policy)
                 
             result.response_time = time.time() - start_time
             
             # Update metrics
-            self.metrics.timer(f"transport_{result.transport_type}_time", result.response_time)
-            self.metrics.counter(f"transport_{result.transport_type}_requests", 1)
+            self.metrics.record_histogram(f"transport_{result.transport_type}_time", result.response_time)
+            self.metrics.record_counter(f"transport_{result.transport_type}_requests", 1)
             
             if result.status_code >= 400:
-                self.metrics.counter(f"transport_{result.transport_type}_errors", 1)
+                self.metrics.record_counter(f"transport_{result.transport_type}_errors", 1)
                 
             return result
             
@@ -137,6 +184,72 @@ class ScrapingTransport:
                 error=str(e)
             )
             
+    async def _fetch_routed(
+        self,
+        url: str,
+        policy: DomainPolicy,
+        decision: RouteDecision,
+        validator: ContentValidator
+    ) -> TransportResult:
+        """Fetch along a learned route and feed the outcome back to the cache.
+        
+        HTTP results that miss the required content are re-fetched with the
+        browser, so the cheap path never costs correctness.
+        """
+        routing = {'decision': decision.reason, 'pattern': decision.key[1], 'probe': decision.probe}
+        
+        if decision.transport == "browser":
+            result = await self._fetch_with_browser(url, policy)
+            if self._is_conclusive(result):
+                self.routing_cache.record(url, "browser", self._is_usable(result, validator))
+            result.metadata['routing'] = routing
+            return result
+        
+        result = await self._fetch_with_http(url, policy)
+        if not self._is_conclusive(result):
+            result.metadata['routing'] = routing
+            return result
+        
+        usable = self._is_usable(result, validator)
+        self.routing_cache.record(url, "http", usable)
+        if usable or not getattr(policy, 'fallback_to_browser', True):
+            result.metadata['routing'] = routing
+            return result
+        
+        logger.debug(f"HTTP content for {url} missed required fields, rendering")
+        self.routing_cache.record_fallback()
+        self.metrics.record_counter("transport_render_fallbacks", 1)
+        
+        rendered = await self._fetch_with_browser(url, policy)
+        if self._is_conclusive(rendered):
+            self.routing_cache.record(url, "browser", self._is_usable(rendered, validator))
+        rendered.metadata['routing'] = {**routing, 'fallback': True}
+        return rendered
+        
+    @staticmethod
+    def _is_conclusive(result: TransportResult) -> bool:
+        """Missing pages and server errors say nothing about rendering needs."""
+        return not result.error and result.status_code not in (404, 410) and result.status_code < 500
+        
+    @staticmethod
+    def _is_usable(result: TransportResult, validator: ContentValidator) -> bool:
+        if result.status_code >= 400:
+            return False
+        try:
+            return bool(validator(result.content))
+        except Exception as e:
+            logger.debug(f"Content validator failed: {e}")
+            return False
+        
+    def report_extraction_result(self, url: str, transport_type: str, success: bool):
+        """Feed a downstream extraction outcome back into learned routing.
+        
+        Use when fields are extracted after ``fetch`` returns rather than
+        through a ``validator``.
+        """
+        if self.routing_cache is not None:
+            self.routing_cache.record(url, transport_type, success)
+        
     async def _fetch_with_http(self, url: str, policy: DomainPolicy) -> TransportResult:
         """Fetch content using HTTP client."""
         try:
@@ -177,6 +290,15 @@ class ScrapingTransport:
                         policy.domain, new_cookies
                     )
                     
+                if self.warc_writer is not None:
+                    await self.warc_writer.archive(
+                        str(response.url), response.status_code,
+                        response.headers.multi_items(), response.content,
+                        request_headers=response.request.headers.multi_items(),
+                        reason=response.reason_phrase,
+                        http_version=response.http_version
+                    )
+                    
                 return TransportResult(
                     content=response.text,
                     status_code=response.status_code,
@@ -202,41 +324,48 @@ class ScrapingTransport:
             )
             
     async def _fetch_with_browser(self, url: str, policy: DomainPolicy) -> TransportResult:
-        """Fetch content using browser automation."""
-        page = None
+        """Fetch content using a page checked out from the browser pool."""
         try:
-            # Get or create browser page
-            page = await self._get_browser_page()
-            
-            # Apply stealth measures
-            await self._apply_stealth_measures(page, policy)
-            
-            # Apply rate limiting
-            await self._apply_rate_limiting(policy)
-            
-            # Navigate to URL
-            response = await page.goto(
-                url,
-                timeout=self.browser_timeout * 1000,  # Convert to milliseconds
-                wait_until='domcontentloaded'
-            )
-            
-            status_code = response.status if response else 200
-            
-            # Wait for dynamic content if needed
-            if policy.wait_for_js:
-                await page.wait_for_load_state('networkidle', timeout=10000)
+            blocked = getattr(policy, 'block_resources', None)
+            async with self.browser_pool.page(
+                block_resources=DEFAULT_BLOCKED_RESOURCES if blocked is None else blocked
+            ) as page:
+                # Apply stealth measures
+                await self._apply_stealth_measures(page, policy)
                 
-            # Extract content
-            content = await page.content()
-            final_url = page.url
-            
-            # Get metadata
-            metadata = {
-                'user_agent': await page.evaluate('navigator.userAgent'),
-                'viewport': await page.viewport_size(),
-                'cookies': await page.context.cookies(url)
-            }
+                # Apply rate limiting
+                await self._apply_rate_limiting(policy)
+                
+                # Navigate to URL
+                response = await page.goto(
+                    url,
+                    timeout=self.browser_timeout * 1000,  # Convert to milliseconds
+                    wait_until='domcontentloaded'
+                )
+                
+                status_code = response.status if response else 200
+                
+                # Wait for dynamic content if needed
+                if getattr(policy, 'wait_for_js', False):
+                    await page.wait_for_load_state('networkidle', timeout=10000)
+                    
+                # Extract content
+                content = await page.content()
+                final_url = page.url
+                
+                # Get metadata
+                metadata = {
+                    'user_agent': await page.evaluate('navigator.userAgent'),
+                    'viewport': page.viewport_size,
+                    'cookies': await page.context.cookies(url)
+                }
+                
+                if self.warc_writer is not None:
+                    await self.warc_writer.archive(
+                        final_url, status_code, response.headers if response else {}, content,
+                        request_headers=response.request.headers if response else None,
+                        transport="browser"
+                    )
             
             return TransportResult(
                 content=content,
@@ -257,95 +386,14 @@ class ScrapingTransport:
                 final_url=url,
                 error=str(e)
             )
-        finally:
-            if page:
-                await self._release_browser_page(page)
-                
-    async def _get_browser_page(self) -> Page:
-        """Get or create a browser page from the pool."""
-        if self._page_pool:
-            return self._page_pool.pop()
-            
-        # Create new browser context if needed
-        if not self._browser_context:
-            playwright = await async_playwright().start()
-            browser = await playwright.chromium.launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-extensions',
-                    '--disable-plugins',
-                    '--disable-images',  # Speed optimization
-                    '--disable-javascript-harmony-shipping',
-                    '--disable-background-timer-throttling',
-                    '--disable-renderer-backgrounding',
-                    '--disable-features=TranslateUI',
-                    '--disable-ipc-flooding-protection'
-                ]
-            )
-            
-            self._browser_context = await browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            )
-            
-        return await self._browser_context.new_page()
-        
-    async def _release_browser_page(self, page: Page):
-        """Return page to pool or close it."""
-        try:
-            # Clear page state
-            await page.goto('about:blank')
-            
-            # Add to pool if under limit
-            if len(self._page_pool) < self._max_pages:
-                self._page_pool.append(page)
-            else:
-                await page.close()
-                
-        except Exception as e:
-            logger.debug(f"Error releasing page: {e}")
-            try:
-                await page.close()
-            except:
-                pass
                 
     async def _apply_stealth_measures(self, page: Page, policy: DomainPolicy):
-        """Apply stealth measures to browser page."""
+        """Apply per-request stealth measures to a pooled browser page.
+        
+        Resource blocking and the navigator overrides are installed once
+        per page/context by the browser pool.
+        """
         try:
-            # Block unnecessary resources for speed and stealth
-            await page.route("**/*.{png,jpg,jpeg,gif,svg,css,woff,woff2,ttf,ico}", 
-                            lambda route: route.abort())
-            
-            # Block tracking and analytics
-            tracking_patterns = [
-                '**/analytics.js', '**/gtag/*', '**/ga.js', '**/google-analytics/*',
-                '**/facebook.net/*', '**/doubleclick.net/*', '**/googletagmanager.com/*'
-            ]
-            
-            for pattern in tracking_patterns:
-                await page.route(pattern, lambda route: route.abort())
-                
-            # Override navigator properties to avoid detection
-            await page.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined,
-                });
-                
-                Object.defineProperty(navigator, 'plugins', {
-                    get: () => [1, 2, 3, 4, 5],
-                });
-                
-                Object.defineProperty(navigator, 'languages', {
-                    get: () => ['en-US', 'en'],
-                });
-                
-                window.chrome = {
-                    runtime: {},
-                };
-            """)
-            
             # Set realistic headers
             domain = urlparse(page.url).netloc if hasattr(page, 'url') else policy.domain
             headers = self.header_generator.generate_headers(domain)
@@ -363,9 +411,15 @@ class ScrapingTransport:
         self, 
         urls: list[str], 
         policy: DomainPolicy,
-        max_concurrent: int = 5
+        max_concurrent: Optional[int] = None
     ) -> list[TransportResult]:
-        """Fetch multiple URLs concurrently with rate limiting."""
+        """Fetch multiple URLs concurrently with rate limiting.
+        
+        Browser batches default to the pool capacity, spreading pages
+        across all warm contexts.
+        """
+        if max_concurrent is None:
+            max_concurrent = self.browser_pool.capacity if policy.transport == "browser" else 5
         semaphore = asyncio.Semaphore(max_concurrent)
         
         async def fetch_with_semaphore(url):
@@ -395,25 +449,19 @@ class ScrapingTransport:
     async def cleanup(self):
         """Clean up browser resources."""
         try:
-            # Close all pages in pool
-            while self._page_pool:
-                page = self._page_pool.pop()
-                await page.close()
-                
-            # Close browser context
-            if self._browser_context:
-                await self._browser_context.close()
-                self._browser_context = None
-                
+            await self.browser_pool.stop()
         except Exception as e:
             logger.error(f"Error during transport cleanup: {e}")
             
     def get_statistics(self) -> Dict[str, Any]:
         """Get transport statistics."""
+        pool_stats = self.browser_pool.get_stats()
         return {
-            'browser_pages_pooled': len(self._page_pool),
-            'browser_context_active': self._browser_context is not None,
-            'max_pages': self._max_pages,
+            'browser_pages_pooled': pool_stats['pages_idle'],
+            'browser_context_active': pool_stats['contexts'] > 0,
+            'max_pages': pool_stats['capacity'],
+            'browser_pool': pool_stats,
+            'routing': self.routing_cache.get_statistics() if self.routing_cache else None,
             'http_timeout': self.http_timeout,
             'browser_timeout': self.browser_timeout
         }
@@ -0,0 +1,458 @@
+"""
+WARC Archive - Raw HTTP exchange archiving and offline replay.
+
+Writes fetched responses as WARC/1.1 (ISO 28500) records so extraction
+can be re-run later without touching the network:
+- one gzip member per record, so any record can be read by offset
+- files rotate once they pass a size limit
+- every WARC file gets a CDXJ index (``<file>.cdxj``) mapping URLs to
+  record offsets
+- ``WARCArchive`` looks responses up by URL for replay
+
+Response bodies are stored as delivered to the client, i.e. after
+content and transfer decoding; the original encoding headers are kept as
+``X-Archive-Orig-*`` fields. Text bodies (e.g. a browser-rendered DOM)
+are stored as UTF-8 and their Content-Type charset is rewritten to match.
+
+``WARC-Protocol`` carries the ALPN id of the HTTP version (``http/1.1``,
+``h2``); which transport fetched the page is in ``X-Archive-Transport``.
+"""
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+from urllib.parse import urlsplit
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+WARC_VERSION = "WARC/1.1"
+
+HeaderList = List[Tuple[str, str]]
+Headers = Union[Mapping[str, str], Sequence[Tuple[str, str]]]
+
+# Headers that describe the wire encoding of a body we store decoded
+_ENCODING_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+_CHARSET = re.compile(r"charset=([\w.:-]+)", re.I)
+_CHARSET_PARAM = re.compile(r";\s*charset=[^;]*", re.I)
+
+# ALPN protocol ids used as WARC-Protocol values
+_PROTOCOL_IDS = {"HTTP/0.9": "http/0.9", "HTTP/1.0": "http/1.0", "HTTP/1.1": "http/1.1",
+                 "HTTP/2": "h2", "HTTP/2.0": "h2", "HTTP/3": "h3", "HTTP/3.0": "h3"}
+
+
+def _header_list(headers: Optional[Headers]) -> HeaderList:
+    if not headers:
+        return []
+    items = headers.items() if isinstance(headers, Mapping) else headers
+    result = []
+    for name, value in items:
+        if isinstance(name, bytes):
+            name = name.decode("latin-1")
+        if isinstance(value, bytes):
+            value = value.decode("latin-1")
+        result.append((str(name), str(value)))
+    return result
+
+
+def _utf8_content_type(value: str) -> str:
+    """``value`` with its charset parameter set to utf-8."""
+    return _CHARSET_PARAM.sub("", value).strip() + "; charset=utf-8"
+
+
+def _digest(data: bytes) -> str:
+    return "sha1:" + base64.b32encode(hashlib.sha1(data).digest()).decode("ascii")
+
+
+def _warc_date(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def surt(url: str) -> str:
+    """Sort-friendly URL key, e.g. ``https://www.Bilweb.se/a?b=1`` -> ``se,bilweb)/a?b=1``."""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    key = ",".join(reversed(host.split("."))) + ")" + (parts.path or "/")
+    if parts.query:
+        key += "?" + "&".join(sorted(parts.query.split("&")))
+    return key
+
+
+@dataclass
+class WARCRecordLocation:
+    """Where a record was written."""
+    filename: str
+    offset: int
+    length: int
+
+
+@dataclass
+class ArchivedResponse:
+    """A response read back from the archive."""
+    url: str
+    status_code: int
+    headers: HeaderList
+    body: bytes
+    fetched_at: str
+    transport: str = "http"
+    protocol: Optional[str] = None
+    record_id: Optional[str] = None
+
+    def header(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        name = name.lower()
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+        return default
+
+    @property
+    def content_type(self) -> str:
+        return (self.header("Content-Type") or "").split(";")[0].strip().lower()
+
+    @property
+    def encoding(self) -> str:
+        match = _CHARSET.search(self.header("Content-Type") or "")
+        return match.group(1) if match else "utf-8"
+
+    @property
+    def text(self) -> str:
+        try:
+            return self.body.decode(self.encoding, errors="replace")
+        except LookupError:
+            return self.body.decode("utf-8", errors="replace")
+
+
+class WARCWriter:
+    """
+    Append-only, size-rotated WARC writer.
+
+    Thread-safe; async callers should use ``archive()``, which does the
+    compression and file IO off the event loop and never raises.
+    """
+
+    def __init__(self,
+                 directory: Union[str, Path],
+                 prefix: str = "crawl",
+                 max_file_size: int = 1024 ** 3,
+                 software: str = "sparkling-owl-spin",
+                 operator: Optional[str] = None,
+                 write_requests: bool = True):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.max_file_size = max_file_size
+        self.software = software
+        self.operator = operator
+        self.write_requests = write_requests
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._index = None
+        self._filename: Optional[str] = None
+        self._serial = 0
+
+        self.stats = {
+            'records_written': 0,
+            'responses_written': 0,
+            'bytes_written': 0,
+            'files_written': 0,
+            'write_errors': 0
+        }
+
+    # -- files ---------------------------------------------------------------
+
+    def _open_next_file(self):
+        self._close_file()
+        self._serial += 1
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        self._filename = f"{self.prefix}-{stamp}-{os.getpid()}-{self._serial:05d}.warc.gz"
+        self._file = open(self.directory / self._filename, "ab")
+        self._index = open(self.directory / f"{self._filename}.cdxj", "a", encoding="utf-8")
+        self.stats['files_written'] += 1
+
+        info = [("software", self.software), ("format", "WARC File Format 1.1")]
+        if self.operator:
+            info.append(("operator", self.operator))
+        payload = "".join(f"{k}: {v}\r\n" for k, v in info).encode("utf-8")
+        self._write_record("warcinfo", payload, "application/warc-fields",
+                           extra=[("WARC-Filename", self._filename)])
+        logger.info(f"Writing WARC file {self._filename}")
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._index.close()
+            self._file = None
+            self._index = None
+
+    def close(self):
+        with self._lock:
+            self._close_file()
+
+    # -- records -------------------------------------------------------------
+
+    def _write_record(self, record_type: str, block: bytes, content_type: str,
+                      target_uri: Optional[str] = None, date: Optional[datetime] = None,
+                      extra: Iterable[Tuple[str, str]] = ()) -> Tuple[str, WARCRecordLocation]:
+        record_id = f"<urn:uuid:{uuid.uuid4()}>"
+        headers = [
+            ("WARC-Type", record_type),
+            ("WARC-Record-ID", record_id),
+            ("WARC-Date", _warc_date(date or datetime.now(timezone.utc))),
+        ]
+        if target_uri:
+            headers.append(("WARC-Target-URI", target_uri))
+        headers.extend(extra)
+        headers.extend([
+            ("WARC-Block-Digest", _digest(block)),
+            ("Content-Type", content_type),
+            ("Content-Length", str(len(block))),
+        ])
+        head = WARC_VERSION + "\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers) + "\r\n"
+        member = gzip.compress(head.encode("utf-8") + block + b"\r\n\r\n")
+
+        offset = self._file.tell()
+        self._file.write(member)
+        self.stats['records_written'] += 1
+        self.stats['bytes_written'] += len(member)
+        return record_id, WARCRecordLocation(self._filename, offset, len(member))
+
+    def write_response(self,
+                       url: str,
+                       status_code: int,
+                       headers: Optional[Headers],
+                       body: bytes,
+                       method: str = "GET",
+                       request_headers: Optional[Headers] = None,
+                       reason: Optional[str] = None,
+                       http_version: Optional[str] = None,
+                       fetched_at: Optional[datetime] = None,
+                       transport: str = "http") -> WARCRecordLocation:
+        """Write a response record (plus its request record) and index it.
+
+        ``http_version`` is the negotiated protocol; leave it unset when
+        unknown (browser fetches) and no ``WARC-Protocol`` is written.
+        """
+        text_body = isinstance(body, str)
+        if text_body:
+            body = body.encode("utf-8")
+        fetched_at = fetched_at or datetime.now(timezone.utc)
+        if reason is None:
+            try:
+                reason = HTTPStatus(status_code).phrase
+            except ValueError:
+                reason = ""
+        protocol = None
+        if http_version:
+            if not http_version.upper().startswith("HTTP/"):
+                http_version = f"HTTP/{http_version}"
+            protocol = _PROTOCOL_IDS.get(http_version.upper())
+        else:
+            http_version = "HTTP/1.1"
+
+        stored_headers = []
+        for name, value in _header_list(headers):
+            if name.lower() in _ENCODING_HEADERS:
+                stored_headers.append((f"X-Archive-Orig-{name}", value))
+            elif name.lower() == "content-type" and text_body:
+                stored_headers.append((f"X-Archive-Orig-{name}", value))
+                stored_headers.append((name, _utf8_content_type(value)))
+            else:
+                stored_headers.append((name, value))
+        stored_headers.append(("Content-Length", str(len(body))))
+
+        http_head = f"{http_version} {status_code} {reason}\r\n" + \
+            "".join(f"{k}: {v}\r\n" for k, v in stored_headers) + "\r\n"
+        block = http_head.encode("latin-1", errors="replace") + body
+        payload_digest = _digest(body)
+        mime = next((v for k, v in stored_headers if k.lower() == "content-type"), "")
+
+        with self._lock:
+            if self._file is None or self._file.tell() >= self.max_file_size:
+                self._open_next_file()
+
+            extra = [("WARC-Payload-Digest", payload_digest)]
+            if protocol:
+                extra.append(("WARC-Protocol", protocol))
+            extra.append(("X-Archive-Transport", transport))
+            record_id, location = self._write_record(
+                "response", block, "application/http; msgtype=response",
+                target_uri=url, date=fetched_at, extra=extra
+            )
+
+            if self.write_requests:
+                parts = urlsplit(url)
+                path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+                request_lines = [f"{method.upper()} {path} {http_version}", f"Host: {parts.netloc}"]
+                request_lines += [f"{k}: {v}" for k, v in _header_list(request_headers)
+                                  if k.lower() != "host"]
+                self._write_record(
+                    "request", ("\r\n".join(request_lines) + "\r\n\r\n").encode("latin-1", errors="replace"),
+                    "application/http; msgtype=request", target_uri=url, date=fetched_at,
+                    extra=[("WARC-Concurrent-To", record_id)]
+                )
+
+            entry = {
+                "url": url,
+                "mime": mime.split(";")[0].strip(),
+                "status": str(status_code),
+                "digest": payload_digest,
+                "length": str(location.length),
+                "offset": str(location.offset),
+                "filename": location.filename,
+            }
+            self._index.write(f"{surt(url)} {fetched_at.astimezone(timezone.utc):%Y%m%d%H%M%S} "
+                              f"{json.dumps(entry, separators=(',', ':'))}\n")
+            self._file.flush()
+            self._index.flush()
+            self.stats['responses_written'] += 1
+            return location
+
+    async def archive(self, url: str, status_code: int, headers: Optional[Headers],
+                      body: Union[bytes, str], **kwargs) -> Optional[WARCRecordLocation]:
+        """``write_response`` from async code; failures are logged, not raised."""
+        try:
+            return await asyncio.to_thread(self.write_response, url, status_code, headers, body, **kwargs)
+        except Exception as e:
+            self.stats['write_errors'] += 1
+            logger.warning(f"Failed to archive {url}: {e}")
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'current_file': self._filename}
+
+
+# -- reading -------------------------------------------------------------------
+
+def _parse_record(data: bytes) -> Tuple[Dict[str, str], bytes]:
+    head, _, rest = data.partition(b"\r\n\r\n")
+    lines = head.decode("utf-8", errors="replace").split("\r\n")
+    if not lines[0].startswith("WARC/"):
+        raise ValueError("Not a WARC record")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip()] = value.strip()
+    length = int(headers.get("Content-Length", "0"))
+    return headers, rest[:length]
+
+
+def _parse_http_response(block: bytes) -> Tuple[int, HeaderList, bytes]:
+    head, _, body = block.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = []
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers.append((name.strip(), value.strip()))
+    return status, headers, body
+
+
+def _to_response(headers: Dict[str, str], block: bytes) -> ArchivedResponse:
+    status, http_headers, body = _parse_http_response(block)
+    return ArchivedResponse(
+        url=headers.get("WARC-Target-URI", ""),
+        status_code=status,
+        headers=http_headers,
+        body=body,
+        fetched_at=headers.get("WARC-Date", ""),
+        transport=headers.get("X-Archive-Transport", "http"),
+        protocol=headers.get("WARC-Protocol"),
+        record_id=headers.get("WARC-Record-ID")
+    )
+
+
+def iter_warc_records(path: Union[str, Path]) -> Iterator[Tuple[Dict[str, str], bytes]]:
+    """Yield ``(warc_headers, block)`` for every record in a gzipped WARC file."""
+    with open(path, "rb") as f:
+        pending = b""
+        while True:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            data = b""
+            while not decompressor.eof:
+                chunk = pending or f.read(1 << 16)
+                pending = b""
+                if not chunk:
+                    if data:
+                        raise ValueError(f"Truncated WARC record in {path}")
+                    return
+                data += decompressor.decompress(chunk)
+            pending = decompressor.unused_data
+            yield _parse_record(data)
+
+
+class WARCArchive:
+    """Read side of a WARC directory: URL lookup through the CDXJ indexes."""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.reload()
+
+    def reload(self):
+        """Re-read the CDXJ indexes; the newest capture of each URL wins."""
+        entries: Dict[str, Dict[str, Any]] = {}
+        for index_path in sorted(self.directory.glob("*.cdxj")):
+            with open(index_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        key, timestamp, payload = line.rstrip("\n").split(" ", 2)
+                        entry = json.loads(payload)
+                    except ValueError:
+                        continue  # partially written line
+                    entry["timestamp"] = timestamp
+                    current = entries.get(key)
+                    if current is None or current["timestamp"] <= timestamp:
+                        entries[key] = entry
+        self._entries = entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, url: str) -> bool:
+        return surt(url) in self._entries
+
+    def urls(self, pattern: Optional[str] = None, status: Optional[int] = None) -> List[str]:
+        """Archived URLs in index order, optionally filtered by regex and status."""
+        regex = re.compile(pattern) if pattern else None
+        result = []
+        for key in sorted(self._entries):
+            entry = self._entries[key]
+            if status is not None and entry.get("status") != str(status):
+                continue
+            if regex is not None and not regex.search(entry["url"]):
+                continue
+            result.append(entry["url"])
+        return result
+
+    def get(self, url: str) -> Optional[ArchivedResponse]:
+        """Newest archived response for ``url``, read by offset."""
+        entry = self._entries.get(surt(url))
+        if entry is None:
+            return None
+        with open(self.directory / entry["filename"], "rb") as f:
+            f.seek(int(entry["offset"]))
+            member = f.read(int(entry["length"]))
+        headers, block = _parse_record(gzip.decompress(member))
+        return _to_response(headers, block)
+
+    def iter_responses(self, pattern: Optional[str] = None) -> Iterator[ArchivedResponse]:
+        for url in self.urls(pattern):
+            response = self.get(url)
+            if response is not None:
+                yield response
@@ -11,11 +11,15 @@ Key Features:
 - Automatic field pattern detection
 - Conflict resolution and optimization
 - Template variance adaptation
+- Single-pass sample indexing, optionally spread over worker processes
 """
 
+import math
 import re
+import time
 import hashlib
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Tuple, Set, Optional, Any
 from dataclasses import dataclass
 from lxml import html, etree
@@ -26,6 +30,15 @@ from observability.metrics import MetricsCollector
 
 logger = get_logger(__name__)
 
+# Selector shapes generated by this module. They are resolved against a
+# DocumentIndex directly; anything else is evaluated by lxml.
+_SIMPLE_XPATH = re.compile(r'^//[A-Za-z_][\w.-]*(?:\[\d+\])?(?:/[A-Za-z_][\w.-]*(?:\[\d+\])?)*$')
+_XPATH_STEP = re.compile(r'([A-Za-z_][\w.-]*)(?:\[(\d+)\])?')
+_SIMPLE_ID_CSS = re.compile(r'^#([A-Za-z_][\w-]*)$')
+_SIMPLE_CLASS_CSS = re.compile(r'^([A-Za-z][\w-]*)((?:\.[A-Za-z_][\w-]*)+)$')
+
+SelectorKey = Tuple[str, str]  # (selector_type, selector)
+
 
 @dataclass
 class SelectorCandidate:
@@ -56,6 +69,237 @@ class FieldSuggestion:
     sample_values: List[str]
 
 
+@dataclass
+class SampleProfile:
+    """Structure and raw selector candidates gathered from one sample."""
+    tags: List[str]
+    classes: List[str]
+    ids: List[str]
+    candidates: List[Tuple[str, str, str, str]]  # (selector_type, selector, field_name, text)
+
+
+class DocumentIndex:
+    """
+    Single traversal of a parsed sample.
+    
+    Each element's XPath step (tag plus position among same-tag siblings) is
+    computed once per parent and its path extends the parent's path, so
+    building paths is linear in the document size. Lookups by tag, id and
+    class let generated selectors be resolved without walking the tree.
+    """
+    
+    def __init__(self, doc: html.HtmlElement):
+        self.doc = doc
+        self.elements: List[Tuple[html.HtmlElement, Optional[str]]] = []  # document order
+        self.children: Dict[html.HtmlElement, Dict[str, List[html.HtmlElement]]] = {}
+        self.position: Dict[html.HtmlElement, int] = {doc: 1}
+        self.by_tag: Dict[str, List[html.HtmlElement]] = defaultdict(list)
+        self.by_id: Dict[str, List[html.HtmlElement]] = defaultdict(list)
+        self.by_class: Dict[str, List[html.HtmlElement]] = defaultdict(list)
+        
+        # The root has no path: generated XPaths start below it
+        stack = [(doc, None)]
+        while stack:
+            elem, path = stack.pop()
+            self.elements.append((elem, path))
+            self.by_tag[elem.tag].append(elem)
+            if elem.get('id'):
+                self.by_id[elem.get('id')].append(elem)
+            if elem.get('class'):
+                for cls in set(elem.get('class').split()):
+                    self.by_class[cls].append(elem)
+            
+            # Comments and processing instructions are not addressable elements
+            child_elements = [child for child in elem if isinstance(child.tag, str)]
+            if not child_elements:
+                continue
+            by_tag = defaultdict(list)
+            for child in child_elements:
+                by_tag[child.tag].append(child)
+                self.position[child] = len(by_tag[child.tag])
+            self.children[elem] = by_tag
+            
+            entries = []
+            for child in child_elements:
+                step = f"{child.tag}[{self.position[child]}]" if len(by_tag[child.tag]) > 1 else child.tag
+                entries.append((child, f"{path}/{step}" if path else step))
+            stack.extend(reversed(entries))
+    
+    def select(self, selector_type: str, selector: str) -> Optional[List[html.HtmlElement]]:
+        """Resolve a generated selector; None if it has to be evaluated by lxml."""
+        if selector_type == 'xpath':
+            if not _SIMPLE_XPATH.match(selector):
+                return None
+            steps = _XPATH_STEP.findall(selector[2:])
+            tag, position = steps[0]
+            matched = [
+                elem for elem in self.by_tag.get(tag, ())
+                if not position or self.position.get(elem) == int(position)
+            ]
+            for tag, position in steps[1:]:
+                next_matched = []
+                for elem in matched:
+                    siblings = self.children.get(elem, {}).get(tag)
+                    if not siblings:
+                        continue
+                    if not position:
+                        next_matched.extend(siblings)
+                    elif 0 < int(position) <= len(siblings):
+                        next_matched.append(siblings[int(position) - 1])
+                matched = next_matched
+            return matched
+        
+        match = _SIMPLE_ID_CSS.match(selector)
+        if match:
+            return list(self.by_id.get(match.group(1), ()))
+        match = _SIMPLE_CLASS_CSS.match(selector)
+        if match:
+            tag, classes = match.group(1), set(match.group(2)[1:].split('.'))
+            return [
+                elem for elem in self.by_class.get(next(iter(classes)), ())
+                if elem.tag == tag and classes <= set(elem.get('class', '').split())
+            ]
+        return None
+
+
+def _select_with_lxml(doc: html.HtmlElement, key: SelectorKey, compiled: Dict[SelectorKey, Any]) -> List[Any]:
+    """Evaluate a selector with lxml, compiling it once per run."""
+    if key not in compiled:
+        selector_type, selector = key
+        try:
+            if selector_type == 'xpath':
+                compiled[key] = etree.XPath(selector)
+            else:
+                from lxml.cssselect import CSSSelector
+                compiled[key] = CSSSelector(selector)
+        except Exception as e:
+            logger.debug(f"Error compiling selector {selector}: {e}")
+            compiled[key] = None
+    if compiled[key] is None:
+        return []
+    try:
+        return compiled[key](doc)
+    except Exception as e:
+        logger.debug(f"Error applying selector {key[1]}: {e}")
+        return []
+
+
+def evaluate_selectors(
+    indexes: List[DocumentIndex], 
+    selectors: List[SelectorKey]
+) -> Dict[SelectorKey, Tuple[int, List[str]]]:
+    """Apply selectors to indexed samples; returns (matching samples, extracted texts) per selector."""
+    compiled = {}
+    outcomes = {}
+    
+    for key in selectors:
+        successful_extractions = 0
+        extracted_values = []
+        for index in indexes:
+            results = index.select(*key)
+            if results is None:
+                results = _select_with_lxml(index.doc, key, compiled)
+            if not results:
+                continue
+            successful_extractions += 1
+            for elem in results:
+                if hasattr(elem, 'text_content'):
+                    text = elem.text_content().strip()
+                else:
+                    text = (getattr(elem, 'text', elem) or '').strip()
+                if text:
+                    extracted_values.append(text)
+        outcomes[key] = (successful_extractions, extracted_values)
+        
+    return outcomes
+
+
+def _parse_sample(position: int, html_content: str) -> Optional[html.HtmlElement]:
+    try:
+        return html.fromstring(html_content)
+    except Exception as e:
+        logger.warning(f"Failed to parse HTML sample {position}: {e}")
+        return None
+
+
+def _profile_chunk(samples: List[Tuple[int, str]]) -> List[Tuple[int, Optional[SampleProfile]]]:
+    """Worker: parse and profile a chunk of samples."""
+    suggester = XPathSuggester()
+    field_names = {}
+    profiles = []
+    for position, html_content in samples:
+        doc = _parse_sample(position, html_content)
+        profile = suggester._profile_document(DocumentIndex(doc), field_names) if doc is not None else None
+        profiles.append((position, profile))
+    return profiles
+
+
+def _score_chunk(samples: List[str], selectors: List[SelectorKey]) -> Dict[SelectorKey, Tuple[int, List[str]]]:
+    """Worker: parse a chunk of samples and apply selectors to it."""
+    return evaluate_selectors([DocumentIndex(html.fromstring(content)) for content in samples], selectors)
+
+
+class _SampleSet:
+    """
+    Parsed samples for one analysis.
+    
+    Without an executor every sample is parsed and indexed once and reused
+    for profiling and scoring. With a process pool, chunks of samples are
+    profiled and scored in the workers, which parse each chunk once per
+    phase; only profiles and extraction counts cross process boundaries.
+    """
+    
+    def __init__(self, html_samples: List[str], executor: Optional[ProcessPoolExecutor] = None,
+                 workers: int = 1):
+        self.html_samples = html_samples
+        self.executor = executor
+        self.workers = workers
+        self.indexes: List[DocumentIndex] = []
+        self.valid_samples: List[str] = []
+        
+    def _chunks(self, items: List[Any]) -> List[List[Any]]:
+        # A few chunks per worker keeps the pool busy when sample sizes vary
+        size = max(1, math.ceil(len(items) / (self.workers * 4)))
+        return [items[i:i + size] for i in range(0, len(items), size)]
+        
+    def profile(self, suggester: "XPathSuggester") -> List[SampleProfile]:
+        """Parse every sample and collect its profile, skipping unparseable ones."""
+        profiles = []
+        if self.executor is None:
+            field_names = {}
+            for position, html_content in enumerate(self.html_samples):
+                doc = _parse_sample(position, html_content)
+                if doc is None:
+                    continue
+                index = DocumentIndex(doc)
+                self.indexes.append(index)
+                profiles.append(suggester._profile_document(index, field_names))
+            return profiles
+        
+        chunks = self._chunks(list(enumerate(self.html_samples)))
+        for chunk in self.executor.map(_profile_chunk, chunks):
+            for position, profile in chunk:
+                if profile is not None:
+                    self.valid_samples.append(self.html_samples[position])
+                    profiles.append(profile)
+        return profiles
+        
+    def evaluate(self, selectors: List[SelectorKey]) -> Dict[SelectorKey, Tuple[int, List[str]]]:
+        """Apply selectors to every valid sample."""
+        if self.executor is None:
+            return evaluate_selectors(self.indexes, selectors)
+        
+        outcomes = {key: (0, []) for key in selectors}
+        chunks = self._chunks(self.valid_samples)
+        for chunk_outcomes in self.executor.map(_score_chunk, chunks, [selectors] * len(chunks)):
+            for key, (hits, values) in chunk_outcomes.items():
+                outcomes[key] = (outcomes[key][0] + hits, outcomes[key][1] + values)
+        return outcomes
+        
+    def __len__(self) -> int:
+        return len(self.indexes) if self.executor is None else len(self.valid_samples)
+
+
 class XPathSuggester:
     """
     Advanced XPath and CSS selector suggestion system.
@@ -64,16 +308,21 @@ class XPathSuggester:
     to identify stable, reliable selectors for data extraction.
     """
     
-    def __init__(self, metrics_collector: MetricsCollector = None):
+    def __init__(self, metrics_collector: MetricsCollector = None, max_workers: int = 1):
         self.metrics = metrics_collector
         self.min_stability_score = 0.7
         self.min_coverage = 0.8
         self.max_variance = 0.3
+        # Worker processes for large sample sets; 1 analyzes in-process
+        self.max_workers = max_workers
+        # Documents compared for structure similarity (SequenceMatcher is quadratic)
+        self.similarity_sample_size = 20
         
     def suggest_selectors_for_template(
         self, 
         html_samples: List[str], 
-        field_hints: Dict[str, str] = None
+        field_hints: Dict[str, str] = None,
+        max_workers: Optional[int] = None
     ) -> Dict[str, FieldSuggestion]:
         """
         Analyzes HTML documents and suggests stable selectors for fields.
@@ -81,6 +330,7 @@ class XPathSuggester:
         Args:
             html_samples: List of HTML documents from same template
             field_hints: Optional hints about expected field names/types
+            max_workers: Worker processes to spread samples over (default: ``self.max_workers``)
             
         Returns:
             Dictionary mapping field names to selector suggestions
@@ -90,42 +340,49 @@ class XPathSuggester:
         if len(html_samples) < 2:
             raise ValueError("Need at least 2 HTML samples for comparison")
             
-        # Parse all HTML samples
-        parsed_docs = []
-        for i, html_content in enumerate(html_samples):
-            try:
-                doc = html.fromstring(html_content)
-                parsed_docs.append(doc)
-            except Exception as e:
-                logger.warning(f"Failed to parse HTML sample {i}: {e}")
-                
-        if len(parsed_docs) < 2:
+        workers = min(max_workers or self.max_workers or 1, len(html_samples))
+        started = time.perf_counter()
+        
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                optimized_suggestions = self._analyze(_SampleSet(html_samples, executor, workers), field_hints)
+        else:
+            optimized_suggestions = self._analyze(_SampleSet(html_samples), field_hints)
+            
+        duration = time.perf_counter() - started
+        logger.info(f"Generated {len(optimized_suggestions)} field suggestions in {duration:.2f}s")
+        
+        if self.metrics:
+            self.metrics.record_counter("xpath_suggester_analyses", 1)
+            self.metrics.record_gauge("xpath_suggester_suggestions", len(optimized_suggestions))
+            self.metrics.record_histogram("xpath_suggester_duration_seconds", duration)
+            
+        return optimized_suggestions
+        
+    def _analyze(self, samples: _SampleSet, field_hints: Dict[str, str] = None) -> Dict[str, FieldSuggestion]:
+        """Run the analysis over parsed samples."""
+        # Parse and index every sample once
+        profiles = samples.profile(self)
+        
+        if len(profiles) < 2:
             raise ValueError("Need at least 2 valid HTML documents")
             
         # Extract common structure patterns
-        common_patterns = self._extract_common_patterns(parsed_docs)
+        common_patterns = self._extract_common_patterns(profiles)
         
         # Generate selector candidates
-        candidates = self._generate_selector_candidates(parsed_docs, common_patterns)
+        candidates = self._generate_selector_candidates(profiles, common_patterns)
         
         # Score and rank candidates
-        scored_candidates = self._score_candidates(candidates, parsed_docs)
+        scored_candidates = self._score_candidates(candidates, samples)
         
         # Group candidates by field and select best
         field_suggestions = self._group_and_select_best(scored_candidates, field_hints)
         
         # Resolve conflicts and optimize
-        optimized_suggestions = self._optimize_suggestions(field_suggestions, parsed_docs)
-        
-        logger.info(f"Generated {len(optimized_suggestions)} field suggestions")
+        return self._optimize_suggestions(field_suggestions)
         
-        if self.metrics:
-            self.metrics.counter("xpath_suggester_analyses", 1)
-            self.metrics.gauge("xpath_suggester_suggestions", len(optimized_suggestions))
-            
-        return optimized_suggestions
-        
-    def _extract_common_patterns(self, docs: List[html.HtmlElement]) -> Dict[str, Any]:
+    def _extract_common_patterns(self, profiles: List[SampleProfile]) -> Dict[str, Any]:
         """Extract common structural patterns across documents."""
         patterns = {
             'common_tags': [],
@@ -135,43 +392,32 @@ class XPathSuggester:
             'structure_similarity': 0.0
         }
         
-        # Extract tag sequences for each document
-        tag_sequences = []
-        all_classes = []
-        all_ids = []
-        
-        for doc in docs:
-            # Get tag sequence
-            tags = [elem.tag for elem in doc.iter() if elem.tag != 'script' and elem.tag != 'style']
-            tag_sequences.append(tags)
-            
-            # Get classes and IDs
-            for elem in doc.iter():
-                if elem.get('class'):
-                    all_classes.extend(elem.get('class').split())
-                if elem.get('id'):
-                    all_ids.append(elem.get('id'))
-                    
+        tag_sequences = [profile.tags for profile in profiles]
+        
         # Find common elements
         if tag_sequences:
             # Compare tag sequences to find common structure
             base_sequence = tag_sequences[0]
             similarities = []
             
-            for seq in tag_sequences[1:]:
+            for seq in tag_sequences[1:self.similarity_sample_size]:
                 similarity = SequenceMatcher(None, base_sequence, seq).ratio()
                 similarities.append(similarity)
                 
             patterns['structure_similarity'] = sum(similarities) / len(similarities) if similarities else 0.0
             
             # Find most common tags
-            all_tags = [tag for seq in tag_sequences for tag in seq]
-            tag_counter = Counter(all_tags)
+            tag_counter = Counter()
+            for seq in tag_sequences:
+                tag_counter.update(seq)
             patterns['common_tags'] = [tag for tag, count in tag_counter.most_common(20)]
             
         # Find common classes and IDs
-        class_counter = Counter(all_classes)
-        id_counter = Counter(all_ids)
+        class_counter = Counter()
+        id_counter = Counter()
+        for profile in profiles:
+            class_counter.update(profile.classes)
+            id_counter.update(profile.ids)
         
         patterns['common_classes'] = [cls for cls, count in class_counter.most_common(10) if count > 1]
         patterns['common_ids'] = [id_val for id_val, count in id_counter.most_common(10) if count > 1]
@@ -180,106 +426,53 @@ class XPathSuggester:
         
     def _generate_selector_candidates(
         self, 
-        docs: List[html.HtmlElement], 
+        profiles: List[SampleProfile], 
         patterns: Dict[str, Any]
     ) -> List[SelectorCandidate]:
         """Generate candidate selectors based on common patterns."""
-        candidates = []
-        
-        # Generate candidates for each document
-        for doc_idx, doc in enumerate(docs):
-            doc_candidates = self._extract_candidates_from_doc(doc, patterns, doc_idx)
-            candidates.extend(doc_candidates)
-            
-        # Group similar candidates
-        grouped_candidates = self._group_similar_candidates(candidates)
-        
-        return grouped_candidates
+        # Group similar candidates across all documents
+        return self._group_similar_candidates(
+            candidate for profile in profiles for candidate in profile.candidates
+        )
         
-    def _extract_candidates_from_doc(
+    def _profile_document(
         self, 
-        doc: html.HtmlElement, 
-        patterns: Dict[str, Any], 
-        doc_idx: int
-    ) -> List[SelectorCandidate]:
-        """Extract selector candidates from a single document."""
-        candidates = []
-        
-        # Look for text-containing elements
-        for elem in doc.iter():
-            if elem.text and elem.text.strip() and len(elem.text.strip()) > 2:
-                text_content = elem.text.strip()
+        index: DocumentIndex, 
+        field_names: Optional[Dict[Tuple, str]] = None
+    ) -> SampleProfile:
+        """Collect structure and selector candidates from one indexed document."""
+        if field_names is None:
+            field_names = {}
+        profile = SampleProfile(tags=[], classes=[], ids=[], candidates=[])
+        
+        for elem, path in index.elements:
+            if elem.tag not in ('script', 'style'):
+                profile.tags.append(elem.tag)
+            if elem.get('class'):
+                profile.classes.extend(elem.get('class').split())
+            if elem.get('id'):
+                profile.ids.append(elem.get('id'))
                 
-                # Skip script and style content
-                if elem.tag in ['script', 'style']:
-                    continue
-                    
-                # Generate XPath
-                xpath = self._generate_xpath_for_element(elem, doc)
-                if xpath:
-                    field_name = self._infer_field_name(elem, text_content)
-                    
-                    candidate = SelectorCandidate(
-                        selector=xpath,
-                        selector_type='xpath',
-                        field_name=field_name,
-                        stability_score=0.0,  # Will be calculated later
-                        precision_score=0.0,
-                        coverage=0.0,
-                        variance=0.0,
-                        sample_values=[text_content]
-                    )
-                    candidates.append(candidate)
-                    
-                # Generate CSS selector if element has class or ID
-                css_selector = self._generate_css_for_element(elem)
-                if css_selector:
-                    field_name = self._infer_field_name(elem, text_content)
-                    
-                    candidate = SelectorCandidate(
-                        selector=css_selector,
-                        selector_type='css',
-                        field_name=field_name,
-                        stability_score=0.0,
-                        precision_score=0.0,
-                        coverage=0.0,
-                        variance=0.0,
-                        sample_values=[text_content]
-                    )
-                    candidates.append(candidate)
-                    
-        return candidates
-        
-    def _generate_xpath_for_element(self, elem: html.HtmlElement, doc: html.HtmlElement) -> str:
-        """Generate XPath for an element with position tolerance."""
-        try:
-            # Get path to element
-            path_elements = []
-            current = elem
-            
-            while current is not None and current != doc:
-                tag = current.tag
+            # Look for text-containing elements, skipping script and style content
+            text_content = elem.text.strip() if elem.text else ''
+            if len(text_content) <= 2 or elem.tag in ('script', 'style'):
+                continue
                 
-                # Add position predicate for non-unique elements
-                siblings = [e for e in current.getparent() if e.tag == tag] if current.getparent() is not None else [current]
+            # Template labels repeat across samples; infer their field names once
+            key = (elem.get('class'), elem.get('id'), elem.get('name'), elem.get('data-field'), text_content)
+            field_name = field_names.get(key)
+            if field_name is None:
+                field_name = field_names[key] = self._infer_field_name(elem, text_content)
                 
-                if len(siblings) > 1:
-                    position = siblings.index(current) + 1
-                    path_elements.append(f"{tag}[{position}]")
-                else:
-                    path_elements.append(tag)
-                    
-                current = current.getparent()
+            if path:
+                profile.candidates.append(('xpath', "//" + path, field_name, text_content))
                 
-            if path_elements:
-                path_elements.reverse()
-                xpath = "//" + "/".join(path_elements)
-                return xpath
+            # Generate CSS selector if element has class or ID
+            css_selector = self._generate_css_for_element(elem)
+            if css_selector:
+                profile.candidates.append(('css', css_selector, field_name, text_content))
                 
-        except Exception as e:
-            logger.debug(f"Error generating XPath: {e}")
-            
-        return None
+        return profile
         
     def _generate_css_for_element(self, elem: html.HtmlElement) -> str:
         """Generate CSS selector for element if it has class or ID."""
@@ -348,105 +541,63 @@ class XPathSuggester:
             
         return 'unknown_field'
         
-    def _group_similar_candidates(self, candidates: List[SelectorCandidate]) -> List[SelectorCandidate]:
-        """Group candidates that target similar elements."""
-        grouped = defaultdict(list)
+    def _group_similar_candidates(self, candidates) -> List[SelectorCandidate]:
+        """
+        Group raw (selector_type, selector, field_name, text) candidates by
+        field name and selector type, keeping the most common selector.
+        """
+        grouped: Dict[Tuple[str, str], Tuple[Counter, Dict[str, None]]] = {}
         
-        for candidate in candidates:
-            # Create grouping key based on field name and selector similarity
-            key = f"{candidate.field_name}_{candidate.selector_type}"
-            grouped[key].append(candidate)
+        for selector_type, selector, field_name, text in candidates:
+            group = grouped.get((field_name, selector_type))
+            if group is None:
+                group = grouped[(field_name, selector_type)] = (Counter(), {})
+            group[0][selector] += 1
+            group[1][text] = None
             
-        # Merge similar candidates
+        # Merge candidates with same field name and type
         merged_candidates = []
-        for group in grouped.values():
-            if len(group) == 1:
-                merged_candidates.append(group[0])
-            else:
-                # Merge candidates with same field name and type
-                merged = self._merge_candidate_group(group)
-                merged_candidates.append(merged)
-                
+        for (field_name, selector_type), (selector_counts, values) in grouped.items():
+            merged_candidates.append(SelectorCandidate(
+                selector=selector_counts.most_common(1)[0][0],
+                selector_type=selector_type,
+                field_name=field_name,
+                stability_score=0.0,  # Will be calculated later
+                precision_score=0.0,
+                coverage=0.0,
+                variance=0.0,
+                sample_values=list(values)
+            ))
+            
         return merged_candidates
         
-    def _merge_candidate_group(self, candidates: List[SelectorCandidate]) -> SelectorCandidate:
-        """Merge a group of similar candidates."""
-        # Use the most common selector
-        selectors = [c.selector for c in candidates]
-        selector_counts = Counter(selectors)
-        most_common_selector = selector_counts.most_common(1)[0][0]
-        
-        # Combine sample values
-        all_values = []
-        for candidate in candidates:
-            all_values.extend(candidate.sample_values)
-            
-        # Create merged candidate
-        base_candidate = candidates[0]
-        merged = SelectorCandidate(
-            selector=most_common_selector,
-            selector_type=base_candidate.selector_type,
-            field_name=base_candidate.field_name,
-            stability_score=0.0,
-            precision_score=0.0,
-            coverage=0.0,
-            variance=0.0,
-            sample_values=list(set(all_values))  # Remove duplicates
-        )
-        
-        return merged
-        
     def _score_candidates(
         self, 
         candidates: List[SelectorCandidate], 
-        docs: List[html.HtmlElement]
+        samples: _SampleSet
     ) -> List[SelectorCandidate]:
         """Score candidates based on stability, precision, and coverage."""
-        scored_candidates = []
+        # Each distinct selector is applied once per sample
+        outcomes = samples.evaluate(list(dict.fromkeys((c.selector_type, c.selector) for c in candidates)))
         
         for candidate in candidates:
-            scores = self._calculate_candidate_scores(candidate, docs)
+            successful_extractions, extracted_values = outcomes[(candidate.selector_type, candidate.selector)]
+            scores = self._calculate_candidate_scores(successful_extractions, extracted_values, len(samples))
             
             candidate.stability_score = scores['stability']
             candidate.precision_score = scores['precision']
             candidate.coverage = scores['coverage']
             candidate.variance = scores['variance']
             
-            scored_candidates.append(candidate)
-            
-        return scored_candidates
+        return candidates
         
     def _calculate_candidate_scores(
         self, 
-        candidate: SelectorCandidate, 
-        docs: List[html.HtmlElement]
+        successful_extractions: int, 
+        extracted_values: List[str],
+        total_docs: int
     ) -> Dict[str, float]:
         """Calculate stability, precision, and coverage scores."""
-        successful_extractions = 0
-        extracted_values = []
-        
-        for doc in docs:
-            try:
-                if candidate.selector_type == 'xpath':
-                    results = doc.xpath(candidate.selector)
-                else:  # CSS
-                    results = doc.cssselect(candidate.selector)
-                    
-                if results:
-                    successful_extractions += 1
-                    # Extract text content
-                    for elem in results:
-                        if hasattr(elem, 'text_content'):
-                            text = elem.text_content().strip()
-                        else:
-                            text = (elem.text or '').strip()
-                        if text:
-                            extracted_values.append(text)
-                            
-            except Exception as e:
-                logger.debug(f"Error applying selector {candidate.selector}: {e}")
-                
-        total_docs = len(docs)
         coverage = successful_extractions / total_docs if total_docs > 0 else 0.0
         
         # Calculate stability (consistency of extraction)
@@ -501,8 +652,7 @@ class XPathSuggester:
         
     def _optimize_suggestions(
         self, 
-        field_groups: Dict[str, List[SelectorCandidate]], 
-        docs: List[html.HtmlElement]
+        field_groups: Dict[str, List[SelectorCandidate]]
     ) -> Dict[str, FieldSuggestion]:
         """Create optimized field suggestions with primary and fallback selectors."""
         suggestions = {}
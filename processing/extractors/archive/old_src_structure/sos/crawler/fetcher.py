@@ -95,7 +95,8 @@ class Fetcher:
         enable_caching: bool = True,
         proxy_pool: Optional[ProxyPool] = None,
         user_agents: Optional[List[str]] = None,
-        rate_limit: float = 0.0
+        rate_limit: float = 0.0,
+        warc_writer: Optional[Any] = None
     ):
         """
         Initialize the Fetcher
@@ -108,6 +109,8 @@ class Fetcher:
             proxy_pool: Optional proxy pool for request routing
             user_agents: List of user agents for rotation
             rate_limit: Minimum delay between requests in seconds
+            warc_writer: Optional ``scraper.warc.WARCWriter``; every fetched
+                response is archived with its request headers
         """
         self.max_concurrent = max_concurrent
         self.max_retries = max_retries
@@ -115,6 +118,7 @@ class Fetcher:
         self.enable_caching = enable_caching
         self.proxy_pool = proxy_pool
         self.rate_limit = rate_limit
+        self.warc_writer = warc_writer
         
         # User agents for rotation
         self.user_agents = user_agents or [
@@ -278,6 +282,16 @@ class Fetcher:
                         elapsed_time=elapsed
                     )
                     
+                    # Archive the raw exchange before anything post-processes it
+                    if self.warc_writer is not None:
+                        await self.warc_writer.archive(
+                            str(response.url), response.status, response.raw_headers, content,
+                            method=request.method,
+                            request_headers=kwargs["headers"],
+                            reason=response.reason,
+                            http_version=f"HTTP/{response.version.major}.{response.version.minor}"
+                        )
+                    
                     # Cache successful responses
                     if self.enable_caching and fetch_response.is_success:
                         cache_key = f"{request.method}:{request.url}"
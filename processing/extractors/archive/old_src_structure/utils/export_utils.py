@@ -8,7 +8,7 @@ import uuid # Import uuid for UUID type handling
 import enum # Import enum for Enum type handling
 from typing import List, Dict, Any, Generator, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import inspect, text, asc, desc, func
+from sqlalchemy import inspect, text, asc, desc, func, select
 try:
     from database.models import Person, Company, Vehicle # Import relevant models
     MODELS_AVAILABLE = True
@@ -103,9 +103,7 @@ async def upload_to_supabase_storage(
     # For simplicity, let's collect the data into bytes first.
     # For very large files, consider writing to a temporary file and then uploading.
 
-    full_data = b""
-    for chunk in data_stream:
-        full_data += chunk
+    full_data = b"".join(data_stream)
 
     if compress:
         full_data = gzip.compress(full_data)
@@ -151,111 +149,193 @@ async def generate_presigned_url(bucket_name: str, file_path: str, expires_in: i
         logger.error(f"Error generating presigned URL: {e}")
         raise
 
-def get_data_from_db(
-    db: Session, 
-    export_type: str, 
-    tenant_id: uuid.UUID, # Added tenant_id parameter
-    filters: Dict[str, Any], 
-    sort_by: Optional[str] = None,
-    fields: Optional[List[str]] = None,
-    mask_pii: bool = True, # New parameter for PII masking
-    limit: Optional[int] = None, # Added limit
-    offset: Optional[int] = None # Added offset
-) -> Generator[Dict, None, None]:
+# Columns replaced by a constant when PII masking is on; they are never read from the database
+PII_MASKS = {
+    "person": {
+        # personal_number_hash is a hash, not the raw number. A proper PII service
+        # would decrypt and mask the number itself; until then the column is masked.
+        "personal_number_hash": "[MASKED_HASH]",
+        "personal_number_enc": "[MASKED_ENCRYPTED_DATA]",
+        "phone_number_hash": "[MASKED_PHONE_HASH]",
+        "phone_number_enc": "[MASKED_ENCRYPTED_PHONE]",
+        "salary_decimal": "[MASKED_SALARY]",
+    }
+}
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _serialize_value(value: Any) -> Any:
+    """Converts non-JSON serializable types (datetime, Decimal, UUID, Enum, bytes)."""
+    if value is None or isinstance(value, (str, float, int)):
+        return value
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return str(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, bytes):  # For LargeBinary columns
+        return value.decode('utf-8', errors='ignore')  # Or base64 encode
+    return value
+
+
+class ExportPlan:
     """
-    Fetches data from the database based on export_type, filters, sorting, and field selection.
-    Yields rows as dictionaries.
+    Column list, masking and keyset strategy for one export, computed once
+    instead of re-inspecting the model for every row.
     """
-    model = get_model_by_export_type(export_type)
-    query = db.query(model)
 
+    def __init__(self, export_type: str, fields: Optional[List[str]] = None, mask_pii: bool = True):
+        self.export_type = export_type
+        self.model = get_model_by_export_type(export_type)
+        mapper = inspect(self.model)
+        model_columns = [c.name for c in mapper.columns]
+
+        requested = fields if fields else model_columns
+        unknown = [name for name in requested if name not in model_columns]
+        if unknown:
+            logger.warning(f"Fields {unknown} not found in model '{export_type}'. Skipping.")
+        self.fieldnames = [name for name in requested if name in model_columns]
+
+        masks = PII_MASKS.get(export_type, {}) if mask_pii else {}
+        self.masked = {name: masks[name] for name in self.fieldnames if name in masks}
+        self.selected = [name for name in self.fieldnames if name not in self.masked]
+
+        # Keyset chunking needs a single-column primary key
+        primary_key = mapper.primary_key
+        self.key_name = primary_key[0].key if len(primary_key) == 1 else None
+        # The key is selected for keyset paging even when it isn't exported
+        self.select_names = list(self.selected)
+        if self.key_name and self.key_name not in self.select_names:
+            self.select_names.append(self.key_name)
+        self.key_index = self.select_names.index(self.key_name) if self.key_name else None
+
+    def columns(self) -> list:
+        return [getattr(self.model, name) for name in self.select_names]
+
+    def to_dict(self, row) -> Dict[str, Any]:
+        values = dict(zip(self.select_names, row))
+        return {
+            name: self.masked[name] if name in self.masked else _serialize_value(values[name])
+            for name in self.fieldnames
+        }
+
+
+def _apply_filters(stmt, model, tenant_id: Optional[uuid.UUID], filters: Dict[str, Any], export_type: str = ""):
+    """Applies the tenant filter and export filters to a query or select."""
     # Apply tenant_id filter if the model has a tenant_id column
     if hasattr(model, 'tenant_id'):
-        query = query.filter(getattr(model, 'tenant_id') == tenant_id)
+        stmt = stmt.filter(getattr(model, 'tenant_id') == tenant_id)
     else:
         logger.warning(f"Model {export_type} does not have a 'tenant_id' column. Data will not be filtered by tenant.")
 
-
-    # Apply filters
     for key, value in filters.items():
         if hasattr(model, key):
             column = getattr(model, key)
             if isinstance(value, dict):
                 # Handle operators like gte, lte, in
                 if "gte" in value:
-                    query = query.filter(column >= value["gte"])
+                    stmt = stmt.filter(column >= value["gte"])
                 if "lte" in value:
-                    query = query.filter(column <= value["lte"])
+                    stmt = stmt.filter(column <= value["lte"])
                 if "in" in value and isinstance(value["in"], list):
-                    query = query.filter(column.in_(value["in"]))
+                    stmt = stmt.filter(column.in_(value["in"]))
             else:
                 # Basic equality filter
-                query = query.filter(column == value)
+                stmt = stmt.filter(column == value)
         else:
             logger.warning(f"Filter field '{key}' not found in model '{export_type}'. Skipping.")
+    return stmt
 
-    # Apply sorting
-    if sort_by:
-        sort_column_name = sort_by.lstrip('-')
-        if hasattr(model, sort_column_name):
-            sort_column = getattr(model, sort_column_name)
-            if sort_by.startswith('-'):
-                query = query.order_by(desc(sort_column))
-            else:
-                query = query.order_by(asc(sort_column))
-        else:
-            logger.warning(f"Sort field '{sort_by}' not found in model '{export_type}'. Skipping sort.")
 
-    # Apply limit and offset for pagination
-    if offset is not None:
-        query = query.offset(offset)
+def get_data_from_db(
+    db: Session, 
+    export_type: str, 
+    tenant_id: uuid.UUID, # Added tenant_id parameter
+    filters: Dict[str, Any], 
+    sort_by: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    mask_pii: bool = True, # New parameter for PII masking
+    limit: Optional[int] = None, # Added limit
+    offset: Optional[int] = None, # Deprecated: prefer the keyset cursor `after`
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    after: Optional[Any] = None, # Keyset cursor: primary key of the last row already exported
+    plan: Optional[ExportPlan] = None
+) -> Generator[Dict, None, None]:
+    """
+    Fetches data from the database based on export_type, filters, sorting, and field selection.
+    Yields rows as dictionaries.
+
+    Only the exported columns are selected (masked PII columns are not read
+    at all). Exports ordered by primary key, the default, are read in keyset
+    chunks of ``chunk_size`` rows, each a short query that resumes after the
+    last key seen. Other sort orders, and the deprecated ``offset``, stream
+    a single query through a server-side cursor. Memory stays bounded by
+    ``chunk_size`` either way.
+    """
+    plan = plan or ExportPlan(export_type, fields, mask_pii)
+    model = plan.model
+    base = _apply_filters(select(*plan.columns()), model, tenant_id, filters, export_type)
+
+    descending = bool(sort_by) and sort_by.startswith('-')
+    sort_column_name = sort_by.lstrip('-') if sort_by else plan.key_name
+    if sort_by and not hasattr(model, sort_column_name):
+        logger.warning(f"Sort field '{sort_by}' not found in model '{export_type}'. Skipping sort.")
+        sort_column_name, descending = plan.key_name, False
+
+    key_column = getattr(model, plan.key_name) if plan.key_name else None
+    if after is not None and key_column is not None:
+        base = base.filter(key_column < after if descending else key_column > after)
+
+    if sort_column_name and sort_column_name == plan.key_name and not offset:
+        yield from _iter_keyset(db, plan, base, key_column, descending, limit, chunk_size)
+        return
+
+    # Server-side cursor over a single query
+    if sort_column_name:
+        sort_column = getattr(model, sort_column_name)
+        base = base.order_by(desc(sort_column) if descending else asc(sort_column))
+    if offset:
+        base = base.offset(offset)
     if limit is not None:
-        query = query.limit(limit)
-
-    # Fetch and yield data
-    for row in query.all():
-        row_dict = {}
-        # Select specific fields if requested, otherwise all columns
-        columns_to_include = fields if fields else [c.name for c in inspect(model).columns]
-
-        for col_name in columns_to_include:
-            if hasattr(row, col_name):
-                value = getattr(row, col_name)
-                
-                # Apply PII masking if enabled and applicable
-                if mask_pii and export_type == "person" and col_name == "personal_number_hash":
-                    # Note: personal_number_hash is a hash, not the raw number.
-                    # For masking, we'd ideally mask the *decrypted* personal_number.
-                    # As a placeholder for production-readiness, we'll mask the hash itself
-                    # or indicate it's masked. A proper PII service would handle decryption.
-                    row_dict[col_name] = "[MASKED_HASH]"
-                elif mask_pii and export_type == "person" and col_name == "personal_number_enc":
-                    row_dict[col_name] = "[MASKED_ENCRYPTED_DATA]"
-                elif mask_pii and export_type == "person" and col_name == "phone_number_hash":
-                    row_dict[col_name] = "[MASKED_PHONE_HASH]"
-                elif mask_pii and export_type == "person" and col_name == "phone_number_enc":
-                    row_dict[col_name] = "[MASKED_ENCRYPTED_PHONE]"
-                elif mask_pii and export_type == "person" and col_name == "salary_decimal":
-                    row_dict[col_name] = "[MASKED_SALARY]"
-                # Handle non-JSON serializable types (e.g., datetime, Decimal, UUID, Enum)
-                elif isinstance(value, (datetime.datetime, datetime.date)):
-                    row_dict[col_name] = value.isoformat()
-                elif isinstance(value, datetime.timedelta):
-                    row_dict[col_name] = str(value)
-                elif isinstance(value, uuid.UUID):
-                    row_dict[col_name] = str(value)
-                elif isinstance(value, enum.Enum):
-                    row_dict[col_name] = value.value
-                elif isinstance(value, (float, int)):
-                    row_dict[col_name] = value
-                elif isinstance(value, bytes): # For LargeBinary columns
-                    row_dict[col_name] = value.decode('utf-8', errors='ignore') # Or base64 encode
-                else:
-                    row_dict[col_name] = value
-        yield row_dict
-
-def get_fieldnames_for_export_type(export_type: str) -> List[str]:
+        base = base.limit(limit)
+    result = db.execute(base.execution_options(stream_results=True, max_row_buffer=chunk_size))
+    try:
+        for partition in result.partitions(chunk_size):
+            for row in partition:
+                yield plan.to_dict(row)
+    finally:
+        result.close()
+
+
+def _iter_keyset(db: Session, plan: ExportPlan, base, key_column, descending: bool,
+                 limit: Optional[int], chunk_size: int) -> Generator[Dict, None, None]:
+    """Yields rows in primary-key order, one bounded query per chunk."""
+    order = desc(key_column) if descending else asc(key_column)
+    last_key = None
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        stmt = base
+        if last_key is not None:
+            stmt = stmt.filter(key_column < last_key if descending else key_column > last_key)
+        rows = db.execute(stmt.order_by(order).limit(size)).all()
+        for row in rows:
+            yield plan.to_dict(row)
+        if len(rows) < size:
+            return
+        last_key = rows[-1][plan.key_index]
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+def get_fieldnames_for_export_type(export_type: str, fields: Optional[List[str]] = None) -> List[str]:
     """Returns a list of column names for a given export type."""
+    if fields:
+        return ExportPlan(export_type, fields).fieldnames
     model = get_model_by_export_type(export_type)
     return [column.name for column in inspect(model).columns]
 
@@ -275,25 +355,7 @@ def get_latest_update_timestamp_for_export_type(
     if not hasattr(model, 'updated_at'):
         return None
 
-    query = db.query(func.max(model.updated_at))
-
-    # Apply tenant_id filter if the model has a tenant_id column
-    if hasattr(model, 'tenant_id'):
-        query = query.filter(getattr(model, 'tenant_id') == tenant_id)
-    
-    # Apply filters (similar to get_data_from_db)
-    for key, value in filters.items():
-        if hasattr(model, key):
-            column = getattr(model, key)
-            if isinstance(value, dict):
-                if "gte" in value:
-                    query = query.filter(column >= value["gte"])
-                if "lte" in value:
-                    query = query.filter(column <= value["lte"])
-                if "in" in value and isinstance(value["in"], list):
-                    query = query.filter(column.in_(value["in"]))
-            else:
-                query = query.filter(column == value)
+    query = _apply_filters(db.query(func.max(model.updated_at)), model, tenant_id, filters, export_type)
 
     latest_timestamp = query.scalar()
     return latest_timestamp
@@ -23,19 +23,32 @@ API Modules:
 - MonitoringAPI: Real-time monitoring
 - ExportsAPI: Data export functionality
 - WebhooksAPI: Webhook management
+
+Components are imported on first attribute access, so the API entry point
+only loads the modules ``create_app`` needs.
 """
 
-from .app import create_app
-from .views import DashboardViews, TemplateViews, JobViews
-from .auth import AuthManager, AuthenticationRequired
-from .security import SecurityManager
-from .api import APIRouter
+import importlib
+from typing import Any
 
-# API modules
-from .api import (
-    AuthAPI, JobsAPI, TemplatesAPI, 
-    MonitoringAPI, ExportsAPI, WebhooksAPI
-)
+# Public name -> submodule that defines it
+_LAZY_IMPORTS = {
+    "create_app": ".app",
+    "DashboardViews": ".views",
+    "TemplateViews": ".views",
+    "JobViews": ".views",
+    "AuthManager": ".auth",
+    "AuthenticationRequired": ".auth",
+    "SecurityManager": ".security",
+    "APIRouter": ".api",
+    # API modules
+    "AuthAPI": ".api",
+    "JobsAPI": ".api",
+    "TemplatesAPI": ".api",
+    "MonitoringAPI": ".api",
+    "ExportsAPI": ".api",
+    "WebhooksAPI": ".api",
+}
 
 __all__ = [
     "create_app",
@@ -52,4 +65,16 @@ __all__ = [
     "MonitoringAPI", 
     "ExportsAPI",
     "WebhooksAPI"
-]
\ No newline at end of file
+]
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -156,7 +156,7 @@ async def get_data_direct(
 
     # Pass mask_pii, limit, and offset to the data retrieval function
     data_generator = get_data_from_db(db, export_type, tenant_id, parsed_filters, sort_by, parsed_fields, mask_pii=mask_pii, limit=limit, offset=offset)
-    fieldnames = parsed_fields if parsed_fields else get_fieldnames_for_export_type(export_type)
+    fieldnames = get_fieldnames_for_export_type(export_type, parsed_fields)
 
     # Determine format based on query param or Accept header
     response_format = format
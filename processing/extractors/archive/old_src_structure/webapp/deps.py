@@ -8,12 +8,14 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from src.database.manager import DatabaseManager
-from src.settings import get_settings
+from src.database.crawl_database import CrawlDatabaseService, create_crawl_service
+from src.settings import get_settings, get_database_dsn
 
 
 settings = get_settings()
 security = HTTPBearer()
 db_manager = DatabaseManager()
+_crawl_service: Optional[CrawlDatabaseService] = None
 
 
 async def get_db_session() -> AsyncGenerator[Session, None]:
@@ -22,6 +24,17 @@ async def get_db_session() -> AsyncGenerator[Session, None]:
         yield session
 
 
+async def get_crawl_service() -> CrawlDatabaseService:
+    """Get the async crawl database service (pages, links, search)."""
+    global _crawl_service
+    if _crawl_service is None:
+        dsn = get_database_dsn()
+        if dsn.startswith("postgresql://") or dsn.startswith("postgres://"):
+            dsn = "postgresql+asyncpg://" + dsn.split("://", 1)[1]
+        _crawl_service = await create_crawl_service(dsn)
+    return _crawl_service
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db_session)
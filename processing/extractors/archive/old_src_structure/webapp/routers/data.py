@@ -2,27 +2,131 @@
 Data management router - Complete implementation per Backend-översikt.txt specification.
 """
 
-from typing import List, Optional, Dict, Any
+import json
+from typing import List, Optional, Tuple, Dict, Any, Iterator, AsyncIterator
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from datetime import datetime
+from sqlalchemy import select, tuple_
 
-from src.webapp.deps import get_current_user, get_db_session
+from src.webapp.deps import get_current_user, get_db_session, get_crawl_service, db_manager
+from src.webapp.utils.pagination import encode_cursor, decode_keyset
+from src.database.crawl_database import CrawlDatabaseService
+from src.database.models import ExtractedItem, Job
 
 
 router = APIRouter(prefix="/data", tags=["data"])
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _decode_keyset(cursor: str, *fields: str, timestamp_field: Optional[str] = None,
+                   integer_fields: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """Decode an opaque cursor, rejecting anything we did not issue."""
+    try:
+        return decode_keyset(cursor, *fields, timestamp_field=timestamp_field, integer_fields=integer_fields)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def _items_query(job_id: Optional[int], project_id: Optional[int], template_id: Optional[int]):
+    """Extracted item columns with the common list filters applied."""
+    stmt = select(
+        ExtractedItem.id,
+        ExtractedItem.job_id,
+        ExtractedItem.template_id,
+        ExtractedItem.item_key,
+        ExtractedItem.payload_json,
+        ExtractedItem.dq_status,
+        ExtractedItem.created_at
+    )
+    if job_id is not None:
+        stmt = stmt.where(ExtractedItem.job_id == job_id)
+    if template_id is not None:
+        stmt = stmt.where(ExtractedItem.template_id == template_id)
+    if project_id is not None:
+        stmt = stmt.join(Job, Job.id == ExtractedItem.job_id).where(Job.project_id == project_id)
+    return stmt
+
+
+def _item_to_dict(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "job_id": row.job_id,
+        "template_id": row.template_id,
+        "item_key": row.item_key,
+        "data": row.payload_json,
+        "dq_status": row.dq_status,
+        "created_at": row.created_at.isoformat() if row.created_at else None
+    }
+
+
+def _ndjson(record: Dict[str, Any]) -> str:
+    return json.dumps(record, default=str, separators=(",", ":")) + "\n"
+
 
 @router.get("/items", summary="List extracted items")
 async def list_items(
+    job_id: Optional[int] = Query(None, description="Filter by job"),
     project_id: Optional[int] = Query(None, description="Filter by project"),
     template_id: Optional[int] = Query(None, description="Filter by template"),
     limit: int = Query(50, ge=1, le=1000, description="Number of items to return"),
-    offset: int = Query(0, ge=0, description="Number of items to skip"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page"),
+    current_user = Depends(get_current_user),
+    db = Depends(get_db_session)
+):
+    """List extracted items, newest first, with keyset (cursor) pagination.
+
+    The cursor holds the last ``id`` returned; ``id`` is unique, so it alone
+    orders the keyset. Each page seeks past it instead of skipping rows, via
+    the ``(job_id, id)`` index when filtering by job, so deep pages cost the
+    same as the first one.
+    """
+    stmt = _items_query(job_id, project_id, template_id)
+    if cursor:
+        after = _decode_keyset(cursor, "id", integer_fields=("id",))
+        stmt = stmt.where(ExtractedItem.id < after["id"])
+
+    # Fetch one extra row to know whether another page exists
+    rows = db.execute(stmt.order_by(ExtractedItem.id.desc()).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "items": [_item_to_dict(row) for row in rows],
+        "next_cursor": encode_cursor({"id": rows[-1].id}) if has_more else None,
+        "has_more": has_more
+    }
+
+
+@router.get("/items/stream", summary="Stream all items of a job as NDJSON")
+async def stream_items(
+    job_id: int = Query(..., description="Job whose items to stream"),
+    template_id: Optional[int] = Query(None, description="Filter by template"),
+    batch_size: int = Query(1000, ge=100, le=10000, description="Rows fetched per round trip"),
     current_user = Depends(get_current_user)
 ):
-    """List extracted items with filtering and pagination."""
-    # TODO: Implement data service
-    return {"items": [], "total": 0}
+    """Stream every item of a job, one JSON object per line.
+
+    Rows come from a server-side cursor ``batch_size`` at a time, so the
+    whole job is returned in one request with constant memory.
+    """
+    stmt = (
+        _items_query(job_id, None, template_id)
+        .order_by(ExtractedItem.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    def generate() -> Iterator[str]:
+        # The session lives as long as the response body, not the handler
+        with db_manager.get_session(read_only=True) as session:
+            for row in session.execute(stmt):
+                yield _ndjson(_item_to_dict(row))
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
 
 
 @router.get("/items/{item_id}", summary="Get item details")
@@ -82,6 +186,61 @@ async def get_data_stats(
     }
 
 
+@router.get("/pages/search", summary="Full-text search over crawled pages")
+async def search_pages(
+    q: str = Query(..., min_length=1, max_length=500, description="Search query"),
+    job_id: Optional[str] = Query(None, description="Restrict to one crawl job"),
+    limit: int = Query(20, ge=1, le=100, description="Number of results to return"),
+    offset: int = Query(0, ge=0, le=10000, description="Number of results to skip"),
+    current_user = Depends(get_current_user),
+    crawl_service: CrawlDatabaseService = Depends(get_crawl_service)
+):
+    """Search extracted page text, ranked by relevance with highlighted snippets."""
+    return await crawl_service.search_pages(q, job_id=job_id, limit=limit, offset=offset)
+
+
+@router.get("/jobs/{job_id}/pages", summary="List crawled pages of a job")
+async def list_job_pages(
+    job_id: str,
+    limit: int = Query(100, ge=1, le=1000, description="Number of pages to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page"),
+    current_user = Depends(get_current_user),
+    crawl_service: CrawlDatabaseService = Depends(get_crawl_service)
+):
+    """List crawled pages, newest first, with keyset (cursor) pagination."""
+    after = None
+    if cursor:
+        keyset = _decode_keyset(cursor, "id", timestamp_field="crawled_at")
+        after = (keyset["crawled_at"], keyset["id"])
+
+    pages = await crawl_service.list_pages(job_id, limit=limit + 1, after=after)
+    has_more = len(pages) > limit
+    pages = pages[:limit]
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor({"crawled_at": pages[-1]["crawled_at"], "id": pages[-1]["id"]})
+
+    return {"pages": pages, "next_cursor": next_cursor, "has_more": has_more}
+
+
+@router.get("/jobs/{job_id}/pages/stream", summary="Stream all crawled pages of a job as NDJSON")
+async def stream_job_pages(
+    job_id: str,
+    include_html: bool = Query(False, description="Include raw HTML in each record"),
+    batch_size: int = Query(500, ge=50, le=5000, description="Rows fetched per round trip"),
+    current_user = Depends(get_current_user),
+    crawl_service: CrawlDatabaseService = Depends(get_crawl_service)
+):
+    """Stream every crawled page of a job, one JSON object per line."""
+
+    async def generate() -> AsyncIterator[str]:
+        async for page in crawl_service.stream_pages(job_id, batch_size, include_html):
+            yield _ndjson(page)
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+
 @router.get("/duplicates", summary="Find duplicate items")
 async def find_duplicates(
     project_id: Optional[int] = Query(None, description="Filter by project"),
@@ -224,22 +383,29 @@ async def get_data_summary(
 async def list_data_jobs(
     db: DatabaseSession,
     user: CurrentUser,
-    pagination: PaginationDep,
-    status: Optional[str] = Query(None, description="Filter by job status")
+    status: Optional[str] = Query(None, description="Filter by job status"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page"),
+    size: int = Query(50, ge=1, le=100, description="Jobs per page")
 ) -> Dict[str, Any]:
-    """List data processing and crawl jobs."""
+    """List data processing and crawl jobs, newest first, by keyset cursor."""
     query = db.query(CrawlJob).filter(CrawlJob.user_id == user.id)
     
     if status:
         query = query.filter(CrawlJob.status == status)
     
-    total = query.count()
+    if cursor:
+        after = _decode_keyset(cursor, "id", timestamp_field="created_at")
+        query = query.filter(
+            tuple_(CrawlJob.created_at, CrawlJob.id) < tuple_(after["created_at"], after["id"])
+        )
+    
     jobs = (
-        query.order_by(CrawlJob.created_at.desc())
-        .offset(pagination.skip)
-        .limit(pagination.size)
+        query.order_by(CrawlJob.created_at.desc(), CrawlJob.id.desc())
+        .limit(size + 1)
         .all()
     )
+    has_more = len(jobs) > size
+    jobs = jobs[:size]
     
     return {
         "jobs": [
@@ -256,10 +422,12 @@ async def list_data_jobs(
             for job in jobs
         ],
         "pagination": {
-            "page": pagination.page,
-            "size": pagination.size,
-            "total": total,
-            "pages": (total + pagination.size - 1) // pagination.size
+            "size": size,
+            "has_more": has_more,
+            "next_cursor": encode_cursor({
+                "created_at": jobs[-1].created_at.isoformat(),
+                "id": jobs[-1].id
+            }) if has_more else None
         }
     }
 
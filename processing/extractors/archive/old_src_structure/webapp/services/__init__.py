@@ -1,11 +1,20 @@
 """
 Service layer exports.
+
+Services are imported on first attribute access.
 """
 
-from .auth_service import AuthService, APIKeyService
-from .export_service import ExportService
-from .privacy_service import PrivacyService
-from .template_service import TemplateService
+import importlib
+from typing import Any
+
+# Public name -> submodule that defines it
+_LAZY_IMPORTS = {
+    "AuthService": ".auth_service",
+    "APIKeyService": ".auth_service",
+    "ExportService": ".export_service",
+    "PrivacyService": ".privacy_service",
+    "TemplateService": ".template_service",
+}
 
 __all__ = [
     "AuthService",
@@ -14,3 +23,15 @@ __all__ = [
     "PrivacyService",
     "TemplateService",
 ]
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -18,7 +18,7 @@ from ..schemas.models import (
     TemplateCreate, TemplateUpdate, TemplateInDB,
     JobCreate, JobUpdate, JobInDB
 )
-from ..auth import get_password_hash, verify_password
+from src.utils.auth_utils import get_password_hash, verify_password
 
 
 class UserService:
@@ -2,7 +2,7 @@
 Utility functions for pagination in FastAPI endpoints.
 """
 
-from typing import List, Optional, TypeVar, Generic, Any, Dict
+from typing import List, Optional, Tuple, TypeVar, Generic, Any, Dict
 from math import ceil
 
 from fastapi import Query
@@ -179,8 +179,9 @@ def encode_cursor(data: Dict[str, Any]) -> str:
     import base64
     import json
     
-    json_str = json.dumps(data, sort_keys=True)
-    encoded = base64.b64encode(json_str.encode()).decode()
+    json_str = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    # URL-safe alphabet without padding so cursors survive query strings
+    encoded = base64.urlsafe_b64encode(json_str.encode()).decode().rstrip("=")
     return encoded
 
 
@@ -201,10 +202,49 @@ def decode_cursor(cursor: str) -> Dict[str, Any]:
     import json
     
     try:
-        decoded = base64.b64decode(cursor.encode()).decode()
-        return json.loads(decoded)
+        padded = cursor + "=" * (-len(cursor) % 4)
+        decoded = base64.urlsafe_b64decode(padded.encode()).decode()
+        data = json.loads(decoded)
     except Exception as e:
         raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("Invalid cursor: expected an object")
+    return data
+
+
+def decode_keyset(cursor: str, *fields: str, timestamp_field: Optional[str] = None,
+                  integer_fields: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """
+    Decode a keyset cursor issued by ``encode_cursor``.
+    
+    Args:
+        cursor: Encoded cursor string
+        fields: Keys the cursor must contain
+        timestamp_field: Key holding an ISO timestamp, returned as a datetime
+        integer_fields: Keys whose values must be integers
+        
+    Returns:
+        Dict[str, Any]: Cursor data dictionary
+        
+    Raises:
+        ValueError: If the cursor is invalid, lacks a field or has a bad timestamp or integer
+    """
+    from datetime import datetime
+    
+    data = decode_cursor(cursor)
+    missing = [field for field in fields + ((timestamp_field,) if timestamp_field else ()) if field not in data]
+    if missing:
+        raise ValueError(f"Invalid cursor: missing {missing}")
+    if timestamp_field:
+        try:
+            data[timestamp_field] = datetime.fromisoformat(data[timestamp_field])
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid cursor: bad {timestamp_field}")
+    for field in integer_fields:
+        # bool is an int subclass but never a valid key
+        if type(data.get(field)) is not int:
+            raise ValueError(f"Invalid cursor: bad {field}")
+    return data
 
 
 class SearchPaginationParams(PaginationParams):
@@ -6,12 +6,14 @@ Comprehensive webhook system for the ECaDP platform.
 
 This module provides:
 - WebhookClient: For sending webhook notifications
+- WebhookDeliveryEngine: Durable, batched outbox delivery
 - WebhookHandler: For receiving and processing webhook events
 - WebhookEventData: Event data structures
 - Event builders and dispatchers
 """
 
 from .client import WebhookClient, WebhookManager, send_job_notification, send_system_alert
+from .outbox import WebhookOutbox, WebhookDeliveryEngine, WebhookEndpointConfig
 from .handler import WebhookHandler, WebhookValidator, WebhookResponse, create_webhook_handler
 from .events import (
     EventType,
@@ -45,6 +47,11 @@ __all__ = [
     "send_job_notification",
     "send_system_alert",
     
+    # Durable batched delivery
+    "WebhookOutbox",
+    "WebhookDeliveryEngine",
+    "WebhookEndpointConfig",
+    
     # Handler components
     "WebhookHandler",
     "WebhookValidator",
@@ -17,6 +17,8 @@ from dataclasses import dataclass
 import aiohttp
 import time
 
+from .outbox import WebhookDeliveryEngine, WebhookEndpointConfig
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -48,7 +50,7 @@ class WebhookClient:
     Features:
     - Automatic retries with exponential backoff
     - Signature verification support
-    - Event queuing and batch delivery
+    - Event queuing and batch delivery (durable when a delivery engine is attached)
     - Delivery status tracking
     - Custom headers and authentication
     """
@@ -60,7 +62,9 @@ class WebhookClient:
         max_retries: int = 3,
         timeout: int = 30,
         retry_delay: float = 1.0,
-        custom_headers: Optional[Dict[str, str]] = None
+        custom_headers: Optional[Dict[str, str]] = None,
+        delivery_engine: Optional[WebhookDeliveryEngine] = None,
+        endpoint_config: Optional[WebhookEndpointConfig] = None
     ):
         self.webhook_url = webhook_url
         self.secret = secret
@@ -69,6 +73,16 @@ class WebhookClient:
         self.retry_delay = retry_delay
         self.custom_headers = custom_headers or {}
         
+        # Durable outbox delivery for queued (immediate=False) events
+        self.delivery_engine = delivery_engine
+        if delivery_engine is not None:
+            delivery_engine.register_endpoint(endpoint_config or WebhookEndpointConfig(
+                url=webhook_url,
+                secret=secret,
+                custom_headers=self.custom_headers,
+                max_attempts=max(max_retries, 1)
+            ))
+        
         # Statistics
         self.total_events = 0
         self.successful_deliveries = 0
@@ -147,7 +161,9 @@ class WebhookClient:
             event_type: Type of event (e.g., 'job.completed')
             payload: Event payload data
             event_id: Optional custom event ID
-            immediate: Whether to send immediately or queue for batch processing
+            immediate: Whether to send immediately or queue for batch processing.
+                With a delivery engine attached, queued events go to the durable
+                outbox and are delivered in batches without blocking the caller.
             
         Returns:
             WebhookDelivery: Delivery result
@@ -169,6 +185,15 @@ class WebhookClient:
             
             if immediate:
                 return await self._deliver_event(event)
+            elif self.delivery_engine is not None:
+                self.delivery_engine.enqueue(
+                    self.webhook_url, event_type, payload, event_id, event.timestamp
+                )
+                return WebhookDelivery(
+                    event_id=event_id,
+                    delivery_id=f"outbox_{event_id}",
+                    webhook_url=self.webhook_url
+                )
             else:
                 await self.event_queue.put(event)
                 # Return placeholder delivery for queued events
@@ -393,9 +418,10 @@ class WebhookManager:
     Handles multiple webhook endpoints and event routing.
     """
     
-    def __init__(self):
+    def __init__(self, delivery_engine: Optional[WebhookDeliveryEngine] = None):
         self.clients: Dict[str, WebhookClient] = {}
         self.event_routing: Dict[str, List[str]] = {}  # event_type -> client_names
+        self.delivery_engine = delivery_engine
     
     def add_webhook(
         self,
@@ -405,6 +431,7 @@ class WebhookManager:
         **kwargs
     ):
         """Add a webhook client"""
+        kwargs.setdefault('delivery_engine', self.delivery_engine)
         self.clients[name] = WebhookClient(
             webhook_url=webhook_url,
             secret=secret,
@@ -0,0 +1,557 @@
+"""
+Webhook Outbox and Delivery Engine
+=================================
+
+Durable, batched webhook delivery for high-volume events.
+
+Producers append events to an outbox table and return immediately.
+Per-endpoint workers claim batches from the outbox, deliver them as JSON
+array payloads over a shared connection pool, and reschedule failures with
+exponential backoff and jitter. Events that exhaust their attempts (or are
+rejected outright) move to a dead-letter table where they can be inspected
+and requeued. Because the outbox lives on disk, nothing queued is lost on
+restart.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from src.observability.histograms import HistogramRegistry, get_histogram_registry
+
+logger = logging.getLogger(__name__)
+
+# (url, body, headers) -> (status_code, response_text)
+Transport = Callable[[str, str, Dict[str, str]], Awaitable[Tuple[int, str]]]
+
+# Client errors that are worth retrying; any other 4xx goes straight to DLQ
+RETRYABLE_CLIENT_ERRORS = {408, 409, 425, 429}
+
+
+@dataclass
+class WebhookEndpointConfig:
+    """Delivery settings for a single webhook endpoint"""
+    url: str
+    secret: Optional[str] = None
+    custom_headers: Dict[str, str] = field(default_factory=dict)
+    concurrency: int = 2
+    max_batch_size: int = 100
+    max_batch_bytes: int = 256 * 1024
+    batch_window: float = 1.0  # seconds to linger for a fuller batch
+    max_attempts: int = 8
+    backoff_base: float = 1.0
+    backoff_cap: float = 600.0
+
+
+@dataclass
+class OutboxRecord:
+    """A claimed outbox row"""
+    id: int
+    endpoint: str
+    event_id: str
+    event_type: str
+    body: str
+    attempts: int
+    created_at: float
+
+
+class WebhookOutbox:
+    """
+    SQLite-backed outbox.
+
+    Rows move pending -> inflight -> (deleted | pending | dead letter).
+    Inflight rows left behind by a crash are returned to pending on open.
+    """
+
+    def __init__(self, db_path: str = "webhook_outbox.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+        self.recover_inflight()
+
+    def _init_schema(self):
+        with self._lock:
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS webhook_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    endpoint TEXT NOT NULL,
+                    event_id TEXT NOT NULL,
+                    event_type TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_error TEXT,
+                    UNIQUE (endpoint, event_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_webhook_outbox_due
+                    ON webhook_outbox (endpoint, status, next_attempt_at, id);
+
+                CREATE TABLE IF NOT EXISTS webhook_dead_letter (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    endpoint TEXT NOT NULL,
+                    event_id TEXT NOT NULL,
+                    event_type TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    failed_at REAL NOT NULL,
+                    last_error TEXT
+                );
+            ''')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def recover_inflight(self) -> int:
+        """Return rows claimed by a previous process to pending"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE webhook_outbox SET status = 'pending' WHERE status = 'inflight'"
+            )
+            return cursor.rowcount
+
+    def enqueue(self, endpoint: str, event_id: str, event_type: str, body: str,
+                now: Optional[float] = None) -> bool:
+        """Append an event; duplicates (same endpoint + event_id) are ignored"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                '''INSERT OR IGNORE INTO webhook_outbox
+                   (endpoint, event_id, event_type, body, size, next_attempt_at, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                (endpoint, event_id, event_type, body, len(body), now, now)
+            )
+            return cursor.rowcount == 1
+
+    def count_due(self, endpoint: str, now: Optional[float] = None) -> int:
+        now = now if now is not None else time.time()
+        with self._lock:
+            row = self._conn.execute(
+                '''SELECT COUNT(*) FROM webhook_outbox
+                   WHERE endpoint = ? AND status = 'pending' AND next_attempt_at <= ?''',
+                (endpoint, now)
+            ).fetchone()
+            return row[0]
+
+    def next_due_at(self, endpoint: str) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                '''SELECT MIN(next_attempt_at) FROM webhook_outbox
+                   WHERE endpoint = ? AND status = 'pending' ''',
+                (endpoint,)
+            ).fetchone()
+            return row[0]
+
+    def claim_batch(self, endpoint: str, max_events: int, max_bytes: int,
+                    now: Optional[float] = None) -> List[OutboxRecord]:
+        """Mark up to ``max_events``/``max_bytes`` due rows inflight and return them"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    '''SELECT id, endpoint, event_id, event_type, body, size, attempts, created_at
+                       FROM webhook_outbox
+                       WHERE endpoint = ? AND status = 'pending' AND next_attempt_at <= ?
+                       ORDER BY id LIMIT ?''',
+                    (endpoint, now, max_events)
+                ).fetchall()
+
+                batch: List[OutboxRecord] = []
+                total = 0
+                for row_id, row_endpoint, event_id, event_type, body, size, attempts, created in rows:
+                    # Always take at least one event, even if it alone is oversized
+                    if batch and total + size > max_bytes:
+                        break
+                    total += size
+                    batch.append(OutboxRecord(
+                        row_id, row_endpoint, event_id, event_type, body, attempts, created
+                    ))
+
+                if batch:
+                    self._conn.executemany(
+                        "UPDATE webhook_outbox SET status = 'inflight' WHERE id = ?",
+                        [(record.id,) for record in batch]
+                    )
+                self._conn.execute("COMMIT")
+                return batch
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def mark_delivered(self, ids: List[int]):
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM webhook_outbox WHERE id = ?", [(i,) for i in ids]
+            )
+
+    def reschedule(self, records: List[OutboxRecord], next_attempt_at: List[float], error: str):
+        with self._lock:
+            self._conn.executemany(
+                '''UPDATE webhook_outbox
+                   SET status = 'pending', attempts = attempts + 1,
+                       next_attempt_at = ?, last_error = ?
+                   WHERE id = ?''',
+                [(due, error[:1000], record.id) for record, due in zip(records, next_attempt_at)]
+            )
+
+    def dead_letter(self, records: List[OutboxRecord], error: str, now: Optional[float] = None):
+        """Move records to the dead-letter table"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    '''INSERT INTO webhook_dead_letter
+                       (endpoint, event_id, event_type, body, attempts, created_at, failed_at, last_error)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                    [(r.endpoint, r.event_id, r.event_type, r.body, r.attempts + 1,
+                      r.created_at, now, error[:1000]) for r in records]
+                )
+                self._conn.executemany(
+                    "DELETE FROM webhook_outbox WHERE id = ?", [(r.id,) for r in records]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def list_dead_letters(self, endpoint: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        query = '''SELECT id, endpoint, event_id, event_type, attempts, failed_at, last_error
+                   FROM webhook_dead_letter'''
+        params: Tuple = ()
+        if endpoint:
+            query += " WHERE endpoint = ?"
+            params = (endpoint,)
+        query += " ORDER BY id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, params + (limit,)).fetchall()
+        keys = ("id", "endpoint", "event_id", "event_type", "attempts", "failed_at", "last_error")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def requeue_dead_letters(self, endpoint: Optional[str] = None) -> int:
+        """Move dead letters back into the outbox with a fresh attempt budget
+
+        A dead letter whose event is already queued again is left where it
+        is, so it is never deleted without having been requeued.
+        """
+        where, params = ("WHERE endpoint = ?", (endpoint,)) if endpoint else ("", ())
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    f"SELECT id, endpoint, event_id, event_type, body FROM webhook_dead_letter {where} ORDER BY id",
+                    params
+                ).fetchall()
+                moved = []
+                for dead_id, row_endpoint, event_id, event_type, body in rows:
+                    cursor = self._conn.execute(
+                        """INSERT OR IGNORE INTO webhook_outbox
+                           (endpoint, event_id, event_type, body, size, next_attempt_at, created_at)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                        (row_endpoint, event_id, event_type, body, len(body), now, now)
+                    )
+                    if cursor.rowcount == 1:
+                        moved.append((dead_id,))
+                self._conn.executemany("DELETE FROM webhook_dead_letter WHERE id = ?", moved)
+                self._conn.execute("COMMIT")
+                return len(moved)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            pending = self._conn.execute(
+                "SELECT status, COUNT(*) FROM webhook_outbox GROUP BY status"
+            ).fetchall()
+            dead = self._conn.execute("SELECT COUNT(*) FROM webhook_dead_letter").fetchone()[0]
+        counts = {"pending": 0, "inflight": 0}
+        counts.update(dict(pending))
+        counts["dead_letter"] = dead
+        return counts
+
+
+class WebhookDeliveryEngine:
+    """
+    Batched webhook delivery over a durable outbox.
+
+    Features:
+    - Non-blocking enqueue for producers
+    - Per-endpoint worker concurrency over one shared connection pool
+    - Size/time windowed batching into JSON array payloads
+    - Exponential backoff with full jitter, scheduled in the outbox
+    - Dead-letter queue for exhausted or rejected events
+    - Events/sec and delivery latency percentiles
+    """
+
+    def __init__(self,
+                 outbox: Optional[WebhookOutbox] = None,
+                 db_path: str = "webhook_outbox.db",
+                 pool_size: int = 100,
+                 timeout: int = 30,
+                 poll_interval: float = 5.0,
+                 transport: Optional[Transport] = None,
+                 histograms: Optional[HistogramRegistry] = None):
+        self.outbox = outbox or WebhookOutbox(db_path)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.histograms = histograms or get_histogram_registry()
+        self.histograms.describe(
+            "webhook_delivery_latency_ms", "Webhook enqueue-to-delivery latency in milliseconds"
+        )
+
+        self.endpoints: Dict[str, WebhookEndpointConfig] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._workers: Dict[str, List[asyncio.Task]] = {}  # endpoint URL -> worker tasks
+        self._running = False
+
+        self._transport = transport
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # Statistics
+        self.enqueued = 0
+        self.delivered = 0
+        self.batches_sent = 0
+        self.failed_attempts = 0
+        self.dead_lettered = 0
+        self._delivery_log: deque = deque()  # (timestamp, events delivered)
+        self._rate_window = 60.0
+
+    def register_endpoint(self, config: WebhookEndpointConfig):
+        """Add or replace an endpoint; workers start with the engine"""
+        self.endpoints[config.url] = config
+        self._wakeups.setdefault(config.url, asyncio.Event())
+        # Running workers pick up a replaced config on their next batch
+        if self._running and not any(not task.done() for task in self._workers.get(config.url, ())):
+            self._start_workers(config)
+
+    def enqueue(self, endpoint: str, event_type: str, payload: Dict[str, Any],
+                event_id: str, timestamp: Optional[datetime] = None) -> bool:
+        """Persist an event for delivery; returns without any network I/O"""
+        if endpoint not in self.endpoints:
+            self.register_endpoint(WebhookEndpointConfig(url=endpoint))
+
+        body = json.dumps({
+            'event_id': event_id,
+            'event_type': event_type,
+            'timestamp': (timestamp or datetime.utcnow()).isoformat(),
+            'data': payload
+        }, default=str)
+
+        added = self.outbox.enqueue(endpoint, event_id, event_type, body)
+        if added:
+            self.enqueued += 1
+            wakeup = self._wakeups.get(endpoint)
+            if wakeup:
+                wakeup.set()
+        return added
+
+    async def start(self):
+        """Start workers for every registered endpoint"""
+        if self._running:
+            return
+        self._running = True
+
+        if self._transport is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+
+        for config in self.endpoints.values():
+            self._start_workers(config)
+
+        logger.info(f"Webhook delivery engine started for {len(self.endpoints)} endpoints")
+
+    def _start_workers(self, config: WebhookEndpointConfig):
+        wakeup = self._wakeups.setdefault(config.url, asyncio.Event())
+        self._workers[config.url] = [
+            asyncio.create_task(self._worker(config, wakeup)) for _ in range(max(1, config.concurrency))
+        ]
+
+    async def stop(self):
+        """Stop workers; undelivered events stay in the outbox"""
+        self._running = False
+        workers = [task for tasks in self._workers.values() for task in tasks]
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+
+        if self._session and not self._session.closed:
+            await self._session.close()
+        logger.info("Webhook delivery engine stopped")
+
+    async def flush(self, timeout: float = 30.0):
+        """Wait until every due event has been delivered or rescheduled"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            now = time.time()
+            counts = self.outbox.counts()
+            due = sum(self.outbox.count_due(url, now) for url in self.endpoints)
+            if due == 0 and counts.get("inflight", 0) == 0:
+                return
+            for wakeup in self._wakeups.values():
+                wakeup.set()
+            await asyncio.sleep(0.05)
+
+    async def _worker(self, config: WebhookEndpointConfig, wakeup: asyncio.Event):
+        while self._running:
+            config = self.endpoints.get(config.url, config)
+            try:
+                batch = self.outbox.claim_batch(
+                    config.url, config.max_batch_size, config.max_batch_bytes
+                )
+                if batch:
+                    await self._deliver_batch(config, batch)
+                    continue
+
+                await self._wait_for_work(config, wakeup)
+
+                # Linger briefly so a trickle of events still forms a batch
+                if self.outbox.count_due(config.url) < config.max_batch_size:
+                    await asyncio.sleep(config.batch_window)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Webhook worker error for {config.url}: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _wait_for_work(self, config: WebhookEndpointConfig, wakeup: asyncio.Event):
+        timeout = self.poll_interval
+        next_due = self.outbox.next_due_at(config.url)
+        if next_due is not None:
+            timeout = min(timeout, max(0.0, next_due - time.time()))
+
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        wakeup.clear()
+
+    def _headers(self, config: WebhookEndpointConfig, body: str, batch: List[OutboxRecord]) -> Dict[str, str]:
+        headers = {
+            'Content-Type': 'application/json',
+            'User-Agent': 'ECaDP-Webhook/1.0',
+            'X-ECaDP-Event': 'batch',
+            'X-ECaDP-Batch-Size': str(len(batch)),
+            'X-ECaDP-Timestamp': str(int(time.time()))
+        }
+        if config.secret:
+            signature = hmac.new(
+                config.secret.encode('utf-8'), body.encode('utf-8'), hashlib.sha256
+            ).hexdigest()
+            headers['X-ECaDP-Signature'] = f"sha256={signature}"
+        headers.update(config.custom_headers)
+        return headers
+
+    async def _post(self, url: str, body: str, headers: Dict[str, str]) -> Tuple[int, str]:
+        if self._transport is not None:
+            return await self._transport(url, body, headers)
+
+        async with self._session.post(url, data=body, headers=headers) as response:
+            return response.status, await response.text()
+
+    async def _deliver_batch(self, config: WebhookEndpointConfig, batch: List[OutboxRecord]):
+        # Event bodies are already JSON, so the array is built by joining
+        body = "[" + ",".join(record.body for record in batch) + "]"
+        headers = self._headers(config, body, batch)
+
+        try:
+            status, text = await self._post(config.url, body, headers)
+        except Exception as e:
+            self._handle_failure(config, batch, f"{type(e).__name__}: {e}", retryable=True)
+            return
+
+        if 200 <= status < 300:
+            self._handle_success(config, batch)
+        else:
+            retryable = status >= 500 or status in RETRYABLE_CLIENT_ERRORS
+            self._handle_failure(config, batch, f"HTTP {status}: {text[:200]}", retryable)
+
+    def _handle_success(self, config: WebhookEndpointConfig, batch: List[OutboxRecord]):
+        self.outbox.mark_delivered([record.id for record in batch])
+
+        now = time.time()
+        latency = self.histograms.get("webhook_delivery_latency_ms", {"endpoint": config.url})
+        for record in batch:
+            latency.record(max(0.0, now - record.created_at) * 1000)
+
+        self.delivered += len(batch)
+        self.batches_sent += 1
+        self._delivery_log.append((now, len(batch)))
+
+    def _handle_failure(self, config: WebhookEndpointConfig, batch: List[OutboxRecord],
+                        error: str, retryable: bool):
+        self.failed_attempts += 1
+
+        exhausted = [r for r in batch if not retryable or r.attempts + 1 >= config.max_attempts]
+        retry = [r for r in batch if r not in exhausted]
+
+        if exhausted:
+            self.outbox.dead_letter(exhausted, error)
+            self.dead_lettered += len(exhausted)
+            logger.error(
+                f"Moved {len(exhausted)} webhook events for {config.url} to dead letter: {error}"
+            )
+
+        if retry:
+            now = time.time()
+            due = [now + self._backoff(config, record.attempts + 1) for record in retry]
+            self.outbox.reschedule(retry, due, error)
+            logger.warning(
+                f"Webhook batch to {config.url} failed ({error}); "
+                f"{len(retry)} events rescheduled"
+            )
+
+    @staticmethod
+    def _backoff(config: WebhookEndpointConfig, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        ceiling = min(config.backoff_cap, config.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def events_per_second(self) -> float:
+        """Delivered events per second over the last minute"""
+        cutoff = time.time() - self._rate_window
+        while self._delivery_log and self._delivery_log[0][0] < cutoff:
+            self._delivery_log.popleft()
+        return sum(count for _, count in self._delivery_log) / self._rate_window
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Delivery statistics including latency percentiles"""
+        return {
+            'enqueued': self.enqueued,
+            'delivered': self.delivered,
+            'batches_sent': self.batches_sent,
+            'failed_attempts': self.failed_attempts,
+            'dead_lettered': self.dead_lettered,
+            'events_per_second': self.events_per_second(),
+            'outbox': self.outbox.counts(),
+            'latency_ms': self.histograms.percentiles("webhook_delivery_latency_ms"),
+            'latency_ms_by_endpoint': self.histograms.breakdown(
+                "webhook_delivery_latency_ms", "endpoint"
+            )
+        }
@@ -5,18 +5,24 @@ Advanced PDF processing with layout analysis and content extraction
 """
 
 import asyncio
+import dataclasses
 import logging
+import os
 import time
 import json
 import tempfile
 import shutil
 import subprocess
+import hashlib
+from collections import OrderedDict, deque
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Union, Tuple
+from typing import Dict, Any, Optional, List, Union, Tuple, AsyncIterator
 from dataclasses import dataclass, asdict
 import base64
 import io
 
+from ..extraction_pool import ExtractionPoolConfig, ExtractionProcessPool
+
 try:
     import requests
     REQUESTS_AVAILABLE = True
@@ -57,6 +63,7 @@ class PDFPage:
     formulas: Optional[List[Dict[str, Any]]] = None
     reading_order: Optional[List[int]] = None
     ocr_confidence: Optional[float] = None
+    error: Optional[str] = None  # Set when the page could not be processed
 
 @dataclass
 class ExtractedPDF:
@@ -71,6 +78,7 @@ class ExtractedPDF:
     document_structure: Optional[Dict[str, Any]] = None
     extraction_time: float = 0.0
     processing_method: str = 'pdf-extract-kit'
+    failed_pages: Optional[List[int]] = None  # Page numbers returned blank after errors
 
 @dataclass
 class PDFExtractConfig:
@@ -93,6 +101,18 @@ class PDFExtractConfig:
     confidence_threshold: float = 0.8
     debug: bool = False
     output_formats: List[str] = None  # json, markdown, html, xml
+    # Page-parallel processing - page ranges are sharded across worker processes
+    parallel_pages: bool = True
+    max_workers: Optional[int] = None  # None = CPU count
+    pages_per_shard: int = 4
+    min_pages_for_parallel: int = 8
+    page_timeout: float = 30.0
+    # Results cached by content hash so re-crawled identical PDFs are not reprocessed
+    cache_enabled: bool = True
+    cache_max_entries: int = 128
+    cache_max_bytes: int = 256 * 1024 * 1024  # Serialized size of in-memory entries
+    cache_dir: Optional[str] = None
+    cache_dir_max_bytes: int = 1024 * 1024 * 1024
 
 class LayoutElement:
     """Base class for layout elements"""
@@ -175,9 +195,19 @@ class PDFProcessor:
             'figures_extracted': 0,
             'formulas_extracted': 0,
             'total_processing_time': 0.0,
-            'ocr_pages': 0
+            'ocr_pages': 0,
+            'pages_parallel': 0,
+            'shards_failed': 0,
+            'cache_hits': 0,
+            'cache_misses': 0
         }
         
+        # Worker processes for page shards, started on first large document
+        self._pool: Optional[ExtractionProcessPool] = None
+        self._cache: "OrderedDict[str, ExtractedPDF]" = OrderedDict()
+        self._cache_sizes: Dict[str, int] = {}
+        self._cache_bytes = 0
+        
         if config.output_formats is None:
             config.output_formats = ['json', 'markdown']
             
@@ -257,8 +287,16 @@ class PDFProcessor:
             logger.error(f"❌ API connection failed: {str(e)}")
             raise
             
-    async def extract_from_pdf(self, pdf_path: Union[str, Path]) -> ExtractedPDF:
-        """Extract comprehensive information from PDF"""
+    async def extract_from_pdf(self, pdf_path: Union[str, Path],
+                               max_pages: Optional[int] = None,
+                               metadata_only: bool = False) -> ExtractedPDF:
+        """Extract comprehensive information from PDF
+        
+        Args:
+            max_pages: Only process the first N pages
+            metadata_only: Skip page processing; return metadata, page
+                count and table of contents
+        """
         
         start_time = time.time()
         self._stats['pdfs_processed'] += 1
@@ -268,30 +306,32 @@ class PDFProcessor:
         try:
             logger.info(f"📄 Processing PDF: {pdf_path.name}")
             
-            if not pdf_path.exists():
-                raise FileNotFoundError(f"PDF not found: {pdf_path}")
-                
-            if pdf_path.stat().st_size > self.config.max_file_size:
-                raise ValueError(f"PDF too large: {pdf_path.stat().st_size} bytes")
-                
-            if not PYMUPDF_AVAILABLE:
-                raise ImportError("PyMuPDF required for PDF processing")
-                
-            # Open PDF document
-            doc = fitz.open(str(pdf_path))
+            self._validate_pdf(pdf_path)
             
-            # Extract metadata
-            metadata = doc.metadata
+            cache_key = None
+            if self.config.cache_enabled:
+                cache_key = self._cache_key(await asyncio.to_thread(self._content_hash, pdf_path),
+                                            max_pages, metadata_only)
+                cached = self._cache_get(cache_key)
+                if cached is not None:
+                    self._stats['cache_hits'] += 1
+                    logger.info(f"♻️  PDF served from cache: {pdf_path.name}")
+                    return dataclasses.replace(cached, filename=pdf_path.name, extraction_time=time.time() - start_time)
+                self._stats['cache_misses'] += 1
+            
+            # Metadata and outline only need the document trailer, not the pages
+            doc = fitz.open(str(pdf_path))
+            try:
+                metadata = doc.metadata
+                page_count = len(doc)
+                toc = await self._extract_toc(doc)
+            finally:
+                doc.close()
             
-            # Process pages
             pages = []
-            for page_num in range(len(doc)):
-                page_data = await self._process_page(doc, page_num)
-                pages.append(page_data)
-                self._stats['pages_processed'] += 1
-                
-            # Extract table of contents
-            toc = await self._extract_toc(doc)
+            if not metadata_only:
+                async for page_data in self.iter_pages(pdf_path, max_pages=max_pages):
+                    pages.append(page_data)
             
             # Compile full text
             full_text = "\n\n".join(page.text_content or "" for page in pages)
@@ -299,23 +339,30 @@ class PDFProcessor:
             # Analyze document structure
             structure = await self._analyze_document_structure(pages, toc)
             
-            doc.close()
-            
             extraction_time = time.time() - start_time
             self._stats['total_processing_time'] += extraction_time
             
+            failed_pages = [page.page_number for page in pages if page.error]
+            
             result = ExtractedPDF(
                 filename=pdf_path.name,
-                total_pages=len(pages),
+                total_pages=page_count,
                 pages=pages,
                 metadata=metadata,
                 full_text=full_text,
                 table_of_contents=toc,
                 document_structure=structure,
-                extraction_time=extraction_time
+                extraction_time=extraction_time,
+                failed_pages=failed_pages or None
             )
             
-            logger.info(f"✅ PDF processed: {pdf_path.name} ({len(pages)} pages, {extraction_time:.2f}s)")
+            # Partial results are not cached, so the next request retries the failed pages
+            if failed_pages:
+                logger.warning(f"⚠️  {len(failed_pages)} page(s) of {pdf_path.name} failed; result not cached")
+            elif cache_key:
+                self._cache_put(cache_key, result)
+            
+            logger.info(f"✅ PDF processed: {pdf_path.name} ({len(pages)}/{page_count} pages, {extraction_time:.2f}s)")
             
             return result
             
@@ -328,8 +375,194 @@ class PDFProcessor:
                 pages=[],
                 extraction_time=time.time() - start_time
             )
+    
+    async def iter_pages(self, pdf_path: Union[str, Path],
+                         max_pages: Optional[int] = None) -> AsyncIterator[PDFPage]:
+        """Stream processed pages in page order
+        
+        Large documents are split into page-range shards processed by
+        worker processes; only a bounded window of shards is in flight, so
+        memory stays flat however long the document is. Stopping iteration
+        early cancels the remaining shards.
+        """
+        
+        pdf_path = Path(pdf_path)
+        self._validate_pdf(pdf_path)
+        
+        doc = fitz.open(str(pdf_path))
+        page_count = len(doc)
+        if max_pages is not None:
+            page_count = min(page_count, max_pages)
+        
+        if not self._parallel(page_count):
+            try:
+                for page_num in range(page_count):
+                    page_data = self._process_page(doc, page_num)
+                    self._record_page(page_data)
+                    yield page_data
+            finally:
+                doc.close()
+            return
+        doc.close()
+        
+        pool = self._get_pool()
+        size = max(1, self.config.pages_per_shard)
+        shards = iter([(first, min(first + size, page_count)) for first in range(0, page_count, size)])
+        in_flight: deque = deque()
+        
+        def schedule():
+            while len(in_flight) < pool.config.pending_limit:
+                shard = next(shards, None)
+                if shard is None:
+                    return
+                first, last = shard
+                task = asyncio.ensure_future(pool.submit(
+                    _process_page_range, str(pdf_path), first, last, self.config,
+                    timeout=self.config.page_timeout * (last - first)
+                ))
+                in_flight.append((shard, task))
+        
+        schedule()
+        try:
+            while in_flight:
+                (first, last), task = in_flight.popleft()
+                try:
+                    shard_pages = await task
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"❌ Failed to process pages {first + 1}-{last}: {str(e)}")
+                    self._stats['shards_failed'] += 1
+                    shard_pages = [PDFPage(page_number=n + 1, width=0, height=0, text_content="",
+                                           error=str(e) or type(e).__name__)
+                                   for n in range(first, last)]
+                schedule()
+                for page_data in shard_pages:
+                    self._record_page(page_data)
+                    self._stats['pages_parallel'] += 1
+                    yield page_data
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+    
+    async def extract_metadata(self, pdf_path: Union[str, Path]) -> ExtractedPDF:
+        """Metadata, page count and table of contents without page processing"""
+        return await self.extract_from_pdf(pdf_path, metadata_only=True)
+    
+    def _validate_pdf(self, pdf_path: Path):
+        if not pdf_path.exists():
+            raise FileNotFoundError(f"PDF not found: {pdf_path}")
+            
+        if pdf_path.stat().st_size > self.config.max_file_size:
+            raise ValueError(f"PDF too large: {pdf_path.stat().st_size} bytes")
             
-    async def _process_page(self, doc: fitz.Document, page_num: int) -> PDFPage:
+        if not PYMUPDF_AVAILABLE:
+            raise ImportError("PyMuPDF required for PDF processing")
+    
+    def _parallel(self, page_count: int) -> bool:
+        return (self.config.parallel_pages
+                and page_count >= self.config.min_pages_for_parallel
+                and (self.config.max_workers or os.cpu_count() or 1) > 1)
+    
+    def _get_pool(self) -> ExtractionProcessPool:
+        if self._pool is None:
+            self._pool = ExtractionProcessPool(ExtractionPoolConfig(
+                max_workers=self.config.max_workers,
+                task_timeout=self.config.page_timeout
+            ))
+        return self._pool
+    
+    def _record_page(self, page_data: PDFPage):
+        self._stats['pages_processed'] += 1
+        self._stats['tables_extracted'] += len(page_data.tables or [])
+        self._stats['figures_extracted'] += len(page_data.images or [])
+        self._stats['formulas_extracted'] += len(page_data.formulas or [])
+    
+    @staticmethod
+    def _content_hash(pdf_path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(pdf_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _cache_key(self, content_hash: str, max_pages: Optional[int], metadata_only: bool) -> str:
+        """Content hash plus every option that changes the result"""
+        options = (
+            'meta' if metadata_only else max_pages,
+            self.config.layout_analysis, self.config.extract_tables, self.config.extract_figures,
+            self.config.extract_formulas, self.config.reading_order_detection
+        )
+        return f"{content_hash}-{hashlib.sha1(repr(options).encode()).hexdigest()[:12]}"
+    
+    def _cache_get(self, key: str) -> Optional[ExtractedPDF]:
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        
+        if self.config.cache_dir:
+            path = Path(self.config.cache_dir) / f"{key}.json"
+            if path.exists():
+                try:
+                    payload = path.read_text(encoding='utf-8')
+                    data = json.loads(payload)
+                    data['pages'] = [PDFPage(**page) for page in data['pages']]
+                    result = ExtractedPDF(**data)
+                    os.utime(path)  # Recently used entries survive directory pruning
+                    self._cache_put(key, result, payload=payload)
+                    return result
+                except Exception as e:
+                    logger.debug(f"Ignoring unreadable PDF cache entry {path.name}: {str(e)}")
+        return None
+    
+    def _cache_put(self, key: str, result: ExtractedPDF, payload: Optional[str] = None):
+        """Cache ``result`` in memory and, unless ``payload`` was read from disk, in ``cache_dir``
+        
+        Both caches are bounded by serialized size; the oldest entries are
+        evicted first and a result larger than the memory budget is only
+        kept on disk.
+        """
+        persist = payload is None and self.config.cache_dir
+        if payload is None:
+            payload = json.dumps(asdict(result))
+        size = len(payload)
+        
+        self._cache_remove(key)
+        if size <= self.config.cache_max_bytes:
+            self._cache[key] = result
+            self._cache_sizes[key] = size
+            self._cache_bytes += size
+        while self._cache and (len(self._cache) > self.config.cache_max_entries
+                               or self._cache_bytes > self.config.cache_max_bytes):
+            self._cache_remove(next(iter(self._cache)))
+        
+        if persist:
+            try:
+                cache_dir = Path(self.config.cache_dir)
+                cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = cache_dir / f"{key}.json.tmp"
+                tmp_path.write_text(payload, encoding='utf-8')
+                tmp_path.replace(cache_dir / f"{key}.json")
+                self._prune_cache_dir(cache_dir)
+            except Exception as e:
+                logger.debug(f"Failed to persist PDF cache entry: {str(e)}")
+    
+    def _cache_remove(self, key: str):
+        if self._cache.pop(key, None) is not None:
+            self._cache_bytes -= self._cache_sizes.pop(key)
+    
+    def _prune_cache_dir(self, cache_dir: Path):
+        """Delete least recently used cache files until the directory fits its budget"""
+        entries = sorted(((path.stat(), path) for path in cache_dir.glob("*.json")),
+                         key=lambda entry: entry[0].st_mtime)
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, path in entries:
+            if total <= self.config.cache_dir_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            
+    def _process_page(self, doc: fitz.Document, page_num: int) -> PDFPage:
         """Process individual PDF page"""
         
         try:
@@ -352,27 +585,24 @@ class PDFProcessor:
             
             # Layout analysis
             if self.config.layout_analysis:
-                page_data.layout_elements = await self._analyze_page_layout(page)
+                page_data.layout_elements = self._analyze_page_layout(page)
                 
             # Extract tables
             if self.config.extract_tables:
-                page_data.tables = await self._extract_page_tables(page)
-                self._stats['tables_extracted'] += len(page_data.tables or [])
+                page_data.tables = self._extract_page_tables(page)
                 
             # Extract images/figures
             if self.config.extract_figures:
-                page_data.images = await self._extract_page_images(page)
+                page_data.images = self._extract_page_images(page)
                 page_data.figures = page_data.images  # Alias
-                self._stats['figures_extracted'] += len(page_data.images or [])
                 
             # Extract formulas
             if self.config.extract_formulas:
-                page_data.formulas = await self._extract_page_formulas(page, text_content)
-                self._stats['formulas_extracted'] += len(page_data.formulas or [])
+                page_data.formulas = self._extract_page_formulas(page, text_content)
                 
             # Reading order detection
             if self.config.reading_order_detection and page_data.layout_elements:
-                page_data.reading_order = await self._detect_reading_order(page_data.layout_elements)
+                page_data.reading_order = self._detect_reading_order(page_data.layout_elements)
                 
             return page_data
             
@@ -383,10 +613,11 @@ class PDFProcessor:
                 page_number=page_num + 1,
                 width=0,
                 height=0,
-                text_content=""
+                text_content="",
+                error=str(e) or type(e).__name__
             )
             
-    async def _analyze_page_layout(self, page: fitz.Page) -> List[Dict[str, Any]]:
+    def _analyze_page_layout(self, page: fitz.Page) -> List[Dict[str, Any]]:
         """Analyze page layout and detect elements"""
         
         try:
@@ -428,7 +659,7 @@ class PDFProcessor:
             logger.error(f"❌ Layout analysis failed: {str(e)}")
             return []
             
-    async def _extract_page_tables(self, page: fitz.Page) -> List[Dict[str, Any]]:
+    def _extract_page_tables(self, page: fitz.Page) -> List[Dict[str, Any]]:
         """Extract tables from page"""
         
         try:
@@ -468,7 +699,7 @@ class PDFProcessor:
             logger.error(f"❌ Table extraction failed: {str(e)}")
             return []
             
-    async def _extract_page_images(self, page: fitz.Page) -> List[Dict[str, Any]]:
+    def _extract_page_images(self, page: fitz.Page) -> List[Dict[str, Any]]:
         """Extract images from page"""
         
         try:
@@ -516,7 +747,7 @@ class PDFProcessor:
             logger.error(f"❌ Image extraction failed: {str(e)}")
             return []
             
-    async def _extract_page_formulas(self, page: fitz.Page, text_content: str) -> List[Dict[str, Any]]:
+    def _extract_page_formulas(self, page: fitz.Page, text_content: str) -> List[Dict[str, Any]]:
         """Extract mathematical formulas from page"""
         
         try:
@@ -558,7 +789,7 @@ class PDFProcessor:
             logger.error(f"❌ Formula extraction failed: {str(e)}")
             return []
             
-    async def _detect_reading_order(self, elements: List[Dict[str, Any]]) -> List[int]:
+    def _detect_reading_order(self, elements: List[Dict[str, Any]]) -> List[int]:
         """Detect reading order of layout elements"""
         
         try:
@@ -675,6 +906,10 @@ class PDFProcessor:
     async def cleanup(self):
         """Clean up resources"""
         
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            
         if self.temp_dir and self.temp_dir.exists():
             try:
                 shutil.rmtree(self.temp_dir)
@@ -682,6 +917,23 @@ class PDFProcessor:
             except Exception as e:
                 logger.error(f"❌ Failed to cleanup temp dir: {str(e)}")
 
+# Processor owned by each worker process, reused across shards
+_worker_processor: Optional[PDFProcessor] = None
+
+def _process_page_range(pdf_path: str, first: int, last: int,
+                        config: PDFExtractConfig) -> List[PDFPage]:
+    """Worker entry point - process pages ``first``..``last - 1`` of a PDF"""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = PDFProcessor(config)
+    _worker_processor.config = config
+    
+    doc = fitz.open(pdf_path)
+    try:
+        return [_worker_processor._process_page(doc, page_num) for page_num in range(first, last)]
+    finally:
+        doc.close()
+
 class PDFExtractKitAdapter:
     """High-level adapter for PDF-Extract-Kit integration"""
     
@@ -704,10 +956,13 @@ class PDFExtractKitAdapter:
     async def extract_pdf_content(self, pdf_path: Union[str, Path],
                                 extract_tables: bool = True,
                                 extract_figures: bool = True,
-                                extract_formulas: bool = False) -> Dict[str, Any]:
+                                extract_formulas: bool = False,
+                                max_pages: Optional[int] = None) -> Dict[str, Any]:
         """
         Extract comprehensive content from PDF.
         
+        ``max_pages`` limits processing to the first N pages.
+        
         Returns:
         {
             'success': bool,
@@ -719,6 +974,7 @@ class PDFExtractKitAdapter:
             'formulas': list,
             'metadata': dict,
             'structure': dict,
+            'failed_pages': list,  # pages returned blank after errors
             'extraction_time': float
         }
         """
@@ -740,7 +996,7 @@ class PDFExtractKitAdapter:
             self.processor.config.extract_figures = extract_figures
             self.processor.config.extract_formulas = extract_formulas
             
-            result = await self.processor.extract_from_pdf(pdf_path)
+            result = await self.processor.extract_from_pdf(pdf_path, max_pages=max_pages)
             
             # Restore config
             self.processor.config.extract_tables = old_tables
@@ -772,6 +1028,8 @@ class PDFExtractKitAdapter:
                 'table_of_contents': result.table_of_contents or [],
                 'structure': result.document_structure or {},
                 'pages': [asdict(page) for page in result.pages],
+                'pages_processed': len(result.pages),
+                'failed_pages': result.failed_pages or [],
                 'extraction_time': result.extraction_time,
                 'method': 'pdf-extract-kit'
             }
@@ -785,6 +1043,38 @@ class PDFExtractKitAdapter:
                 'method': 'pdf-extract-kit'
             }
             
+    async def stream_pdf_pages(self, pdf_path: Union[str, Path],
+                               max_pages: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield extracted pages one at a time, in page order.
+        
+        Pages are produced as soon as their shard finishes, so callers can
+        index or store them without holding the whole document.
+        """
+        
+        if not self.config.enabled or not self.processor:
+            return
+            
+        async for page in self.processor.iter_pages(pdf_path, max_pages=max_pages):
+            yield asdict(page)
+            
+    async def extract_pdf_metadata(self, pdf_path: Union[str, Path]) -> Dict[str, Any]:
+        """Extract metadata, page count and outline without processing pages"""
+        
+        if not self.config.enabled or not self.processor:
+            return {'success': False, 'error': 'PDF processor not available'}
+            
+        result = await self.processor.extract_metadata(pdf_path)
+        return {
+            'success': result.metadata is not None,
+            'filename': result.filename,
+            'total_pages': result.total_pages,
+            'metadata': result.metadata or {},
+            'table_of_contents': result.table_of_contents or [],
+            'extraction_time': result.extraction_time,
+            'method': 'pdf-extract-kit-metadata'
+        }
+            
     async def extract_tables_only(self, pdf_path: Union[str, Path]) -> Dict[str, Any]:
         """Extract only tables from PDF"""
         
@@ -20,6 +20,7 @@ Implementerar den ultimata innehållsextraktion enligt prioriteringslistan:
 """
 
 import asyncio
+import dataclasses
 import json
 import logging
 import re
@@ -82,6 +83,8 @@ except ImportError:
 from bs4 import BeautifulSoup
 import lxml
 
+from .extraction_pool import ExtractionPoolConfig, ExtractionProcessPool
+
 logger = logging.getLogger(__name__)
 
 
@@ -198,6 +201,15 @@ class ExtractionConfig:
     
     # Output formats
     output_formats: List[str] = field(default_factory=lambda: ['text', 'markdown', 'json'])
+    
+    # CPU offload - parsing and entity extraction run in worker processes
+    use_process_pool: bool = True
+    process_pool_workers: Optional[int] = None  # None = CPU count
+    process_pool_max_pending: Optional[int] = None  # None = 2 per worker
+    process_task_timeout: float = 60.0
+    process_max_tasks_per_worker: Optional[int] = 500
+    process_batch_size: int = 8
+    offload_min_bytes: int = 8 * 1024  # smaller documents are parsed inline
 
 
 class TikaClient:
@@ -471,14 +483,80 @@ class ContentDeduplicator:
         ]
 
 
+LOCAL_METHODS = (ExtractionMethod.TRAFILATURA, ExtractionMethod.BEAUTIFULSOUP, ExtractionMethod.PYMUPDF)
+
+# Extractor owned by each pool worker process, built by the pool initializer
+_worker_extractor: Optional["RevolutionaryContentExtractor"] = None
+
+
+def _init_extraction_worker(config: ExtractionConfig):
+    """Process pool initializer - build the parsers once per worker"""
+    global _worker_extractor
+    _worker_extractor = RevolutionaryContentExtractor(
+        dataclasses.replace(config, use_process_pool=False)
+    )
+
+
+def _extract_local_batch(jobs: List[Tuple[str, Union[str, bytes], Optional[str]]]) -> List[ExtractedContent]:
+    """Worker entry point - run ``(method, content, url)`` jobs in this process"""
+    return [
+        _worker_extractor._extract_local(ExtractionMethod(method), content, url)
+        for method, content, url in jobs
+    ]
+
+
+def _extract_entities(text: str, url: Optional[str]) -> List[EntityResult]:
+    """Worker entry point - entity recognition for text from remote parsers"""
+    return _worker_extractor.entity_extractor.extract_entities(text, url)
+
+
 class RevolutionaryContentExtractor:
     """Revolutionary Content Extraction System - Main Controller"""
     
-    def __init__(self, config: Optional[ExtractionConfig] = None):
+    def __init__(self, config: Optional[ExtractionConfig] = None,
+                 pool: Optional[ExtractionProcessPool] = None):
         self.config = config or ExtractionConfig()
         self.tika_client = TikaClient(self.config)
         self.entity_extractor = EntityExtractor(self.config)
         self.deduplicator = ContentDeduplicator(self.config)
+        
+        # A shared pool may be passed in; otherwise one is created on first use
+        self._pool = pool
+        self._owns_pool = pool is None
+    
+    @property
+    def pool(self) -> Optional[ExtractionProcessPool]:
+        """Process pool for CPU-bound stages, created lazily"""
+        if self._pool is None and self.config.use_process_pool:
+            self._pool = ExtractionProcessPool(
+                ExtractionPoolConfig(
+                    max_workers=self.config.process_pool_workers,
+                    max_pending=self.config.process_pool_max_pending,
+                    task_timeout=self.config.process_task_timeout,
+                    max_tasks_per_worker=self.config.process_max_tasks_per_worker,
+                    batch_size=self.config.process_batch_size
+                ),
+                initializer=_init_extraction_worker,
+                initargs=(self.config,)
+            )
+        return self._pool
+    
+    async def wait_for_capacity(self):
+        """Block the caller (the fetch stage) while the extraction pool is full"""
+        if self.config.use_process_pool and self.pool is not None:
+            await self.pool.wait_for_capacity()
+    
+    async def close(self):
+        """Shut down the process pool if this extractor created it"""
+        if self._pool is not None and self._owns_pool:
+            self._pool.shutdown()
+            self._pool = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
     
     async def extract(self, content: Union[str, bytes], 
                      url: Optional[str] = None,
@@ -489,22 +567,68 @@ class RevolutionaryContentExtractor:
         
         Pipeline: HTML→trafilatura / PDF→Tika/PDF-Extract-Kit / Other→Tika
         """
+        return await self._extract(content, url, content_type, force_method)
+    
+    async def extract_batch(self, documents: List[Tuple[Union[str, bytes], Optional[str], Optional[str]]]
+                            ) -> List[ExtractedContent]:
+        """
+        Extract many ``(content, url, content_type)`` documents
         
+        The first-choice method of every document is sent to the process
+        pool in batches; fallbacks then run per document as in ``extract``.
+        """
         import time
         start_time = time.time()
         
+        prepared = []
+        for content, url, content_type in documents:
+            content_str, content_bytes = self._as_text_and_bytes(content)
+            detected_type = self._detect_content_type(content_str, content_type, url)
+            methods = self._get_extraction_methods(detected_type)
+            first = methods[0] if methods and methods[0] in LOCAL_METHODS else None
+            payload = content_bytes if first == ExtractionMethod.PYMUPDF else content_str
+            prepared.append((first, payload, url))
+        
+        jobs = [(first.value, payload, url) for first, payload, url in prepared if first]
+        if jobs and self.pool is not None:
+            try:
+                results = await self.pool.map_batched(_extract_local_batch, jobs)
+            except Exception as e:
+                logger.error(f"❌ Batched extraction failed, falling back per document: {e}")
+                results = [None] * len(jobs)
+        else:
+            results = [self._extract_local(ExtractionMethod(m), c, u) for m, c, u in jobs]
+        
+        first_results = iter(results)
+        return await asyncio.gather(*(
+            self._extract(content, url, content_type,
+                          first_result=next(first_results) if prepared[i][0] else None,
+                          start_time=start_time)
+            for i, (content, url, content_type) in enumerate(documents)
+        ))
+    
+    @staticmethod
+    def _as_text_and_bytes(content: Union[str, bytes]) -> Tuple[str, bytes]:
+        if isinstance(content, str):
+            return content, content.encode('utf-8')
+        try:
+            return content.decode('utf-8', errors='ignore'), content
+        except:
+            return str(content), content
+    
+    async def _extract(self, content: Union[str, bytes],
+                       url: Optional[str],
+                       content_type: Optional[str],
+                       force_method: Optional[ExtractionMethod] = None,
+                       first_result: Optional[ExtractedContent] = None,
+                       start_time: Optional[float] = None) -> ExtractedContent:
+        import time
+        start_time = start_time or time.time()
+        
         logger.info(f"🔍 Extracting content from: {url or 'direct input'}")
         
         # Convert content to appropriate format
-        if isinstance(content, str):
-            content_bytes = content.encode('utf-8')
-            content_str = content
-        else:
-            content_bytes = content
-            try:
-                content_str = content.decode('utf-8', errors='ignore')
-            except:
-                content_str = str(content)
+        content_str, content_bytes = self._as_text_and_bytes(content)
         
         # Detect content type
         detected_type = self._detect_content_type(content_str, content_type, url)
@@ -518,18 +642,20 @@ class RevolutionaryContentExtractor:
         
         # Try extraction methods in priority order
         last_result = None
-        for method in methods:
+        for index, method in enumerate(methods):
             try:
                 logger.info(f"⚙️  Trying extraction method: {method.value}")
                 
-                if method == ExtractionMethod.TRAFILATURA:
-                    result = await self._extract_with_trafilatura(content_str, url)
-                elif method == ExtractionMethod.BEAUTIFULSOUP:
-                    result = await self._extract_with_beautifulsoup(content_str, url)
+                if index == 0 and first_result is not None:
+                    result = first_result  # already extracted by extract_batch
+                elif method in LOCAL_METHODS:
+                    payload = content_bytes if method == ExtractionMethod.PYMUPDF else content_str
+                    result = await self._run_local(method, payload, url)
                 elif method == ExtractionMethod.TIKA:
                     result = await self.tika_client.extract_content(content_bytes, content_type)
-                elif method == ExtractionMethod.PYMUPDF:
-                    result = await self._extract_pdf_with_pymupdf(content_bytes, url)
+                    # Tika returns text only; entity recognition is CPU work for the pool
+                    if result and result.success and result.text and self.config.extract_entities:
+                        result.entities = await self._run_entities(result.text, url)
                 else:
                     continue  # Method not implemented
                 
@@ -542,10 +668,6 @@ class RevolutionaryContentExtractor:
                 
                 # Post-processing
                 if result.success:
-                    # Extract entities
-                    if self.config.extract_entities and result.text:
-                        result.entities = self.entity_extractor.extract_entities(result.text, url)
-                    
                     # Calculate quality score
                     result.quality_score = self._calculate_quality_score(result)
                     
@@ -565,6 +687,8 @@ class RevolutionaryContentExtractor:
                 
                 last_result = result
                 
+            except asyncio.TimeoutError:
+                logger.error(f"❌ Extraction method {method.value} timed out")
             except Exception as e:
                 logger.error(f"❌ Extraction method {method.value} failed: {e}")
         
@@ -580,6 +704,38 @@ class RevolutionaryContentExtractor:
                 error="All extraction methods failed"
             )
     
+    async def _run_local(self, method: ExtractionMethod, content: Union[str, bytes],
+                         url: Optional[str]) -> Optional[ExtractedContent]:
+        """Run a CPU-bound method in the process pool, or inline for small inputs"""
+        if self.pool is None or len(content) < self.config.offload_min_bytes:
+            return self._extract_local(method, content, url)
+        results = await self.pool.submit(_extract_local_batch, [(method.value, content, url)])
+        return results[0]
+    
+    async def _run_entities(self, text: str, url: Optional[str]) -> List[EntityResult]:
+        if self.pool is None or len(text) < self.config.offload_min_bytes:
+            return self.entity_extractor.extract_entities(text, url)
+        return await self.pool.submit(_extract_entities, text, url)
+    
+    def _extract_local(self, method: ExtractionMethod, content: Union[str, bytes],
+                       url: Optional[str]) -> Optional[ExtractedContent]:
+        """Parse with ``method`` and extract entities - the CPU-bound stages"""
+        if method == ExtractionMethod.TRAFILATURA:
+            result = self._extract_with_trafilatura(content, url)
+        elif method == ExtractionMethod.BEAUTIFULSOUP:
+            result = self._extract_with_beautifulsoup(content, url)
+        elif method == ExtractionMethod.PYMUPDF:
+            result = self._extract_pdf_with_pymupdf(content, url)
+        else:
+            return None
+        
+        if result and result.success and result.text and self.config.extract_entities:
+            try:
+                result.entities = self.entity_extractor.extract_entities(result.text, url)
+            except Exception as e:
+                result.warnings.append(f"Entity extraction failed: {e}")
+        return result
+    
     def _detect_content_type(self, content: str, content_type: Optional[str], 
                            url: Optional[str]) -> ContentType:
         """Detect content type from various indicators"""
@@ -653,7 +809,7 @@ class RevolutionaryContentExtractor:
             methods.append(ExtractionMethod.RAW_TEXT)
             return methods
     
-    async def _extract_with_trafilatura(self, content: str, url: Optional[str]) -> Optional[ExtractedContent]:
+    def _extract_with_trafilatura(self, content: str, url: Optional[str]) -> Optional[ExtractedContent]:
         """Extract content using trafilatura"""
         if not TRAFILATURA_AVAILABLE:
             return None
@@ -733,7 +889,7 @@ class RevolutionaryContentExtractor:
                 error=f"Trafilatura extraction failed: {str(e)}"
             )
     
-    async def _extract_with_beautifulsoup(self, content: str, url: Optional[str]) -> Optional[ExtractedContent]:
+    def _extract_with_beautifulsoup(self, content: str, url: Optional[str]) -> Optional[ExtractedContent]:
         """Extract content using BeautifulSoup as fallback"""
         try:
             soup = BeautifulSoup(content, 'html.parser')
@@ -785,7 +941,7 @@ class RevolutionaryContentExtractor:
                 error=f"BeautifulSoup extraction failed: {str(e)}"
             )
     
-    async def _extract_pdf_with_pymupdf(self, content: bytes, url: Optional[str]) -> Optional[ExtractedContent]:
+    def _extract_pdf_with_pymupdf(self, content: bytes, url: Optional[str]) -> Optional[ExtractedContent]:
         """Extract PDF content using PyMuPDF"""
         if not PYMUPDF_AVAILABLE:
             return None
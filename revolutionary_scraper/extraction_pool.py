@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+⚙️ EXTRACTION PROCESS POOL ⚙️
+=============================
+
+Dedicated, size-bounded process pool for the CPU-heavy extraction stages
+(trafilatura, BeautifulSoup, PyMuPDF, entity recognition) so they never
+run on the event loop that drives fetching.
+
+- 🧮 Fixed number of worker processes (defaults to the CPU count)
+- 🚦 Bounded number of pending tasks; ``submit`` waits when the pool is
+  full, which pushes back on the fetch stage instead of buffering pages
+- 📦 Batched submission - several documents per inter-process round trip
+- ⏱️ Per-task timeouts; a worker stuck on one document is replaced
+- ♻️ Workers are recycled after N tasks to cap memory creep from
+  long-lived parser caches
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ProcessPoolExecutor gained max_tasks_per_child in Python 3.11
+NATIVE_WORKER_RECYCLING = sys.version_info >= (3, 11)
+
+
+@dataclass
+class ExtractionPoolConfig:
+    """Process pool sizing and limits"""
+    max_workers: Optional[int] = None  # defaults to os.cpu_count()
+    max_pending: Optional[int] = None  # defaults to 2 tasks per worker
+    task_timeout: float = 60.0
+    max_tasks_per_worker: Optional[int] = 500
+    batch_size: int = 8
+    start_method: str = "spawn"
+
+    @property
+    def workers(self) -> int:
+        return self.max_workers or os.cpu_count() or 1
+
+    @property
+    def pending_limit(self) -> int:
+        return self.max_pending or self.workers * 2
+
+
+class ExtractionProcessPool:
+    """
+    Bounded process pool for CPU-bound extraction work.
+
+    Functions submitted to the pool must be importable module-level
+    callables, and their arguments and results picklable. The optional
+    ``initializer`` runs once in every worker process, so per-process
+    state (parsers, recognizers) is built once per worker rather than
+    once per document.
+    """
+
+    def __init__(self,
+                 config: Optional[ExtractionPoolConfig] = None,
+                 initializer: Optional[Callable[..., None]] = None,
+                 initargs: Tuple[Any, ...] = ()):
+        self.config = config or ExtractionPoolConfig()
+        self._initializer = initializer
+        self._initargs = initargs
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # max_tasks_per_child cannot be combined with the fork start method
+        self._native_recycling = NATIVE_WORKER_RECYCLING and self.config.start_method != "fork"
+        self._generation = 0
+        self._tasks_in_generation = 0
+
+        self._slots = asyncio.Semaphore(self.config.pending_limit)
+        self._pending = 0
+
+        self.stats = {
+            'tasks_submitted': 0,
+            'tasks_completed': 0,
+            'tasks_failed': 0,
+            'tasks_timed_out': 0,
+            'batches_submitted': 0,
+            'items_processed': 0,
+            'workers_recycled': 0,
+            'pool_restarts': 0,
+            'peak_pending': 0,
+            'backpressure_waits': 0,
+            'wait_time_total': 0.0
+        }
+
+    @property
+    def pending(self) -> int:
+        """Tasks submitted and not yet finished"""
+        return self._pending
+
+    @property
+    def saturated(self) -> bool:
+        """True when the next submission would have to wait"""
+        return self._pending >= self.config.pending_limit
+
+    def start(self):
+        """Start the worker processes (otherwise done on first submit)"""
+        self._get_executor()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            options: Dict[str, Any] = {
+                'max_workers': self.config.workers,
+                'mp_context': multiprocessing.get_context(self.config.start_method),
+                'initializer': self._initializer,
+                'initargs': self._initargs
+            }
+            if self._native_recycling and self.config.max_tasks_per_worker:
+                options['max_tasks_per_child'] = self.config.max_tasks_per_worker
+            self._executor = ProcessPoolExecutor(**options)
+            self._generation += 1
+            self._tasks_in_generation = 0
+            logger.info(f"⚙️  Extraction pool started with {self.config.workers} workers")
+        elif (not self._native_recycling and self.config.max_tasks_per_worker
+              and self._tasks_in_generation >= self.config.max_tasks_per_worker * self.config.workers):
+            # No per-child limit on this Python or start method: replace the whole generation
+            self._replace_executor(terminate=False)
+            self.stats['workers_recycled'] += self.config.workers
+            return self._get_executor()
+        return self._executor
+
+    def _replace_executor(self, terminate: bool):
+        """Hand new work to a fresh executor and retire the current one.
+
+        With ``terminate`` the old worker processes are killed, which is the
+        only way to stop a task that is already running; anything else still
+        running on them fails with ``BrokenProcessPool`` and is retried.
+        """
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        if terminate:
+            for process in list(getattr(executor, '_processes', {}).values()):
+                process.terminate()
+            self.stats['pool_restarts'] += 1
+        executor.shutdown(wait=False, cancel_futures=terminate)
+
+    async def wait_for_capacity(self):
+        """Wait until the pool can accept another task.
+
+        Fetch loops call this before fetching the next page so that pages
+        are not downloaded faster than they can be extracted.
+        """
+        async with self._slots:
+            pass
+
+    async def submit(self, fn: Callable[..., Any], *args: Any,
+                     timeout: Optional[float] = None) -> Any:
+        """Run ``fn(*args)`` in a worker process and return its result.
+
+        Waits for a free slot first when ``max_pending`` tasks are already
+        queued. Raises ``asyncio.TimeoutError`` when the task runs longer
+        than ``timeout`` (default ``task_timeout``).
+        """
+        timeout = self.config.task_timeout if timeout is None else timeout
+
+        if self._slots.locked():
+            self.stats['backpressure_waits'] += 1
+        waited = time.monotonic()
+        await self._slots.acquire()
+        self.stats['wait_time_total'] += time.monotonic() - waited
+
+        self._pending += 1
+        self.stats['peak_pending'] = max(self.stats['peak_pending'], self._pending)
+        self.stats['tasks_submitted'] += 1
+        try:
+            result = await self._run(fn, args, timeout)
+            self.stats['tasks_completed'] += 1
+            return result
+        except BaseException:
+            self.stats['tasks_failed'] += 1
+            raise
+        finally:
+            self._pending -= 1
+            self._slots.release()
+
+    async def _run(self, fn: Callable[..., Any], args: Tuple[Any, ...],
+                   timeout: Optional[float]) -> Any:
+        # A task lost to another task's timeout (or a crashed worker) gets
+        # one more attempt on the replacement pool
+        for attempt in range(2):
+            executor = self._get_executor()
+            generation = self._generation
+            self._tasks_in_generation += 1
+            future = executor.submit(fn, *args)
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            except asyncio.TimeoutError:
+                self.stats['tasks_timed_out'] += 1
+                # Cancelling the wrapper cancels tasks still queued; a task
+                # already running can only be stopped with its worker
+                if not future.cancelled() and generation == self._generation:
+                    logger.warning(f"⏱️  Extraction task exceeded {timeout}s, replacing workers")
+                    self._replace_executor(terminate=True)
+                raise
+            except BrokenProcessPool:
+                if generation == self._generation:
+                    logger.warning("⚠️  Extraction worker died, restarting pool")
+                    self._replace_executor(terminate=True)
+                if attempt:
+                    raise
+
+    async def map_batched(self, fn: Callable[[List[Any]], List[Any]],
+                          items: Sequence[Any],
+                          batch_size: Optional[int] = None,
+                          timeout: Optional[float] = None) -> List[Any]:
+        """Apply a batch function to ``items`` in chunks, preserving order.
+
+        ``fn`` receives a list of items and must return one result per
+        item. Each chunk is a single task, so the per-task timeout scales
+        with the chunk size.
+        """
+        batch_size = batch_size or self.config.batch_size
+        timeout = self.config.task_timeout if timeout is None else timeout
+        chunks = [list(items[i:i + batch_size]) for i in range(0, len(items), batch_size)]
+
+        async def run_chunk(chunk: List[Any]) -> List[Any]:
+            self.stats['batches_submitted'] += 1
+            results = await self.submit(fn, chunk, timeout=timeout * len(chunk))
+            self.stats['items_processed'] += len(chunk)
+            return results
+
+        results: List[Any] = []
+        for chunk_results in await asyncio.gather(*(run_chunk(chunk) for chunk in chunks)):
+            results.extend(chunk_results)
+        return results
+
+    def shutdown(self, wait: bool = True):
+        """Stop all worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            logger.info("⚙️  Extraction pool stopped")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool occupancy and lifetime counters"""
+        return {
+            **self.stats,
+            'workers': self.config.workers,
+            'pending': self._pending,
+            'pending_limit': self.config.pending_limit,
+            'saturated': self.saturated,
+            'running': self._executor is not None,
+            'generation': self._generation
+        }
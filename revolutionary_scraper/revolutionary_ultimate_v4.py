@@ -202,6 +202,10 @@ class RevolutionaryUltimateSystem:
         if self.anti_bot_system:
             await self.anti_bot_system.__aexit__(None, None, None)
         
+        # Stops the extraction worker processes
+        if self.content_extractor:
+            await self.content_extractor.close()
+        
         logger.info("🧹 System components cleaned up")
     
     def add_task(self, url: str, **kwargs) -> str:
@@ -246,6 +250,9 @@ class RevolutionaryUltimateSystem:
             # Get domain policy
             domain_policy = self.config_manager.get_domain_policy(task.domain)
             
+            # Don't fetch faster than the extraction pool can keep up
+            await self.content_extractor.wait_for_capacity()
+            
             # Step 1: Anti-bot scraping
             scraping_result = await self._perform_anti_bot_scraping(task, domain_policy)
             result.scraping_result = scraping_result
@@ -0,0 +1,111 @@
+"""
+Cold-start budget för CLI, API och worker
+
+Mäter importtid med ``python -X importtime`` i en ny process per entry
+point och failar om importen går över budget eller drar in tunga
+valfria stackar (Playwright, spaCy, transformers, pandas, moln-SDK:er)
+som entry pointen inte använder vid start.
+
+Kör som skript för en tabell över de dyraste modulerna:
+
+    python tests/performance/test_cold_start.py src.webapp_main
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+# Paketet som entry points och tester importerar som ``src``
+SRC_PACKAGE = ROOT / "processing" / "extractors" / "archive" / "old_src_structure"
+
+# Budget i sekunder; skala med COLD_START_BUDGET_SCALE på långsamma runners
+BUDGET_SCALE = float(os.environ.get("COLD_START_BUDGET_SCALE", "1.0"))
+
+ENTRY_POINTS = {
+    "cli": ("src.cli", 1.5),
+    "api": ("src.webapp_main", 3.0),
+    "worker": ("src.scheduler", 2.0),
+}
+
+# Får inte importeras bara av att entry pointen laddas
+HEAVY_MODULES = [
+    "playwright",
+    "selenium",
+    "spacy",
+    "transformers",
+    "torch",
+    "pandas",
+    "google.cloud.bigquery",
+    "snowflake.connector",
+    "boto3",
+]
+
+
+def measure_imports(module: str) -> Tuple[float, Dict[str, int]]:
+    """Importera ``module`` i en ny process; returnerar (sekunder, {modul: kumulativ µs})"""
+    with tempfile.TemporaryDirectory() as link_dir:
+        # Exponera paketet som ``src`` precis som i deployade images
+        (Path(link_dir) / "src").symlink_to(SRC_PACKAGE, target_is_directory=True)
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [link_dir, str(SRC_PACKAGE), env.get("PYTHONPATH")]))
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT, env=env, capture_output=True, text=True, timeout=120
+        )
+    if proc.returncode != 0:
+        last_line = (proc.stderr.strip().splitlines() or ["?"])[-1]
+        raise ImportError(f"{module}: {last_line}")
+
+    cumulative: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cum)
+    return cumulative.get(module, 0) / 1e6, cumulative
+
+
+def slowest(cumulative: Dict[str, int], count: int = 15) -> List[Tuple[str, int]]:
+    return sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+@pytest.mark.parametrize("entry_point", sorted(ENTRY_POINTS))
+def test_entry_point_exists(entry_point):
+    module, _ = ENTRY_POINTS[entry_point]
+    path = SRC_PACKAGE.joinpath(*module.split(".")[1:])
+    assert path.with_suffix(".py").is_file() or (path / "__init__.py").is_file(), f"{module} finns inte"
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("entry_point", sorted(ENTRY_POINTS))
+def test_entry_point_cold_start(entry_point):
+    module, budget = ENTRY_POINTS[entry_point]
+    try:
+        seconds, cumulative = measure_imports(module)
+    except ImportError as e:
+        pytest.fail(f"entry point {entry_point} is not importable: {e}")
+
+    heavy = [name for name in HEAVY_MODULES if name in cumulative]
+    assert not heavy, f"{module} imports {heavy} at startup"
+
+    limit = budget * BUDGET_SCALE
+    top = "\n".join(f"  {us / 1e6:7.3f}s  {name}" for name, us in slowest(cumulative))
+    assert seconds <= limit, f"{module} took {seconds:.2f}s to import (budget {limit:.2f}s):\n{top}"
+
+
+if __name__ == "__main__":
+    for target in sys.argv[1:] or [module for module, _ in ENTRY_POINTS.values()]:
+        try:
+            total, modules = measure_imports(target)
+        except ImportError as e:
+            print(f"{target}: not importable ({e})")
+            continue
+        print(f"{target}: {total:.3f}s, {len(modules)} modules")
+        for name, us in slowest(modules):
+            print(f"  {us / 1e6:7.3f}s  {name}")
@@ -0,0 +1,143 @@
+"""
+Tests for streaming backup sinks and the chunk store.
+"""
+import gzip
+import os
+import random
+import time
+
+import pytest
+
+from src.scheduler.jobs.backup_storage import (
+    ChunkedSink, ChunkManifest, ChunkStore, ContentDefinedChunker, StreamingFileSink,
+    restore_chunked_backup
+)
+from src.scheduler.jobs.backup_storage import fcntl
+
+
+def dump(rows, seed=7):
+    rng = random.Random(seed)
+    return b"".join(
+        f"INSERT INTO listings VALUES ({n}, 'Volvo V{rng.randint(40, 90)}', {rng.randint(10000, 400000)});\n".encode()
+        for n in rows
+    )
+
+
+def chunked_backup(store, data, name="database_backup.sql", block=64 * 1024):
+    sink = ChunkedSink(store, ChunkManifest(name=name, backup_type="incremental", created_at="now"),
+                       ContentDefinedChunker(min_size=4096, avg_size=16384, max_size=65536))
+    for offset in range(0, len(data), block):
+        sink.write(data[offset:offset + block])
+    return sink.close()
+
+
+def test_streaming_file_sink_gzip_round_trip(tmp_path):
+    data = dump(range(20000))
+    sink = StreamingFileSink(tmp_path / "dump.sql.gz", compress=True)
+    for offset in range(0, len(data), 10000):
+        sink.write(data[offset:offset + 10000])
+    stats = sink.close()
+
+    assert gzip.decompress((tmp_path / "dump.sql.gz").read_bytes()) == data
+    assert stats["bytes_in"] == len(data)
+    assert stats["bytes_out"] == (tmp_path / "dump.sql.gz").stat().st_size
+    assert not list(tmp_path.glob("*.partial"))
+
+
+def test_second_backup_reuses_unchanged_chunks(tmp_path):
+    store = ChunkStore(tmp_path / "chunks")
+    first = chunked_backup(store, dump(range(20000)))
+    assert first.reused_chunks == 0
+
+    # A row inserted near the start shifts every later byte
+    second = chunked_backup(store, dump([-1]) + dump(range(20000)))
+    assert second.new_chunks <= 2
+    assert second.reused_chunks >= len(first.chunks) - 2
+    assert second.new_bytes < first.new_bytes / 4
+
+
+def test_restore_and_garbage_collect(tmp_path):
+    store = ChunkStore(tmp_path / "chunks")
+    data = dump(range(20000))
+    manifest = chunked_backup(store, data)
+    manifest.save(tmp_path / "backup.manifest.json")
+    stale = chunked_backup(store, dump(range(5000), seed=3))
+
+    result = restore_chunked_backup(tmp_path / "backup.manifest.json", tmp_path / "chunks",
+                                    tmp_path / "restored.sql")
+    assert (tmp_path / "restored.sql").read_bytes() == data
+    assert result["sha256"] == manifest.sha256
+
+    removed = store.garbage_collect(set(manifest.chunks), grace_period=0)
+    assert removed["chunks_removed"] == len(set(stale.chunks) - set(manifest.chunks))
+    assert store.missing(manifest) == []
+    assert store.missing(stale)
+
+
+def test_encrypted_chunks_require_key(tmp_path):
+    pytest.importorskip("cryptography")
+
+    store = ChunkStore(tmp_path / "chunks", passphrase="hemligt")
+    data = dump(range(5000))
+    manifest = chunked_backup(store, data)
+    manifest.save(tmp_path / "backup.manifest.json")
+    assert manifest.encrypted
+    assert data[:64] not in b"".join(p.read_bytes() for p in (tmp_path / "chunks").rglob("*") if p.is_file())
+
+    with pytest.raises(ValueError):
+        restore_chunked_backup(tmp_path / "backup.manifest.json", tmp_path / "chunks", tmp_path / "out.sql")
+    restore_chunked_backup(tmp_path / "backup.manifest.json", tmp_path / "chunks", tmp_path / "out.sql",
+                           encryption_key="hemligt")
+    assert (tmp_path / "out.sql").read_bytes() == data
+
+
+def test_garbage_collect_spares_live_writers_and_other_jobs(tmp_path):
+    store = ChunkStore(tmp_path / "chunks")
+    stale = chunked_backup(store, dump(range(5000), seed=3))
+
+    # Another job's backup elsewhere, registered with the shared store
+    other_job = ChunkStore(tmp_path / "chunks")
+    sink = ChunkedSink(other_job, ChunkManifest(name="db", backup_type="incremental", created_at="now"),
+                       ContentDefinedChunker(min_size=4096, avg_size=16384, max_size=65536))
+    sink.write(dump(range(8000), seed=5))
+    if fcntl is not None:
+        # While it runs, the store is locked and GC stays out
+        assert store.garbage_collect(set(), grace_period=0)["skipped"]
+    (tmp_path / "other_root").mkdir()
+    other = sink.close(tmp_path / "other_root" / "db.manifest.json")
+    # Chunks written within the grace period survive even with no manifest
+    assert store.garbage_collect(set())["chunks_removed"] == 0
+
+    result = store.garbage_collect(set(), grace_period=0)
+    assert not result["skipped"]
+    assert store.missing(other) == []
+    assert result["chunks_removed"] == len(set(stale.chunks) - set(other.chunks))
+
+    # Once retention deletes the other manifest, its chunks go too
+    (tmp_path / "other_root" / "db.manifest.json").unlink()
+    assert store.garbage_collect(set(), grace_period=0)["chunks_removed"] == len(set(other.chunks))
+    assert not list((tmp_path / "chunks" / "manifests").iterdir())
+
+
+def test_reused_chunks_are_refreshed_for_grace_period(tmp_path):
+    store = ChunkStore(tmp_path / "chunks")
+    old = chunked_backup(store, dump(range(3000)))
+    past = time.time() - 7 * 24 * 3600
+    for chunk_id in old.chunks:
+        os.utime(store._path(chunk_id), (past, past))
+
+    chunked_backup(store, dump(range(3000)))
+    assert store.garbage_collect(set(), grace_period=3600)["chunks_removed"] == 0
+
+
+def test_stores_use_random_salt_and_separate_subkeys(tmp_path):
+    pytest.importorskip("cryptography")
+    first = ChunkStore(tmp_path / "a", passphrase="hemligt")
+    second = ChunkStore(tmp_path / "b", passphrase="hemligt")
+    reopened = ChunkStore(tmp_path / "a", passphrase="hemligt")
+
+    assert first.key != second.key and first.key == reopened.key
+    assert first.chunk_id(b"Volvo V70") != second.chunk_id(b"Volvo V70")
+    assert first._id_key not in (first.key, None)
+    chunk_id, _ = first.put(b"Volvo V70")
+    assert reopened.get(chunk_id) == b"Volvo V70"
@@ -0,0 +1,175 @@
+"""
+Tests for the warm, bounded browser context pool.
+"""
+import asyncio
+
+import pytest
+from src.scraper.browser_pool import BrowserPool, BrowserPoolConfig
+
+
+class FakeRoute:
+    def __init__(self, resource_type, url="https://example.se/asset"):
+        self.request = type("Request", (), {"resource_type": resource_type, "url": url})()
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = "aborted"
+
+    async def continue_(self):
+        self.outcome = "continued"
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.handler = None
+        self.closed = False
+
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+    async def goto(self, url, **kwargs):
+        return None
+
+    async def evaluate(self, script):
+        return 0
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+        self.closed = False
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    async def add_init_script(self, script):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    async def new_context(self, **options):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+
+@pytest.mark.asyncio
+async def test_pool_is_prewarmed_and_bounded():
+    browser = FakeBrowser()
+    pool = BrowserPool(BrowserPoolConfig(contexts=2, pages_per_context=2), browser=browser)
+    await pool.start()
+    assert len(browser.contexts) == 2
+    assert pool.get_stats()["pages_idle"] == 2
+
+    active = 0
+    peak = 0
+
+    async def render():
+        nonlocal active, peak
+        async with pool.page():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(render() for _ in range(10)))
+
+    assert peak == 4
+    # Both contexts served pages in parallel
+    assert all(context.pages for context in browser.contexts)
+    assert pool.get_stats()["pages_in_use"] == 0
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_resource_blocking_is_chosen_per_checkout():
+    pool = BrowserPool(BrowserPoolConfig(contexts=1, pages_per_context=1), browser=FakeBrowser())
+
+    async with pool.page() as page:
+        image, script = FakeRoute("image"), FakeRoute("script")
+        await page.handler(image)
+        await page.handler(script)
+        assert (image.outcome, script.outcome) == ("aborted", "continued")
+
+    async with pool.page(block_resources=["script"]) as reused:
+        assert reused is page
+        image, script = FakeRoute("image"), FakeRoute("script")
+        await reused.handler(image)
+        await reused.handler(script)
+        assert (image.outcome, script.outcome) == ("continued", "aborted")
+
+    tracker = FakeRoute("script", "https://www.google-analytics.com/analytics.js")
+    await page.handler(tracker)
+    assert tracker.outcome == "aborted"
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_context_is_recycled_after_use_budget():
+    browser = FakeBrowser()
+    pool = BrowserPool(
+        BrowserPoolConfig(contexts=1, pages_per_context=1, max_uses_per_context=3),
+        browser=browser
+    )
+
+    for _ in range(7):
+        async with pool.page():
+            pass
+
+    first = browser.contexts[0]
+    assert first.closed
+    assert all(page.closed for page in first.pages)
+    assert pool.get_stats()["contexts_recycled"] == 2
+    assert pool.get_stats()["contexts"] == 1
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_page_is_not_reused():
+    pool = BrowserPool(BrowserPoolConfig(contexts=1, pages_per_context=1), browser=FakeBrowser())
+
+    with pytest.raises(RuntimeError):
+        async with pool.page() as page:
+            raise RuntimeError("navigation crashed")
+
+    assert page.closed
+    async with pool.page() as fresh:
+        assert fresh is not page
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_page_creation_frees_the_context_slot():
+    browser = FakeBrowser()
+    pool = BrowserPool(BrowserPoolConfig(contexts=1, pages_per_context=1), browser=browser)
+    await pool.start()
+    context = browser.contexts[0]
+
+    with pytest.raises(RuntimeError):
+        async with pool.page():
+            raise RuntimeError("navigation crashed")
+
+    async def broken_new_page():
+        raise RuntimeError("target closed")
+
+    context.new_page = broken_new_page
+    with pytest.raises(RuntimeError, match="target closed"):
+        await pool.acquire()
+    del context.new_page
+
+    async with pool.page() as page:
+        assert page.context is context
+    assert len(browser.contexts) == 1
+    await pool.stop()
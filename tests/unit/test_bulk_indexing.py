@@ -0,0 +1,99 @@
+"""
+Tests for streaming bulk indexing against a fake search client.
+"""
+import asyncio
+import json
+import threading
+import time
+
+from src.exporters.bulk_indexing import StreamingBulkIndexer, bulk_index
+
+
+class FakeIndices:
+    def __init__(self, client):
+        self.client = client
+        self.settings = {"refresh_interval": "5s", "number_of_replicas": "1"}
+
+    def exists(self, index):
+        return True
+
+    def get_settings(self, index):
+        return {index: {"settings": {"index": dict(self.settings)}}}
+
+    def put_settings(self, index, body):
+        self.client.calls.append(("put_settings", body["index"]))
+        self.settings.update(body["index"])
+
+    def refresh(self, index):
+        self.client.calls.append(("refresh", index))
+
+
+class FakeSearchClient:
+    """Records bulk requests; rejects the first attempt of every third document with 429"""
+
+    def __init__(self, delay=0.0):
+        self.indices = FakeIndices(self)
+        self.calls = []
+        self.documents = {}
+        self.attempts = {}
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def bulk(self, body):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.calls.append(("bulk", len(body), self.indices.settings["refresh_interval"]))
+        time.sleep(self.delay)
+        lines = body.decode().splitlines()
+        items = []
+        for action, source in zip(lines[::2], lines[1::2]):
+            doc = json.loads(source)
+            with self.lock:
+                self.attempts[doc["n"]] = self.attempts.get(doc["n"], 0) + 1
+                first_try = self.attempts[doc["n"]] == 1
+            if doc["n"] % 3 == 0 and first_try:
+                items.append({"index": {"status": 429, "error": {"type": "es_rejected_execution_exception"}}})
+            elif doc.get("bad"):
+                items.append({"index": {"status": 400, "error": {"type": "mapper_parsing_exception"}}})
+            else:
+                self.documents[doc["n"]] = doc
+                items.append({"index": {"status": 201}})
+        with self.lock:
+            self.in_flight -= 1
+        return {"errors": any(item["index"]["status"] >= 300 for item in items), "items": items}
+
+
+async def documents(count):
+    for n in range(count):
+        yield {"n": n, "text": "Volvo V70 " * 5, "bad": n == 7}
+
+
+def test_streams_retries_rejected_items_and_restores_settings():
+    client = FakeSearchClient(delay=0.01)
+    stats = asyncio.run(bulk_index(client, "listings", documents(200), bulk_load_settings=True,
+                                   chunk_size=20, max_in_flight=3, initial_backoff=0.001))
+
+    assert stats.indexed == 199
+    assert stats.failed == 1 and stats.errors[0]["status"] == 400
+    assert stats.retried == 67
+    assert sorted(client.documents) == [n for n in range(200) if n != 7]
+    assert 1 < client.max_in_flight <= 3
+
+    bulk_calls = [call for call in client.calls if call[0] == "bulk"]
+    assert all(refresh == "-1" for _, _, refresh in bulk_calls)
+    assert client.calls[-2] == ("put_settings", {"refresh_interval": "5s", "number_of_replicas": "1"})
+    assert client.calls[-1] == ("refresh", "listings")
+
+
+def test_batches_are_bounded_by_bytes():
+    client = FakeSearchClient()
+    indexer = StreamingBulkIndexer(client, "listings", chunk_size=1000, max_chunk_bytes=2000,
+                                   max_retries=0)
+    stats = asyncio.run(indexer.index_documents([{"n": n + 1, "text": "x" * 300} for n in range(20) if (n + 1) % 3]))
+
+    assert all(size <= 2000 for _, size, _ in client.calls)
+    assert stats.requests == len(client.calls) > 1
+    assert stats.failed == 0 and stats.indexed == 14
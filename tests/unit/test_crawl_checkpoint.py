@@ -0,0 +1,173 @@
+"""
+Tests for the crawl checkpoint log and compaction.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.crawler import crawl_coordinator
+from src.crawler.crawl_checkpoint import CrawlCheckpoint
+from src.crawler.crawl_coordinator import CrawlConfiguration, CrawlCoordinator
+
+
+def queued(n):
+    return {"url_hash": f"h{n}", "url": {"url": f"https://bilweb.se/bil/{n}", "depth": 1, "priority": 5}}
+
+
+def test_resume_restores_frontier_visited_and_hosts(tmp_path):
+    checkpoint = CrawlCheckpoint(tmp_path, "crawl_1", fsync=False)
+    checkpoint.record_meta("bfs")
+    checkpoint.record_enqueued(queued(n) for n in range(4))
+    checkpoint.record_claimed(["h0", "h1"], {"bilweb.se": 1700000000.0})
+    checkpoint.record_done(["h0"])
+    checkpoint.record_stats({"total_crawled": 1})
+    checkpoint.flush()
+    # Buffered but never flushed: lost on a crash
+    checkpoint.record_done(["h1"])
+
+    state = CrawlCheckpoint.load(tmp_path, "crawl_1").state
+    assert state.strategy == "bfs"
+    assert sorted(state.frontier) == ["h1", "h2", "h3"]
+    assert state.in_flight == {"h1"}
+    assert state.visited == {"h0"}
+    assert state.host_last == {"bilweb.se": 1700000000.0}
+    assert state.stats == {"total_crawled": 1}
+
+    # Rediscovered visited URLs are not queued again
+    resumed = CrawlCheckpoint.load(tmp_path, "crawl_1", fsync=False)
+    resumed.record_enqueued([queued(0)])
+    assert "h0" not in resumed.state.frontier
+
+
+def test_compaction_and_torn_tail(tmp_path):
+    async def run():
+        checkpoint = CrawlCheckpoint(tmp_path, "crawl_2", fsync=False)
+        checkpoint.record_enqueued(queued(n) for n in range(10))
+        checkpoint.record_done([f"h{n}" for n in range(5)])
+        await checkpoint.compact()
+        checkpoint.record_done(["h5"])
+        checkpoint.flush()
+        await checkpoint.close()
+        return checkpoint
+
+    checkpoint = asyncio.run(run())
+    directory = tmp_path / "crawl_2"
+    assert (directory / "snapshot.json.gz").exists()
+    assert [p.name for p in directory.glob("log.*.jsonl")] == ["log.000002.jsonl"]
+
+    with open(directory / "log.000002.jsonl", "a") as f:
+        f.write('{"op":"done","seq":99,"hash')
+
+    state = CrawlCheckpoint.load(tmp_path, "crawl_2").state
+    assert sorted(state.frontier) == ["h6", "h7", "h8", "h9"]
+    assert len(state.visited) == 6
+    assert state.seq == checkpoint.state.seq
+
+
+def test_latest_skips_completed_crawls(tmp_path):
+    async def run():
+        done = CrawlCheckpoint(tmp_path, "crawl_done", fsync=False)
+        await done.close(completed=True)
+
+    CrawlCheckpoint(tmp_path, "crawl_open", fsync=False)
+    asyncio.run(run())
+    assert CrawlCheckpoint.latest(tmp_path) == "crawl_open"
+    assert CrawlCheckpoint.latest(tmp_path / "missing") is None
+
+
+class FakeURLQueue:
+    """In-memory stand-in for the Redis URL queue, in priority then insertion order"""
+
+    def __init__(self):
+        self.queue = {}
+        self.seen = set()
+
+    async def add_urls_batch(self, queued_urls, force=False):
+        added = 0
+        for queued_url in queued_urls:
+            if force or queued_url.url_hash not in self.seen:
+                self.seen.add(queued_url.url_hash)
+                self.queue[queued_url.url_hash] = queued_url
+                added += 1
+        return added
+
+    async def get_next_url(self, domain_delay_seconds=1):
+        if not self.queue:
+            return None
+        url_hash = min(self.queue, key=lambda h: self.queue[h].priority)
+        return self.queue.pop(url_hash)
+
+    async def mark_seen_batch(self, url_hashes):
+        self.seen.update(url_hashes)
+        return len(url_hashes)
+
+    async def restore_domain_last_crawl(self, domain_times):
+        pass
+
+    async def get_queue_stats(self):
+        return {"total_queued": len(self.queue)}
+
+    async def mark_url_processed(self, url, status="completed"):
+        return True
+
+
+class FakeCrawler:
+    """Returns a result for every URL except ``failing``; asks for a stop after ``stop_after`` batches"""
+
+    def __init__(self, coordinator, failing=(), stop_after=None):
+        self.coordinator = coordinator
+        self.failing = set(failing)
+        self.stop_after = stop_after
+        self.crawled = []
+
+    async def crawl_bfs(self, urls, session):
+        self.crawled.extend(urls)
+        if self.stop_after is not None and len(self.crawled) >= self.stop_after:
+            await self.coordinator.stop_crawl()
+        return [SimpleNamespace(url=url, content="<html></html>", links=[], metadata={})
+                for url in urls if url not in self.failing]
+
+
+class FakeSitemapGenerator:
+    """Seeds the crawl with the start URL only"""
+
+    async def generate_intelligent_sitemap(self, start_url, max_urls, strategy):
+        return [start_url]
+
+
+def coordinator_for(monkeypatch, tmp_path, **options):
+    # The real sitemap generator and robots parser need a crawl session and Redis
+    monkeypatch.setattr(crawl_coordinator, "SitemapGenerator", FakeSitemapGenerator)
+    monkeypatch.setattr(crawl_coordinator, "RobotsParser", lambda: SimpleNamespace())
+    config = CrawlConfiguration(strategy="bfs", max_concurrent=2, respect_robots_txt=False, use_stealth=False,
+                                use_ai_extraction=False, use_real_time_monitoring=False,
+                                checkpoint_dir=str(tmp_path), **options)
+    return CrawlCoordinator(config, FakeURLQueue(), session=SimpleNamespace())
+
+
+@pytest.mark.parametrize("max_failures, retried", [(3, True), (1, False)])
+def test_resumed_crawl_retries_failed_urls(monkeypatch, tmp_path, max_failures, retried):
+    urls = [f"https://bilweb.se/bil/{n}" for n in range(6)]
+
+    first = coordinator_for(monkeypatch, tmp_path)
+    first.crawler = FakeCrawler(first, failing=[urls[1]], stop_after=4)
+    crawl_id = asyncio.run(first.start_crawl(urls))
+    assert first.crawler.crawled == urls[:4]
+    assert first.stats.total_crawled == 3
+
+    state = CrawlCheckpoint.load(tmp_path, crawl_id).state
+    assert [url["url"] for url in state.failed.values()] == [urls[1]]
+    assert len(state.visited) == 3 and len(state.frontier) == 2
+
+    resumed = coordinator_for(monkeypatch, tmp_path, checkpoint_max_failures=max_failures)
+    resumed.crawler = FakeCrawler(resumed)
+    asyncio.run(resumed.resume_crawl())
+
+    expected = set(urls[4:]) | ({urls[1]} if retried else set())
+    assert set(resumed.crawler.crawled) == expected
+    assert resumed.stats.total_crawled == 3 + len(expected)
+    state = CrawlCheckpoint.load(tmp_path, crawl_id).state
+    assert not state.failed and not state.frontier
+    assert len(state.visited) == 6
+    assert CrawlCheckpoint.latest(tmp_path) is None
@@ -0,0 +1,102 @@
+"""
+Tests for write-only streaming Excel export.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from src.exporters.base import ExportConfig
+from src.exporters.excel_exporter import ExcelExporter, StreamingExcelWriter
+
+
+def listings(count):
+    for n in range(count):
+        yield {"id": n, "model": "Volvo V70", "price": 129000.5, "seen": datetime(2024, 5, 1, 12, n % 60),
+               "tags": ["kombi", "diesel"]}
+
+
+def test_rolls_over_to_new_sheet_at_row_limit(tmp_path):
+    writer = StreamingExcelWriter(str(tmp_path / "out.xlsx"), sheet_name="Bilar", sample_size=10, max_rows=101,
+                                  number_formats={"price": "#,##0.00"})
+    writer.write_rows(listings(250))
+    stats = writer.close()
+
+    assert stats["rows"] == 250
+    assert stats["sheets"] == ["Bilar", "Bilar_2", "Bilar_3"]
+
+    workbook = openpyxl.load_workbook(tmp_path / "out.xlsx")
+    first, last = workbook["Bilar"], workbook["Bilar_3"]
+    assert first.max_row == 101 and last.max_row == 51
+    assert [cell.value for cell in last[1]] == ["id", "model", "price", "seen", "tags"]
+    assert last["A2"].value == 200
+    assert first.freeze_panes == "A2"
+    assert first["A1"].font.bold
+    assert first["C2"].number_format == "#,##0.00"
+    assert first["D2"].value == datetime(2024, 5, 1, 12, 0)
+    assert first["E2"].value == '["kombi", "diesel"]'
+    assert first.column_dimensions["D"].width == 21
+
+
+def test_exporter_streams_async_records(tmp_path):
+    async def records():
+        for record in listings(30):
+            yield record
+
+    exporter = ExcelExporter(ExportConfig(output_path=str(tmp_path / "export"), batch_size=7,
+                                          include_metadata=False,
+                                          format_options={"sample_size": 5, "include_index": True}))
+    result = asyncio.run(exporter.export_stream(records()))
+
+    assert result.success and result.records_exported == 30
+    sheet = openpyxl.load_workbook(result.output_location)["Sheet1"]
+    assert sheet.max_row == 31
+    assert [sheet["A31"].value, sheet["B31"].value] == [29, 29]
+
+    empty = asyncio.run(exporter.export([]))
+    assert empty.success and empty.records_exported == 0
+
+
+def varying_listings():
+    records = list(listings(6))
+    records[4]["dealer"] = "Bilhandel AB"
+    del records[5]["price"]
+    records[5].update(dealer="Bilcenter", color="röd")
+    return records
+
+
+def header_of(result):
+    return [cell.value for cell in openpyxl.load_workbook(result.output_location)["Sheet1"][1]]
+
+
+def test_list_export_takes_columns_from_every_record(tmp_path):
+    exporter = ExcelExporter(ExportConfig(output_path=str(tmp_path / "export"), include_metadata=False,
+                                          format_options={"sample_size": 3}))
+    result = asyncio.run(exporter.export(varying_listings()))
+
+    assert result.success and result.records_exported == 6
+    assert result.metadata["dropped_columns"] == {}
+    assert header_of(result) == ["id", "model", "price", "seen", "tags", "dealer", "color"]
+    sheet = openpyxl.load_workbook(result.output_location)["Sheet1"]
+    assert [sheet["F7"].value, sheet["G7"].value, sheet["C7"].value] == ["Bilcenter", "röd", None]
+
+
+def test_stream_with_keys_after_the_sample_fails(tmp_path):
+    exporter = ExcelExporter(ExportConfig(output_path=str(tmp_path / "export"), include_metadata=False,
+                                          format_options={"sample_size": 3}))
+    result = asyncio.run(exporter.export_stream(iter(varying_listings())))
+
+    assert not result.success and result.records_exported == 6
+    assert "format_options['columns']" in result.error_message
+    assert result.metadata["dropped_columns"] == {"color": 1, "dealer": 2}
+    assert "dealer" not in header_of(result)
+
+    columns = ["id", "model", "dealer", "color"]
+    exporter = ExcelExporter(ExportConfig(output_path=str(tmp_path / "export"), include_metadata=False,
+                                          format_options={"sample_size": 3, "columns": columns}))
+    result = asyncio.run(exporter.export_stream(iter(varying_listings())))
+
+    assert result.success and header_of(result) == columns
+    assert result.metadata["dropped_columns"] == {"price": 5, "seen": 6, "tags": 6}
@@ -0,0 +1,75 @@
+"""
+Tests for streamed database exports.
+"""
+import uuid
+
+import pytest
+
+sqlalchemy = pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import Column, DateTime, Integer, String, create_engine, event
+from sqlalchemy.orm import Session, declarative_base
+
+from src.utils import export_utils
+from src.utils.export_utils import ExportPlan, get_data_from_db
+
+Base = declarative_base()
+TENANT = uuid.UUID("00000000-0000-0000-0000-000000000001")
+
+
+class Person(Base):
+    __tablename__ = "persons"
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String)
+    name = Column(String)
+    city = Column(String)
+    personal_number_hash = Column(String)
+    created_at = Column(DateTime)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setitem(export_utils.MODEL_MAP, "person", Person)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(
+            Person(id=n, tenant_id=str(TENANT if n % 10 else uuid.uuid4()), name=f"Person {n}",
+                   city="Göteborg" if n % 2 else "Malmö", personal_number_hash=f"hash{n}")
+            for n in range(1, 101)
+        )
+        session.commit()
+
+        statements = []
+        event.listen(engine, "before_cursor_execute",
+                     lambda conn, cursor, sql, *args: statements.append(sql))
+        session.statements = statements
+        yield session
+
+
+def test_keyset_chunks_select_only_exported_columns(db):
+    rows = list(get_data_from_db(db, "person", str(TENANT), {}, fields=["name", "personal_number_hash"],
+                                 chunk_size=25))
+
+    assert len(rows) == 90
+    assert rows[0] == {"name": "Person 1", "personal_number_hash": "[MASKED_HASH]"}
+    # 90 rows in chunks of 25, each chunk resuming after the last id seen
+    assert len(db.statements) == 4
+    assert all("personal_number_hash" not in sql for sql in db.statements)
+    assert all("persons.id >" in sql for sql in db.statements[1:])
+
+
+def test_limit_after_and_filters(db):
+    rows = list(get_data_from_db(db, "person", str(TENANT), {"city": "Malmö"}, limit=7, chunk_size=3,
+                                 mask_pii=False, after=50))
+    assert [row["id"] for row in rows] == [52, 54, 56, 58, 62, 64, 66]
+    assert rows[0]["personal_number_hash"] == "hash52"
+
+
+def test_sorted_export_streams_single_query(db):
+    plan = ExportPlan("person", ["id", "name", "unknown"])
+    assert plan.fieldnames == ["id", "name"]
+
+    rows = list(get_data_from_db(db, "person", str(TENANT), {}, sort_by="-name", limit=3, plan=plan))
+    assert [row["name"] for row in rows] == ["Person 99", "Person 98", "Person 97"]
+    assert len(db.statements) == 1
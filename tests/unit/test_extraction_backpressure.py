@@ -0,0 +1,110 @@
+"""
+Tests for extraction pool backpressure on the fetch stage and pool shutdown.
+"""
+import asyncio
+from types import SimpleNamespace
+
+from revolutionary_scraper.content_extraction_system import (
+    ExtractedContent, ExtractionConfig, RevolutionaryContentExtractor
+)
+from revolutionary_scraper.extraction_pool import ExtractionPoolConfig, ExtractionProcessPool
+from revolutionary_scraper.revolutionary_ultimate_v4 import RevolutionaryUltimateSystem
+
+
+def block_pool(pool, release):
+    """Replace the worker round trip with one that waits for ``release``"""
+    async def run(fn, args, timeout):
+        await release.wait()
+        return fn(*args)
+    pool._run = run
+
+
+class FakeAntiBot:
+    """Anti-bot front end that records when pages are fetched"""
+
+    def __init__(self, log):
+        self.config = SimpleNamespace(method_priority=[])
+        self.log = log
+
+    async def scrape(self, url, method, headers, data):
+        self.log.append(("fetch", url))
+        return SimpleNamespace(success=True, content="<html><p>Volvo V70</p></html>", attempts=1,
+                               method_used=None, error=None)
+
+    async def __aexit__(self, *exc):
+        self.log.append(("anti_bot_closed",))
+
+
+def test_wait_for_capacity_blocks_while_the_pool_is_full():
+    async def run():
+        pool = ExtractionProcessPool(ExtractionPoolConfig(max_workers=1, max_pending=1))
+        release = asyncio.Event()
+        block_pool(pool, release)
+        busy = asyncio.ensure_future(pool.submit(len, "abc"))
+        await asyncio.sleep(0)
+        assert pool.saturated
+
+        waiter = asyncio.ensure_future(pool.wait_for_capacity())
+        await asyncio.sleep(0.01)
+        blocked = not waiter.done()
+        release.set()
+        await asyncio.wait_for(waiter, 1)
+        return blocked, await busy, pool.pending
+
+    assert asyncio.run(run()) == (True, 3, 0)
+
+
+def test_system_fetches_only_with_extraction_capacity_and_closes_the_pool():
+    log = []
+
+    async def run():
+        system = RevolutionaryUltimateSystem()
+        extractor = RevolutionaryContentExtractor(ExtractionConfig(process_pool_workers=1,
+                                                                   process_pool_max_pending=1))
+
+        async def extract(content, url, content_type, force_method):
+            log.append(("extract", url))
+            return ExtractedContent(success=True, text="Volvo V70", quality_score=0.9)
+
+        extractor.extract = extract
+        system.content_extractor = extractor
+        system.anti_bot_system = FakeAntiBot(log)
+
+        release = asyncio.Event()
+        block_pool(extractor.pool, release)
+        busy = asyncio.ensure_future(extractor.pool.submit(len, "abc"))
+        await asyncio.sleep(0)
+
+        system.add_task("https://bilhandel.se/annons/1")
+        processing = asyncio.ensure_future(system.process_queue())
+        await asyncio.sleep(0.01)
+        fetched_while_full = list(log)
+        release.set()
+        results = await processing
+        await busy
+
+        pool = extractor.pool
+        pool.start()
+        await system._cleanup_components()
+        return fetched_while_full, results, pool
+
+    fetched_while_full, results, pool = asyncio.run(run())
+
+    assert fetched_while_full == []
+    assert results[0].success
+    assert log == [("fetch", "https://bilhandel.se/annons/1"), ("extract", "https://bilhandel.se/annons/1"),
+                   ("anti_bot_closed",)]
+    assert not pool.get_stats()["running"]
+
+
+def test_fork_pool_recycles_whole_generations():
+    async def run():
+        pool = ExtractionProcessPool(ExtractionPoolConfig(max_workers=1, max_tasks_per_worker=2,
+                                                          start_method="fork"))
+        try:
+            results = [await pool.submit(len, "abc") for _ in range(3)]
+            return results, pool._generation, pool.stats['workers_recycled']
+        finally:
+            pool.shutdown()
+
+    assert asyncio.run(run()) == ([3, 3, 3], 2, 1)
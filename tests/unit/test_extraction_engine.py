@@ -0,0 +1,173 @@
+"""
+Tests for pruned, cached and micro-batched AI extraction.
+"""
+import asyncio
+import json
+import re
+
+from src.ai.extraction_engine import (
+    AIExtractionEngine, ExtractionField, ExtractionModel, ExtractionResult, ExtractionSchema, ExtractionStrategy
+)
+from src.ai.html_pruning import HTMLPruner, PruningProfile
+
+SCHEMA = ExtractionSchema(
+    name="Car listing",
+    description="Used car listings",
+    fields=[
+        ExtractionField(name="title", description="Car model name", data_type="string"),
+        ExtractionField(name="price", description="Asking price in kronor", data_type="price",
+                        extraction_hints=["pris"]),
+        ExtractionField(name="mileage", description="Mileage in mil", data_type="number", required=False),
+    ]
+)
+
+
+def listing_page(n, footer="", filler=0):
+    reviews = "".join(f"<p>Recension {i}: trevlig bil att köra på långa resor.</p>" for i in range(filler))
+    return f"""<html><head><title>Volvo V{n} | Bilhandel</title><script>var t = {n};</script></head><body>
+<header class="site-header"><a href="/">Hem</a><a href="/bilar">Bilar</a></header>
+<nav><ul><li><a href="/a">Kombi</a></li><li><a href="/b">Sedan</a></li></ul></nav>
+<div id="cookie-banner">Vi använder cookies</div>
+<main><article><header><h1>Volvo V{n}</h1></header>
+<dl><dt>Pris</dt><dd>{100 + n} 000 kr</dd><dt>Miltal</dt><dd>{n * 1000} mil</dd></dl>{reviews}
+</article></main>
+<div class="sidebar-related"><a href="/x">Liknande bilar</a></div>
+<footer>Bilhandel AB {footer}</footer></body></html>"""
+
+
+def page_fields(text):
+    return {
+        "title": re.search(r"Volvo V\d+", text).group(),
+        "price": re.search(r"(\d+) 000 kr", text).group(1) + "000",
+        "mileage": None,
+    }
+
+
+class StubModelEngine(AIExtractionEngine):
+    """Engine whose model reads fields straight from the prompt"""
+
+    def __init__(self, wrong_batch_size=False, **kwargs):
+        super().__init__(default_model=ExtractionModel.LOCAL_MODEL, **kwargs)
+        self.prompts = []
+        self.wrong_batch_size = wrong_batch_size
+
+    async def _execute_extraction(self, prompt, model, schema):
+        self.stats['model_calls'] += 1
+        self.prompts.append(prompt)
+        await asyncio.sleep(0.01)
+        pages = prompt.body.split("=== PAGE ")[1:] or [prompt.body]
+        if prompt.pages > 1:
+            results = [page_fields(page) for page in pages]
+            data = {"results": results[:-1] if self.wrong_batch_size else results}
+        else:
+            data = page_fields(pages[0])
+        return ExtractionResult(success=True, extracted_data=data, confidence_score=1.0, model_used=model.value,
+                                extraction_time=0, tokens_used=100 * prompt.pages, raw_response=json.dumps(data))
+
+
+def test_pruner_drops_boilerplate_and_keeps_relevant_blocks():
+    pruner = HTMLPruner(max_chars=8000)
+    text = pruner.prune(listing_page(70), PruningProfile.from_schema(SCHEMA))
+
+    assert text.splitlines()[:4] == ["Volvo V70 | Bilhandel", "Volvo V70", "Pris", "170 000 kr"]
+    for boilerplate in ("Hem", "Kombi", "cookies", "Liknande", "Bilhandel AB", "var t"):
+        assert boilerplate not in text
+
+    # Over budget, schema-relevant blocks win over long filler, in document order
+    pruner = HTMLPruner(max_chars=200)
+    text = pruner.prune(listing_page(70, filler=40), PruningProfile.from_schema(SCHEMA))
+    assert len(text) <= 200
+    assert "Volvo V70" in text and "170 000 kr" in text and "70000 mil" in text
+    assert text.index("Volvo V70") < text.index("170 000 kr")
+
+    # JSON-LD survives script removal; region selectors restrict to the template's regions
+    json_ld = '<script type="application/ld+json">{"@type": "Car", "price": 99}</script>'
+    page = listing_page(70).replace("</head>", json_ld + "</head>")
+    regions = PruningProfile.from_schema(SCHEMA)
+    regions.region_selectors = ["//dl"]
+    assert HTMLPruner().prune(page, regions).splitlines() == [
+        '{"@type":"Car","price":99}', "Volvo V70 | Bilhandel", "Pris", "170 000 kr", "Miltal", "70000 mil"
+    ]
+
+
+def test_results_are_cached_by_pruned_content():
+    engine = StubModelEngine(cache_size=2)
+
+    async def run():
+        first = await engine.extract_from_html(listing_page(60, footer="12:00"), SCHEMA)
+        # Only the boilerplate changed, so the page is not sent again
+        second = await engine.extract_from_html(listing_page(60, footer="12:05"), SCHEMA)
+        second.extracted_data["title"] = "changed"
+        third = await engine.extract_from_html(listing_page(60), SCHEMA)
+        # Concurrent requests for one page share a single model call
+        shared = await asyncio.gather(*(engine.extract_from_html(listing_page(90), SCHEMA) for _ in range(3)))
+        return first, second, third, shared
+
+    first, second, third, shared = asyncio.run(run())
+    assert first.extracted_data == {"title": "Volvo V60", "price": "160000", "mileage": None}
+    assert not first.cached and second.cached and second.tokens_used == 0
+    assert third.extracted_data["title"] == "Volvo V60"
+    assert engine.stats['model_calls'] == 2
+    assert [r.cached for r in shared] == [False, True, True]
+
+    # Both prompts share the very same schema prefix
+    assert engine.prompts[0].prefix is engine.prompts[1].prefix
+    assert "WEB CONTENT" not in engine.prompts[0].prefix and "Volvo V90" in engine.prompts[1].body
+    prompt = engine._build_extraction_prompt("x", SCHEMA, ExtractionStrategy.STRUCTURED_OUTPUT)
+    assert prompt.startswith(engine.prompts[0].prefix) and prompt.endswith("x\n\nJSON OUTPUT:\n")
+
+    # The cache is bounded
+    asyncio.run(engine.extract_from_html(listing_page(91), SCHEMA))
+    assert len(engine.extraction_cache) == 2
+    assert engine.get_stats()['cache']['evictions'] == 1
+
+
+def test_batch_extract_packs_small_pages_into_shared_calls():
+    engine = StubModelEngine(micro_batch_size=3, micro_batch_max_chars=200)
+    pages = [listing_page(n) for n in range(1, 6)] + [listing_page(6, filler=10), listing_page(1, footer="x")]
+
+    results = asyncio.run(engine.batch_extract(pages, SCHEMA))
+
+    assert [r.extracted_data["title"] for r in results] == [f"Volvo V{n}" for n in (1, 2, 3, 4, 5, 6, 1)]
+    assert all(r.success for r in results) and results[-1].cached
+    # Five small pages in batches of three and two, the long page on its own
+    assert sorted(p.pages for p in engine.prompts) == [1, 2, 3]
+    assert engine.stats == {'model_calls': 3, 'micro_batches': 2, 'batched_pages': 5}
+    assert results[0].confidence_score == engine._calculate_confidence(results[0].extracted_data, SCHEMA)
+
+    # Batched results are cached per page
+    again = asyncio.run(engine.batch_extract(pages[:2], SCHEMA))
+    assert all(r.cached for r in again) and engine.stats['model_calls'] == 3
+
+    # A response without one result per page falls back to single-page calls
+    fallback = StubModelEngine(wrong_batch_size=True, micro_batch_size=3, micro_batch_max_chars=200)
+    results = asyncio.run(fallback.batch_extract(pages[:3], SCHEMA))
+    assert [r.extracted_data["title"] for r in results] == ["Volvo V1", "Volvo V2", "Volvo V3"]
+    assert [p.pages for p in fallback.prompts] == [3, 1, 1, 1]
+
+
+def test_layout_classes_never_prune_the_whole_page():
+    pages = [
+        f'<html><body class="single-post has-sidebar"><div><h2>Volvo V{n}</h2><p>Pris {100 + n} 000 kr</p>'
+        f'</div></body></html>'
+        for n in (70, 80)
+    ]
+    profile = PruningProfile.from_schema(SCHEMA)
+    assert HTMLPruner().prune(pages[0], profile) == "Volvo V70\nPris 170 000 kr"
+    wrapped = '<html><body><div class="layout-with-sidebar"><h2>Volvo V70</h2><p>Pris 170 000 kr</p></div>' \
+              '<div class="sidebar">Annonser</div></body></html>'
+    assert HTMLPruner().prune(wrapped, profile) == "Volvo V70\nPris 170 000 kr"
+    # A page that pruning would empty falls back to its unpruned text
+    assert HTMLPruner().prune('<html><body><nav><a href="/">Hem</a> Volvo V70</nav></body></html>',
+                              profile) == "Hem Volvo V70"
+
+    engine = StubModelEngine()
+    results = asyncio.run(engine.batch_extract(pages, SCHEMA))
+    assert [r.extracted_data["title"] for r in results] == ["Volvo V70", "Volvo V80"]
+    assert not any(r.cached for r in results)
+
+    # Empty pages are neither sent to the model nor cached
+    empty = asyncio.run(engine.extract_from_html("<html><body><script>x()</script></body></html>", SCHEMA))
+    assert not empty.success and empty.errors == ["Page has no extractable text"]
+    assert not asyncio.run(engine.batch_extract([""], SCHEMA))[0].success
+    assert engine.stats['model_calls'] == 1 and len(engine.extraction_cache) == 2
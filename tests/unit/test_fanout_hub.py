@@ -0,0 +1,126 @@
+"""
+Tests for the WebSocket fan-out hub.
+"""
+import asyncio
+import json
+
+import pytest
+from src.monitoring.fanout import FanoutHub, OverflowPolicy
+
+
+class FakeSocket:
+    """Collects sent messages, optionally blocking until released."""
+
+    def __init__(self, blocked: bool = False):
+        self.messages = []
+        self.gate = asyncio.Event()
+        if not blocked:
+            self.gate.set()
+
+    async def send(self, message):
+        await self.gate.wait()
+        self.messages.append(json.loads(message))
+
+
+async def settle():
+    await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_block_others():
+    hub = FanoutHub(max_queue=3)
+    fast, slow = FakeSocket(), FakeSocket(blocked=True)
+    await hub.subscribe(fast)
+    await hub.subscribe(slow)
+
+    for i in range(10):
+        hub.publish("alert", {"i": i})
+        await settle()
+
+    assert [m["data"]["i"] for m in fast.messages] == list(range(10))
+    assert slow.messages == []
+
+    # The slow client keeps only its newest events (one is already in flight)
+    slow.gate.set()
+    await settle()
+    assert [m["data"]["i"] for m in slow.messages] == [0, 7, 8, 9]
+    await hub.stop()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_drops_lagging_client():
+    hub = FanoutHub(max_queue=2, overflow_policy=OverflowPolicy.DISCONNECT)
+    slow = FakeSocket(blocked=True)
+    await hub.subscribe(slow)
+    await settle()
+
+    for i in range(5):
+        hub.publish("alert", {"i": i})
+    await settle()
+
+    assert hub.subscriber_count == 0
+    await hub.stop()
+
+
+@pytest.mark.asyncio
+async def test_state_deltas_and_snapshot_for_new_subscribers():
+    hub = FanoutHub()
+    client = FakeSocket()
+    await hub.subscribe(client)
+
+    hub.publish_state("status", {"cpu": 10, "jobs": 2})
+    await settle()
+    hub.publish_state("status", {"cpu": 20, "jobs": 2})
+    await settle()
+
+    first, second = client.messages
+    assert first["changed"] == {"cpu": 10, "jobs": 2}
+    assert second["changed"] == {"cpu": 20}
+
+    late = FakeSocket()
+    await hub.subscribe(late)
+    await settle()
+    assert late.messages[0]["type"] == "snapshot"
+    assert late.messages[0]["state"] == {"cpu": 20, "jobs": 2}
+    await hub.stop()
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_batched_per_tick():
+    hub = FanoutHub()
+    client = FakeSocket()
+    await hub.subscribe(client)
+
+    for i in range(100):
+        hub.record_metric("requests_total", i)
+    hub.flush_metrics()
+    await settle()
+
+    assert len(client.messages) == 1
+    assert client.messages[0]["changed"] == {"requests_total": 99}
+    await hub.stop()
+
+
+@pytest.mark.asyncio
+async def test_discarded_metrics_leave_the_state():
+    hub = FanoutHub()
+    client = FakeSocket()
+    await hub.subscribe(client)
+
+    hub.record_metric("job_progress.a", 0.5)
+    hub.record_metric("job_progress.b", 1.0)
+    hub.flush_metrics()
+    await settle()
+    hub.discard_metric("job_progress.a")
+    await settle()
+    # A value still waiting for the tick is dropped as well
+    hub.record_metric("job_progress.b", 0.2)
+    hub.discard_metric("job_progress.b")
+    hub.flush_metrics()
+    await settle()
+
+    assert [m.get("removed") for m in client.messages[1:]] == [["job_progress.a"], ["job_progress.b"]]
+    assert hub._states["metrics"] == {}
+    hub.discard_metric("never_recorded")
+    assert hub.published == 3
+    await hub.stop()
@@ -0,0 +1,38 @@
+"""
+Tests for keyset pagination cursors.
+"""
+from datetime import datetime
+
+import pytest
+
+from src.webapp.utils.pagination import decode_keyset, encode_cursor
+
+
+def test_cursor_round_trip():
+    created = datetime(2024, 6, 10, 12, 30, 15, 250000)
+    cursor = encode_cursor({"created_at": created.isoformat(), "id": 42})
+
+    assert "=" not in cursor
+    assert decode_keyset(cursor, "id", timestamp_field="created_at") == {"created_at": created, "id": 42}
+    # Without a timestamp field values come back as issued
+    assert decode_keyset(encode_cursor({"id": "a1"}), "id") == {"id": "a1"}
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    encode_cursor({"id": 42}),
+    encode_cursor({"created_at": "yesterday", "id": 42}),
+    encode_cursor({"created_at": 1718022615, "id": 42}),
+    "WzEsMl0",  # a JSON list, not an object
+])
+def test_bad_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_keyset(cursor, "id", timestamp_field="created_at")
+
+
+@pytest.mark.parametrize("value", ["42", "1 OR 1=1", 4.2, True, None, [42]])
+def test_non_integer_keys_are_rejected(value):
+    cursor = encode_cursor({"id": value})
+    assert decode_keyset(cursor, "id")["id"] == value
+    with pytest.raises(ValueError, match="Invalid cursor: bad id"):
+        decode_keyset(cursor, "id", integer_fields=("id",))
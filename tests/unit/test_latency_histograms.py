@@ -0,0 +1,106 @@
+"""
+Tests for the fixed-memory latency histograms.
+"""
+import random
+import threading
+
+import pytest
+from src.observability.histograms import (
+    HistogramRegistry,
+    LatencyHistogram,
+    ShardedHistogram,
+)
+
+
+class TestLatencyHistogram:
+    """Test cases for LatencyHistogram."""
+
+    def test_quantiles_within_relative_accuracy(self):
+        """Estimated percentiles stay within the configured relative error."""
+        rng = random.Random(42)
+        values = [rng.expovariate(1 / 250) for _ in range(20000)]
+        histogram = LatencyHistogram(relative_accuracy=0.01)
+        for value in values:
+            histogram.record(value)
+
+        ordered = sorted(values)
+        for q in (0.5, 0.9, 0.99):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            assert histogram.quantile(q) == pytest.approx(exact, rel=0.03)
+
+        assert histogram.count == len(values)
+        assert histogram.mean == pytest.approx(sum(values) / len(values))
+
+    def test_memory_is_bounded(self):
+        """Bucket count never exceeds max_buckets."""
+        histogram = LatencyHistogram(relative_accuracy=0.01, max_buckets=64)
+        for exponent in range(-5, 8):
+            for step in range(1, 100):
+                histogram.record(step * 10 ** exponent)
+
+        assert len(histogram.buckets) <= 64
+        assert histogram.quantile(1.0) == pytest.approx(histogram.max, rel=0.02)
+
+    def test_merge_matches_single_histogram(self):
+        """Merging two halves gives the same estimates as one histogram."""
+        whole, left, right = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for value in range(1, 1001):
+            whole.record(value)
+            (left if value % 2 else right).record(value)
+
+        left.merge(right)
+        assert left.count == whole.count
+        assert left.quantiles() == whole.quantiles()
+
+    def test_empty_histogram(self):
+        summary = LatencyHistogram().summary()
+        assert summary["count"] == 0
+        assert summary["p99"] == 0.0
+
+
+class TestShardedHistogram:
+    """Test cases for per-thread shards."""
+
+    def test_records_from_many_threads(self):
+        histogram = ShardedHistogram()
+
+        def worker():
+            for value in range(1000):
+                histogram.record(value)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert histogram.snapshot().count == 4000
+        assert histogram.totals() == (4000, 4 * sum(range(1000)))
+
+
+class TestHistogramRegistry:
+    """Test cases for labelled histograms and Prometheus output."""
+
+    def test_percentiles_by_domain_and_stage(self):
+        registry = HistogramRegistry()
+        for value in range(100):
+            registry.observe("latency", value, {"domain": "a.se", "stage": "fetch"})
+            registry.observe("latency", value * 10, {"domain": "a.se", "stage": "parse"})
+            registry.observe("latency", 1, {"domain": "b.se", "stage": "fetch"})
+
+        assert registry.percentiles("latency", {"domain": "a.se"})["count"] == 200
+        assert registry.percentiles("latency", {"stage": "fetch"})["count"] == 200
+
+        by_domain = registry.breakdown("latency", "domain")
+        assert set(by_domain) == {"a.se", "b.se"}
+        assert by_domain["b.se"]["p99"] == pytest.approx(1)
+
+    def test_render_prometheus(self):
+        registry = HistogramRegistry()
+        registry.describe("latency", "Request latency")
+        registry.observe("latency", 5, {"domain": "a.se"})
+
+        text = registry.render_prometheus(prefix="ecadp")
+        assert "# TYPE ecadp_latency summary" in text
+        assert 'ecadp_latency{domain="a.se",quantile="0.99"}' in text
+        assert 'ecadp_latency_count{domain="a.se"} 1' in text
@@ -0,0 +1,105 @@
+"""
+Tests for batched NER inference in the NER service adapter.
+"""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from src.plugins.nlp_services import ner_service
+from src.plugins.nlp_services.ner_service import EntityType, NERServiceAdapter
+
+TEXTS = [
+    "John Doe flyttade till Stockholm 2023-05-01, ring +46 70 1234567.",
+    "Kontakta info@bilhandel.se eller besök https://bilhandel.se",
+    "Volvo köpte 120 kronor aktier i Google.",
+]
+
+
+class FakeSpacy:
+    """spaCy-like pipeline that tags capitalised words and records pipe calls"""
+
+    def __init__(self):
+        self.pipe_names = ["tok2vec", "ner"]
+        self.calls = []
+
+    def pipe(self, texts, batch_size, n_process):
+        texts = list(texts)
+        self.calls.append((len(texts), batch_size, n_process, threading.current_thread().name))
+        for text in texts:
+            ents = [SimpleNamespace(label_="PRS" if word == "John" else "ORG", start_char=text.index(word),
+                                    end_char=text.index(word) + len(word))
+                    for word in ("John", "Volvo") if word in text]
+            yield SimpleNamespace(ents=ents)
+
+
+class FakeHuggingFace:
+    """Token classification pipeline returning aggregated entity groups"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, batch_size):
+        self.calls.append((len(texts), batch_size))
+        return [[{"entity_group": "LOC", "score": 0.97, "start": text.index("Stockholm"),
+                  "end": text.index("Stockholm") + 9}] if "Stockholm" in text else [] for text in texts]
+
+
+def test_regex_batch_matches_single_extraction():
+    service = NERServiceAdapter(plugin_info=None)
+
+    async def run():
+        batch = await service.batch_extract(TEXTS)
+        singles = [await service.extract_entities(text) for text in TEXTS]
+        return batch, singles
+
+    batch, singles = asyncio.run(run())
+    assert [r.text for r in batch] == TEXTS
+    assert [r.entities for r in batch] == [r.entities for r in singles]
+    assert {e.label for e in batch[1].entities} == {EntityType.EMAIL, EntityType.URL}
+    assert asyncio.run(service.batch_extract([])) == []
+    asyncio.run(service.cleanup())
+    assert service._executor is None
+
+
+def test_spacy_batch_runs_one_pipe_call_off_the_event_loop(monkeypatch):
+    nlp = FakeSpacy()
+    monkeypatch.setattr(ner_service, "SPACY_AVAILABLE", True)
+    monkeypatch.setattr(NERServiceAdapter, "_load_spacy_pipeline", lambda self, model, language: nlp)
+    service = NERServiceAdapter(plugin_info=None, batch_size=2, n_process=4)
+
+    texts = TEXTS * 3
+    results = asyncio.run(service.batch_extract(texts, model_name="spacy_sm", language="sv"))
+
+    # Nine texts in batches of two: four worker processes, never more than full batches
+    assert nlp.calls == [(9, 2, 4, nlp.calls[0][3])]
+    assert nlp.calls[0][3].startswith("ner")
+    assert service._spacy_pipe_settings(3) == (2, 1)
+    person = results[0].entities[0]
+    assert (person.text, person.label, person.start) == ("John", EntityType.PERSON, 0)
+    assert results[2].entities[0].label == EntityType.ORGANIZATION
+    # Regex entities are still added as backup
+    assert EntityType.DATE in {e.label for e in results[0].entities}
+
+    # The pipeline is loaded once per model and language
+    asyncio.run(service.extract_entities(TEXTS[0], model_name="spacy_sm", language="sv"))
+    assert len(nlp.calls) == 2 and list(service._pipelines) == [("spacy_sm", "sv")]
+
+
+def test_huggingface_batch_and_mock_fallback(monkeypatch):
+    ner = FakeHuggingFace()
+    monkeypatch.setattr(ner_service, "TRANSFORMERS_AVAILABLE", True)
+    monkeypatch.setattr(NERServiceAdapter, "_load_huggingface_pipeline", lambda self: ner)
+    service = NERServiceAdapter(plugin_info=None, batch_size=16)
+
+    results = asyncio.run(service.batch_extract(TEXTS, model_name="huggingface"))
+    assert ner.calls == [(3, 16)]
+    assert [(e.text, e.label, e.confidence) for e in results[0].entities] == [
+        ("Stockholm", EntityType.LOCATION, 0.97)
+    ]
+
+    # Without a loadable pipeline the mock model answers
+    monkeypatch.setattr(NERServiceAdapter, "_load_huggingface_pipeline", lambda self: None)
+    fallback = NERServiceAdapter(plugin_info=None)
+    results = asyncio.run(fallback.batch_extract(TEXTS, model_name="huggingface"))
+    assert [e.text for e in results[2].entities] == []
+    assert [e.text for e in results[0].entities] == ["Stockholm"]
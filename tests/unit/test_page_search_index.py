@@ -0,0 +1,80 @@
+"""
+Tests for the crawled page full-text search index.
+"""
+from types import SimpleNamespace
+
+import pytest
+from src.database.search_index import (
+    SearchDocument,
+    SQLiteSearchIndex,
+    extract_search_text,
+)
+
+
+def make_page(page_id, job_id, title, body, meta=""):
+    return SimpleNamespace(
+        id=page_id, job_id=job_id, url=f"https://example.se/{page_id}",
+        title=title, meta_description=meta,
+        html_content=f"<html><head><title>{title}</title></head>"
+                     f"<body><script>var tracking = 'volvo';</script><p>{body}</p></body></html>"
+    )
+
+
+def test_extract_search_text_skips_markup_and_scripts():
+    html = ("<html><head><style>p {color: red}</style></head><body>"
+            "<h1>Begagnade&nbsp;bilar</h1><p>Volvo <b>V70</b></p>"
+            "<script>alert('x')</script></body></html>")
+    assert extract_search_text(html) == "Begagnade bilar Volvo V70"
+    assert extract_search_text("<p>" + "a" * 100 + "</p>", max_chars=10) == "a" * 10
+    assert extract_search_text(None) == ""
+
+
+@pytest.mark.asyncio
+async def test_ranked_paginated_search_with_snippets():
+    index = SQLiteSearchIndex()
+    await index.index_many([
+        SearchDocument.from_page(make_page("p1", "job1", "Volvo V70 till salu", "Välskött volvo med dragkrok")),
+        SearchDocument.from_page(make_page("p2", "job1", "Bilhandlare", "Vi säljer även en volvo")),
+        SearchDocument.from_page(make_page("p3", "job1", "Saab 9-5", "Inga andra märken")),
+        SearchDocument.from_page(make_page("p4", "job2", "Volvo XC60", "Annan crawl")),
+    ])
+
+    results = await index.search("volvo", job_id="job1", limit=1)
+    assert results.total == 2
+    assert results.has_more
+    # Title matches outrank body-only matches
+    assert results.hits[0].page_id == "p1"
+    assert "<mark>" in results.hits[0].snippet
+
+    second = await index.search("volvo", job_id="job1", limit=1, offset=1)
+    assert [hit.page_id for hit in second.hits] == ["p2"]
+    assert not second.has_more
+
+    # Script contents are never indexed
+    assert (await index.search("tracking")).total == 0
+
+
+@pytest.mark.asyncio
+async def test_reindexing_replaces_document():
+    index = SQLiteSearchIndex()
+    await index.index(SearchDocument.from_page(make_page("p1", "job1", "Gammal titel", "text")))
+    await index.index(SearchDocument.from_page(make_page("p1", "job1", "Ny titel", "text")))
+
+    assert (await index.search("gammal")).total == 0
+    assert (await index.search("ny")).total == 1
+
+    await index.remove("p1")
+    assert (await index.search("titel")).total == 0
+    # Query syntax characters are treated as plain text
+    assert (await index.search('titel" OR (')).total == 0
+
+
+@pytest.mark.asyncio
+async def test_snippets_escape_page_text():
+    index = SQLiteSearchIndex()
+    # Escaped markup in the page is visible text after extraction
+    body = "Volvo &lt;img src=x onerror=alert(1)&gt; &amp; Saab "
+    await index.index(SearchDocument.from_page(make_page("p1", "job1", "Annons", body)))
+
+    snippet = (await index.search("volvo")).hits[0].snippet
+    assert snippet == "<mark>Volvo</mark> &lt;img src=x onerror=alert(1)&gt; &amp; Saab"
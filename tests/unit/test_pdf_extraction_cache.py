@@ -0,0 +1,89 @@
+"""
+Tests for sharded PDF extraction and its result cache.
+"""
+import asyncio
+import json
+from dataclasses import asdict
+
+import fitz
+
+from revolutionary_scraper.adapters.pdf_extract_kit_adapter import PDFExtractConfig, PDFProcessor
+from revolutionary_scraper.extraction_pool import ExtractionPoolConfig
+
+
+def make_pdf(path, pages, label="Sida"):
+    doc = fitz.open()
+    for n in range(pages):
+        doc.new_page().insert_text((72, 72), f"{label} {n + 1}")
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+class FlakyPool:
+    """In-process stand-in for the extraction pool that fails chosen shards"""
+
+    def __init__(self, failing_shards):
+        self.config = ExtractionPoolConfig(max_workers=2)
+        self.failing_shards = set(failing_shards)
+        self.calls = []
+
+    async def submit(self, fn, *args, timeout=None):
+        self.calls.append(args[1])
+        if args[1] in self.failing_shards:
+            raise RuntimeError("worker crashed")
+        return fn(*args)
+
+
+def processor(tmp_path, **overrides):
+    config = PDFExtractConfig(layout_analysis=False, extract_tables=False, extract_figures=False,
+                              extract_formulas=False, reading_order_detection=False, max_workers=2,
+                              pages_per_shard=4, min_pages_for_parallel=8, cache_dir=str(tmp_path / "cache"))
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return PDFProcessor(config)
+
+
+def test_failed_shards_are_reported_and_not_cached(tmp_path):
+    pdf = make_pdf(tmp_path / "rapport.pdf", 10)
+    proc = processor(tmp_path)
+    proc._pool = FlakyPool(failing_shards={4})
+
+    result = asyncio.run(proc.extract_from_pdf(pdf))
+
+    assert result.failed_pages == [5, 6, 7, 8]
+    assert [page.error for page in result.pages[4:8]] == ["worker crashed"] * 4
+    assert "Sida 9" in result.full_text and "Sida 5" not in result.full_text
+    assert not proc._cache and not list((tmp_path / "cache").glob("*.json"))
+
+    # Once the shard succeeds, the complete result is cached
+    proc._pool.failing_shards.clear()
+    retry = asyncio.run(proc.extract_from_pdf(pdf))
+    assert retry.failed_pages is None and "Sida 5" in retry.full_text
+    assert proc._pool.calls == [0, 4, 8, 0, 4, 8]
+    cached = asyncio.run(proc.extract_from_pdf(pdf))
+    assert cached.full_text == retry.full_text and proc._stats['cache_hits'] == 1
+
+
+def test_cache_is_bounded_by_size_in_memory_and_on_disk(tmp_path):
+    pdfs = [make_pdf(tmp_path / f"doc{n}.pdf", 3, label=f"Dokument {n}") for n in range(4)]
+    proc = processor(tmp_path)
+    entry_size = len(json.dumps(asdict(asyncio.run(proc.extract_from_pdf(pdfs[0])))))
+    assert proc._cache_bytes == entry_size
+
+    proc = processor(tmp_path / "bounded", cache_max_bytes=int(entry_size * 2.5),
+                     cache_dir_max_bytes=int(entry_size * 3.5))
+    for pdf in pdfs:
+        asyncio.run(proc.extract_from_pdf(pdf))
+
+    # Two entries fit in memory and three on disk; the oldest go first
+    assert len(proc._cache) == 2 and proc._cache_bytes <= proc.config.cache_max_bytes
+    assert len(list((tmp_path / "bounded" / "cache").glob("*.json"))) == 3
+    restored = asyncio.run(proc.extract_from_pdf(pdfs[1]))
+    assert "Dokument 1" in restored.full_text and proc._stats['cache_hits'] == 1
+
+    # A result larger than the memory budget is only kept on disk
+    tiny = processor(tmp_path / "tiny", cache_max_bytes=10)
+    asyncio.run(tiny.extract_from_pdf(pdfs[0]))
+    assert not tiny._cache and tiny._cache_bytes == 0
+    assert len(list((tmp_path / "tiny" / "cache").glob("*.json"))) == 1
@@ -0,0 +1,90 @@
+"""
+Tests for incremental proxy selection in ProxyRotator.
+"""
+import random
+import time
+from collections import Counter
+
+from src.proxy_pool.collector import ProxyInfo
+from src.proxy_pool.rotator import FenwickTree, ProxyRotator, RotationStrategy
+
+
+def make_rotator(strategy, count):
+    rotator = ProxyRotator(strategy=strategy, ban_threshold=2)
+    proxies = [ProxyInfo(ip=f"10.0.0.{i}", port=8080) for i in range(count)]
+    for proxy in proxies:
+        rotator.add_proxy(proxy)
+    return rotator, proxies
+
+
+def test_fenwick_tree_sampling_follows_weights():
+    tree = FenwickTree(4)
+    for index, weight in enumerate([1.0, 0.0, 3.0, 0.0]):
+        tree.set(index, weight)
+    assert tree.total() == 4.0
+    assert tree.prefix_sum(3) == 4.0
+    assert [tree.find(t) for t in (0.0, 0.99, 1.0, 3.99)] == [0, 0, 2, 2]
+
+    rng = random.Random(1)
+    counts = Counter(tree.sample(rng) for _ in range(4000))
+    assert set(counts) == {0, 2}
+    assert 0.2 < counts[0] / 4000 < 0.3
+
+    tree.grow(40)
+    tree.set(39, 4.0)
+    assert tree.total() == 8.0
+
+
+def test_weighted_selection_tracks_recorded_results():
+    rotator, proxies = make_rotator(RotationStrategy.WEIGHTED_RANDOM, 3)
+    for _ in range(3):
+        rotator.record_request_result(proxies[0], success=False)
+
+    # The failing proxy is banned and never selected again
+    picks = {rotator.get_next_proxy().ip for _ in range(200)}
+    assert picks == {"10.0.0.1", "10.0.0.2"}
+
+    # Exclusions are honoured without touching the pool
+    excluded = [f"{p.ip}:{p.port}" for p in proxies[1:2]]
+    assert {rotator.get_next_proxy(exclude_proxies=excluded).ip for _ in range(50)} == {"10.0.0.2"}
+    assert rotator.get_next_proxy(exclude_proxies=["10.0.0.1:8080", "10.0.0.2:8080"]) is None
+
+
+def test_ban_expiry_returns_proxy_to_rotation():
+    rotator, proxies = make_rotator(RotationStrategy.RANDOM, 1)
+    rotator.ban_duration = 0.05
+    rotator.record_request_result(proxies[0], success=False)
+    rotator.record_request_result(proxies[0], success=False)
+    assert rotator.get_next_proxy() is None
+
+    # No health check has run; the scheduled refresh alone re-admits it
+    time.sleep(0.06)
+    assert rotator.get_next_proxy() is proxies[0]
+
+
+def test_least_used_and_best_performance_heaps():
+    rotator, proxies = make_rotator(RotationStrategy.LEAST_USED, 4)
+    for proxy in proxies[:3]:
+        rotator.record_request_result(proxy, success=True, response_time=0.5)
+    assert rotator.get_next_proxy() is proxies[3]
+    assert rotator.get_next_proxy(exclude_proxies=["10.0.0.3:8080"]) is proxies[0]
+
+    rotator.strategy = RotationStrategy.BEST_PERFORMANCE
+    for proxy in (proxies[0], proxies[2], proxies[3]):
+        rotator.record_request_result(proxy, success=True, response_time=9.0)
+    assert rotator.get_next_proxy() is proxies[1]
+
+    rotator.remove_proxy(proxies[1])
+    assert rotator.get_next_proxy() is not proxies[1]
+    assert len(rotator._get_available_proxies()) == 3
+
+
+def test_removed_slots_are_reused():
+    rotator, proxies = make_rotator(RotationStrategy.WEIGHTED_RANDOM, 20)
+    for proxy in proxies[:19]:
+        rotator.remove_proxy(proxy)
+    replacement = ProxyInfo(ip="10.0.1.1", port=3128)
+    rotator.add_proxy(replacement)
+
+    assert len(rotator._weights) == 32
+    assert {rotator.get_next_proxy().ip for _ in range(50)} == {"10.0.0.19", "10.0.1.1"}
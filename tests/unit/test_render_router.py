@@ -0,0 +1,95 @@
+"""
+Tests for learned static-vs-render transport routing.
+"""
+import asyncio
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from src.scraper.render_router import (
+    RenderRoutingCache,
+    fields_validator,
+    static_content_validator,
+    url_pattern,
+)
+
+
+def test_url_pattern_groups_item_pages():
+    assert url_pattern("https://Bilweb.se/bil/12345/volvo-v70?x=1") == ("bilweb.se", "/bil/{n}/volvo-v70")
+    assert url_pattern("https://a.se/item/3f2b9c1e-77aa-4c1b") == ("a.se", "/item/{id}")
+    assert url_pattern("https://a.se/") == ("a.se", "/")
+
+
+def test_static_pages_are_routed_to_http():
+    cache = RenderRoutingCache(min_samples=3)
+    assert cache.choose("https://a.se/bil/1", "browser").reason == "unknown"
+
+    for i in range(3):
+        cache.record(f"https://a.se/bil/{i}", "http", True)
+
+    decision = cache.choose("https://a.se/bil/99", "browser")
+    assert (decision.transport, decision.reason) == ("http", "learned_static")
+    # Domain-wide evidence covers patterns not seen yet
+    assert cache.choose("https://a.se/annons/5", "browser").reason == "learned_static"
+
+
+def test_dynamic_pages_go_to_browser_with_sampled_probes():
+    cache = RenderRoutingCache(min_samples=3, probe_rate=0.1, rng=random.Random(7))
+    for i in range(5):
+        cache.record(f"https://spa.se/p/{i}", "http", False)
+
+    decisions = [cache.choose("https://spa.se/p/100").reason for _ in range(1000)]
+    probes = decisions.count("sampled_probe")
+    assert decisions.count("learned_dynamic") + probes == 1000
+    assert 50 < probes < 150
+
+
+def test_routes_persist_across_restarts(tmp_path):
+    db_path = str(tmp_path / "routes.db")
+    cache = RenderRoutingCache(db_path=db_path, min_samples=2)
+    cache.record("https://a.se/bil/1", "http", True)
+    cache.record("https://a.se/bil/2", "http", True)
+    cache.close()
+
+    reopened = RenderRoutingCache(db_path=db_path, min_samples=2)
+    assert reopened.choose("https://a.se/bil/3").reason == "learned_static"
+    assert reopened.get_routes("a.se")["a.se/bil/{n}"]["routed_to"] == "http"
+
+
+def test_validators():
+    validate = static_content_validator(min_text_chars=20)
+    assert validate("<html><body><p>" + "Volvo V70 2012 " * 5 + "</p></body></html>")
+    assert not validate('<html><body><div id="root"></div><script>app()</script></body></html>')
+
+    has_price = fields_validator(lambda html: {"price": "129 000 kr" if "kr" in html else None}, ["price"])
+    assert has_price("<span>129 000 kr</span>")
+    assert not has_price("<span>Laddar...</span>")
+
+
+def test_transport_counts_render_fallbacks_in_the_metrics_collector(monkeypatch):
+    pytest.importorskip("playwright")
+    from src.observability.metrics import MetricsCollector
+    from src.scraper.transport import ScrapingTransport, TransportResult
+
+    metrics = MetricsCollector(enable_prometheus=False, enable_system_metrics=False)
+    transport = ScrapingTransport(None, None, metrics, browser_pool=SimpleNamespace(),
+                                  routing_cache=RenderRoutingCache(min_samples=3))
+
+    async def fetch_http(url, policy):
+        return TransportResult("<div id='app'></div>", 200, 0.0, "http", url)
+
+    async def fetch_browser(url, policy):
+        return TransportResult("<h1>Volvo V70</h1>", 200, 0.0, "browser", url)
+
+    monkeypatch.setattr(transport, "_fetch_with_http", fetch_http)
+    monkeypatch.setattr(transport, "_fetch_with_browser", fetch_browser)
+    policy = SimpleNamespace(transport="http", fallback_to_browser=True, domain="spa.se")
+
+    result = asyncio.run(transport.fetch("https://spa.se/p/1", policy, validator=lambda html: "Volvo" in html))
+
+    assert (result.status_code, result.transport_type) == (200, "browser")
+    assert result.metadata["routing"]["fallback"]
+    assert metrics.get_metric("transport_render_fallbacks").points[-1].value == 1
+    assert metrics.get_metric("transport_browser_requests").points[-1].value == 1
+    assert metrics.get_metric("transport_browser_time").metric_type == "histogram"
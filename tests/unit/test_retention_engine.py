@@ -0,0 +1,101 @@
+"""
+Tests for batched retention deletes.
+"""
+import asyncio
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+
+from src.scheduler.jobs.retention_engine import RetentionEngine, RetentionTarget, ThrottleConfig
+
+
+class SQLiteConnection:
+    """Minimal execute_query/execute_command adapter over sqlite3"""
+
+    def __init__(self):
+        self.db = sqlite3.connect(":memory:")
+        self.db.row_factory = sqlite3.Row
+        self.statements = []
+
+    async def execute_query(self, query, params=None):
+        self.statements.append(query)
+        return [dict(row) for row in self.db.execute(query, params or {})]
+
+    async def execute_command(self, command, params=None):
+        self.statements.append(command)
+        cursor = self.db.execute(command, params or {})
+        self.db.commit()
+        return cursor.rowcount
+
+
+NOW = datetime(2024, 6, 10, 12, 0)
+FAST = ThrottleConfig(batch_size=100, pause_seconds=0)
+
+
+def make_table(conn, name, rows, level=None):
+    conn.db.execute(f"CREATE TABLE {name} (id INTEGER PRIMARY KEY, created_at TIMESTAMP, level TEXT)")
+    conn.db.executemany(
+        f"INSERT INTO {name} (created_at, level) VALUES (?, ?)",
+        [(NOW - timedelta(hours=n), level(n) if level else None) for n in rows]
+    )
+
+
+def test_deletes_in_bounded_batches():
+    conn = SQLiteConnection()
+    make_table(conn, "crawl_results", range(1000))
+    engine = RetentionEngine(conn, FAST, dialect="sqlite")
+
+    result = asyncio.run(engine.purge(RetentionTarget("crawl_results"), NOW - timedelta(hours=249.5)))
+
+    assert result.rows_deleted == 750
+    assert result.batches == 8
+    assert conn.db.execute("SELECT COUNT(*) FROM crawl_results").fetchone()[0] == 250
+    assert not any("RETURNING" in sql for sql in conn.statements)
+
+
+def test_uuid_primary_keys():
+    conn = SQLiteConnection()
+    conn.db.execute("CREATE TABLE export_jobs (id TEXT PRIMARY KEY, created_at TIMESTAMP)")
+    conn.db.executemany("INSERT INTO export_jobs VALUES (?, ?)",
+                        [(str(uuid.uuid4()), NOW - timedelta(days=n)) for n in range(30)])
+    engine = RetentionEngine(conn, ThrottleConfig(batch_size=7, pause_seconds=0), dialect="sqlite")
+
+    result = asyncio.run(engine.purge(RetentionTarget("export_jobs"), NOW - timedelta(days=9.5)))
+
+    assert result.rows_deleted == 20 and result.batches == 3
+    assert conn.db.execute("SELECT COUNT(*) FROM export_jobs").fetchone()[0] == 10
+    deletes = [sql for sql in conn.statements if sql.startswith("DELETE")]
+    assert ":lower" not in deletes[0] and all(":lower" in sql for sql in deletes[1:])
+
+
+def test_condition_and_runtime_limit():
+    conn = SQLiteConnection()
+    make_table(conn, "application_logs", range(500), level=lambda n: "ERROR" if n % 5 == 0 else "INFO")
+    target = RetentionTarget("application_logs", condition="level NOT IN ('ERROR', 'CRITICAL')")
+    engine = RetentionEngine(conn, dialect="sqlite")
+
+    stopped = asyncio.run(engine.purge(target, NOW, ThrottleConfig(batch_size=50, pause_seconds=0,
+                                                                   max_runtime_seconds=1e-9)))
+    assert not stopped.completed and stopped.rows_deleted == 0
+
+    result = asyncio.run(engine.purge(target, NOW, ThrottleConfig(batch_size=50, pause_seconds=0)))
+    assert result.rows_deleted == 400
+    assert conn.db.execute("SELECT COUNT(*) FROM application_logs WHERE level = 'INFO'").fetchone()[0] == 0
+
+
+def test_drops_expired_day_partitions():
+    conn = SQLiteConnection()
+    for day in ("20240607", "20240608", "20240609", "20240610"):
+        conn.db.execute(f"CREATE TABLE crawl_results_{day} (id INTEGER PRIMARY KEY, created_at TIMESTAMP)")
+        conn.db.executemany(f"INSERT INTO crawl_results_{day} (created_at) VALUES (?)", [(day,)] * 10)
+    conn.db.execute("CREATE TABLE crawl_results_archive (id INTEGER PRIMARY KEY)")
+    engine = RetentionEngine(conn, FAST, dialect="sqlite")
+
+    result = asyncio.run(engine.purge(RetentionTarget("crawl_results", partitioned_by_day=True),
+                                      datetime(2024, 6, 9, 6, 0)))
+
+    tables = {row[0] for row in conn.db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables == {"crawl_results_20240609", "crawl_results_20240610", "crawl_results_archive"}
+    assert result.partitions_dropped == 2
+    assert result.rows_deleted == 20
+    assert RetentionEngine.partition_day("crawl_results", "crawl_results_p2024_06_09").day == 9
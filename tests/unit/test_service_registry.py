@@ -0,0 +1,101 @@
+"""
+Tests for level-by-level service startup in the service registry.
+"""
+import asyncio
+from typing import Any, Dict
+
+from engines.core.base_classes import BaseService, ServiceStatus
+from engines.core.registry import ServiceRegistry
+
+
+class FakeService(BaseService):
+    """Service that records start/stop calls in a shared event log"""
+
+    def __init__(self, name, log, delay=0.0, ok=True):
+        super().__init__(name)
+        self.log = log
+        self.delay = delay
+        self.ok = ok
+        self.stopped = False
+
+    async def start(self) -> bool:
+        self.log.append(("start", self.name))
+        await asyncio.sleep(self.delay)
+        if self.ok:
+            self.status = ServiceStatus.RUNNING
+            self.log.append(("running", self.name))
+        return self.ok
+
+    async def stop(self) -> bool:
+        self.log.append(("stop", self.name))
+        self.stopped = True
+        self.status = ServiceStatus.STOPPED
+        return True
+
+    async def health_check(self) -> Dict[str, Any]:
+        return {"status": "healthy"}
+
+
+async def build(services, **kwargs):
+    registry = ServiceRegistry(**kwargs)
+    for service, dependencies in services:
+        await registry.register_service(service, dependencies)
+    return registry
+
+
+def test_levels_start_concurrently_after_their_dependencies():
+    log = []
+
+    async def run():
+        registry = await build([
+            (FakeService("db", log, delay=0.02), []),
+            (FakeService("cache", log, delay=0.01), []),
+            (FakeService("api", log), ["db", "cache"]),
+            (FakeService("worker", log), ["db"]),
+        ])
+        return registry, await registry.start_all_services(), await registry.stop_all_services()
+
+    registry, started, stopped = asyncio.run(run())
+
+    assert [set(level) for level in registry._startup_levels] == [{"db", "cache"}, {"api", "worker"}]
+    assert started == {"db": True, "cache": True, "api": True, "worker": True}
+    # The whole first level is running before the second one starts
+    assert log[:2] == [("start", "db"), ("start", "cache")]
+    assert log.index(("running", "db")) < log.index(("start", "api"))
+    assert log.index(("running", "db")) < log.index(("start", "worker"))
+    # Shutdown runs the levels in reverse
+    assert set(log[-4:-2]) == {("stop", "api"), ("stop", "worker")}
+    assert stopped == dict.fromkeys(["api", "worker", "db", "cache"], True)
+
+
+def test_timed_out_service_is_stopped_and_dependents_skipped():
+    log = []
+    slow = FakeService("search", log, delay=5)
+
+    async def run():
+        registry = await build([(FakeService("db", log), []), (slow, []), (FakeService("api", log), ["search"])])
+        await registry.register_service(slow, [], start_timeout=0.01)
+        return await registry.start_all_services()
+
+    started = asyncio.run(run())
+
+    assert started == {"db": True, "search": False, "api": False}
+    assert slow.stopped and slow.status == ServiceStatus.ERROR
+    assert ("start", "api") not in log
+
+
+def test_fail_fast_stops_cancelled_services_and_skips_later_levels():
+    log = []
+    broken = FakeService("broker", log, ok=False)
+    slow = FakeService("search", log, delay=5)
+    later = FakeService("api", log)
+
+    async def run():
+        registry = await build([(broken, []), (slow, []), (FakeService("db", log), []), (later, ["db"])])
+        return await registry.start_all_services(fail_fast=True)
+
+    started = asyncio.run(run())
+
+    assert started == {"broker": False, "search": False, "db": True, "api": False}
+    assert slow.stopped and slow.status == ServiceStatus.STOPPED
+    assert later.status == ServiceStatus.INITIALIZING and ("start", "api") not in log
@@ -0,0 +1,284 @@
+"""
+Tests for chunked, file-staged warehouse loads.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.exporters import bigquery_exporter, snowflake_exporter
+from src.exporters.base import ExportConfig
+from src.exporters.bigquery_exporter import BigQueryExporter
+from src.exporters.snowflake_exporter import SnowflakeExporter
+from src.exporters.staged_load import ChunkFileWriter, StagedLoader
+
+
+def listings(count):
+    for n in range(count):
+        yield {"n": n, "model": "Volvo V70", "vin": hashlib.sha256(str(n).encode()).hexdigest()}
+
+
+def read_chunk(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line)["n"] for line in f]
+
+
+class FakeWarehouse:
+    """Load function that records chunk contents; can fail a chunk's first attempts"""
+
+    def __init__(self, fail=None, delay=0.0):
+        self.fail = fail or {}
+        self.delay = delay
+        self.loaded = {}
+        self.order = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, path, chunk, manifest):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if self.fail.get(chunk.index, 0) >= chunk.attempts:
+                raise RuntimeError(f"load job for {chunk.name} failed")
+            rows = read_chunk(path)
+            assert len(rows) == chunk.rows
+            self.loaded[chunk.index] = rows
+            self.order.append(chunk.index)
+            return f"{manifest.load_id}_{chunk.index}_{chunk.attempts}"
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def test_writer_rotates_chunks_at_target_size(tmp_path):
+    writer = ChunkFileWriter(tmp_path, target_bytes=32768, compression_level=1)
+    chunks = writer.write_rows(listings(6000)) + writer.close()
+
+    assert len(chunks) > 3
+    # Compressed output grows in deflate blocks, so chunks overshoot the target a little
+    assert all(32768 <= chunk.bytes < 3 * 32768 for chunk in chunks[:-1])
+    assert not list(tmp_path.glob("*.partial"))
+    # Chunk boundaries are contiguous and cover every row exactly once
+    rows = [read_chunk(tmp_path / chunk.name) for chunk in chunks]
+    assert [n for chunk_rows in rows for n in chunk_rows] == list(range(6000))
+    assert [len(chunk_rows) for chunk_rows in rows] == [chunk.rows for chunk in chunks]
+
+
+def test_parquet_chunks_widen_their_schema_for_new_keys(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    records = list(listings(45))
+    for record in records[20:30]:
+        record["price"] = 129000
+    for record in records[40:]:
+        record["color"] = "röd"
+
+    writer = ChunkFileWriter(tmp_path, file_format="parquet", row_group_size=10)
+    chunks = writer.write_rows(records) + writer.close()
+
+    # New keys start a new chunk, also for the rows flushed on close
+    assert [chunk.rows for chunk in chunks] == [20, 20, 5]
+    tables = [pq.read_table(tmp_path / chunk.name) for chunk in chunks]
+    assert "price" not in tables[0].column_names
+    assert tables[1].column("price").to_pylist() == [129000] * 10 + [None] * 10
+    assert tables[2].column_names == ["n", "model", "vin", "price", "color"]
+    assert [n for table in tables for n in table.column("n").to_pylist()] == list(range(45))
+
+    conflicting = ChunkFileWriter(tmp_path / "conflict", file_format="parquet", row_group_size=10)
+    conflicting.write_rows(listings(10))
+    with pytest.raises(TypeError):
+        conflicting.write_rows({"n": str(n)} for n in range(10))
+
+
+def test_loads_chunks_concurrently_and_resumes_failed_chunk(tmp_path):
+    warehouse = FakeWarehouse(fail={2: 5}, delay=0.02)
+    loader = StagedLoader(tmp_path, "load-1", "ds.listings", warehouse, target_bytes=32768,
+                          max_concurrent_loads=3, max_attempts=2, retry_delay=0.001, batch_size=100)
+    manifest = asyncio.run(loader.run(listings(3000)))
+
+    assert manifest.writes_complete and manifest.rows_written == 3000
+    assert not loader.complete
+    assert 1 < warehouse.max_in_flight <= 3
+    assert [chunk.state for chunk in manifest.chunks if chunk.state != "loaded"] == ["failed"]
+    assert manifest.chunks[2].attempts == 2
+    assert loader.summary()["rows_loaded"] == 3000 - manifest.chunks[2].rows
+    # Loaded chunk files are removed, the failed one is kept for the resume
+    assert sorted(p.name for p in (tmp_path / "load-1").glob("chunk-*")) == [manifest.chunks[2].name]
+
+    warehouse.fail = {}
+    resumed = StagedLoader(tmp_path, "load-1", "ds.listings", warehouse)
+    asyncio.run(resumed.resume())
+
+    assert resumed.complete
+    assert resumed.manifest.chunks[2].attempts == 3
+    assert resumed.manifest.chunks[2].job_id == "load-1_2_3"
+    assert sorted(n for rows in warehouse.loaded.values() for n in rows) == list(range(3000))
+    assert not (tmp_path / "load-1").exists()
+
+
+def test_first_chunk_loads_alone_when_exclusive(tmp_path):
+    warehouse = FakeWarehouse(delay=0.01)
+
+    async def records():
+        for record in listings(2000):
+            yield record
+
+    loader = StagedLoader(tmp_path, "load-2", "ds.listings", warehouse, target_bytes=32768,
+                          exclusive_first_chunk=True, keep_files=True, batch_size=50)
+    asyncio.run(loader.run(records()))
+
+    assert loader.complete and warehouse.order[0] == 0
+    assert (tmp_path / "load-2" / "manifest.json").exists()
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.sfqid = None
+
+    def execute(self, sql):
+        self.conn.statements.append(sql)
+        self.sfqid = f"q{len(self.conn.statements)}"
+        if sql.startswith("PUT"):
+            self.conn.staged.append(sql.split("'")[1].rsplit("/", 1)[-1])
+
+    def fetchall(self):
+        sql = self.conn.statements[-1]
+        if sql.startswith("COPY"):
+            name = sql.split("FILES = ('")[1].split("'")[0]
+            return [(name, "LOADED", 0, 0)]
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+        self.staged = []
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+def test_snowflake_puts_and_copies_each_chunk(tmp_path, monkeypatch):
+    conn = FakeConnection()
+    monkeypatch.setattr(snowflake_exporter, "SNOWFLAKE_AVAILABLE", True)
+    monkeypatch.setattr(SnowflakeExporter, "_connect", lambda self: conn)
+
+    options = {"account": "acme", "user": "loader", "password": "secret", "database": "DW",
+               "schema": "RAW", "table": "listings", "if_exists": "replace",
+               "staging_dir": str(tmp_path), "chunk_target_bytes": 32768}
+    exporter = SnowflakeExporter(ExportConfig(batch_size=200, include_metadata=False, format_options=options))
+    result = asyncio.run(exporter.export_stream(listings(1500), load_id="load-3"))
+
+    assert result.success and result.records_exported == 1500
+    assert conn.closed
+    chunks = result.metadata["staged_load"]["chunks"]
+    assert len(conn.staged) == chunks > 1
+
+    statements = conn.statements
+    assert statements[0].startswith("CREATE TEMPORARY FILE FORMAT IF NOT EXISTS STAGED_LOAD_NDJSON TYPE = JSON")
+    # Table creation and truncation come with the first chunk, before any other COPY
+    first_copy = next(i for i, sql in enumerate(statements) if sql.startswith("COPY"))
+    assert "chunk-000000" in statements[first_copy]
+    assert any(sql.startswith('CREATE TABLE IF NOT EXISTS "listings"') for sql in statements[:first_copy])
+    assert statements[first_copy - 1] == 'TRUNCATE TABLE IF EXISTS "listings"'
+    assert all("@~/staged_load/load-3/" in sql for sql in statements if sql.startswith(("PUT", "COPY")))
+
+
+class FakeAPIError(Exception):
+    pass
+
+
+class FakeNotFound(FakeAPIError):
+    pass
+
+
+class FakeLoadJob:
+    def __init__(self, job_id, rows, errors):
+        self.job_id = job_id
+        self.output_rows = rows
+        self.errors = list(errors)
+
+    def result(self):
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+class FakeBigQueryClient:
+    """Load jobs that run server-side; ``errors`` are raised by a job's result() calls"""
+
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.jobs = {}
+        self.loads = []
+        self.lookups = []
+
+    def dataset(self, dataset_id):
+        return SimpleNamespace(table=lambda table_id: f"{dataset_id}.{table_id}")
+
+    def get_table(self, table_ref):
+        raise FakeNotFound(table_ref)
+
+    def get_job(self, job_id):
+        self.lookups.append(job_id)
+        if job_id not in self.jobs:
+            raise FakeNotFound(job_id)
+        return self.jobs[job_id]
+
+    def load_table_from_file(self, source, table_ref, job_id, job_config):
+        rows = sum(1 for _ in gzip.GzipFile(fileobj=source))
+        self.loads.append((job_id, job_config))
+        self.jobs[job_id] = FakeLoadJob(job_id, rows, self.errors.get(job_id, ()))
+        return self.jobs[job_id]
+
+
+def test_bigquery_resume_does_not_reload_chunks_whose_job_succeeded(tmp_path, monkeypatch):
+    fake_bigquery = SimpleNamespace(
+        LoadJobConfig=lambda **options: SimpleNamespace(**options),
+        SourceFormat=SimpleNamespace(PARQUET="PARQUET", NEWLINE_DELIMITED_JSON="NEWLINE_DELIMITED_JSON"),
+        SchemaUpdateOption=SimpleNamespace(ALLOW_FIELD_ADDITION="ALLOW_FIELD_ADDITION")
+    )
+    # Chunk 1's job succeeds but the client loses the result; chunk 2's job fails
+    client = FakeBigQueryClient(errors={
+        "load-4_000001_1": [ConnectionError("connection reset")],
+        "load-4_000002_1": [FakeAPIError("invalid row"), FakeAPIError("invalid row")],
+    })
+    monkeypatch.setattr(bigquery_exporter, "BIGQUERY_AVAILABLE", True)
+    monkeypatch.setattr(bigquery_exporter, "bigquery", fake_bigquery, raising=False)
+    monkeypatch.setattr(bigquery_exporter, "GoogleAPICallError", FakeAPIError, raising=False)
+    monkeypatch.setattr(bigquery_exporter, "NotFound", FakeNotFound, raising=False)
+    monkeypatch.setattr(BigQueryExporter, "_create_client", lambda self: client)
+
+    options = {"project_id": "acme", "dataset_id": "raw", "table_id": "listings", "staging_dir": str(tmp_path),
+               "chunk_target_bytes": 32768, "max_load_attempts": 1}
+    exporter = BigQueryExporter(ExportConfig(batch_size=200, include_metadata=False, format_options=options))
+    result = asyncio.run(exporter.export_stream(listings(3000), load_id="load-4"))
+
+    assert not result.success and "load_id=load-4" in result.error_message
+    chunks = result.metadata["staged_load"]["chunks"]
+    assert len(client.loads) == chunks == 3
+    assert client.loads[0][1].write_disposition == "WRITE_APPEND"
+    assert not hasattr(client.loads[0][1], "schema_update_options")
+    assert client.loads[1][1].schema_update_options == ["ALLOW_FIELD_ADDITION"]
+
+    result = asyncio.run(exporter.resume_load("load-4"))
+
+    assert result.success and result.records_exported == 3000
+    assert client.lookups == ["load-4_000001_1", "load-4_000002_1"]
+    # Only the chunk whose job really failed is loaded again, under a new job id
+    assert [job_id for job_id, _ in client.loads[chunks:]] == ["load-4_000002_2"]
+    assert not (tmp_path / "load-4").exists()
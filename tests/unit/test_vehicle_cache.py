@@ -0,0 +1,107 @@
+"""
+Tests for the bounded single-flight vehicle lookup cache.
+"""
+import asyncio
+import pickle
+import sqlite3
+from datetime import datetime
+
+from processing.data_processing.sources import vehicle_cache
+from processing.data_processing.sources.swedish_data import (
+    SwedishVehicleDataAdapter, VehicleDataSource, VehicleInfo, VehicleSearchResult, VehicleType
+)
+from processing.data_processing.sources.vehicle_cache import COALESCED, HIT, LOADED, VehicleLookupCache
+
+
+def search_result(plate):
+    vehicle = VehicleInfo(registration_number=plate, make="Volvo", model="V70", year=2015,
+                          vehicle_type=VehicleType.CAR, source=VehicleDataSource.MOCK,
+                          inspection_valid_until=datetime(2025, 5, 31), raw_data={"färg": "blå"})
+    return VehicleSearchResult(query=plate, results=[vehicle], source=VehicleDataSource.MOCK,
+                               search_time=datetime(2024, 6, 10, 12, 0), total_results=1, success=True)
+
+
+def test_entries_expire_and_lru_is_bounded(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(vehicle_cache.time, "time", lambda: now[0])
+    cache = VehicleLookupCache(max_entries=2, ttl=60)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts b, the least recently used
+    assert "b" not in cache and len(cache) == 2
+
+    now[0] += 61
+    assert cache.get("a") is None and cache.expire() == 1
+    assert cache.get_stats()["evictions"] == 1 and cache.get_stats()["expirations"] == 2
+
+
+def test_concurrent_loads_share_one_request():
+    cache = VehicleLookupCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "Volvo"
+
+    async def run():
+        first = await asyncio.gather(*(cache.get_or_load("ABC123", loader) for _ in range(3)))
+        return first, await cache.get_or_load("ABC123", loader)
+
+    first, again = asyncio.run(run())
+    assert first == [("Volvo", LOADED), ("Volvo", COALESCED), ("Volvo", COALESCED)]
+    assert again == ("Volvo", HIT) and len(calls) == 1
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 3 and cache.stats["coalesced"] == 2
+
+
+def test_adapter_stats_count_each_request_once():
+    adapter = SwedishVehicleDataAdapter(plugin_info=None)
+    adapter.initialized = True
+    upstream = []
+
+    async def lookup_uncached(registration_number, reg_number, preferred_sources):
+        upstream.append(reg_number)
+        adapter.stats["total_lookups"] += 1
+        await asyncio.sleep(0.01)
+        return search_result(reg_number)
+
+    adapter._lookup_uncached = lookup_uncached
+
+    async def run():
+        await asyncio.gather(*(adapter.lookup_vehicle("ABC 123") for _ in range(3)))
+        return await adapter.batch_lookup(["abc123", "DEF456", "def 456"])
+
+    batch = asyncio.run(run())
+    assert upstream == ["ABC 123", "DEF 456"]
+    assert set(batch) == {"abc123", "DEF456", "def 456"}
+    stats = adapter.get_vehicle_statistics()
+    # Waiters on an in-flight lookup are not cache hits
+    assert (stats["cache_hits"], stats["coalesced_lookups"], stats["total_lookups"]) == (1, 2, 2)
+    assert stats["cache_hit_rate"] == 20.0
+    # The batch miss for DEF456 is counted once, not by both the batch and lookup_vehicle
+    assert stats["cache"]["misses"] == 4 and stats["cache"]["hits"] == 1
+
+
+def test_persisted_entries_are_json(tmp_path):
+    path = str(tmp_path / "vehicles.db")
+    adapter = SwedishVehicleDataAdapter(plugin_info=None, cache_path=path)
+    stored = search_result("ABC123")
+    adapter.cache.set("vehicle:ABC123", stored)
+    asyncio.run(adapter.cache.close())
+
+    db = sqlite3.connect(path)
+    (payload,) = db.execute("SELECT value FROM vehicle_lookup_cache").fetchone()
+    assert '"make": "Volvo"' in payload and '"färg": "blå"' in payload
+    # Entries written by older versions are dropped, never unpickled
+    db.execute("INSERT INTO vehicle_lookup_cache VALUES ('vehicle:OLD111', ?, strftime('%s', 'now'))",
+               (pickle.dumps({"x": 1}),))
+    db.commit()
+    db.close()
+
+    restored = SwedishVehicleDataAdapter(plugin_info=None, cache_path=path)
+    assert restored.cache.get("vehicle:ABC123") == stored
+    assert "vehicle:OLD111" not in restored.cache
+    rows = restored.cache._conn.execute("SELECT cache_key FROM vehicle_lookup_cache").fetchall()
+    assert rows == [("vehicle:ABC123",)]
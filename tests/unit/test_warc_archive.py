@@ -0,0 +1,83 @@
+"""
+Tests for WARC archiving and lookup.
+"""
+import gzip
+
+from src.scraper.warc import WARCArchive, WARCWriter, iter_warc_records, surt
+
+
+def test_surt_normalises_host_and_query():
+    assert surt("https://www.Bilweb.se/bilar?b=2&a=1") == "se,bilweb)/bilar?a=1&b=2"
+    assert surt("http://bilweb.se") == "se,bilweb)/"
+
+
+def test_round_trip_through_index(tmp_path):
+    writer = WARCWriter(tmp_path, prefix="test")
+    html = "<html><body>Volvo V70 – 129 000 kr</body></html>".encode("utf-8")
+    location = writer.write_response(
+        "https://bilweb.se/bil/1", 200,
+        [("Content-Type", "text/html; charset=utf-8"), ("Content-Encoding", "gzip"),
+         ("Set-Cookie", "a=1"), ("Set-Cookie", "b=2")],
+        html, request_headers={"User-Agent": "test"}
+    )
+    writer.write_response("https://bilweb.se/bil/2", 404, {"Content-Type": "text/html"}, b"gone")
+    writer.close()
+
+    # Each record is its own gzip member, readable from its offset alone
+    with open(tmp_path / location.filename, "rb") as f:
+        f.seek(location.offset)
+        record = gzip.decompress(f.read(location.length))
+    assert record.startswith(b"WARC/1.1\r\nWARC-Type: response\r\n")
+
+    types = [headers["WARC-Type"] for headers, _ in iter_warc_records(tmp_path / location.filename)]
+    assert types == ["warcinfo", "response", "request", "response", "request"]
+
+    archive = WARCArchive(tmp_path)
+    assert len(archive) == 2
+    assert archive.urls(status=200) == ["https://bilweb.se/bil/1"]
+
+    response = archive.get("https://www.bilweb.se/bil/1")
+    assert response.status_code == 200
+    assert response.body == html
+    assert response.text == html.decode("utf-8")
+    assert response.header("X-Archive-Orig-Content-Encoding") == "gzip"
+    assert response.header("Content-Length") == str(len(html))
+    assert [v for k, v in response.headers if k == "Set-Cookie"] == ["a=1", "b=2"]
+    assert archive.get("https://bilweb.se/missing") is None
+
+
+def test_rotation_and_newest_capture_wins(tmp_path):
+    writer = WARCWriter(tmp_path, max_file_size=1)
+    for version in range(3):
+        writer.write_response("https://bilweb.se/", 200, {"Content-Type": "text/html"},
+                              f"version {version}".encode())
+    writer.close()
+
+    assert len(list(tmp_path.glob("*.warc.gz"))) == 3
+    assert len(list(tmp_path.glob("*.warc.gz.cdxj"))) == 3
+    assert writer.get_stats()["responses_written"] == 3
+
+    archive = WARCArchive(tmp_path)
+    assert archive.get("https://bilweb.se/").body == b"version 2"
+
+
+def test_rendered_text_is_stored_as_utf8(tmp_path):
+    writer = WARCWriter(tmp_path)
+    dom = "<html><body>Köp Volvo – 129 000 kr</body></html>"
+    writer.write_response("https://bilweb.se/bil/3", 200,
+                          {"Content-Type": "text/html; charset=ISO-8859-1"}, dom, transport="browser")
+    writer.write_response("https://bilweb.se/bil/4", 200, {"Content-Type": "text/html"}, b"ok",
+                          http_version="HTTP/2")
+    writer.close()
+
+    archive = WARCArchive(tmp_path)
+    rendered = archive.get("https://bilweb.se/bil/3")
+    assert rendered.header("Content-Type") == "text/html; charset=utf-8"
+    assert rendered.header("X-Archive-Orig-Content-Type") == "text/html; charset=ISO-8859-1"
+    assert rendered.text == dom
+    # The browser does not expose the negotiated protocol
+    assert (rendered.transport, rendered.protocol) == ("browser", None)
+
+    fetched = archive.get("https://bilweb.se/bil/4")
+    assert fetched.header("Content-Type") == "text/html"
+    assert (fetched.transport, fetched.protocol) == ("http", "h2")
@@ -0,0 +1,132 @@
+"""
+Tests for the durable webhook outbox and batched delivery engine.
+"""
+import json
+
+import pytest
+from src.webhooks.outbox import (
+    WebhookDeliveryEngine,
+    WebhookEndpointConfig,
+    WebhookOutbox,
+)
+
+URL = "https://hooks.example.com/ecadp"
+
+
+class RecordingTransport:
+    """Fake transport returning queued status codes, then 200."""
+
+    def __init__(self, statuses=None):
+        self.statuses = list(statuses or [])
+        self.batches = []
+
+    async def __call__(self, url, body, headers):
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status == 200:
+            self.batches.append(json.loads(body))
+        return status, "ok" if status == 200 else "error"
+
+
+def make_engine(tmp_path, transport, **endpoint_kwargs):
+    engine = WebhookDeliveryEngine(
+        db_path=str(tmp_path / "outbox.db"), transport=transport, poll_interval=0.05
+    )
+    engine.register_endpoint(WebhookEndpointConfig(
+        url=URL, batch_window=0.01, backoff_base=0.001, backoff_cap=0.01,
+        **endpoint_kwargs
+    ))
+    return engine
+
+
+def test_outbox_survives_restart(tmp_path):
+    db_path = str(tmp_path / "outbox.db")
+    outbox = WebhookOutbox(db_path)
+    outbox.enqueue(URL, "evt_1", "job.progress", '{"event_id": "evt_1"}')
+    outbox.enqueue(URL, "evt_1", "job.progress", '{"event_id": "evt_1"}')
+    claimed = outbox.claim_batch(URL, max_events=10, max_bytes=1024)
+    assert len(claimed) == 1
+    outbox.close()
+
+    # The crashed process never acknowledged the batch
+    reopened = WebhookOutbox(db_path)
+    assert reopened.counts()["pending"] == 1
+
+
+def test_claim_batch_respects_byte_limit(tmp_path):
+    outbox = WebhookOutbox(str(tmp_path / "outbox.db"))
+    for i in range(10):
+        outbox.enqueue(URL, f"evt_{i}", "job.progress", "x" * 100)
+
+    assert len(outbox.claim_batch(URL, max_events=10, max_bytes=350)) == 3
+    assert len(outbox.claim_batch(URL, max_events=5, max_bytes=10_000)) == 5
+
+
+def test_requeue_keeps_dead_letters_whose_event_is_queued_again(tmp_path):
+    outbox = WebhookOutbox(str(tmp_path / "outbox.db"))
+    for event_id in ("evt_1", "evt_2"):
+        outbox.enqueue(URL, event_id, "job.progress", f'{{"event_id": "{event_id}"}}')
+    outbox.dead_letter(outbox.claim_batch(URL, max_events=10, max_bytes=10_000), "HTTP 400")
+    # evt_1 is re-sent by its producer before the dead letters are requeued
+    outbox.enqueue(URL, "evt_1", "job.progress", '{"event_id": "evt_1"}')
+
+    assert outbox.requeue_dead_letters() == 1
+    assert [d["event_id"] for d in outbox.list_dead_letters()] == ["evt_1"]
+    assert outbox.counts()["pending"] == 2
+
+
+@pytest.mark.asyncio
+async def test_events_are_delivered_in_batches(tmp_path):
+    transport = RecordingTransport(statuses=[503])
+    engine = make_engine(tmp_path, transport, max_batch_size=25)
+
+    for i in range(60):
+        engine.enqueue(URL, "job.progress", {"progress": i}, f"evt_{i}")
+
+    await engine.start()
+    await engine.flush(timeout=5)
+    await engine.stop()
+
+    delivered = [event["event_id"] for batch in transport.batches for event in batch]
+    assert sorted(delivered) == sorted(f"evt_{i}" for i in range(60))
+    assert all(len(batch) <= 25 for batch in transport.batches)
+
+    stats = engine.get_statistics()
+    assert stats["delivered"] == 60
+    assert stats["failed_attempts"] == 1
+    assert stats["latency_ms"]["count"] >= 60
+
+
+@pytest.mark.asyncio
+async def test_rejected_events_go_to_dead_letter(tmp_path):
+    transport = RecordingTransport(statuses=[400])
+    engine = make_engine(tmp_path, transport)
+    engine.enqueue(URL, "job.completed", {"job_id": "j1"}, "evt_bad")
+
+    await engine.start()
+    await engine.flush(timeout=5)
+    await engine.stop()
+
+    assert engine.outbox.counts()["dead_letter"] == 1
+    assert engine.outbox.list_dead_letters()[0]["event_id"] == "evt_bad"
+
+    assert engine.outbox.requeue_dead_letters() == 1
+    assert engine.outbox.counts()["pending"] == 1
+
+
+@pytest.mark.asyncio
+async def test_registering_a_running_endpoint_again_reuses_its_workers(tmp_path):
+    transport = RecordingTransport()
+    engine = make_engine(tmp_path, transport, concurrency=2)
+    await engine.start()
+    workers = engine._workers[URL]
+
+    engine.register_endpoint(WebhookEndpointConfig(url=URL, batch_window=0.01, max_batch_size=5, concurrency=2))
+    for i in range(12):
+        engine.enqueue(URL, "job.progress", {"progress": i}, f"evt_{i}")
+    await engine.flush(timeout=5)
+
+    assert engine._workers[URL] is workers and len(workers) == 2
+    assert sum(len(batch) for batch in transport.batches) == 12
+    # The running workers batch with the replacement config
+    assert all(len(batch) <= 5 for batch in transport.batches)
+    await engine.stop()
@@ -0,0 +1,79 @@
+"""
+Tests for single-pass selector inference in XPathSuggester.
+"""
+import pytest
+from lxml import etree, html
+
+from src.scraper import xpath_suggester
+from src.scraper.xpath_suggester import DocumentIndex, XPathSuggester
+
+
+def listing_page(n):
+    rows = "".join(
+        f"<li class='item'><span class='name'>Volvo V{60 + j}</span><span class='price'>{100 + n + j} 000 kr</span>"
+        f"<!-- annons --><div>Datum {1 + j}/5/2024</div></li>"
+        for j in range(3 + n % 3)
+    )
+    banner = "<div class='ad'>Annons här</div>" if n % 2 else ""
+    return (f"<html><head><title>Bilar sida {n}</title></head><body>{banner}"
+            f"<div id='main'><h1 class='title'>Begagnade bilar</h1><ul>{rows}</ul></div></body></html>")
+
+
+def test_index_resolves_generated_selectors_like_lxml():
+    doc = html.fromstring(listing_page(1))
+    index = DocumentIndex(doc)
+
+    paths = {path for elem, path in index.elements if path}
+    assert "body/div[2]/ul/li[3]/span[2]" in paths
+    assert "body/div[1]" in paths and "head/title" in paths
+    assert all("function" not in path for path in paths)
+
+    for selector in ["//body/div[2]/ul/li[2]/span[1]", "//ul/li/span[2]", "//li[4]/div", "//div",
+                     "//body/div[3]", "//span[0]"]:
+        assert index.select("xpath", selector) == etree.XPath(selector)(doc), selector
+
+    assert [e.text for e in index.select("css", "span.price")] == ["101 000 kr", "102 000 kr", "103 000 kr",
+                                                                  "104 000 kr"]
+    assert index.select("css", "#main") == [doc.body[1]]
+    # Shapes the index does not understand are left to lxml
+    assert index.select("xpath", "//span[@class='price']") is None
+    assert index.select("css", "ul > li") is None
+
+
+def test_each_sample_is_parsed_once_and_field_names_are_cached(monkeypatch):
+    parsed = []
+    fromstring = xpath_suggester.html.fromstring
+    monkeypatch.setattr(xpath_suggester.html, "fromstring", lambda content: parsed.append(1) or fromstring(content))
+    inferred = []
+    infer = XPathSuggester._infer_field_name
+    monkeypatch.setattr(XPathSuggester, "_infer_field_name",
+                        lambda self, elem, text: inferred.append(text) or infer(self, elem, text))
+
+    samples = [listing_page(n) for n in range(6)] + [""]
+    suggestions = XPathSuggester().suggest_selectors_for_template(samples)
+
+    assert len(parsed) == len(samples)
+    # "Begagnade bilar", "Annons här" and repeated car names are inferred once
+    assert len(inferred) == len(set(inferred))
+    assert suggestions["price"].primary_selector.coverage == 1.0
+    # Unpositioned steps match the heading whether or not the banner shifts it
+    assert suggestions["name"].primary_selector.selector == "//body/div/h1"
+    assert [f.selector for f in suggestions["name"].fallback_selectors] == ["span.name"]
+
+
+def test_worker_processes_give_same_suggestions():
+    samples = [listing_page(n) for n in range(8)]
+
+    def summary(suggestions):
+        return {
+            name: (s.primary_selector.selector, s.confidence, s.data_type, sorted(s.sample_values),
+                   [f.selector for f in s.fallback_selectors])
+            for name, s in suggestions.items()
+        }
+
+    sequential = XPathSuggester().suggest_selectors_for_template(samples)
+    parallel = XPathSuggester(max_workers=2).suggest_selectors_for_template(samples)
+    assert summary(parallel) == summary(sequential)
+
+    with pytest.raises(ValueError):
+        XPathSuggester(max_workers=2).suggest_selectors_for_template(["", "<html>"])